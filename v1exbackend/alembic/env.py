@@ -28,6 +28,9 @@ from app.models import (
     Event,
     Embedding,
     CodeSnapshot,
+    RateLimitAudit,
+    RateLimitRollupMinute,
+    RateLimitRollupHour,
 )
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,101 @@
+"""create rate_limit_audit rollup tables
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUP_TABLES = {
+    'rate_limit_audit_rollups_minute': 'minute',
+    'rate_limit_audit_rollups_hour': 'hour',
+}
+
+# Límites superiores del histograma de tiempos de respuesta (ms)
+RESPONSE_TIME_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500)
+
+
+def _histogram_columns() -> list:
+    names = [f'rt_le_{bound}ms' for bound in RESPONSE_TIME_BUCKETS_MS]
+    names.append(f'rt_gt_{RESPONSE_TIME_BUCKETS_MS[-1]}ms')
+    return [sa.Column(name, sa.Integer, server_default='0', nullable=False) for name in names]
+
+
+def upgrade() -> None:
+    """Create per-minute and per-hour rollups and backfill them from rate_limit_audits."""
+
+    rate_limit_action_enum = postgresql.ENUM(name='ratelimitaction', create_type=False)
+
+    for table, unit in ROLLUP_TABLES.items():
+        op.create_table(
+            table,
+            sa.Column('user_id', sa.String(36), primary_key=True),
+            sa.Column('action', rate_limit_action_enum, primary_key=True),
+            sa.Column('bucket_start', sa.DateTime, primary_key=True),
+
+            # Requests
+            sa.Column('request_count', sa.Integer, server_default='0', nullable=False),
+            sa.Column('allowed_count', sa.Integer, server_default='0', nullable=False),
+            sa.Column('blocked_count', sa.Integer, server_default='0', nullable=False),
+            sa.Column('alert_count', sa.Integer, server_default='0', nullable=False),
+
+            # OpenAI
+            sa.Column('openai_tokens', sa.BigInteger, server_default='0', nullable=False),
+            sa.Column('cost_cents', sa.Float, server_default='0', nullable=False),
+
+            # Response times
+            sa.Column('response_time_sum_ms', sa.Float, server_default='0', nullable=False),
+            sa.Column('response_time_count', sa.Integer, server_default='0', nullable=False),
+            *_histogram_columns(),
+        )
+
+        # Windows over all users
+        op.create_index(f'ix_{table}_bucket_start', table, ['bucket_start'])
+
+        # Backfill desde la auditoría existente
+        histogram_select = []
+        lower = 0
+        for bound in RESPONSE_TIME_BUCKETS_MS:
+            histogram_select.append(
+                f"count(*) FILTER (WHERE response_time_ms > {lower} AND response_time_ms <= {bound})"
+            )
+            lower = bound
+        histogram_select.append(f"count(*) FILTER (WHERE response_time_ms > {lower})")
+
+        op.execute(f"""
+            INSERT INTO {table}
+            SELECT
+                user_id,
+                action,
+                date_trunc('{unit}', timestamp),
+                count(*),
+                count(*) FILTER (WHERE allowed),
+                count(*) FILTER (WHERE NOT allowed),
+                count(*) FILTER (WHERE alert_triggered),
+                coalesce(sum(openai_total_tokens), 0),
+                coalesce(sum(estimated_cost_cents), 0),
+                coalesce(sum(response_time_ms) FILTER (WHERE response_time_ms > 0), 0),
+                count(*) FILTER (WHERE response_time_ms > 0),
+                {', '.join(histogram_select)}
+            FROM rate_limit_audits
+            GROUP BY 1, 2, 3
+        """)
+
+
+def downgrade() -> None:
+    """Drop rollup tables."""
+
+    for table in ROLLUP_TABLES:
+        op.drop_index(f'ix_{table}_bucket_start')
+        op.drop_table(table)
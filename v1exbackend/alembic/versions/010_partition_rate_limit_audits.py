@@ -0,0 +1,166 @@
+"""partition rate_limit_audits by day
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Particiones futuras creadas por la migración; después las crea
+# RateLimitAuditPartitionService.ensure_partitions()
+PARTITIONS_AHEAD_DAYS = 7
+
+
+def _columns() -> list:
+    """Columnas de rate_limit_audits (migración 008)."""
+    rate_limit_action_enum = postgresql.ENUM(name='ratelimitaction', create_type=False)
+    rate_limit_status_enum = postgresql.ENUM(name='ratelimitstatus', create_type=False)
+
+    return [
+        sa.Column('id', sa.String(36), nullable=False),
+        sa.Column('user_id', sa.String(36), nullable=False),
+
+        # Request info
+        sa.Column('endpoint', sa.String(200), nullable=False),
+        sa.Column('method', sa.String(10), nullable=False),
+        sa.Column('action', rate_limit_action_enum, nullable=False),
+
+        # Rate limit status
+        sa.Column('status', rate_limit_status_enum, nullable=False),
+        sa.Column('allowed', sa.Boolean, default=True, nullable=False),
+
+        # Token Bucket info
+        sa.Column('tokens_requested', sa.Integer, default=1, nullable=False),
+        sa.Column('tokens_available', sa.Integer, nullable=False),
+        sa.Column('tokens_consumed', sa.Integer, default=0, nullable=False),
+
+        # OpenAI token tracking
+        sa.Column('openai_prompt_tokens', sa.Integer, nullable=True),
+        sa.Column('openai_completion_tokens', sa.Integer, nullable=True),
+        sa.Column('openai_total_tokens', sa.Integer, nullable=True),
+        sa.Column('openai_model', sa.String(100), nullable=True),
+
+        # Cost tracking
+        sa.Column('estimated_cost_cents', sa.Float, nullable=True),
+
+        # Response info
+        sa.Column('response_time_ms', sa.Float, nullable=True),
+        sa.Column('http_status_code', sa.Integer, nullable=True),
+
+        # Rate limit details
+        sa.Column('rate_limit_key', sa.String(200), nullable=False),
+        sa.Column('rate_limit_window_seconds', sa.Integer, nullable=False),
+        sa.Column('rate_limit_max_requests', sa.Integer, nullable=False),
+        sa.Column('current_request_count', sa.Integer, nullable=False),
+
+        # Alert flags
+        sa.Column('is_suspicious', sa.Boolean, default=False, nullable=False),
+        sa.Column('alert_triggered', sa.Boolean, default=False, nullable=False),
+        sa.Column('alert_reason', sa.String(500), nullable=True),
+
+        # IP and user agent
+        sa.Column('ip_address', sa.String(45), nullable=True),
+        sa.Column('user_agent', sa.String(500), nullable=True),
+
+        # Metadata
+        sa.Column('audit_metadata', postgresql.JSONB, default={}, nullable=False),
+
+        # Timestamps
+        sa.Column('timestamp', sa.DateTime, default=sa.func.now(), nullable=False),
+    ]
+
+
+def _create_indexes() -> None:
+    """Índices de la migración 008 (en la tabla padre se propagan a las particiones)."""
+    op.create_index('ix_rate_limit_audits_user_id', 'rate_limit_audits', ['user_id'])
+    op.create_index('ix_rate_limit_audits_action', 'rate_limit_audits', ['action'])
+    op.create_index('ix_rate_limit_audits_status', 'rate_limit_audits', ['status'])
+    op.create_index('ix_rate_limit_audits_timestamp', 'rate_limit_audits', ['timestamp'])
+    op.create_index('idx_rate_limit_audits_user_timestamp', 'rate_limit_audits', ['user_id', 'timestamp'])
+    op.create_index('idx_rate_limit_audits_action_timestamp', 'rate_limit_audits', ['action', 'timestamp'])
+    op.create_index('idx_rate_limit_audits_status_timestamp', 'rate_limit_audits', ['status', 'timestamp'])
+    op.create_index('idx_rate_limit_audits_alert', 'rate_limit_audits', ['alert_triggered', 'timestamp'])
+    op.create_index('idx_rate_limit_audits_user_action', 'rate_limit_audits', ['user_id', 'action', 'timestamp'])
+
+
+def upgrade() -> None:
+    """Convert rate_limit_audits to daily range partitions on timestamp."""
+
+    # El PK de una tabla particionada debe incluir la clave de partición
+    op.create_table(
+        'rate_limit_audits_partitioned',
+        *_columns(),
+        sa.PrimaryKeyConstraint('id', 'timestamp', name='rate_limit_audits_partitioned_pkey'),
+        postgresql_partition_by='RANGE (timestamp)'
+    )
+
+    # Una partición por día desde el registro más antiguo hasta hoy + N días
+    op.execute(f"""
+        DO $$
+        DECLARE
+            day date;
+            last_day date := current_date + {PARTITIONS_AHEAD_DAYS};
+        BEGIN
+            SELECT coalesce(min(timestamp)::date, current_date) INTO day FROM rate_limit_audits;
+            WHILE day <= last_day LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF rate_limit_audits_partitioned '
+                    'FOR VALUES FROM (%L) TO (%L)',
+                    'rate_limit_audits_p' || to_char(day, 'YYYYMMDD'), day, day + 1
+                );
+                day := day + 1;
+            END LOOP;
+        END $$;
+    """)
+
+    # Registros fuera de las particiones diarias (reloj adelantado, mantenimiento
+    # atrasado) caen aquí en vez de fallar el INSERT del writer; ensure_partitions
+    # los mueve a la partición del día cuando la crea
+    op.execute(
+        "CREATE TABLE rate_limit_audits_default "
+        "PARTITION OF rate_limit_audits_partitioned DEFAULT"
+    )
+
+    op.execute("INSERT INTO rate_limit_audits_partitioned SELECT * FROM rate_limit_audits")
+
+    op.drop_table('rate_limit_audits')
+    op.rename_table('rate_limit_audits_partitioned', 'rate_limit_audits')
+    op.execute(
+        "ALTER TABLE rate_limit_audits "
+        "RENAME CONSTRAINT rate_limit_audits_partitioned_pkey TO rate_limit_audits_pkey"
+    )
+
+    _create_indexes()
+
+
+def downgrade() -> None:
+    """Back to a single heap table."""
+
+    op.create_table(
+        'rate_limit_audits_plain',
+        *_columns(),
+        sa.PrimaryKeyConstraint('id', name='rate_limit_audits_plain_pkey'),
+    )
+
+    op.execute("INSERT INTO rate_limit_audits_plain SELECT * FROM rate_limit_audits")
+
+    # DROP de la tabla padre elimina también las particiones
+    op.drop_table('rate_limit_audits')
+    op.rename_table('rate_limit_audits_plain', 'rate_limit_audits')
+    op.execute(
+        "ALTER TABLE rate_limit_audits "
+        "RENAME CONSTRAINT rate_limit_audits_plain_pkey TO rate_limit_audits_pkey"
+    )
+
+    _create_indexes()
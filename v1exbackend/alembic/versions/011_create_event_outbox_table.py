@@ -0,0 +1,50 @@
+"""create event_outbox table
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSON
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the transactional outbox for event delivery."""
+    op.create_table(
+        'event_outbox',
+        sa.Column('id', sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column('event_id', sa.String(36), sa.ForeignKey('events.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('message', JSON, nullable=False),
+        sa.Column('routing_key', sa.String(255), nullable=False),
+
+        # Retries
+        sa.Column('attempts', sa.Integer, server_default='0', nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.Column('last_error', sa.Text, nullable=True),
+
+        # Delivery per destination
+        sa.Column('parquet_written_at', sa.DateTime(), nullable=True),
+        sa.Column('published_at', sa.DateTime(), nullable=True),
+
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('CURRENT_TIMESTAMP')),
+        sa.UniqueConstraint('event_id', name='uq_event_outbox_event_id'),
+    )
+
+    # The relay claims due rows in order
+    op.create_index('idx_event_outbox_next_attempt', 'event_outbox', ['next_attempt_at', 'id'])
+
+
+def downgrade() -> None:
+    """Drop event_outbox table."""
+    op.drop_index('idx_event_outbox_next_attempt', 'event_outbox')
+    op.drop_table('event_outbox')
@@ -1,7 +1,8 @@
 """Individual agent node implementations."""
 
+import json
 import logging
-from typing import Any
+from typing import Any, Awaitable, Callable, Optional
 from uuid import uuid4
 
 from openai import AsyncOpenAI
@@ -258,49 +259,36 @@ async def course_manager_node(state: AgentState) -> dict[str, Any]:
 
 # ==================== Nodo 4: Feedback Agent (Continuous) ====================
 
-async def feedback_node(state: AgentState) -> dict[str, Any]:
-    """
-    Nodo 4: Provide real-time feedback during coding.
+FeedbackDeltaCallback = Callable[[str], Awaitable[None]]
 
-    Tools:
-    - analyze_code
-    - give_hint
-    - validate
-    """
-    logger.info(f"[Nodo 4] Providing feedback for task: {state.get('task_id')}")
 
-    try:
-        task_id = state.get("task_id")
-        user_id = state.get("user_id")
-        code = state.get("code_snapshot", "")
+async def _build_feedback_prompt(state: AgentState) -> str:
+    """Prompt for the feedback model, with task context and similar validated code."""
+    task_id = state.get("task_id")
+    user_id = state.get("user_id")
+    code = state.get("code_snapshot", "")
 
-        if not code or not task_id:
-            return {
-                "current_node": "nodo_4_feedback",
-                "error": "No code or task_id provided"
-            }
+    task_context = await get_task_context(
+        goal_id=state.get("goal_id"),
+        user_id=user_id,
+        include_completed=True
+    )
 
-        task_context = await get_task_context(
-            goal_id=state.get("goal_id"),
-            user_id=user_id,
-            include_completed=True
-        )
+    similar_code = await get_similar_code(
+        code=code,
+        user_id=user_id,
+        language="python",
+        limit=3,
+        min_similarity=0.75,
+        only_validated=True,
+        scope="user"
+    )
 
-        similar_code = await get_similar_code(
-            code=code,
-            user_id=user_id,
-            language="python",
-            limit=3,
-            min_similarity=0.75,
-            only_validated=True,
-            scope="user"
-        )
-
-        code_context = format_rag_context(similar_code, max_results=2)
+    code_context = format_rag_context(similar_code, max_results=2)
 
-        task_info = next((t for t in task_context.get("tasks", []) if t["id"] == task_id), None)
+    task_info = next((t for t in task_context.get("tasks", []) if t["id"] == task_id), None)
 
-        prompt = f"""Analyze this code submission and provide constructive feedback.
+    return f"""Analyze this code submission and provide constructive feedback.
 
 Task: {task_info.get('title') if task_info else 'Unknown'}
 Description: {task_info.get('description') if task_info else ''}
@@ -320,43 +308,100 @@ Provide JSON response with:
 - hints: list of strings (specific improvement suggestions)
 - issues_found: list of strings (any bugs or problems)"""
 
-        response = await openai_client.chat.completions.create(
+
+def parse_validation(content: str) -> dict[str, Any]:
+    """Parse the model's JSON answer, tolerating a surrounding code fence."""
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[1] if "\n" in content else ""
+        content = content.rsplit("```", 1)[0]
+    return json.loads(content)
+
+
+async def _save_feedback_snapshot(state: AgentState, validation: dict[str, Any]) -> Any:
+    """Store the validated code snapshot and return its id."""
+    async with AsyncSessionLocal() as db:
+        from app.services.code_snapshot_service import CodeSnapshotService
+        from app.schemas.code_snapshot_schemas import CodeSnapshotCreate
+
+        snapshot_service = CodeSnapshotService(db)
+
+        snapshot_create = CodeSnapshotCreate(
+            task_id=state.get("task_id"),
+            user_id=state.get("user_id"),
+            code_content=state.get("code_snapshot", ""),
+            language="python",
+            validation_passed=validation["passed"],
+            validation_score=validation["score"],
+            validation_feedback=validation["feedback"],
+            issues_found=validation.get("issues_found", [])
+        )
+
+        snapshot = await snapshot_service.create_snapshot(snapshot_create)
+        await db.commit()
+
+    return snapshot.id
+
+
+async def run_feedback(
+    state: AgentState,
+    on_delta: Optional[FeedbackDeltaCallback] = None
+) -> dict[str, Any]:
+    """
+    Feedback pipeline with a streaming completion.
+
+    Model tokens are passed to `on_delta` as they arrive, so callers (the
+    task.validate WebSocket handler) can show feedback long before the
+    full answer is parsed.
+
+    Args:
+        state: Agent state with user_id, task_id, goal_id and code_snapshot
+        on_delta: Called with each content delta
+
+    Returns:
+        The node's state update (validation_results and snapshot_id, or error)
+    """
+    logger.info(f"[Nodo 4] Providing feedback for task: {state.get('task_id')}")
+
+    try:
+        if not state.get("code_snapshot") or not state.get("task_id"):
+            return {
+                "current_node": "nodo_4_feedback",
+                "error": "No code or task_id provided"
+            }
+
+        prompt = await _build_feedback_prompt(state)
+
+        stream = await openai_client.chat.completions.create(
             model=settings.OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": "You are an expert code reviewer providing constructive feedback."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.3,
-            max_tokens=800
+            max_tokens=800,
+            stream=True
         )
 
-        import json
-        validation = json.loads(response.choices[0].message.content)
-
-        async with AsyncSessionLocal() as db:
-            from app.services.code_snapshot_service import CodeSnapshotService
-            from app.schemas.code_snapshot_schemas import CodeSnapshotCreate
-
-            snapshot_service = CodeSnapshotService(db)
-
-            snapshot_create = CodeSnapshotCreate(
-                task_id=task_id,
-                user_id=user_id,
-                code_content=code,
-                language="python",
-                validation_passed=validation["passed"],
-                validation_score=validation["score"],
-                validation_feedback=validation["feedback"],
-                issues_found=validation.get("issues_found", [])
-            )
-
-            snapshot = await snapshot_service.create_snapshot(snapshot_create)
-            await db.commit()
-
-        logger.info(f"[Nodo 4] Code validated: {snapshot.id}, passed={validation['passed']}")
+        parts = []
+        async with stream:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                if on_delta is not None:
+                    await on_delta(delta)
+
+        validation = parse_validation("".join(parts))
+        snapshot_id = await _save_feedback_snapshot(state, validation)
+
+        logger.info(f"[Nodo 4] Code validated: {snapshot_id}, passed={validation['passed']}")
         return {
             "validation_results": validation,
-            "snapshot_id": snapshot.id,
+            "snapshot_id": snapshot_id,
             "current_node": "nodo_4_feedback",
         }
 
@@ -368,6 +413,18 @@ Provide JSON response with:
         }
 
 
+async def feedback_node(state: AgentState) -> dict[str, Any]:
+    """
+    Nodo 4: Provide real-time feedback during coding.
+
+    Tools:
+    - analyze_code
+    - give_hint
+    - validate
+    """
+    return await run_feedback(state)
+
+
 # ==================== Nodo 5: Performance Evaluator ====================
 
 async def performance_evaluator_node(state: AgentState) -> dict[str, Any]:
@@ -4,8 +4,9 @@ from fastapi import APIRouter, status
 from fastapi.responses import JSONResponse
 
 from app.core.config import settings
+from app.core.password_hasher import get_password_hasher
 from app.core.redis_client import get_redis
-from app.core.rabbitmq import get_channel
+from app.core.rabbitmq import get_connection, get_consumer_runtime
 
 router = APIRouter()
 
@@ -39,10 +40,12 @@ async def detailed_health_check() -> JSONResponse:
         pass
 
     # Check RabbitMQ
+    consumers = {}
     try:
-        channel = get_channel()
-        if channel and not channel.is_closed:
+        connection = get_connection()
+        if not connection.is_closed:
             checks["rabbitmq"] = True
+        consumers = get_consumer_runtime().metrics()
     except Exception:
         pass
 
@@ -56,5 +59,7 @@ async def detailed_health_check() -> JSONResponse:
             "status": "healthy" if all_healthy else "degraded",
             "version": settings.APP_VERSION,
             "services": checks,
+            "password_hasher": get_password_hasher().metrics(),
+            "rabbitmq_consumers": consumers,
         }
     )
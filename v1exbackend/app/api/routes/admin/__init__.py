@@ -4,11 +4,13 @@ Admin routes - Endpoints para administradores.
 
 from fastapi import APIRouter
 
-from app.api.routes.admin import rate_limits
+from app.api.routes.admin import analytics, rate_limits, websockets
 
 admin_router = APIRouter(prefix="/admin", tags=["Admin"])
 
 # Include sub-routers
 admin_router.include_router(rate_limits.router, prefix="/rate-limits", tags=["rate-limits"])
+admin_router.include_router(websockets.router, prefix="/websockets", tags=["websockets"])
+admin_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
 
 __all__ = ["admin_router"]
@@ -0,0 +1,175 @@
+"""
+Admin Analytics Endpoints - Reportes de eventos desde el lago Parquet.
+
+Estas consultas no tocan PostgreSQL: leen los archivos Parquet que escribe
+el sink de eventos, así que los reportes pesados no cargan la base OLTP.
+Los eventos llegan al lago desde el outbox con unos segundos de retraso.
+"""
+
+from typing import List, Optional
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.core.security import get_current_admin_user_id
+from app.models import EventType
+from app.services.event_analytics_service import ACTIVITY_BUCKETS, EventAnalyticsService, _to_naive_utc
+
+router = APIRouter()
+
+# Rango por defecto cuando no se indica start_date
+DEFAULT_RANGE = timedelta(days=7)
+
+
+def _time_range(start_date: Optional[datetime], end_date: Optional[datetime]) -> tuple[datetime, datetime]:
+    # Fechas con zona (p. ej. "...Z") y sin zona se comparan en UTC naive
+    end = _to_naive_utc(end_date) if end_date else datetime.utcnow()
+    start = _to_naive_utc(start_date) if start_date else end - DEFAULT_RANGE
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_date must be before end_date"
+        )
+    return start, end
+
+
+def _event_types(event_type: Optional[List[str]]) -> Optional[List[str]]:
+    if not event_type:
+        return None
+    try:
+        return [EventType(value).value for value in event_type]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid event_type: {event_type}"
+        )
+
+
+# ============================================================================
+# GET /admin/analytics/events/daily-counts
+# ============================================================================
+
+@router.get("/events/daily-counts")
+async def get_daily_event_counts(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    event_type: Optional[List[str]] = Query(None),
+    user_id: Optional[str] = None,
+    admin_id: str = Depends(get_current_admin_user_id)
+):
+    """
+    Número de eventos por día y tipo en [start_date, end_date).
+
+    Por defecto, los últimos 7 días. `event_type` se puede repetir
+    (`?event_type=goal.created&event_type=task.completed`).
+
+    **Returns:**
+    ```json
+    {
+        "start_date": "2025-01-08T00:00:00",
+        "end_date": "2025-01-15T00:00:00",
+        "counts": [
+            {"date": "2025-01-08", "event_type": "goal.created", "count": 41},
+            {"date": "2025-01-08", "event_type": "task.completed", "count": 230}
+        ]
+    }
+    ```
+    """
+    start, end = _time_range(start_date, end_date)
+    counts = await EventAnalyticsService().counts_by_type_per_day(
+        start, end, event_types=_event_types(event_type), user_id=user_id
+    )
+
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "counts": counts
+    }
+
+
+# ============================================================================
+# GET /admin/analytics/events/top-users
+# ============================================================================
+
+@router.get("/events/top-users")
+async def get_top_users(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    event_type: Optional[List[str]] = Query(None),
+    limit: int = Query(20, ge=1, le=1000),
+    admin_id: str = Depends(get_current_admin_user_id)
+):
+    """
+    Usuarios con más eventos en [start_date, end_date), de más a menos.
+
+    **Returns:**
+    ```json
+    {
+        "start_date": "2025-01-08T00:00:00",
+        "end_date": "2025-01-15T00:00:00",
+        "users": [
+            {"user_id": "usr_123", "count": 512},
+            {"user_id": "usr_456", "count": 301}
+        ]
+    }
+    ```
+    """
+    start, end = _time_range(start_date, end_date)
+    users = await EventAnalyticsService().top_users(
+        start, end, limit=limit, event_types=_event_types(event_type)
+    )
+
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "users": users
+    }
+
+
+# ============================================================================
+# GET /admin/analytics/users/{user_id}/activity
+# ============================================================================
+
+@router.get("/users/{user_id}/activity")
+async def get_user_activity(
+    user_id: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    bucket: str = Query("day", description=f"One of {', '.join(ACTIVITY_BUCKETS)}"),
+    event_type: Optional[List[str]] = Query(None),
+    admin_id: str = Depends(get_current_admin_user_id)
+):
+    """
+    Histograma de actividad de un usuario: eventos por hora, día o semana.
+
+    Los intervalos sin eventos no aparecen en la respuesta.
+
+    **Returns:**
+    ```json
+    {
+        "user_id": "usr_123",
+        "bucket": "day",
+        "activity": [
+            {"bucket": "2025-01-08T00:00:00", "count": 17},
+            {"bucket": "2025-01-10T00:00:00", "count": 4}
+        ]
+    }
+    ```
+    """
+    if bucket not in ACTIVITY_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid bucket: {bucket}"
+        )
+
+    start, end = _time_range(start_date, end_date)
+    activity = await EventAnalyticsService().user_activity(
+        user_id, start, end, bucket=bucket, event_types=_event_types(event_type)
+    )
+
+    return {
+        "user_id": user_id,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "bucket": bucket,
+        "activity": activity
+    }
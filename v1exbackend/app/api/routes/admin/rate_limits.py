@@ -3,7 +3,7 @@ Admin Rate Limit Endpoints - Gestión y monitoreo de rate limits.
 """
 
 from typing import Optional, List
-from datetime import datetime, timedelta
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -11,6 +11,7 @@ from app.core.database import get_db
 from app.core.security import get_current_admin_user_id
 from app.core.rate_limiter import get_rate_limiter
 from app.services.rate_limit_audit_service import RateLimitAuditService
+from app.services.rate_limit_audit_writer import get_audit_writer
 from app.models import RateLimitAction
 
 router = APIRouter()
@@ -59,6 +60,46 @@ async def get_user_rate_limit_status(
     }
 
 
+# ============================================================================
+# GET /admin/rate-limits/users/status
+# ============================================================================
+
+MAX_BULK_USERS = 500
+
+
+@router.get("/users/status")
+async def get_users_rate_limit_status(
+    user_ids: List[str] = Query(..., description="User IDs (repeat the parameter)"),
+    admin_id: str = Depends(get_current_admin_user_id)
+):
+    """
+    Obtener el estado de los rate limits de varios usuarios a la vez.
+
+    Todas las lecturas se hacen en un único pipeline de Redis.
+
+    **Example:**
+    ```
+    GET /admin/rate-limits/users/status?user_ids=usr_123&user_ids=usr_456
+    ```
+    """
+    if len(user_ids) > MAX_BULK_USERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many user_ids (max {MAX_BULK_USERS})"
+        )
+
+    rate_limiter = await get_rate_limiter()
+    statuses = await rate_limiter.get_users_status(user_ids)
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "users": [
+            {"user_id": user_id, "limits": limits}
+            for user_id, limits in statuses.items()
+        ]
+    }
+
+
 # ============================================================================
 # GET /admin/rate-limits/audits
 # ============================================================================
@@ -173,6 +214,10 @@ async def get_rate_limit_statistics(
     Si se provee user_id, retorna estadísticas del usuario.
     Si no, retorna estadísticas globales del sistema.
 
+    La ventana es [start_date, end_date). Si ambos extremos caen en minuto
+    exacto (o no se pasan: últimas 24h alineadas al minuto) se lee de los
+    rollups por hora/minuto en lugar de la tabla de auditoría.
+
     **User Statistics Example:**
     ```json
     {
@@ -213,75 +258,11 @@ async def get_rate_limit_statistics(
         return stats
     else:
         # Global statistics
-        # Default: últimas 24 horas
-        if not start_date:
-            start_date = datetime.utcnow() - timedelta(hours=24)
-        if not end_date:
-            end_date = datetime.utcnow()
-
-        from sqlalchemy import select, func
-        from app.models import RateLimitAudit
-
-        query = select(RateLimitAudit).where(
-            RateLimitAudit.timestamp >= start_date,
-            RateLimitAudit.timestamp <= end_date
+        return await audit_service.get_global_statistics(
+            start_date=start_date,
+            end_date=end_date
         )
 
-        result = await db.execute(query)
-        audits = result.scalars().all()
-
-        total_requests = len(audits)
-        allowed_requests = sum(1 for a in audits if a.allowed)
-        blocked_requests = total_requests - allowed_requests
-
-        # Por acción
-        by_action = {}
-        for action in RateLimitAction:
-            action_audits = [a for a in audits if a.action == action]
-            if action_audits:
-                by_action[action.value] = {
-                    "total": len(action_audits),
-                    "allowed": sum(1 for a in action_audits if a.allowed),
-                    "blocked": sum(1 for a in action_audits if not a.allowed)
-                }
-
-        # Tokens y costos totales
-        total_openai_tokens = sum(a.openai_total_tokens or 0 for a in audits)
-        total_cost_cents = sum(a.estimated_cost_cents or 0 for a in audits)
-
-        # Usuarios únicos
-        unique_users = len(set(a.user_id for a in audits))
-
-        # Alertas
-        total_alerts = sum(1 for a in audits if a.alert_triggered)
-
-        return {
-            "system": "global",
-            "period": {
-                "start": start_date.isoformat(),
-                "end": end_date.isoformat()
-            },
-            "requests": {
-                "total": total_requests,
-                "allowed": allowed_requests,
-                "blocked": blocked_requests,
-                "block_rate": blocked_requests / total_requests if total_requests > 0 else 0
-            },
-            "users": {
-                "unique_users": unique_users,
-                "avg_requests_per_user": total_requests / unique_users if unique_users > 0 else 0
-            },
-            "by_action": by_action,
-            "openai": {
-                "total_tokens": total_openai_tokens,
-                "estimated_cost_usd": total_cost_cents / 100 if total_cost_cents else 0
-            },
-            "alerts": {
-                "total": total_alerts,
-                "rate": total_alerts / total_requests if total_requests > 0 else 0
-            }
-        }
-
 
 # ============================================================================
 # POST /admin/rate-limits/users/{user_id}/reset
@@ -327,6 +308,41 @@ async def reset_user_rate_limits(
     }
 
 
+# ============================================================================
+# POST /admin/rate-limits/users/reset
+# ============================================================================
+
+@router.post("/users/reset")
+async def reset_users_rate_limits(
+    user_ids: List[str] = Query(..., description="User IDs (repeat the parameter)"),
+    action: Optional[RateLimitAction] = Query(None, description="Specific action to reset (or all if not provided)"),
+    admin_id: str = Depends(get_current_admin_user_id)
+):
+    """
+    Resetear rate limits de varios usuarios con un único DELETE en Redis.
+
+    **Example:**
+    ```
+    POST /admin/rate-limits/users/reset?user_ids=usr_123&user_ids=usr_456
+    ```
+    """
+    if len(user_ids) > MAX_BULK_USERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many user_ids (max {MAX_BULK_USERS})"
+        )
+
+    rate_limiter = await get_rate_limiter()
+    await rate_limiter.reset_users_limits(user_ids, action.value if action else None)
+
+    return {
+        "success": True,
+        "user_ids": user_ids,
+        "action": action.value if action else "all",
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
 # ============================================================================
 # GET /admin/rate-limits/top-consumers
 # ============================================================================
@@ -490,16 +506,58 @@ async def get_rate_limit_config(
             "window_seconds": config.window_seconds,
             "burst_multiplier": config.burst_multiplier,
             "effective_burst_limit": int(config.max_requests * config.burst_multiplier),
+            "algorithm": config.algorithm,
+            "lease_size": config.lease_size,
+            "lease_ttl_seconds": config.lease_ttl_seconds,
             "description": _get_action_description(action)
         }
 
     return {
         "configs": configs,
+        # Motor por defecto (campo histórico); el de cada acción va en configs
         "algorithm": "Token Bucket",
+        "algorithms": list(rate_limiter.engines.keys()),
         "backend": "Redis"
     }
 
 
+# ============================================================================
+# GET /admin/rate-limits/audit-writer
+# ============================================================================
+
+@router.get("/audit-writer")
+async def get_audit_writer_metrics(
+    admin_id: str = Depends(get_current_admin_user_id)
+):
+    """
+    Métricas del writer de auditoría en background.
+
+    `dropped` cuenta los registros descartados por cola llena (backpressure);
+    `failed` los que no se pudieron insertar.
+
+    **Returns:**
+    ```json
+    {
+        "running": true,
+        "queue_depth": 12,
+        "queue_capacity": 10000,
+        "max_queue_depth": 840,
+        "enqueued": 152340,
+        "dropped": 0,
+        "written": 152328,
+        "failed": 0,
+        "batches": 611,
+        "last_flush_ms": 8.41
+    }
+    ```
+    """
+    writer = get_audit_writer()
+    if writer is None:
+        raise HTTPException(status_code=503, detail="Audit writer not running")
+
+    return writer.metrics()
+
+
 def _get_action_description(action: str) -> str:
     """Helper para describir cada acción."""
     descriptions = {
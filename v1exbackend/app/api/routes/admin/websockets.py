@@ -0,0 +1,84 @@
+"""
+Admin WebSocket Endpoints - Monitoreo de conexiones WebSocket.
+"""
+
+from fastapi import APIRouter, Depends
+
+from app.core.redis_client import RedisService
+from app.core.security import get_current_admin_user_id
+from app.core.websocket import connection_manager
+
+router = APIRouter()
+
+
+# ============================================================================
+# GET /admin/websockets/online
+# ============================================================================
+
+@router.get("/online")
+async def get_online_users(
+    admin_id: str = Depends(get_current_admin_user_id)
+):
+    """
+    Usuarios con al menos una conexión WebSocket activa (todas las instancias).
+
+    Se cuenta con ZCARD sobre el índice de usuarios online, sin recorrer
+    las conexiones. Incluye los contadores de las colas de salida de las
+    conexiones de esta instancia (mensajes descartados o fusionados por
+    clientes lentos) y del supervisor (rechazos por límite de conexiones,
+    desalojos por inactividad, pings y TTL renovados).
+
+    **Returns:**
+    ```json
+    {
+        "online_users": 1523,
+        "local_connections": 412,
+        "outbound": {
+            "queued": 3,
+            "max_queue_depth": 2,
+            "sent": 98211,
+            "dropped": 0,
+            "coalesced": 17
+        },
+        "supervisor": {
+            "supervised": 412,
+            "rejected": 5,
+            "evicted": 12,
+            "pings_sent": 240,
+            "ttl_refreshes": 8650
+        }
+    }
+    ```
+    """
+    return {
+        "online_users": await RedisService().count_online_users(),
+        "local_connections": len(connection_manager.active_connections),
+        "outbound": connection_manager.outbound_metrics(),
+        "supervisor": connection_manager.supervisor.metrics()
+    }
+
+
+# ============================================================================
+# GET /admin/websockets/users/{user_id}
+# ============================================================================
+
+@router.get("/users/{user_id}")
+async def get_user_websocket_connections(
+    user_id: str,
+    admin_id: str = Depends(get_current_admin_user_id)
+):
+    """
+    Conexiones WebSocket activas de un usuario (todas las instancias).
+
+    **Returns:**
+    ```json
+    {
+        "user_id": "usr_123",
+        "connections": ["3f1c...", "9a2b..."]
+    }
+    ```
+    """
+    return {
+        "user_id": user_id,
+        "connections": await RedisService().get_user_connections(user_id)
+    }
@@ -29,6 +29,9 @@ async def create_event(
     1. PostgreSQL
     2. Parquet file (partitioned by date)
     3. RabbitMQ (pub/sub)
+
+    Only the PostgreSQL commit happens in the request; Parquet and RabbitMQ
+    are delivered in background from the event outbox.
     """
     service = EventService(db)
 
@@ -3,7 +3,9 @@
 import logging
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+from app.core.config import settings
 from app.core.websocket import connection_manager, WebSocketMessage
+from app.core.ws_codec import MessageCodec
 from app.services.message_router import MessageRouter
 
 logger = logging.getLogger(__name__)
@@ -17,6 +19,13 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
     Main WebSocket endpoint for real-time communication.
 
     Client connects with: ws://host:port/api/v1/ws?token=<jwt_token>
+
+    Optional wire format: `&format=msgpack` (binary frames) and
+    `&compress=deflate` (deflate messages above WS_COMPRESSION_THRESHOLD).
+
+    Session resume: messages pushed to a user carry a `seq`. A client that
+    reconnects with `&last_seq=<n>` first receives the messages it missed,
+    or `session.resync_required` if they are no longer buffered.
     """
     logger.info("WebSocket: Connection attempt received")
     # Authenticate connection
@@ -26,8 +35,18 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
         return
     logger.info(f"WebSocket: Authenticated user {user_id}")
 
-    # Accept and register connection
-    connection_id = await connection_manager.connect(websocket, user_id)
+    # Accept and register connection with the requested wire format
+    codec = MessageCodec.negotiate(websocket.query_params, settings.WS_COMPRESSION_THRESHOLD)
+    last_seq = websocket.query_params.get("last_seq")
+    connection_id = await connection_manager.connect(
+        websocket,
+        user_id,
+        codec,
+        last_seq=int(last_seq) if last_seq and last_seq.isdigit() else None
+    )
+    if connection_id is None:
+        logger.warning(f"WebSocket: Connection limit reached for user {user_id}")
+        return
 
     # Send welcome message
     welcome_msg = WebSocketMessage(
@@ -35,7 +54,8 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
         payload={
             "connection_id": connection_id,
             "user_id": user_id,
-            "message": "Connected to AI Goals Tracker"
+            "message": "Connected to AI Goals Tracker",
+            "wire": codec.describe()
         }
     )
     await connection_manager.send_personal_message(welcome_msg, connection_id)
@@ -46,12 +66,16 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
     try:
         # Listen for messages
         while True:
-            # Receive message
-            data = await websocket.receive_text()
+            # Receive message (text or binary frame)
+            data = await websocket.receive()
+            if data["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(data.get("code", 1000))
+            connection_manager.touch(connection_id)
 
             # Parse message
             try:
-                message = WebSocketMessage.from_json(data)
+                frame = data["text"] if data.get("text") is not None else data["bytes"]
+                message = WebSocketMessage.from_dict(codec.decode(frame))
             except Exception as e:
                 logger.error(f"Failed to parse message: {e}")
                 error_msg = WebSocketMessage(
@@ -61,7 +85,7 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
                 await connection_manager.send_personal_message(error_msg, connection_id)
                 continue
 
-            # Route message to appropriate handler
+            # Queue for the connection's handler pool (pings and cancels run now)
             await router_instance.route_message(message)
 
     except WebSocketDisconnect:
@@ -69,4 +93,5 @@ async def websocket_endpoint(websocket: WebSocket) -> None:
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
+        await router_instance.close()
         await connection_manager.disconnect(connection_id)
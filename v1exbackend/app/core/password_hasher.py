@@ -0,0 +1,143 @@
+"""Bounded executor for bcrypt hashing and verification."""
+
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_password
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full; callers should answer 503."""
+
+
+def _timed(func: Callable[..., Any], *args: Any) -> tuple[Any, float, float]:
+    started_at = time.perf_counter()
+    result = func(*args)
+    return result, started_at, time.perf_counter()
+
+
+class PasswordHasher:
+    """
+    Run bcrypt off the event loop in a dedicated, size-limited executor.
+
+    bcrypt releases the GIL while hashing, so worker threads hash in
+    parallel without blocking the loop. At most `max_workers` hashes run
+    at once and `max_queue` more may wait; beyond that calls fail fast
+    with PasswordHasherBusy instead of queueing unbounded work (login
+    storms would otherwise pile up latency for every caller).
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 32):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+        # Jobs submitted and not finished (queued + running)
+        self.pending = 0
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.queue_wait_total_ms = 0.0
+        self.queue_wait_max_ms = 0.0
+        self.hash_total_ms = 0.0
+        self.hash_max_ms = 0.0
+
+    async def hash(self, password: str) -> str:
+        """Hash a password for storing."""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash."""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy(
+                f"Password hashing saturated ({self.pending} pending)"
+            )
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        self.submitted += 1
+        submitted_at = time.perf_counter()
+
+        future: Future = self._executor.submit(_timed, func, *args)
+        # Released when the job really finishes (a cancelled caller does not
+        # stop a running hash), from the worker thread
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+
+        try:
+            result, started_at, finished_at = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+
+        self.completed += 1
+        queue_wait_ms = (started_at - submitted_at) * 1000
+        hash_ms = (finished_at - started_at) * 1000
+        self.queue_wait_total_ms += queue_wait_ms
+        self.queue_wait_max_ms = max(self.queue_wait_max_ms, queue_wait_ms)
+        self.hash_total_ms += hash_ms
+        self.hash_max_ms = max(self.hash_max_ms, hash_ms)
+
+        return result
+
+    def _release(self) -> None:
+        self.pending -= 1
+
+    def metrics(self) -> dict[str, Any]:
+        """Queue wait vs hash time and saturation counters."""
+        completed = self.completed or 1
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "queue_wait_ms": {
+                "avg": round(self.queue_wait_total_ms / completed, 2),
+                "max": round(self.queue_wait_max_ms, 2),
+            },
+            "hash_ms": {
+                "avg": round(self.hash_total_ms / completed, 2),
+                "max": round(self.hash_max_ms, 2),
+            },
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker threads after running jobs finish."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global hasher instance
+_password_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get the password hasher (created on first use)."""
+    global _password_hasher
+    if _password_hasher is None:
+        _password_hasher = PasswordHasher(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+        )
+    return _password_hasher
+
+
+def close_password_hasher() -> None:
+    """Shut down the password hasher."""
+    global _password_hasher
+    if _password_hasher:
+        _password_hasher.shutdown()
+        _password_hasher = None
@@ -2,70 +2,83 @@
 
 import json
 import logging
-from typing import Optional, Callable, Any
-from aio_pika import connect_robust, Connection, Channel, Exchange, ExchangeType, Message
-from aio_pika.abc import AbstractIncomingMessage
+from typing import Optional, Any
+from aio_pika import connect_robust, Connection
 
 from app.core.config import settings
+from app.core.rabbitmq_consumer import BatchHandler, ConsumerRuntime, Handler, QueueConsumer
+from app.core.rabbitmq_publisher import OutgoingMessage, RabbitMQPublisher
 
 logger = logging.getLogger(__name__)
 
-# Global RabbitMQ connection and channel
+# Global RabbitMQ connection; publishing and consuming open their own channels
 _connection: Optional[Connection] = None
-_channel: Optional[Channel] = None
-_exchange: Optional[Exchange] = None
+_publisher: Optional[RabbitMQPublisher] = None
+_consumers: Optional[ConsumerRuntime] = None
 
 
 async def init_rabbitmq() -> None:
-    """Initialize RabbitMQ connection and exchange."""
-    global _connection, _channel, _exchange
+    """Initialize RabbitMQ connection, the shared publisher and the consumer runtime."""
+    global _connection, _publisher, _consumers
 
     _connection = await connect_robust(settings.RABBITMQ_URL)
-    _channel = await _connection.channel()
 
-    # Declare exchange
-    _exchange = await _channel.declare_exchange(
-        settings.RABBITMQ_EXCHANGE,
-        ExchangeType.TOPIC,
-        durable=True,
+    # Every event (outbox relay, EventPublisher) goes to RABBITMQ_EXCHANGE,
+    # declared by the publisher channels and by each consumer
+    _publisher = RabbitMQPublisher(
+        _connection,
+        pool_size=settings.RABBITMQ_PUBLISH_CHANNELS,
+        max_in_flight=settings.RABBITMQ_PUBLISH_MAX_IN_FLIGHT,
+        confirm_timeout=settings.RABBITMQ_CONFIRM_TIMEOUT,
+        exchange_types={settings.RABBITMQ_EXCHANGE: settings.RABBITMQ_EXCHANGE_TYPE},
     )
+    await _publisher.start()
 
-    logger.info(f"RabbitMQ exchange '{settings.RABBITMQ_EXCHANGE}' declared")
+    _consumers = ConsumerRuntime(_connection)
 
 
 async def close_rabbitmq() -> None:
     """Close RabbitMQ connection."""
-    global _connection, _channel, _exchange
+    global _connection, _publisher, _consumers
 
-    if _channel:
-        await _channel.close()
+    if _consumers:
+        await _consumers.stop()
+    if _publisher:
+        await _publisher.close()
     if _connection:
         await _connection.close()
 
-    _channel = None
     _connection = None
-    _exchange = None
+    _publisher = None
+    _consumers = None
 
 
-def get_exchange() -> Exchange:
-    """Get RabbitMQ exchange instance."""
-    if _exchange is None:
+def get_connection() -> Connection:
+    """Get the shared RabbitMQ connection."""
+    if _connection is None:
         raise RuntimeError("RabbitMQ not initialized. Call init_rabbitmq() first.")
-    return _exchange
+    return _connection
 
 
-def get_channel() -> Channel:
-    """Get RabbitMQ channel instance."""
-    if _channel is None:
+def get_publisher() -> RabbitMQPublisher:
+    """Get the shared RabbitMQ publisher."""
+    if _publisher is None:
         raise RuntimeError("RabbitMQ not initialized. Call init_rabbitmq() first.")
-    return _channel
+    return _publisher
+
+
+def get_consumer_runtime() -> ConsumerRuntime:
+    """Get the consumer runtime (one channel per consumed queue)."""
+    if _consumers is None:
+        raise RuntimeError("RabbitMQ not initialized. Call init_rabbitmq() first.")
+    return _consumers
 
 
 class EventPublisher:
     """Publish events to RabbitMQ."""
 
     def __init__(self) -> None:
-        self.exchange = get_exchange()
+        self.publisher = get_publisher()
 
     async def publish(
         self,
@@ -81,16 +94,12 @@ class EventPublisher:
             payload: Event payload (will be JSON serialized)
             headers: Optional message headers
         """
-        message = Message(
+        await self.publisher.publish(OutgoingMessage(
+            exchange=settings.RABBITMQ_EXCHANGE,
+            routing_key=routing_key,
             body=json.dumps(payload).encode(),
-            content_type="application/json",
             headers=headers or {},
-        )
-
-        await self.exchange.publish(
-            message,
-            routing_key=routing_key,
-        )
+        ))
 
         logger.debug(f"Published event: {routing_key}")
 
@@ -100,58 +109,63 @@ class EventConsumer:
 
     def __init__(self, queue_name: str) -> None:
         self.queue_name = queue_name
-        self.channel = get_channel()
+        self.runtime = get_consumer_runtime()
+        self.routing_keys: list[str] = []
 
     async def bind(self, routing_keys: list[str]) -> None:
         """
-        Create queue and bind to routing keys.
+        Set the routing keys the queue subscribes to.
+
+        The queue, its retry queues and its dead-letter queue are declared
+        and bound when consuming starts.
 
         Args:
             routing_keys: List of routing keys to subscribe to
                          (e.g., ['goal.*', 'task.validated'])
         """
-        exchange = get_exchange()
-
-        # Declare queue
-        queue = await self.channel.declare_queue(
-            self.queue_name,
-            durable=True,
-        )
-
-        # Bind to routing keys
-        for routing_key in routing_keys:
-            await queue.bind(exchange, routing_key=routing_key)
-            logger.info(f"Queue '{self.queue_name}' bound to '{routing_key}'")
+        self.routing_keys = list(routing_keys)
 
     async def consume(
         self,
-        callback: Callable[[dict[str, Any], str], Any],
-        auto_ack: bool = False
-    ) -> None:
+        callback: Optional[Handler] = None,
+        batch_callback: Optional[BatchHandler] = None,
+        concurrency: Optional[int] = None,
+        prefetch: Optional[int] = None
+    ) -> QueueConsumer:
         """
         Start consuming messages.
 
+        Messages are acked after the callback returns. A callback that
+        raises sends the message to a retry queue with exponential backoff;
+        after RABBITMQ_CONSUMER_MAX_RETRIES it goes to the dead-letter queue.
+
         Args:
-            callback: Async function to handle messages
+            callback: Async function to handle messages one by one
                      Signature: async def handler(payload: dict, routing_key: str)
-            auto_ack: Whether to auto-acknowledge messages
+            batch_callback: Async function to handle lists of messages instead
+                     Signature: async def handler(messages: list[tuple[dict, str]])
+            concurrency: Handler tasks (default RABBITMQ_CONSUMER_CONCURRENCY)
+            prefetch: Unacked messages (default RABBITMQ_CONSUMER_PREFETCH)
         """
-        queue = await self.channel.get_queue(self.queue_name)
-
-        async def message_handler(message: AbstractIncomingMessage) -> None:
-            async with message.process(ignore_processed=auto_ack):
-                payload = json.loads(message.body.decode())
-                routing_key = message.routing_key or ""
-
-                try:
-                    await callback(payload, routing_key)
-                    logger.debug(f"Processed message: {routing_key}")
-                except Exception as e:
-                    logger.error(f"Error processing message {routing_key}: {e}")
-                    raise
-
-        await queue.consume(message_handler, no_ack=auto_ack)
+        consumer = self.runtime.add(QueueConsumer(
+            self.runtime.connection,
+            self.queue_name,
+            exchange=settings.RABBITMQ_EXCHANGE,
+            exchange_type=settings.RABBITMQ_EXCHANGE_TYPE,
+            routing_keys=self.routing_keys,
+            handler=callback,
+            batch_handler=batch_callback,
+            prefetch=prefetch or settings.RABBITMQ_CONSUMER_PREFETCH,
+            concurrency=concurrency or settings.RABBITMQ_CONSUMER_CONCURRENCY,
+            batch_size=settings.RABBITMQ_CONSUMER_BATCH_SIZE,
+            batch_timeout=settings.RABBITMQ_CONSUMER_BATCH_TIMEOUT,
+            max_retries=settings.RABBITMQ_CONSUMER_MAX_RETRIES,
+            retry_base_delay=settings.RABBITMQ_CONSUMER_RETRY_BASE_DELAY,
+            retry_max_delay=settings.RABBITMQ_CONSUMER_RETRY_MAX_DELAY,
+        ))
+        await self.runtime.start()
         logger.info(f"Started consuming from queue '{self.queue_name}'")
+        return consumer
 
 
 # ==================== Event Types ====================
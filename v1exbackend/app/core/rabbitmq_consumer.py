@@ -0,0 +1,424 @@
+"""Concurrent RabbitMQ consumers: prefetch, worker pool, retries with backoff and dead-lettering."""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from aio_pika import DeliveryMode, ExchangeType, Message
+from aio_pika.abc import AbstractChannel, AbstractConnection, AbstractIncomingMessage, AbstractQueue
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict[str, Any], str], Awaitable[Any]]
+BatchHandler = Callable[[list[tuple[dict[str, Any], str]]], Awaitable[Any]]
+
+RETRY_COUNT_HEADER = "x-retry-count"
+# Retries travel through the retry queues and come back with the queue name
+# as routing key; the key the message was first published with is kept here
+ORIGINAL_ROUTING_KEY_HEADER = "x-original-routing-key"
+
+# Seconds of history behind the throughput metric
+THROUGHPUT_WINDOW = 60
+
+
+def _routing_key(message: AbstractIncomingMessage) -> str:
+    """Routing key the message was published with, also after retries."""
+    original = (message.headers or {}).get(ORIGINAL_ROUTING_KEY_HEADER)
+    if original is not None:
+        return original.decode() if isinstance(original, bytes) else str(original)
+    return message.routing_key or ""
+
+
+def _message_age(message: AbstractIncomingMessage) -> Optional[float]:
+    """Seconds since the message was published (None if it has no timestamp)."""
+    timestamp = message.timestamp
+    if timestamp is None:
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return max(0.0, (datetime.now(timezone.utc) - timestamp).total_seconds())
+
+
+class _RateCounter:
+    """Events per second over the last `window` seconds, in one-second buckets."""
+
+    def __init__(self, window: int = THROUGHPUT_WINDOW):
+        self.window = window
+        self._buckets: deque[list] = deque()
+
+    def add(self, count: int = 1) -> None:
+        second = int(time.monotonic())
+        if self._buckets and self._buckets[-1][0] == second:
+            self._buckets[-1][1] += count
+        else:
+            self._buckets.append([second, count])
+        while self._buckets[0][0] <= second - self.window:
+            self._buckets.popleft()
+
+    def rate(self) -> float:
+        cutoff = int(time.monotonic()) - self.window
+        return sum(count for second, count in self._buckets if second > cutoff) / self.window
+
+
+class QueueConsumer:
+    """
+    Consume one queue with a pool of handler tasks.
+
+    Topology (declared on start, all durable):
+
+    - `{queue}` bound to `exchange` with `routing_keys`; rejected messages
+      are dead-lettered to `{exchange}.dlx`
+    - `{queue}.retry.{n}`: one queue per retry attempt with a TTL of the
+      backoff delay, dead-lettering back into `{queue}`. One queue per
+      delay avoids per-message TTLs, which only expire at the queue head.
+    - `{queue}.dlq` bound to `{exchange}.dlx`: messages that exhausted
+      their retries (or could not be decoded)
+
+    `prefetch` bounds the unacknowledged messages the broker hands to this
+    consumer; `concurrency` handler tasks process them. With a
+    `batch_handler`, each task collects up to `batch_size` messages (or
+    what arrived within `batch_timeout`) and handles them in one call; a
+    failure retries every message of the batch.
+    """
+
+    def __init__(
+        self,
+        connection: AbstractConnection,
+        queue_name: str,
+        exchange: str,
+        routing_keys: list[str],
+        handler: Optional[Handler] = None,
+        batch_handler: Optional[BatchHandler] = None,
+        prefetch: int = 64,
+        concurrency: int = 8,
+        batch_size: int = 100,
+        batch_timeout: float = 0.5,
+        max_retries: int = 5,
+        retry_base_delay: float = 1.0,
+        retry_max_delay: float = 300.0,
+        exchange_type: Union[ExchangeType, str] = ExchangeType.TOPIC
+    ):
+        if (handler is None) == (batch_handler is None):
+            raise ValueError("QueueConsumer needs exactly one of handler or batch_handler")
+
+        self.connection = connection
+        self.queue_name = queue_name
+        self.exchange = exchange
+        self.exchange_type = exchange_type
+        self.routing_keys = routing_keys
+        self.handler = handler
+        self.batch_handler = batch_handler
+        self.prefetch = prefetch
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        self.dead_letter_exchange = f"{exchange}.dlx"
+        self.dead_letter_queue = f"{queue_name}.dlq"
+
+        self.channel: Optional[AbstractChannel] = None
+        self.queue: Optional[AbstractQueue] = None
+        self._consumer_tag: Optional[str] = None
+        # Bounded by prefetch: the broker never sends more unacked messages
+        self._pending: asyncio.Queue[AbstractIncomingMessage] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+
+        # Metrics
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.in_progress = 0
+        self.queue_depth: Optional[int] = None
+        self.last_lag_ms = 0.0
+        self.handler_ms_total = 0.0
+        self.handler_calls = 0
+        self._throughput = _RateCounter()
+
+    def retry_queue(self, attempt: int) -> str:
+        return f"{self.queue_name}.retry.{attempt}"
+
+    def retry_delay(self, attempt: int) -> float:
+        """Backoff (seconds) before retry number `attempt` (1-based)."""
+        return min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1))
+
+    # ==================== Lifecycle ====================
+
+    async def declare(self) -> None:
+        """Declare exchanges, the queue, its retry queues and its dead-letter queue."""
+        channel = self.channel
+
+        exchange = await channel.declare_exchange(self.exchange, self.exchange_type, durable=True)
+        dlx = await channel.declare_exchange(self.dead_letter_exchange, ExchangeType.DIRECT, durable=True)
+
+        dlq = await channel.declare_queue(self.dead_letter_queue, durable=True)
+        await dlq.bind(dlx, routing_key=self.queue_name)
+
+        self.queue = await channel.declare_queue(
+            self.queue_name,
+            durable=True,
+            arguments={
+                "x-dead-letter-exchange": self.dead_letter_exchange,
+                "x-dead-letter-routing-key": self.queue_name,
+            },
+        )
+        for routing_key in self.routing_keys:
+            await self.queue.bind(exchange, routing_key=routing_key)
+
+        for attempt in range(1, self.max_retries + 1):
+            await channel.declare_queue(
+                self.retry_queue(attempt),
+                durable=True,
+                arguments={
+                    "x-message-ttl": int(self.retry_delay(attempt) * 1000),
+                    # Back to the main queue through the default exchange
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": self.queue_name,
+                },
+            )
+
+    async def start(self) -> None:
+        """Open a channel with the prefetch, declare the topology and start consuming."""
+        self.channel = await self.connection.channel(publisher_confirms=True)
+        await self.channel.set_qos(prefetch_count=self.prefetch)
+        await self.declare()
+
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._consumer_tag = await self.queue.consume(self._on_message)
+        logger.info(
+            f"Consuming '{self.queue_name}' (prefetch {self.prefetch}, "
+            f"{self.concurrency} {'batch ' if self.batch_handler else ''}workers)"
+        )
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Stop receiving, let running handlers finish and close the channel.
+
+        Messages received but not handled yet are redelivered by the broker
+        once the channel closes.
+        """
+        if self.queue is not None and self._consumer_tag is not None:
+            try:
+                await self.queue.cancel(self._consumer_tag)
+            except Exception as e:
+                logger.warning(f"Error cancelling consumer of '{self.queue_name}': {e}")
+            self._consumer_tag = None
+
+        deadline = time.monotonic() + timeout
+        while self.in_progress and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        if self.channel is not None and not self.channel.is_closed:
+            await self.channel.close()
+        self.channel = None
+
+    # ==================== Receiving ====================
+
+    async def _on_message(self, message: AbstractIncomingMessage) -> None:
+        self.received += 1
+        age = _message_age(message)
+        if age is not None:
+            self.last_lag_ms = age * 1000
+        self._pending.put_nowait(message)
+
+    async def _next_batch(self) -> list[AbstractIncomingMessage]:
+        batch = [await self._pending.get()]
+        if self.batch_handler is None:
+            return batch
+
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._pending.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._pending.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            self.in_progress += len(batch)
+            try:
+                await self._handle(batch)
+            except Exception as e:
+                logger.error(f"Unexpected error handling messages of '{self.queue_name}': {e}")
+            finally:
+                self.in_progress -= len(batch)
+
+    async def _handle(self, batch: list[AbstractIncomingMessage]) -> None:
+        decoded = []
+        for message in batch:
+            try:
+                decoded.append((message, json.loads(message.body)))
+            except ValueError as e:
+                # Retrying cannot fix a malformed body
+                logger.error(f"Dead-lettering undecodable message from '{self.queue_name}': {e}")
+                await self._dead_letter(message)
+
+        if not decoded:
+            return
+
+        start = time.perf_counter()
+        try:
+            if self.batch_handler is not None:
+                await self.batch_handler([(payload, _routing_key(message)) for message, payload in decoded])
+            else:
+                message, payload = decoded[0]
+                await self.handler(payload, _routing_key(message))
+        except Exception as e:
+            self.failed += len(decoded)
+            logger.error(f"Error processing {len(decoded)} message(s) from '{self.queue_name}': {e}")
+            for message, _ in decoded:
+                await self._retry(message)
+            return
+        finally:
+            self.handler_ms_total += (time.perf_counter() - start) * 1000
+            self.handler_calls += 1
+
+        for message, _ in decoded:
+            await message.ack()
+        self.processed += len(decoded)
+        self._throughput.add(len(decoded))
+
+    # ==================== Failures ====================
+
+    async def _retry(self, message: AbstractIncomingMessage) -> None:
+        """Send a failed message to its next retry queue, or dead-letter it."""
+        attempt = int((message.headers or {}).get(RETRY_COUNT_HEADER, 0)) + 1
+        if attempt > self.max_retries:
+            logger.warning(
+                f"Dead-lettering message {message.message_id} from '{self.queue_name}' "
+                f"after {self.max_retries} retries"
+            )
+            await self._dead_letter(message)
+            return
+
+        retry = Message(
+            body=message.body,
+            content_type=message.content_type,
+            delivery_mode=DeliveryMode.PERSISTENT,
+            message_id=message.message_id,
+            timestamp=message.timestamp,
+            headers={
+                ORIGINAL_ROUTING_KEY_HEADER: _routing_key(message),
+                **(message.headers or {}),
+                RETRY_COUNT_HEADER: attempt,
+            },
+        )
+        try:
+            await self.channel.default_exchange.publish(retry, routing_key=self.retry_queue(attempt))
+        except Exception as e:
+            # Without the retry copy the original must stay in the queue
+            logger.error(f"Error scheduling retry for '{self.queue_name}', requeueing: {e}")
+            await message.reject(requeue=True)
+            return
+
+        await message.ack()
+        self.retried += 1
+
+    async def _dead_letter(self, message: AbstractIncomingMessage) -> None:
+        # Rejected without requeue, the broker routes it to the DLX
+        await message.reject(requeue=False)
+        self.dead_lettered += 1
+
+    # ==================== Metrics ====================
+
+    async def refresh_queue_depth(self) -> None:
+        """Ask the broker how many messages are waiting in the queue."""
+        if self.queue is None:
+            return
+        result = await self.queue.declare()
+        self.queue_depth = result.message_count
+
+    def metrics(self) -> dict[str, Any]:
+        """Per-queue counters, lag and throughput."""
+        return {
+            "queue": self.queue_name,
+            "prefetch": self.prefetch,
+            "concurrency": self.concurrency,
+            "batch_mode": self.batch_handler is not None,
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "in_progress": self.in_progress,
+            "buffered": self._pending.qsize(),
+            "queue_depth": self.queue_depth,
+            "last_lag_ms": round(self.last_lag_ms, 2),
+            "avg_handler_ms": round(self.handler_ms_total / self.handler_calls, 2) if self.handler_calls else 0.0,
+            "throughput_per_second": round(self._throughput.rate(), 2),
+        }
+
+
+class ConsumerRuntime:
+    """Run several queue consumers on one connection and report their metrics."""
+
+    def __init__(self, connection: AbstractConnection, depth_interval: float = 5.0):
+        self.connection = connection
+        self.depth_interval = depth_interval
+        self.consumers: dict[str, QueueConsumer] = {}
+        self._depth_task: Optional[asyncio.Task] = None
+
+    def add(self, consumer: QueueConsumer) -> QueueConsumer:
+        """Register a consumer; `start` starts the ones not running yet."""
+        if consumer.queue_name in self.consumers:
+            raise ValueError(f"Queue '{consumer.queue_name}' already has a consumer")
+        self.consumers[consumer.queue_name] = consumer
+        return consumer
+
+    async def start(self) -> None:
+        """Start the consumers not running yet and the queue depth poller."""
+        for consumer in self.consumers.values():
+            if consumer.channel is None:
+                await consumer.start()
+        if self._depth_task is None:
+            self._depth_task = asyncio.create_task(self._poll_depths())
+
+    async def stop(self) -> None:
+        """Stop every consumer."""
+        if self._depth_task is not None:
+            self._depth_task.cancel()
+            try:
+                await self._depth_task
+            except asyncio.CancelledError:
+                pass
+            self._depth_task = None
+
+        for consumer in self.consumers.values():
+            await consumer.stop()
+
+    async def _poll_depths(self) -> None:
+        while True:
+            await asyncio.sleep(self.depth_interval)
+            for consumer in self.consumers.values():
+                try:
+                    await consumer.refresh_queue_depth()
+                except Exception as e:
+                    logger.warning(f"Error reading depth of '{consumer.queue_name}': {e}")
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """Metrics of every consumer, by queue name."""
+        return {name: consumer.metrics() for name, consumer in self.consumers.items()}
@@ -0,0 +1,217 @@
+"""Shared RabbitMQ publisher: pooled confirm channels, cached exchanges, bounded in-flight."""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Optional, Sequence, Union
+
+from aio_pika import DeliveryMode, ExchangeType, Message
+from aio_pika.abc import AbstractChannel, AbstractConnection, AbstractExchange
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingMessage:
+    """One message of a batch publish."""
+
+    exchange: str
+    routing_key: str
+    body: bytes
+    message_id: Optional[str] = None
+    headers: dict[str, Any] = field(default_factory=dict)
+    content_type: str = "application/json"
+
+
+class _PooledChannel:
+    """A confirm-mode channel, its declared exchanges and its in-flight window."""
+
+    def __init__(self, index: int, max_in_flight: int):
+        self.index = index
+        self.channel: Optional[AbstractChannel] = None
+        self.exchanges: dict[str, AbstractExchange] = {}
+        self.window = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.lock = asyncio.Lock()
+
+
+class RabbitMQPublisher:
+    """
+    One publisher shared by the whole process.
+
+    - A fixed pool of channels opened in publisher-confirm mode on the shared
+      connection; publishes are spread round-robin over them.
+    - Exchanges are declared once per channel and cached (a channel that
+      closes is reopened and its exchanges are declared again).
+    - Every channel has a window of at most `max_in_flight` unconfirmed
+      messages: publishes beyond it wait, so a slow broker applies
+      backpressure instead of growing memory.
+    - `publish_batch` sends a whole batch before awaiting any confirm, so a
+      batch costs about one broker round trip instead of one per message.
+    """
+
+    def __init__(
+        self,
+        connection: AbstractConnection,
+        pool_size: int = 4,
+        max_in_flight: int = 256,
+        confirm_timeout: float = 10.0,
+        exchange_types: Optional[dict[str, Union[ExchangeType, str]]] = None
+    ):
+        self.connection = connection
+        self.pool_size = pool_size
+        self.max_in_flight = max_in_flight
+        self.confirm_timeout = confirm_timeout
+        # Exchanges not listed here are declared as durable topic exchanges
+        self.exchange_types = dict(exchange_types or {})
+
+        self._pool = [_PooledChannel(i, max_in_flight) for i in range(pool_size)]
+        self._next = 0
+
+        # Metrics
+        self.published = 0
+        self.failed = 0
+        self.batches = 0
+        self.exchange_declarations = 0
+        self.channel_reopens = 0
+
+    # ==================== Lifecycle ====================
+
+    async def start(self) -> None:
+        """Open the channel pool."""
+        for pooled in self._pool:
+            await self._ensure_channel(pooled)
+
+    async def close(self) -> None:
+        """Close the channel pool (the connection belongs to the caller)."""
+        for pooled in self._pool:
+            if pooled.channel is not None and not pooled.channel.is_closed:
+                try:
+                    await pooled.channel.close()
+                except Exception as e:
+                    logger.warning(f"Error closing publisher channel {pooled.index}: {e}")
+            pooled.channel = None
+            pooled.exchanges.clear()
+
+    # ==================== Channels and exchanges ====================
+
+    def _pick(self) -> _PooledChannel:
+        pooled = self._pool[self._next]
+        self._next = (self._next + 1) % self.pool_size
+        return pooled
+
+    async def _ensure_channel(self, pooled: _PooledChannel) -> AbstractChannel:
+        if pooled.channel is not None and not pooled.channel.is_closed:
+            return pooled.channel
+
+        async with pooled.lock:
+            if pooled.channel is None or pooled.channel.is_closed:
+                if pooled.channel is not None:
+                    self.channel_reopens += 1
+                    logger.warning(f"Reopening RabbitMQ publisher channel {pooled.index}")
+                pooled.channel = await self.connection.channel(publisher_confirms=True)
+                pooled.exchanges.clear()
+        return pooled.channel
+
+    async def _get_exchange(self, pooled: _PooledChannel, name: str) -> AbstractExchange:
+        channel = await self._ensure_channel(pooled)
+        exchange = pooled.exchanges.get(name)
+        if exchange is not None:
+            return exchange
+
+        async with pooled.lock:
+            exchange = pooled.exchanges.get(name)
+            if exchange is None:
+                exchange = await channel.declare_exchange(
+                    name,
+                    self.exchange_types.get(name, ExchangeType.TOPIC),
+                    durable=True,
+                )
+                pooled.exchanges[name] = exchange
+                self.exchange_declarations += 1
+        return exchange
+
+    # ==================== Publishing ====================
+
+    async def _publish_on(self, pooled: _PooledChannel, outgoing: OutgoingMessage) -> None:
+        async with pooled.window:
+            pooled.in_flight += 1
+            try:
+                exchange = await self._get_exchange(pooled, outgoing.exchange)
+                message = Message(
+                    body=outgoing.body,
+                    content_type=outgoing.content_type,
+                    delivery_mode=DeliveryMode.PERSISTENT,
+                    message_id=outgoing.message_id,
+                    # Lets consumers measure delivery lag
+                    timestamp=datetime.now(timezone.utc),
+                    headers=outgoing.headers,
+                )
+                # Returns once the broker confirms (or raises on nack/timeout)
+                await exchange.publish(
+                    message,
+                    routing_key=outgoing.routing_key,
+                    timeout=self.confirm_timeout,
+                )
+                self.published += 1
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                pooled.in_flight -= 1
+
+    async def publish(self, outgoing: OutgoingMessage) -> None:
+        """
+        Publish one message and wait for its confirm.
+
+        Raises:
+            Exception: The broker nacked it, the confirm timed out or the
+                channel failed
+        """
+        await self._publish_on(self._pick(), outgoing)
+
+    async def publish_batch(
+        self,
+        messages: Sequence[OutgoingMessage]
+    ) -> list[Optional[BaseException]]:
+        """
+        Publish a batch, awaiting all confirms together.
+
+        Messages are split into one contiguous run per channel, so messages
+        with the same routing key keep their relative order per channel.
+
+        Returns:
+            One entry per message: None if confirmed, else the error
+        """
+        if not messages:
+            return []
+
+        self.batches += 1
+        per_channel = -(-len(messages) // self.pool_size)
+        chunks = [
+            (self._pick(), messages[offset:offset + per_channel])
+            for offset in range(0, len(messages), per_channel)
+        ]
+
+        results = await asyncio.gather(
+            *[self._publish_on(pooled, outgoing) for pooled, chunk in chunks for outgoing in chunk],
+            return_exceptions=True,
+        )
+        return [result if isinstance(result, BaseException) else None for result in results]
+
+    def metrics(self) -> dict[str, Any]:
+        """Publisher counters."""
+        return {
+            "channels": sum(
+                1 for pooled in self._pool
+                if pooled.channel is not None and not pooled.channel.is_closed
+            ),
+            "in_flight": sum(pooled.in_flight for pooled in self._pool),
+            "max_in_flight_per_channel": self.max_in_flight,
+            "published": self.published,
+            "failed": self.failed,
+            "batches": self.batches,
+            "exchange_declarations": self.exchange_declarations,
+            "channel_reopens": self.channel_reopens,
+        }
@@ -4,10 +4,13 @@ Rate Limiter con Token Bucket Algorithm.
 Implementa rate limiting usando Redis para almacenar los buckets.
 """
 
+import asyncio
+import math
 import time
-from typing import Tuple, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
 from dataclasses import dataclass
 import redis.asyncio as redis
+from redis.exceptions import NoScriptError
 
 from app.core.config import settings
 
@@ -20,6 +23,18 @@ class RateLimitConfig:
     window_seconds: int  # Ventana de tiempo en segundos
     burst_multiplier: float = 1.5  # Permite burst hasta 1.5x el límite
 
+    # Leased quota: cada worker reserva hasta lease_size tokens del bucket
+    # compartido y los gasta localmente durante lease_ttl_seconds.
+    # 0 = deshabilitado (cada decisión va a Redis).
+    # Los tokens del lease ya están descontados en Redis, así que el límite
+    # global se respeta; la sobre-admisión posible (p.ej. tras un reset del
+    # bucket con leases vivos) está acotada a lease_size × workers.
+    lease_size: int = 0
+    lease_ttl_seconds: float = 1.0
+
+    # Engine: "token_bucket", "gcra" o "sliding_window" (ver RateLimiter.engines)
+    algorithm: str = "token_bucket"
+
 
 @dataclass
 class RateLimitResult:
@@ -36,19 +51,344 @@ class RateLimitResult:
     current_count: int = 0
 
 
-class TokenBucket:
+# Script Lua del Token Bucket.
+# KEYS[1] = bucket (hash tokens/last_refill), KEYS[2] = contador de requests.
+# Devuelve {allowed, tokens_available, tokens_consumed, current_count, retry_after}.
+# El contador se actualiza dentro del mismo script para que cada decisión
+# cueste un único round-trip a Redis.
+TOKEN_BUCKET_SCRIPT = """
+local key = KEYS[1]
+local count_key = KEYS[2]
+local now = tonumber(ARGV[1])
+local tokens_to_consume = tonumber(ARGV[2])
+local max_capacity = tonumber(ARGV[3])
+local refill_rate = tonumber(ARGV[4])
+local ttl = tonumber(ARGV[5])
+local count_ttl = tonumber(ARGV[6])
+
+-- Obtener estado actual del bucket
+local bucket = redis.call('HMGET', key, 'tokens', 'last_refill')
+local current_tokens = tonumber(bucket[1]) or max_capacity
+local last_refill = tonumber(bucket[2]) or now
+
+-- Calcular tokens a añadir basado en tiempo transcurrido
+local time_passed = now - last_refill
+local tokens_to_add = time_passed * refill_rate
+current_tokens = math.min(max_capacity, current_tokens + tokens_to_add)
+
+-- Intentar consumir tokens
+if current_tokens >= tokens_to_consume then
+    -- Éxito: consumir tokens
+    current_tokens = current_tokens - tokens_to_consume
+
+    -- Actualizar bucket
+    redis.call('HSET', key,
+        'tokens', current_tokens,
+        'last_refill', now
+    )
+    redis.call('EXPIRE', key, ttl)
+
+    -- Actualizar contador para auditoría
+    local current_count = redis.call('INCR', count_key)
+    redis.call('EXPIRE', count_key, count_ttl)
+
+    return {1, current_tokens, tokens_to_consume, current_count}
+else
+    -- Fallo: no hay suficientes tokens
+    -- Calcular tiempo hasta que haya suficientes tokens
+    local tokens_needed = tokens_to_consume - current_tokens
+    local retry_after = tokens_needed / refill_rate
+    local current_count = tonumber(redis.call('GET', count_key)) or 0
+
+    return {0, current_tokens, 0, current_count, tostring(retry_after)}
+end
+"""
+
+
+# Script Lua para reservar un lease de tokens.
+# Devuelve los tokens no usados del lease anterior (ARGV[7]) y concede
+# hasta ARGV[2] tokens, aunque sea parcialmente.
+# Devuelve {allowed, tokens_available, tokens_granted, current_count, retry_after}.
+TOKEN_LEASE_SCRIPT = """
+local key = KEYS[1]
+local count_key = KEYS[2]
+local now = tonumber(ARGV[1])
+local tokens_wanted = tonumber(ARGV[2])
+local max_capacity = tonumber(ARGV[3])
+local refill_rate = tonumber(ARGV[4])
+local ttl = tonumber(ARGV[5])
+local count_ttl = tonumber(ARGV[6])
+local tokens_returned = tonumber(ARGV[7])
+
+local bucket = redis.call('HMGET', key, 'tokens', 'last_refill')
+local current_tokens = tonumber(bucket[1]) or max_capacity
+local last_refill = tonumber(bucket[2]) or now
+
+local time_passed = now - last_refill
+current_tokens = current_tokens + time_passed * refill_rate + tokens_returned
+current_tokens = math.min(max_capacity, current_tokens)
+
+local granted = math.min(tokens_wanted, math.floor(current_tokens))
+if granted < 0 then
+    granted = 0
+end
+current_tokens = current_tokens - granted
+
+redis.call('HSET', key,
+    'tokens', current_tokens,
+    'last_refill', now
+)
+redis.call('EXPIRE', key, ttl)
+
+if granted > 0 then
+    local current_count = redis.call('INCRBY', count_key, granted)
+    redis.call('EXPIRE', count_key, count_ttl)
+    return {1, current_tokens, granted, current_count}
+end
+
+local retry_after = (1 - current_tokens) / refill_rate
+local current_count = tonumber(redis.call('GET', count_key)) or 0
+return {0, current_tokens, 0, current_count, tostring(retry_after)}
+"""
+
+
+# Script Lua de GCRA (Generic Cell Rate Algorithm).
+# KEYS[1] = TAT (theoretical arrival time) en ms, un único entero por bucket.
+# Devuelve {allowed, tokens_available, tokens_consumed, current_count, retry_after}.
+GCRA_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local tokens = tonumber(ARGV[2])
+local emission_interval = tonumber(ARGV[3])
+local burst_offset = tonumber(ARGV[4])
+
+local tat = tonumber(redis.call('GET', key)) or now
+if tat < now then
+    tat = now
+end
+
+local new_tat = tat + emission_interval * tokens
+local allow_at = new_tat - burst_offset
+
+if now >= allow_at then
+    -- Con tokens = 0 sobre una key inactiva new_tat == now, y PX 0 es un error
+    local ttl = math.max(1, math.ceil(new_tat - now))
+    redis.call('SET', key, math.floor(new_tat), 'PX', ttl)
+    local in_use = math.ceil((new_tat - now) / emission_interval)
+    local available = math.floor((burst_offset - (new_tat - now)) / emission_interval)
+    return {1, available, tokens, in_use}
+end
+
+local in_use = math.ceil((tat - now) / emission_interval)
+local available = math.floor((burst_offset - (tat - now)) / emission_interval)
+return {0, available, 0, in_use, tostring((allow_at - now) / 1000)}
+"""
+
+
+# Script Lua de Sliding Window Counter aproximado.
+# KEYS[1] = hash con w (id de la ventana actual), c (count actual), p (count anterior).
+# El count estimado es p * (1 - fracción transcurrida) + c.
+# Devuelve {allowed, tokens_available, tokens_consumed, current_count, retry_after}.
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local tokens = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local window = tonumber(ARGV[4])
+
+local window_id = math.floor(now / window)
+local elapsed = (now - window_id * window) / window
+
+local state = redis.call('HMGET', key, 'w', 'c', 'p')
+local stored_id = tonumber(state[1])
+local current = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+
+-- Rotar ventanas si el hash es de una ventana anterior
+if stored_id ~= window_id then
+    if stored_id == window_id - 1 then
+        previous = current
+    else
+        previous = 0
+    end
+    current = 0
+end
+
+local estimated = previous * (1 - elapsed) + current
+
+if estimated + tokens <= limit then
+    current = current + tokens
+    redis.call('HSET', key, 'w', window_id, 'c', current, 'p', previous)
+    redis.call('PEXPIRE', key, window * 2)
+    estimated = estimated + tokens
+    return {1, math.floor(limit - estimated), tokens, math.ceil(estimated)}
+end
+
+-- Tiempo hasta que el count estimado deje sitio para los tokens
+local retry_after
+local room = limit - current - tokens
+if room >= 0 and previous > 0 then
+    -- En esta ventana, cuando la parte de la anterior decaiga lo suficiente
+    retry_after = ((1 - room / previous) - elapsed) * window
+else
+    -- En la siguiente, donde el count actual pasa a ser la ventana anterior
+    -- y también tiene que decaer hasta dejar sitio
+    local decay = 1
+    if current > 0 and limit >= tokens then
+        decay = math.max(0, 1 - (limit - tokens) / current)
+    end
+    retry_after = (1 - elapsed + decay) * window
+end
+
+return {0, math.max(0, math.floor(limit - estimated)), 0, math.ceil(estimated), tostring(retry_after / 1000)}
+"""
+
+
+@dataclass
+class TokenLease:
+    """Tokens reservados localmente por un worker."""
+
+    tokens: int  # Tokens del lease aún sin gastar
+    expires_at: float  # time.monotonic() en que caduca
+    remote_available: int  # Tokens que quedaban en Redis al reservar
+    base_count: int  # Contador de Redis antes de gastar este lease
+    spent: int = 0
+
+
+class RedisScript:
     """
-    Token Bucket Algorithm implementation.
+    Script Lua registrado en Redis con SCRIPT LOAD y ejecutado con EVALSHA.
 
-    Características:
-    - Tokens se regeneran a tasa constante
-    - Permite bursts hasta burst_multiplier * max_requests
-    - Usa Redis para persistencia distribuida
-    - Atomic operations para concurrencia
+    El SHA se cachea tras la primera carga; si Redis responde NOSCRIPT
+    (reinicio, SCRIPT FLUSH, failover) se vuelve a cargar y se reintenta.
     """
 
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, source: str):
+        self.source = source
+        self.sha: Optional[str] = None
+
+    async def load(self, redis_client: redis.Redis) -> str:
+        """Registrar el script en Redis y cachear su SHA."""
+        self.sha = await redis_client.script_load(self.source)
+        return self.sha
+
+    async def __call__(
+        self,
+        redis_client: redis.Redis,
+        keys: Sequence[str],
+        args: Sequence[Any]
+    ) -> Any:
+        """Ejecutar el script con EVALSHA (recargando si hace falta)."""
+        if self.sha is None:
+            await self.load(redis_client)
+
+        try:
+            return await redis_client.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            await self.load(redis_client)
+            return await redis_client.evalsha(self.sha, len(keys), *keys, *args)
+
+    async def run_many(
+        self,
+        redis_client: redis.Redis,
+        calls: Sequence[Tuple[Sequence[str], Sequence[Any]]]
+    ) -> list:
+        """
+        Ejecutar el script varias veces en un único pipeline.
+
+        Los errores por llamada se devuelven como excepciones en la lista.
+        """
+        if self.sha is None:
+            await self.load(redis_client)
+
+        raw = await self._pipeline(redis_client, calls)
+        if any(isinstance(r, NoScriptError) for r in raw):
+            await self.load(redis_client)
+            raw = await self._pipeline(redis_client, calls)
+        return raw
+
+    async def _pipeline(
+        self,
+        redis_client: redis.Redis,
+        calls: Sequence[Tuple[Sequence[str], Sequence[Any]]]
+    ) -> list:
+        """Encolar un EVALSHA por llamada y ejecutar el pipeline."""
+        pipe = redis_client.pipeline(transaction=False)
+        for keys, args in calls:
+            pipe.evalsha(self.sha, len(keys), *keys, *args)
+        return await pipe.execute(raise_on_error=False)
+
+
+class RateLimitEngine:
+    """
+    Algoritmo de rate limiting respaldado por Redis.
+
+    Cada engine define su script Lua, cómo se construyen KEYS/ARGV y cómo
+    se interpreta la respuesta. Todos los scripts devuelven
+    {allowed, tokens_available, tokens_consumed, current_count, retry_after?}.
+    """
+
+    name: str = ""
+
+    def __init__(self, redis_client: redis.Redis, script_source: str):
         self.redis = redis_client
+        self.script = RedisScript(script_source)
+
+    def storage_keys(self, key: str) -> List[str]:
+        """Keys de Redis que usa un bucket."""
+        raise NotImplementedError
+
+    def _script_call(
+        self,
+        key: str,
+        tokens: int,
+        config: RateLimitConfig,
+        now: float
+    ) -> Tuple[List[str], list]:
+        """(KEYS, ARGV) del script para un consumo."""
+        raise NotImplementedError
+
+    async def get_status_many(
+        self,
+        items: Sequence[Tuple[str, RateLimitConfig]]
+    ) -> List[dict]:
+        """Status de varios buckets en un único round-trip."""
+        raise NotImplementedError
+
+    def _parse_result(
+        self,
+        result: Sequence[Any],
+        key: str,
+        tokens: int,
+        config: RateLimitConfig
+    ) -> RateLimitResult:
+        """Convertir la respuesta del script en un RateLimitResult."""
+        allowed = bool(int(result[0]))
+        return RateLimitResult(
+            allowed=allowed,
+            tokens_available=int(result[1]),
+            tokens_requested=tokens,
+            tokens_consumed=int(result[2]) if allowed else 0,
+            retry_after_seconds=float(result[4]) if len(result) > 4 else None,
+            limit_key=key,
+            window_seconds=config.window_seconds,
+            max_requests=config.max_requests,
+            current_count=int(result[3])
+        )
+
+    @staticmethod
+    def fail_open(key: str, tokens: int, config: RateLimitConfig) -> RateLimitResult:
+        """Resultado cuando Redis falla: permitir el request (fail-open)."""
+        return RateLimitResult(
+            allowed=True,
+            tokens_available=config.max_requests,
+            tokens_requested=tokens,
+            tokens_consumed=0,
+            limit_key=key,
+            window_seconds=config.window_seconds,
+            max_requests=config.max_requests,
+            current_count=0
+        )
 
     async def consume(
         self,
@@ -67,121 +407,204 @@ class TokenBucket:
         Returns:
             RateLimitResult con el resultado de la operación
         """
+        try:
+            keys, args = self._script_call(key, tokens, config, time.time())
+            result = await self.script(self.redis, keys=keys, args=args)
+            return self._parse_result(result, key, tokens, config)
+
+        except Exception as e:
+            # En caso de error con Redis, permitir el request (fail-open)
+            # pero loggear el error
+            print(f"Rate limiter error: {e}")
+            return self.fail_open(key, tokens, config)
+
+    async def consume_many(
+        self,
+        items: Sequence[Tuple[str, int, RateLimitConfig]]
+    ) -> List[RateLimitResult]:
+        """
+        Consumir tokens de varios buckets en un único round-trip (pipeline).
+
+        Cada bucket se evalúa de forma atómica e independiente.
+
+        Args:
+            items: Lista de (key, tokens, config)
+
+        Returns:
+            Lista de RateLimitResult en el mismo orden que items
+        """
+        if not items:
+            return []
+
         now = time.time()
+        try:
+            raw = await self.script.run_many(
+                self.redis,
+                [self._script_call(key, tokens, config, now) for key, tokens, config in items]
+            )
+        except Exception as e:
+            print(f"Rate limiter error: {e}")
+            return [self.fail_open(key, tokens, config) for key, tokens, config in items]
+
+        results = []
+        for (key, tokens, config), result in zip(items, raw):
+            if isinstance(result, Exception):
+                print(f"Rate limiter error: {result}")
+                results.append(self.fail_open(key, tokens, config))
+            else:
+                results.append(self._parse_result(result, key, tokens, config))
+        return results
+
+    async def reset(self, key: str) -> None:
+        """Reset un bucket (útil para testing)."""
+        await self.reset_many([key])
+
+    async def reset_many(self, keys: Sequence[str]) -> None:
+        """Reset de varios buckets con un único DELETE."""
+        if not keys:
+            return
+        await self.redis.delete(*(k for key in keys for k in self.storage_keys(key)))
 
+    async def get_status(self, key: str, config: RateLimitConfig) -> dict:
+        """Obtener status actual de un bucket."""
+        return (await self.get_status_many([(key, config)]))[0]
+
+
+class TokenBucket(RateLimitEngine):
+    """
+    Token Bucket Algorithm implementation.
+
+    Características:
+    - Tokens se regeneran a tasa constante
+    - Permite bursts hasta burst_multiplier * max_requests
+    - Usa Redis para persistencia distribuida
+    - Atomic operations para concurrencia
+    - Un único round-trip (EVALSHA) por decisión
+
+    Memoria: un hash (tokens, last_refill) + una key de contador por bucket.
+    """
+
+    name = "token_bucket"
+
+    def __init__(self, redis_client: redis.Redis):
+        super().__init__(redis_client, TOKEN_BUCKET_SCRIPT)
+        self.lease_script = RedisScript(TOKEN_LEASE_SCRIPT)
+
+    def storage_keys(self, key: str) -> List[str]:
+        return [key, f"{key}:count"]
+
+    def _script_call(
+        self,
+        key: str,
+        tokens: int,
+        config: RateLimitConfig,
+        now: float
+    ) -> Tuple[List[str], list]:
         # Capacidad máxima del bucket (permite bursts)
         max_capacity = int(config.max_requests * config.burst_multiplier)
 
         # Tasa de regeneración (tokens por segundo)
         refill_rate = config.max_requests / config.window_seconds
 
-        # Usar Lua script para operación atómica
-        lua_script = """
-        local key = KEYS[1]
-        local now = tonumber(ARGV[1])
-        local tokens_to_consume = tonumber(ARGV[2])
-        local max_capacity = tonumber(ARGV[3])
-        local refill_rate = tonumber(ARGV[4])
-        local ttl = tonumber(ARGV[5])
-
-        -- Obtener estado actual del bucket
-        local bucket = redis.call('HMGET', key, 'tokens', 'last_refill')
-        local current_tokens = tonumber(bucket[1]) or max_capacity
-        local last_refill = tonumber(bucket[2]) or now
-
-        -- Calcular tokens a añadir basado en tiempo transcurrido
-        local time_passed = now - last_refill
-        local tokens_to_add = time_passed * refill_rate
-        current_tokens = math.min(max_capacity, current_tokens + tokens_to_add)
-
-        -- Intentar consumir tokens
-        if current_tokens >= tokens_to_consume then
-            -- Éxito: consumir tokens
-            current_tokens = current_tokens - tokens_to_consume
-
-            -- Actualizar bucket
-            redis.call('HMSET', key,
-                'tokens', current_tokens,
-                'last_refill', now
-            )
-            redis.call('EXPIRE', key, ttl)
+        return self.storage_keys(key), [
+            now,
+            tokens,
+            max_capacity,
+            refill_rate,
+            config.window_seconds * 2,  # TTL del bucket
+            config.window_seconds,  # TTL del contador
+        ]
+
+    async def acquire_lease(
+        self,
+        key: str,
+        tokens_wanted: int,
+        config: RateLimitConfig,
+        tokens_returned: int = 0
+    ) -> RateLimitResult:
+        """
+        Reservar hasta tokens_wanted tokens del bucket en un solo round-trip.
 
-            return {1, current_tokens, tokens_to_consume}
-        else
-            -- Fallo: no hay suficientes tokens
-            -- Calcular tiempo hasta que haya suficientes tokens
-            local tokens_needed = tokens_to_consume - current_tokens
-            local retry_after = tokens_needed / refill_rate
+        A diferencia de consume(), la concesión puede ser parcial:
+        tokens_consumed indica cuántos tokens se concedieron realmente.
 
-            return {0, current_tokens, 0, retry_after}
-        end
+        Args:
+            key: Identificador único del bucket
+            tokens_wanted: Tokens a reservar
+            config: Configuración del rate limit
+            tokens_returned: Tokens no usados del lease anterior
+
+        Returns:
+            RateLimitResult (tokens_consumed = tokens concedidos)
         """
+        max_capacity = int(config.max_requests * config.burst_multiplier)
+        refill_rate = config.max_requests / config.window_seconds
 
-        try:
-            result = await self.redis.eval(
-                lua_script,
-                1,  # number of keys
-                key,  # KEYS[1]
-                now,  # ARGV[1]
-                tokens,  # ARGV[2]
-                max_capacity,  # ARGV[3]
-                refill_rate,  # ARGV[4]
-                config.window_seconds * 2  # ARGV[5] - TTL
-            )
+        result = await self.lease_script(
+            self.redis,
+            keys=[key, f"{key}:count"],
+            args=[
+                time.time(),
+                tokens_wanted,
+                max_capacity,
+                refill_rate,
+                config.window_seconds * 2,
+                config.window_seconds,
+                tokens_returned,
+            ]
+        )
 
-            allowed = bool(result[0])
-            tokens_available = int(result[1])
-            tokens_consumed = int(result[2]) if allowed else 0
-            retry_after = float(result[3]) if len(result) > 3 else None
+        return RateLimitResult(
+            allowed=bool(int(result[0])),
+            tokens_available=int(result[1]),
+            tokens_requested=tokens_wanted,
+            tokens_consumed=int(result[2]),
+            retry_after_seconds=float(result[4]) if len(result) > 4 else None,
+            limit_key=key,
+            window_seconds=config.window_seconds,
+            max_requests=config.max_requests,
+            current_count=int(result[3])
+        )
 
-            # Obtener count actual para auditoría
-            count_key = f"{key}:count"
-            if allowed:
-                current_count = await self.redis.incr(count_key)
-                await self.redis.expire(count_key, config.window_seconds)
-            else:
-                current_count = await self.redis.get(count_key) or 0
-                current_count = int(current_count)
+    async def get_status_many(
+        self,
+        items: Sequence[Tuple[str, RateLimitConfig]]
+    ) -> List[dict]:
+        """
+        Obtener el status de varios buckets en un único round-trip (pipeline).
 
-            return RateLimitResult(
-                allowed=allowed,
-                tokens_available=tokens_available,
-                tokens_requested=tokens,
-                tokens_consumed=tokens_consumed,
-                retry_after_seconds=retry_after,
-                limit_key=key,
-                window_seconds=config.window_seconds,
-                max_requests=config.max_requests,
-                current_count=current_count
-            )
+        Args:
+            items: Lista de (key, config)
 
-        except Exception as e:
-            # En caso de error con Redis, permitir el request (fail-open)
-            # pero loggear el error
-            print(f"Rate limiter error: {e}")
-            return RateLimitResult(
-                allowed=True,
-                tokens_available=config.max_requests,
-                tokens_requested=tokens,
-                tokens_consumed=0,
-                limit_key=key,
-                window_seconds=config.window_seconds,
-                max_requests=config.max_requests,
-                current_count=0
-            )
+        Returns:
+            Lista de dicts de status en el mismo orden que items
+        """
+        if not items:
+            return []
 
-    async def reset(self, key: str) -> None:
-        """Reset un bucket (útil para testing)."""
-        await self.redis.delete(key)
-        await self.redis.delete(f"{key}:count")
+        pipe = self.redis.pipeline(transaction=False)
+        for key, _ in items:
+            pipe.hmget(key, 'tokens', 'last_refill')
+            pipe.get(f"{key}:count")
+        raw = await pipe.execute()
 
-    async def get_status(self, key: str, config: RateLimitConfig) -> dict:
-        """Obtener status actual de un bucket."""
         now = time.time()
+        return [
+            self._build_status(raw[2 * i], raw[2 * i + 1], config, now)
+            for i, (_, config) in enumerate(items)
+        ]
+
+    def _build_status(
+        self,
+        bucket: Sequence[Any],
+        current_count: Any,
+        config: RateLimitConfig,
+        now: float
+    ) -> dict:
+        """Calcular el status de un bucket a partir de HMGET + GET."""
         max_capacity = int(config.max_requests * config.burst_multiplier)
         refill_rate = config.max_requests / config.window_seconds
 
-        bucket = await self.redis.hmget(key, 'tokens', 'last_refill')
         current_tokens = float(bucket[0]) if bucket[0] else max_capacity
         last_refill = float(bucket[1]) if bucket[1] else now
 
@@ -190,34 +613,185 @@ class TokenBucket:
         tokens_to_add = time_passed * refill_rate
         available_tokens = min(max_capacity, current_tokens + tokens_to_add)
 
-        count_key = f"{key}:count"
-        current_count = await self.redis.get(count_key) or 0
-
         return {
             "available_tokens": available_tokens,
             "max_capacity": max_capacity,
             "refill_rate": refill_rate,
-            "current_count": int(current_count),
+            "current_count": int(current_count or 0),
             "max_requests": config.max_requests,
             "window_seconds": config.window_seconds
         }
 
 
+class GCRA(RateLimitEngine):
+    """
+    Generic Cell Rate Algorithm.
+
+    Equivalente a un token bucket, pero guarda un único entero por bucket
+    (el TAT en ms) y no necesita contador aparte: el número de requests
+    "en curso" se deriva del TAT. Es el engine con menor huella en Redis.
+    """
+
+    name = "gcra"
+
+    def __init__(self, redis_client: redis.Redis):
+        super().__init__(redis_client, GCRA_SCRIPT)
+
+    def storage_keys(self, key: str) -> List[str]:
+        return [f"{key}:gcra"]
+
+    def _intervals(self, config: RateLimitConfig) -> Tuple[float, float]:
+        """(emission_interval, burst_offset) en ms."""
+        emission_interval = config.window_seconds * 1000 / config.max_requests
+        max_capacity = int(config.max_requests * config.burst_multiplier)
+        return emission_interval, emission_interval * max_capacity
+
+    def _script_call(
+        self,
+        key: str,
+        tokens: int,
+        config: RateLimitConfig,
+        now: float
+    ) -> Tuple[List[str], list]:
+        emission_interval, burst_offset = self._intervals(config)
+        return self.storage_keys(key), [
+            int(now * 1000),
+            tokens,
+            emission_interval,
+            burst_offset,
+        ]
+
+    async def get_status_many(
+        self,
+        items: Sequence[Tuple[str, RateLimitConfig]]
+    ) -> List[dict]:
+        if not items:
+            return []
+
+        pipe = self.redis.pipeline(transaction=False)
+        for key, _ in items:
+            pipe.get(self.storage_keys(key)[0])
+        raw = await pipe.execute()
+
+        now_ms = time.time() * 1000
+        statuses = []
+        for (_, config), tat in zip(items, raw):
+            emission_interval, burst_offset = self._intervals(config)
+            in_flight = max(0.0, float(tat) - now_ms) if tat else 0.0
+            statuses.append({
+                "available_tokens": (burst_offset - in_flight) / emission_interval,
+                "max_capacity": int(config.max_requests * config.burst_multiplier),
+                "refill_rate": config.max_requests / config.window_seconds,
+                "current_count": math.ceil(in_flight / emission_interval),
+                "max_requests": config.max_requests,
+                "window_seconds": config.window_seconds
+            })
+        return statuses
+
+
+class SlidingWindowCounter(RateLimitEngine):
+    """
+    Sliding window counter aproximado.
+
+    Guarda el count de la ventana fija actual y el de la anterior en un
+    hash pequeño, y estima el count deslizante ponderando la anterior por
+    la fracción de ventana que aún solapa. El límite es max_requests por
+    ventana (burst_multiplier no aplica).
+    """
+
+    name = "sliding_window"
+
+    def __init__(self, redis_client: redis.Redis):
+        super().__init__(redis_client, SLIDING_WINDOW_SCRIPT)
+
+    def storage_keys(self, key: str) -> List[str]:
+        return [f"{key}:swc"]
+
+    def _script_call(
+        self,
+        key: str,
+        tokens: int,
+        config: RateLimitConfig,
+        now: float
+    ) -> Tuple[List[str], list]:
+        return self.storage_keys(key), [
+            int(now * 1000),
+            tokens,
+            config.max_requests,
+            config.window_seconds * 1000,
+        ]
+
+    async def get_status_many(
+        self,
+        items: Sequence[Tuple[str, RateLimitConfig]]
+    ) -> List[dict]:
+        if not items:
+            return []
+
+        pipe = self.redis.pipeline(transaction=False)
+        for key, _ in items:
+            pipe.hmget(self.storage_keys(key)[0], 'w', 'c', 'p')
+        raw = await pipe.execute()
+
+        now_ms = time.time() * 1000
+        statuses = []
+        for (_, config), (stored_id, current, previous) in zip(items, raw):
+            window_ms = config.window_seconds * 1000
+            window_id = int(now_ms // window_ms)
+            elapsed = (now_ms - window_id * window_ms) / window_ms
+
+            current = float(current or 0)
+            previous = float(previous or 0)
+            stored_id = int(stored_id) if stored_id is not None else None
+            if stored_id != window_id:
+                previous = current if stored_id == window_id - 1 else 0.0
+                current = 0.0
+
+            estimated = previous * (1 - elapsed) + current
+            statuses.append({
+                "available_tokens": max(0.0, config.max_requests - estimated),
+                "max_capacity": config.max_requests,
+                "refill_rate": config.max_requests / config.window_seconds,
+                "current_count": math.ceil(estimated),
+                "max_requests": config.max_requests,
+                "window_seconds": config.window_seconds
+            })
+        return statuses
+
+
 class RateLimiter:
     """
     Rate Limiter principal con configuraciones predefinidas.
     """
 
+    # Limpiar leases caducados cuando el dict supera este tamaño
+    MAX_LOCAL_LEASES = 10_000
+
     def __init__(self, redis_client: redis.Redis):
         self.bucket = TokenBucket(redis_client)
 
+        # Engines disponibles, seleccionables por acción con config.algorithm
+        self.engines: Dict[str, RateLimitEngine] = {
+            engine.name: engine
+            for engine in (
+                self.bucket,
+                GCRA(redis_client),
+                SlidingWindowCounter(redis_client),
+            )
+        }
+
+        # Leases locales de este worker: key -> TokenLease
+        self.leases: Dict[str, TokenLease] = {}
+
         # Configuraciones predefinidas
         self.configs = {
             # API endpoints normales
             "api_call": RateLimitConfig(
                 max_requests=100,  # 100 requests
                 window_seconds=60,  # por minuto
-                burst_multiplier=1.5
+                burst_multiplier=1.5,
+                lease_size=10,  # Reservar 10 tokens por worker
+                lease_ttl_seconds=1.0
             ),
 
             # OpenAI embeddings (más restrictivo)
@@ -260,6 +834,21 @@ class RateLimiter:
         """Generar key de Redis para rate limit."""
         return f"rate_limit:{user_id}:{action}"
 
+    def _resolve_config(
+        self,
+        action: str,
+        custom_config: Optional[RateLimitConfig] = None
+    ) -> RateLimitConfig:
+        """Config de la acción (o la de api_call si no existe)."""
+        return custom_config or self.configs.get(action) or self.configs["api_call"]
+
+    def get_engine(self, config: RateLimitConfig) -> RateLimitEngine:
+        """Engine configurado para una acción."""
+        engine = self.engines.get(config.algorithm)
+        if engine is None:
+            raise ValueError(f"Unknown rate limit algorithm: {config.algorithm}")
+        return engine
+
     async def check_limit(
         self,
         user_id: str,
@@ -279,32 +868,229 @@ class RateLimiter:
         Returns:
             RateLimitResult
         """
-        config = custom_config or self.configs.get(action)
-        if not config:
-            # Si no hay config, usar default
-            config = self.configs["api_call"]
+        # Si no hay config, usar default
+        config = self._resolve_config(action, custom_config)
 
         key = self.get_key(user_id, action)
-        return await self.bucket.consume(key, tokens, config)
+
+        engine = self.get_engine(config)
+
+        # Los leases sólo existen para el Token Bucket
+        if engine is self.bucket and 0 < tokens <= config.lease_size:
+            return await self._consume_leased(key, tokens, config)
+
+        return await engine.consume(key, tokens, config)
+
+    async def _consume_leased(
+        self,
+        key: str,
+        tokens: int,
+        config: RateLimitConfig
+    ) -> RateLimitResult:
+        """
+        Consumir tokens del lease local; ir a Redis sólo si se agota o caduca.
+        """
+        now = time.monotonic()
+        lease = self.leases.get(key)
+
+        # Hot path: hay tokens suficientes en el lease local
+        if lease and lease.expires_at > now and lease.tokens >= tokens:
+            lease.tokens -= tokens
+            lease.spent += 1
+            return self._lease_result(key, tokens, config, lease)
+
+        # Devolver a Redis lo que quede de un lease caducado o insuficiente
+        tokens_returned = 0
+        if lease:
+            del self.leases[key]
+            tokens_returned = lease.tokens
+
+        if len(self.leases) > self.MAX_LOCAL_LEASES:
+            self._prune_leases(now)
+
+        try:
+            grant = await self.bucket.acquire_lease(
+                key,
+                max(config.lease_size, tokens),
+                config,
+                tokens_returned=tokens_returned
+            )
+        except Exception as e:
+            # Fail-open igual que TokenBucket.consume
+            print(f"Rate limiter error: {e}")
+            return self.bucket.fail_open(key, tokens, config)
+
+        granted = grant.tokens_consumed
+        lease = TokenLease(
+            tokens=granted,
+            expires_at=time.monotonic() + config.lease_ttl_seconds,
+            remote_available=grant.tokens_available,
+            base_count=grant.current_count - granted
+        )
+
+        # Otra corrutina pudo reservar mientras esperábamos a Redis
+        concurrent = self.leases.get(key)
+        if concurrent and concurrent.expires_at > now:
+            lease.tokens += concurrent.tokens
+            lease.spent += concurrent.spent
+        self.leases[key] = lease
+
+        if lease.tokens < tokens:
+            return RateLimitResult(
+                allowed=False,
+                tokens_available=lease.tokens,
+                tokens_requested=tokens,
+                tokens_consumed=0,
+                retry_after_seconds=grant.retry_after_seconds or (
+                    (tokens - lease.tokens) * config.window_seconds / config.max_requests
+                ),
+                limit_key=key,
+                window_seconds=config.window_seconds,
+                max_requests=config.max_requests,
+                current_count=grant.current_count
+            )
+
+        lease.tokens -= tokens
+        lease.spent += 1
+        return self._lease_result(key, tokens, config, lease)
+
+    def _lease_result(
+        self,
+        key: str,
+        tokens: int,
+        config: RateLimitConfig,
+        lease: TokenLease
+    ) -> RateLimitResult:
+        """Construir el resultado de un consumo servido desde el lease local."""
+        return RateLimitResult(
+            allowed=True,
+            tokens_available=lease.remote_available + lease.tokens,
+            tokens_requested=tokens,
+            tokens_consumed=tokens,
+            limit_key=key,
+            window_seconds=config.window_seconds,
+            max_requests=config.max_requests,
+            current_count=lease.base_count + lease.spent
+        )
+
+    def _prune_leases(self, now: float) -> None:
+        """Descartar leases caducados (sus tokens se pierden, nunca se sobre-admite)."""
+        for key in [k for k, lease in self.leases.items() if lease.expires_at <= now]:
+            del self.leases[key]
+
+    async def check_limits(
+        self,
+        requests: Sequence[Tuple[str, str, int]]
+    ) -> List[RateLimitResult]:
+        """
+        Verificar y consumir varios rate limits en un único round-trip por engine.
+
+        No usa los leases locales: cada bucket se evalúa en Redis.
+
+        Args:
+            requests: Lista de (user_id, action, tokens)
+
+        Returns:
+            Lista de RateLimitResult en el mismo orden que requests
+        """
+        items = [
+            (self.get_key(user_id, action), tokens, self._resolve_config(action))
+            for user_id, action, tokens in requests
+        ]
+        return await self._run_by_engine(
+            items,
+            lambda item: item[2],
+            lambda engine, group: engine.consume_many(group)
+        )
 
     async def reset_user_limits(self, user_id: str, action: Optional[str] = None) -> None:
         """Reset limits para un usuario (útil para testing o admin)."""
-        if action:
-            key = self.get_key(user_id, action)
-            await self.bucket.reset(key)
-        else:
-            # Reset all actions
-            for action in self.configs.keys():
-                key = self.get_key(user_id, action)
-                await self.bucket.reset(key)
+        await self.reset_users_limits([user_id], action)
+
+    async def reset_users_limits(
+        self,
+        user_ids: Sequence[str],
+        action: Optional[str] = None
+    ) -> None:
+        """
+        Reset limits de varios usuarios con un único DELETE.
+
+        Se borran las keys de todos los engines, así un cambio de algoritmo
+        no deja estado huérfano.
+        """
+        actions = [action] if action else list(self.configs.keys())
+        keys = [
+            self.get_key(user_id, user_action)
+            for user_id in user_ids
+            for user_action in actions
+        ]
+        if not keys:
+            return
+
+        for key in keys:
+            self.leases.pop(key, None)
+        await self.bucket.redis.delete(*(
+            storage_key
+            for key in keys
+            for engine in self.engines.values()
+            for storage_key in engine.storage_keys(key)
+        ))
 
     async def get_user_status(self, user_id: str) -> dict:
         """Obtener status de todos los rate limits de un usuario."""
-        status = {}
-        for action, config in self.configs.items():
-            key = self.get_key(user_id, action)
-            status[action] = await self.bucket.get_status(key, config)
-        return status
+        return (await self.get_users_status([user_id]))[user_id]
+
+    async def get_users_status(self, user_ids: Sequence[str]) -> Dict[str, dict]:
+        """
+        Obtener status de todos los rate limits de varios usuarios.
+
+        Todas las lecturas de un mismo engine van en un único pipeline
+        (1 round-trip por engine en uso).
+
+        Returns:
+            Dict user_id -> {action -> status}
+        """
+        items = [
+            (user_id, action, self.get_key(user_id, action), config)
+            for user_id in user_ids
+            for action, config in self.configs.items()
+        ]
+        statuses = await self._run_by_engine(
+            [(key, config) for _, _, key, config in items],
+            lambda item: item[1],
+            lambda engine, group: engine.get_status_many(group)
+        )
+
+        result: Dict[str, dict] = {user_id: {} for user_id in user_ids}
+        for (user_id, action, _, config), status in zip(items, statuses):
+            result[user_id][action] = {**status, "algorithm": config.algorithm}
+        return result
+
+    async def _run_by_engine(
+        self,
+        items: Sequence[Any],
+        config_of: Callable[[Any], RateLimitConfig],
+        run: Callable[[RateLimitEngine, list], Awaitable[list]]
+    ) -> list:
+        """
+        Agrupar items por engine, ejecutar cada grupo en paralelo y
+        devolver los resultados en el orden original.
+        """
+        groups: Dict[str, List[int]] = {}
+        for i, item in enumerate(items):
+            groups.setdefault(config_of(item).algorithm, []).append(i)
+
+        names = list(groups)
+        outputs = await asyncio.gather(*(
+            run(self.engines[name], [items[i] for i in groups[name]])
+            for name in names
+        ))
+
+        results: list = [None] * len(items)
+        for name, output in zip(names, outputs):
+            for i, result in zip(groups[name], output):
+                results[i] = result
+        return results
 
 
 # Singleton instance
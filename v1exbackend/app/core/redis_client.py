@@ -1,10 +1,84 @@
 """Redis client for caching and state management."""
 
 import json
+import time
+from datetime import datetime
 from typing import Any, Optional
 import redis.asyncio as redis
 
 from app.core.config import settings
+from app.core.rate_limiter import RedisScript
+from app.core.token_cache import token_digest
+
+# Token blacklist keys, and the channel where revocations publish the token
+# digest so each worker can update its local filter (see token_blacklist.py)
+BLACKLIST_KEY_PREFIX = "blacklist:"
+BLACKLIST_CHANNEL = "token_blacklist:events"
+
+# WebSocket connections: ws_connections:{id} holds the connection info, the
+# per-user sorted set indexes "{instance_id}:{connection_id}" members and the
+# online-users sorted set holds user ids, both scored by expiry (epoch seconds)
+WS_CONNECTION_TTL = 3600
+WS_USER_INDEX_PREFIX = "ws_user_connections:"
+WS_ONLINE_USERS_KEY = "ws_online_users"
+
+# KEYS: connection, user index, online users
+# ARGV: index member, user_id, data, expires_at, ttl, max per user (0: no limit), now
+# Returns 0 without adding when the user already has max live connections:
+# the check and the add are one atomic step across all instances
+WS_ADD_CONNECTION_SCRIPT = """
+local limit = tonumber(ARGV[6])
+if limit > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[7])
+    if redis.call('ZCARD', KEYS[2]) >= limit then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[3], 'EX', ARGV[5])
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+local current = tonumber(redis.call('ZSCORE', KEYS[3], ARGV[2]))
+if not current or current < tonumber(ARGV[4]) then
+    redis.call('ZADD', KEYS[3], ARGV[4], ARGV[2])
+end
+return 1
+"""
+
+# KEYS: connection, user index, online users
+# ARGV: index member, user_id, now
+WS_REMOVE_CONNECTION_SCRIPT = """
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[3])
+local last = redis.call('ZRANGE', KEYS[2], -1, -1, 'WITHSCORES')
+if #last == 0 then
+    redis.call('ZREM', KEYS[3], ARGV[2])
+else
+    redis.call('ZADD', KEYS[3], last[2], ARGV[2])
+end
+return #last
+"""
+
+# Session resume: ws_seq:{user_id} counts the frames sent to a user and
+# ws_replay:{user_id} keeps the last ones, scored by seq, as "{seq}\n{json}"
+# (the JSON without its seq, which is only known inside the script)
+WS_SEQ_PREFIX = "ws_seq:"
+WS_REPLAY_PREFIX = "ws_replay:"
+
+# KEYS: seq counter, replay buffer
+# ARGV: message JSON, buffer size, ttl
+WS_APPEND_REPLAY_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+redis.call('ZADD', KEYS[2], seq, seq .. '\\n' .. ARGV[1])
+redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -(tonumber(ARGV[2]) + 1))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return seq
+"""
+
+_ws_add_connection = RedisScript(WS_ADD_CONNECTION_SCRIPT)
+_ws_remove_connection = RedisScript(WS_REMOVE_CONNECTION_SCRIPT)
+_ws_append_replay = RedisScript(WS_APPEND_REPLAY_SCRIPT)
 
 # Global Redis client
 _redis_client: Optional[redis.Redis] = None
@@ -66,14 +140,65 @@ class RedisService:
 
     # ==================== WebSocket Connections ====================
 
-    async def add_ws_connection(self, connection_id: str, user_id: str) -> None:
-        """Register a WebSocket connection."""
-        key = f"ws_connections:{connection_id}"
+    async def add_ws_connection(
+        self,
+        connection_id: str,
+        user_id: str,
+        instance_id: str,
+        ttl: int = WS_CONNECTION_TTL,
+        max_per_user: int = 0
+    ) -> bool:
+        """
+        Register a WebSocket connection and index it under its user.
+
+        Args:
+            max_per_user: Refuse the connection if the user already has this
+                many live connections on any instance (0: no limit)
+
+        Returns:
+            False if refused by max_per_user
+        """
+        now = time.time()
+        expires_at = now + ttl
         data = {
             "user_id": user_id,
-            "connected_at": str(redis.asyncio.client.datetime.datetime.now()),
+            "instance_id": instance_id,
+            "connected_at": str(datetime.now()),
         }
-        await self.client.setex(key, 3600, json.dumps(data))  # 1 hour TTL
+        added = await _ws_add_connection(
+            self.client,
+            keys=[f"ws_connections:{connection_id}", f"{WS_USER_INDEX_PREFIX}{user_id}", WS_ONLINE_USERS_KEY],
+            args=[f"{instance_id}:{connection_id}", user_id, json.dumps(data), expires_at, ttl, max_per_user, now],
+        )
+        return bool(added)
+
+    async def refresh_ws_connections(
+        self,
+        connections: list[tuple[str, str]],
+        instance_id: str,
+        ttl: int
+    ) -> None:
+        """
+        Extend the TTL of live connections in one round trip.
+
+        Args:
+            connections: (connection_id, user_id) pairs
+            instance_id: Instance holding the connections
+            ttl: New time to live in seconds
+        """
+        expires_at = time.time() + ttl
+        users = set()
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            for connection_id, user_id in connections:
+                pipe.expire(f"ws_connections:{connection_id}", ttl)
+                # XX: never re-add a connection removed meanwhile
+                pipe.zadd(f"{WS_USER_INDEX_PREFIX}{user_id}", {f"{instance_id}:{connection_id}": expires_at}, xx=True)
+                users.add(user_id)
+            for user_id in users:
+                pipe.expire(f"{WS_USER_INDEX_PREFIX}{user_id}", ttl)
+                pipe.zadd(WS_ONLINE_USERS_KEY, {user_id: expires_at}, gt=True)
+            await pipe.execute()
 
     async def get_ws_connection(self, connection_id: str) -> Optional[dict[str, Any]]:
         """Get WebSocket connection info."""
@@ -81,24 +206,106 @@ class RedisService:
         data = await self.client.get(key)
         return json.loads(data) if data else None
 
-    async def remove_ws_connection(self, connection_id: str) -> None:
-        """Remove WebSocket connection."""
-        key = f"ws_connections:{connection_id}"
-        await self.client.delete(key)
+    async def remove_ws_connection(
+        self,
+        connection_id: str,
+        user_id: Optional[str] = None,
+        instance_id: Optional[str] = None
+    ) -> None:
+        """Remove a WebSocket connection and its user index entry."""
+        if user_id is None or instance_id is None:
+            connection = await self.get_ws_connection(connection_id)
+            if connection is None:
+                return
+            user_id = connection["user_id"]
+            instance_id = connection["instance_id"]
+
+        await _ws_remove_connection(
+            self.client,
+            keys=[f"ws_connections:{connection_id}", f"{WS_USER_INDEX_PREFIX}{user_id}", WS_ONLINE_USERS_KEY],
+            args=[f"{instance_id}:{connection_id}", user_id, time.time()],
+        )
+
+    async def _get_user_index(self, user_id: str) -> list[tuple[str, str]]:
+        """Live (instance_id, connection_id) entries of a user."""
+        key = f"{WS_USER_INDEX_PREFIX}{user_id}"
+        now = time.time()
+
+        # Lazy cleanup of connections that expired without a disconnect
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(key, "-inf", now)
+            pipe.zrangebyscore(key, f"({now}", "+inf")
+            _, members = await pipe.execute()
+
+        return [tuple(member.split(":", 1)) for member in members]
 
     async def get_user_connections(self, user_id: str) -> list[str]:
-        """Get all active connections for a user."""
-        pattern = "ws_connections:*"
-        connection_ids = []
+        """Get all active connections for a user (O(user's connections))."""
+        return [connection_id for _, connection_id in await self._get_user_index(user_id)]
+
+    async def get_user_instances(self, user_id: str) -> set[str]:
+        """Get the instances holding at least one connection of a user."""
+        return {instance_id for instance_id, _ in await self._get_user_index(user_id)}
 
-        async for key in self.client.scan_iter(match=pattern):
-            data = await self.client.get(key)
-            if data:
-                conn_data = json.loads(data)
-                if conn_data.get("user_id") == user_id:
-                    connection_ids.append(key.split(":")[1])
+    async def count_online_users(self) -> int:
+        """Count users with at least one live connection (O(log N))."""
+        now = time.time()
 
-        return connection_ids
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(WS_ONLINE_USERS_KEY, "-inf", now)
+            pipe.zcard(WS_ONLINE_USERS_KEY)
+            _, count = await pipe.execute()
+
+        return count
+
+    async def append_replay(self, user_id: str, message_json: str, size: int, ttl: int) -> int:
+        """
+        Assign the next sequence number of a user and keep the message for replay.
+
+        Args:
+            user_id: Target user ID
+            message_json: Message JSON (without seq)
+            size: Messages kept per user
+            ttl: Seconds the counter and buffer live after the last message
+
+        Returns:
+            The message's sequence number
+        """
+        return await _ws_append_replay(
+            self.client,
+            keys=[f"{WS_SEQ_PREFIX}{user_id}", f"{WS_REPLAY_PREFIX}{user_id}"],
+            args=[message_json, size, ttl],
+        )
+
+    async def get_replay(self, user_id: str, after_seq: int) -> Optional[list[tuple[int, str]]]:
+        """
+        Messages sent to a user after `after_seq`, oldest first.
+
+        Returns:
+            (seq, message JSON) pairs, or None if some of them are no longer
+            buffered (or the counter was reset) and the client must resync
+        """
+        key = f"{WS_REPLAY_PREFIX}{user_id}"
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.get(f"{WS_SEQ_PREFIX}{user_id}")
+            pipe.zrange(key, 0, 0, withscores=True)
+            pipe.zrangebyscore(key, f"({after_seq}", "+inf")
+            current, oldest, entries = await pipe.execute()
+
+        current = int(current or 0)
+        if after_seq > current:
+            return None
+        if after_seq == current:
+            return []
+        if not oldest or int(oldest[0][1]) > after_seq + 1:
+            return None
+
+        replay = []
+        for entry in entries:
+            seq, message_json = entry.split("\n", 1)
+            replay.append((int(seq), message_json))
+        return replay
 
     # ==================== LangGraph State ====================
 
@@ -127,12 +334,13 @@ class RedisService:
 
     async def blacklist_token(self, token: str, expires_in: int) -> None:
         """Add token to blacklist (for logout/revocation)."""
-        key = f"blacklist:{token}"
+        key = f"{BLACKLIST_KEY_PREFIX}{token}"
         await self.client.setex(key, expires_in, "1")
+        await self.client.publish(BLACKLIST_CHANNEL, token_digest(token).hex())
 
     async def is_token_blacklisted(self, token: str) -> bool:
-        """Check if token is blacklisted."""
-        key = f"blacklist:{token}"
+        """Check if token is blacklisted (always asks Redis, see TokenBlacklist)."""
+        key = f"{BLACKLIST_KEY_PREFIX}{token}"
         return await self.client.exists(key) > 0
 
     # ==================== Rate Limiting ====================
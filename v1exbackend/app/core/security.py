@@ -8,6 +8,7 @@ from fastapi import HTTPException, Security, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.core.config import settings
+from app.core.token_cache import TokenClaimsCache
 
 # HTTP Bearer scheme for Swagger authentication
 security_scheme = HTTPBearer(
@@ -15,6 +16,10 @@ security_scheme = HTTPBearer(
     description="Enter your JWT token (without 'Bearer' prefix)"
 )
 
+# Verified claims per worker, so repeated requests with the same token skip
+# the HMAC check and JSON parsing until the token expires
+_claims_cache = TokenClaimsCache(max_size=settings.JWT_CLAIMS_CACHE_SIZE)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
@@ -83,22 +88,31 @@ def decode_token(token: str) -> Optional[dict[str, Any]]:
     """
     Decode and verify a JWT token.
 
+    Verified payloads are cached until the token's exp; the returned
+    dict is shared and must not be mutated.
+
     Args:
         token: JWT token string
 
     Returns:
         Decoded payload or None if invalid
     """
+    payload = _claims_cache.get(token)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(
             token,
             settings.SECRET_KEY,
             algorithms=[settings.ALGORITHM]
         )
-        return payload
     except JWTError:
         return None
 
+    _claims_cache.put(token, payload)
+    return payload
+
 
 def extract_user_id_from_token(token: str) -> Optional[str]:
     """
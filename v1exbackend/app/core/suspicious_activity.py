@@ -0,0 +1,166 @@
+"""
+Detección incremental de actividad sospechosa con contadores en Redis.
+
+Reemplaza los COUNT(*) sobre rate_limit_audits de los últimos 5 minutos:
+por cada (user_id, action) se mantienen dos ventanas deslizantes en Redis
+(todos los requests y los bloqueados) como sorted sets con score = timestamp.
+Cada observación poda lo que salió de la ventana, cuenta y añade el
+request actual, así que el coste no depende del tamaño de la tabla.
+
+El score va en microsegundos (cabe exacto en un double) para que los
+límites de la ventana coincidan con la comparación de timestamps en SQL.
+Las reglas y los textos de alert_reason son los mismos que la ruta SQL.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+SUSPICIOUS_WINDOW_SECONDS = 300  # 5 minutos
+BLOCKED_THRESHOLD = 10
+
+
+def evaluate_suspicious(
+    recent_count: int,
+    blocked_count: int,
+    max_requests: int,
+    allowed: bool
+) -> Tuple[bool, Optional[str]]:
+    """
+    Reglas de actividad sospechosa a partir de los counts de la ventana.
+
+    Args:
+        recent_count: Requests previos del usuario/acción en los últimos 5 minutos
+        blocked_count: Requests bloqueados previos en los últimos 5 minutos
+        max_requests: Límite normal de la acción
+        allowed: Si el request actual fue permitido
+
+    Returns:
+        (is_suspicious, alert_reason)
+    """
+    # Umbral sospechoso: 5x el límite normal en 5 minutos
+    threshold = max_requests * 5
+
+    if recent_count and recent_count > threshold:
+        return True, f"Excessive requests: {recent_count} in 5 minutes (threshold: {threshold})"
+
+    # Verificar si está siendo bloqueado constantemente
+    if not allowed and blocked_count and blocked_count > BLOCKED_THRESHOLD:
+        return True, f"Multiple rate limit violations: {blocked_count} blocked requests in 5 minutes"
+
+    return False, None
+
+
+class SuspiciousActivityDetector:
+    """
+    Ventanas deslizantes por (user_id, action) en Redis.
+
+    Cada registro cuesta 4 comandos por ventana (ZREMRANGEBYSCORE, ZCOUNT,
+    ZADD, EXPIRE) y un lote entero se envía en un solo pipeline.
+    """
+
+    def __init__(self, redis_client: redis.Redis, window_seconds: int = SUSPICIOUS_WINDOW_SECONDS):
+        self.redis = redis_client
+        self.window_seconds = window_seconds
+        self.window_us = window_seconds * 1_000_000
+
+    @staticmethod
+    def get_keys(user_id: str, action: str) -> Tuple[str, str]:
+        """Keys de la ventana de todos los requests y de los bloqueados."""
+        base = f"suspicious:{user_id}:{action}"
+        return f"{base}:all", f"{base}:blocked"
+
+    async def observe(
+        self,
+        request_id: str,
+        user_id: str,
+        action: str,
+        allowed: bool,
+        max_requests: int,
+        timestamp: datetime
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Registrar un request y evaluar si es sospechoso.
+
+        Returns:
+            (is_suspicious, alert_reason)
+        """
+        record = {
+            "id": request_id,
+            "user_id": user_id,
+            "action": action,
+            "allowed": allowed,
+            "rate_limit_max_requests": max_requests,
+            "timestamp": timestamp,
+        }
+        await self.flag_batch([record])
+        return record["is_suspicious"], record["alert_reason"]
+
+    async def flag_batch(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Marcar is_suspicious/alert_triggered/alert_reason en registros de auditoría.
+
+        Los registros se procesan en orden de timestamp dentro de un único
+        pipeline, así que cada uno ve los anteriores del mismo lote.
+        """
+        if not records:
+            return
+
+        ordered = sorted(records, key=lambda r: r["timestamp"])
+
+        pipe = self.redis.pipeline(transaction=False)
+        for record in ordered:
+            now_us = self._to_us(record["timestamp"])
+            since_us = now_us - self.window_us
+            all_key, blocked_key = self.get_keys(record["user_id"], self._action(record))
+
+            keys = [all_key] if record["allowed"] else [all_key, blocked_key]
+            for key in keys:
+                # ZCOUNT antes de ZADD: el request actual no se cuenta,
+                # igual que el COUNT(*) previo al INSERT
+                pipe.zremrangebyscore(key, "-inf", f"({since_us}")
+                pipe.zcount(key, since_us, "+inf")
+                pipe.zadd(key, {record["id"]: now_us})
+                pipe.expire(key, self.window_seconds)
+
+        results = await pipe.execute()
+
+        position = 0
+        for record in ordered:
+            recent_count = int(results[position + 1])
+            position += 4
+
+            blocked_count = 0
+            if not record["allowed"]:
+                blocked_count = int(results[position + 1])
+                position += 4
+
+            is_suspicious, alert_reason = evaluate_suspicious(
+                recent_count=recent_count,
+                blocked_count=blocked_count,
+                max_requests=record["rate_limit_max_requests"],
+                allowed=record["allowed"]
+            )
+            record.update(
+                is_suspicious=is_suspicious,
+                alert_triggered=is_suspicious,
+                alert_reason=alert_reason
+            )
+
+    async def reset(self, user_id: str, action: str) -> None:
+        """Borrar las ventanas de un usuario/acción."""
+        await self.redis.delete(*self.get_keys(user_id, action))
+
+    @staticmethod
+    def _action(record: Dict[str, Any]) -> str:
+        action = record["action"]
+        return getattr(action, "value", action)
+
+    @staticmethod
+    def _to_us(timestamp: datetime) -> int:
+        # Los timestamps de auditoría son UTC naive (datetime.utcnow())
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        delta = timestamp - datetime(1970, 1, 1, tzinfo=timezone.utc)
+        return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
@@ -0,0 +1,196 @@
+"""Local Bloom filter of blacklisted tokens, synced from Redis via pub/sub."""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Optional
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.core.redis_client import BLACKLIST_CHANNEL, BLACKLIST_KEY_PREFIX, get_redis
+from app.core.token_cache import token_digest
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 128-bit token digests."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes) -> list[int]:
+        # Double hashing (Kirsch-Mitzenmacher) over the two halves of the digest
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.num_hashes)]
+
+    def add(self, digest: bytes) -> None:
+        """Add a token digest."""
+        for position in self._positions(digest):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest: bytes) -> bool:
+        bits = self._bits
+        for position in self._positions(digest):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class TokenBlacklist:
+    """
+    Blacklist check that only goes to Redis on a possible Bloom filter hit.
+
+    Redis stays the source of truth (`blacklist:{token}` keys with TTL).
+    Every worker subscribes to BLACKLIST_CHANNEL, where revocations publish
+    the token digest, and keeps a Bloom filter of revoked digests. The
+    filter is rebuilt from a key scan after (re)subscribing and every
+    `rebuild_interval` seconds, which also forgets expired entries. While
+    there is no synced filter (startup, lost subscription) every check goes
+    to Redis.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        capacity: int = 100_000,
+        error_rate: float = 0.001,
+        rebuild_interval: float = 3600.0
+    ):
+        self.redis = redis_client
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+
+        self._bloom: Optional[BloomFilter] = None
+        self._synced = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.local_negatives = 0
+        self.redis_checks = 0
+
+    @property
+    def synced(self) -> bool:
+        return self._bloom is not None
+
+    async def is_blacklisted(self, token: str) -> bool:
+        """Check if a token is blacklisted."""
+        if self._bloom is not None and token_digest(token) not in self._bloom:
+            self.local_negatives += 1
+            return False
+
+        self.redis_checks += 1
+        return await self.redis.exists(f"{BLACKLIST_KEY_PREFIX}{token}") > 0
+
+    async def rebuild(self) -> None:
+        """Rebuild the filter from the blacklist keys currently in Redis."""
+        digests = []
+        async for key in self.redis.scan_iter(match=f"{BLACKLIST_KEY_PREFIX}*", count=1000):
+            if isinstance(key, bytes):
+                key = key.decode("utf-8")
+            digests.append(token_digest(key[len(BLACKLIST_KEY_PREFIX):]))
+
+        bloom = BloomFilter(max(self.capacity, 2 * len(digests)), self.error_rate)
+        for digest in digests:
+            bloom.add(digest)
+
+        self._bloom = bloom
+        self._synced.set()
+
+    def apply_event(self, data: str | bytes) -> None:
+        """Add a revoked digest received on BLACKLIST_CHANNEL."""
+        if self._bloom is None:
+            return
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        self._bloom.add(bytes.fromhex(data))
+
+    async def start(self) -> None:
+        """Start the pub/sub listener."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the listener; checks go to Redis afterwards."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._bloom = None
+
+    async def wait_synced(self, timeout: float) -> bool:
+        """Wait for the first filter build."""
+        try:
+            await asyncio.wait_for(self._synced.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _run(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                # Subscribe before the scan so no revocation in between is lost
+                await pubsub.subscribe(BLACKLIST_CHANNEL)
+                await self.rebuild()
+                next_rebuild = time.monotonic() + self.rebuild_interval
+
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self.apply_event(message["data"])
+
+                    if time.monotonic() >= next_rebuild:
+                        await self.rebuild()
+                        next_rebuild = time.monotonic() + self.rebuild_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Revocations may have been missed: use Redis until resynced
+                logger.warning(f"Token blacklist subscription lost, falling back to Redis: {e}")
+                self._bloom = None
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+
+
+# Global blacklist instance
+_token_blacklist: Optional[TokenBlacklist] = None
+
+
+async def init_token_blacklist() -> None:
+    """Start the blacklist filter (requires init_redis())."""
+    global _token_blacklist
+    _token_blacklist = TokenBlacklist(
+        get_redis(),
+        capacity=settings.TOKEN_BLACKLIST_BLOOM_CAPACITY,
+        error_rate=settings.TOKEN_BLACKLIST_BLOOM_ERROR_RATE,
+    )
+    await _token_blacklist.start()
+    if not await _token_blacklist.wait_synced(timeout=5.0):
+        logger.warning("Token blacklist filter not synced yet, checking Redis directly")
+
+
+async def close_token_blacklist() -> None:
+    """Stop the blacklist filter."""
+    global _token_blacklist
+    if _token_blacklist:
+        await _token_blacklist.stop()
+        _token_blacklist = None
+
+
+def get_token_blacklist() -> Optional[TokenBlacklist]:
+    """Get the blacklist filter, or None if not started."""
+    return _token_blacklist
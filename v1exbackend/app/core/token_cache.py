@@ -0,0 +1,67 @@
+"""Per-worker cache of verified JWT claims."""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def token_digest(token: str) -> bytes:
+    """128-bit digest used as the cache/blacklist key instead of the raw token."""
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+
+class TokenClaimsCache:
+    """
+    Bounded LRU of verified token claims keyed by token digest.
+
+    Only tokens that passed signature and claims verification are stored,
+    and each entry expires at the token's `exp`, so a hit is equivalent to
+    a successful `jwt.decode` at that moment. Cached claims are shared
+    between callers and must not be mutated.
+    """
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._entries: OrderedDict[bytes, tuple[dict[str, Any], float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict[str, Any]]:
+        """Return cached claims for a token, or None on miss/expiry."""
+        key = token_digest(token)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def put(self, token: str, claims: dict[str, Any]) -> None:
+        """Cache verified claims until the token's exp (tokens without exp are not cached)."""
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)) or self.max_size <= 0:
+            return
+
+        key = token_digest(token)
+        self._entries[key] = (claims, float(exp))
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached claims."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,14 +1,27 @@
 """WebSocket connection manager and message handler."""
 
-import json
 import logging
 import uuid
-from typing import Dict, Optional, Any
+from typing import Callable, Dict, Optional, Any, Union
 from fastapi import WebSocket, WebSocketDisconnect, status
 from datetime import datetime
 
-from app.core.redis_client import RedisService
+import orjson
+
+from app.core.config import settings
+from app.core.redis_client import RedisService, get_redis
 from app.core.security import decode_token
+from app.core.token_blacklist import get_token_blacklist
+from app.core.ws_codec import MessageCodec, OutboundMessage
+from app.core.ws_fanout import WebSocketFanout
+from app.core.ws_outbound import ConnectionWriter
+from app.core.ws_supervisor import ConnectionSupervisor
+
+# Coalesce key of heartbeats; a delivered heartbeat counts as liveness
+HEARTBEAT_KEY = "ping"
+
+# Combines a still-queued message (first) with a new one (second), as dicts
+MessageMerge = Callable[[dict[str, Any], dict[str, Any]], dict[str, Any]]
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +29,8 @@ logger = logging.getLogger(__name__)
 class WebSocketMessage:
     """WebSocket message structure."""
 
+    __slots__ = ("type", "payload", "_correlation_id", "_created_at", "_timestamp")
+
     def __init__(
         self,
         type: str,
@@ -24,8 +39,23 @@ class WebSocketMessage:
     ):
         self.type = type
         self.payload = payload
-        self.correlation_id = correlation_id or str(uuid.uuid4())
-        self.timestamp = datetime.utcnow().isoformat()
+        self._correlation_id = correlation_id
+        self._created_at = datetime.utcnow()
+        self._timestamp: Optional[str] = None
+
+    @property
+    def correlation_id(self) -> str:
+        """Correlation ID (generated on first use if the sender gave none)."""
+        if self._correlation_id is None:
+            self._correlation_id = str(uuid.uuid4())
+        return self._correlation_id
+
+    @property
+    def timestamp(self) -> str:
+        """Creation time in ISO format (formatted on first use)."""
+        if self._timestamp is None:
+            self._timestamp = self._created_at.isoformat()
+        return self._timestamp
 
     def to_dict(self) -> dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
@@ -38,18 +68,22 @@ class WebSocketMessage:
 
     def to_json(self) -> str:
         """Convert to JSON string."""
-        return json.dumps(self.to_dict())
+        return orjson.dumps(self.to_dict(), option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
 
     @classmethod
-    def from_json(cls, data: str) -> "WebSocketMessage":
-        """Create from JSON string."""
-        parsed = json.loads(data)
+    def from_dict(cls, parsed: dict[str, Any]) -> "WebSocketMessage":
+        """Create from a decoded message (any wire format)."""
         return cls(
             type=parsed["type"],
             payload=parsed["payload"],
             correlation_id=parsed.get("correlation_id"),
         )
 
+    @classmethod
+    def from_json(cls, data: str) -> "WebSocketMessage":
+        """Create from JSON string."""
+        return cls.from_dict(orjson.loads(data))
+
 
 class ConnectionManager:
     """Manage WebSocket connections with authentication and user tracking."""
@@ -64,9 +98,30 @@ class ConnectionManager:
         # Connection metadata: connection_id -> user_id
         self.connection_users: Dict[str, str] = {}
 
+        # Outbound queue and writer task per connection: connection_id -> writer
+        self.writers: Dict[str, ConnectionWriter] = {}
+
+        # Negotiated wire format per connection: connection_id -> codec
+        self.codecs: Dict[str, MessageCodec] = {}
+
         # Redis service for persistence (lazy initialization)
         self._redis: Optional[RedisService] = None
 
+        # This worker's id in the connection index and fan-out channels
+        self.instance_id = uuid.uuid4().hex[:12]
+
+        # Cross-instance delivery (None until start_fanout(): local only)
+        self.fanout: Optional[WebSocketFanout] = None
+
+        # Connection limits and heartbeats (the wheel turns after start_supervisor())
+        self.supervisor = ConnectionSupervisor(
+            self,
+            heartbeat_interval=settings.WS_HEARTBEAT_INTERVAL,
+            idle_timeout=settings.WS_IDLE_TIMEOUT,
+            max_connections_per_user=settings.WS_MAX_CONNECTIONS_PER_USER,
+            max_connections=settings.WS_MAX_CONNECTIONS_PER_PROCESS,
+        )
+
     @property
     def redis(self) -> RedisService:
         """Get Redis service instance (lazy initialization)."""
@@ -74,6 +129,25 @@ class ConnectionManager:
             self._redis = RedisService()
         return self._redis
 
+    async def start_fanout(self) -> None:
+        """Start receiving messages for this instance's sockets from other workers."""
+        self.fanout = WebSocketFanout(get_redis(), self.instance_id, self._deliver_local)
+        await self.fanout.start()
+
+    async def stop_fanout(self) -> None:
+        """Stop cross-instance delivery."""
+        if self.fanout is not None:
+            await self.fanout.stop()
+            self.fanout = None
+
+    def start_supervisor(self) -> None:
+        """Start heartbeat checks, idle eviction and TTL refreshes."""
+        self.supervisor.start()
+
+    async def stop_supervisor(self) -> None:
+        """Stop supervising connections."""
+        await self.supervisor.stop()
+
     async def authenticate(self, websocket: WebSocket) -> Optional[str]:
         """
         Authenticate WebSocket connection via JWT token.
@@ -95,8 +169,14 @@ class ConnectionManager:
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return None
 
-        # Check if token is blacklisted
-        if await self.redis.is_token_blacklisted(token):
+        # Check if token is blacklisted (local filter, Redis only on a possible hit)
+        blacklist = get_token_blacklist()
+        if blacklist is not None:
+            blacklisted = await blacklist.is_blacklisted(token)
+        else:
+            blacklisted = await self.redis.is_token_blacklisted(token)
+
+        if blacklisted:
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return None
 
@@ -119,38 +199,114 @@ class ConnectionManager:
 
         return user_id
 
-    async def connect(self, websocket: WebSocket, user_id: str) -> str:
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        codec: Optional[MessageCodec] = None,
+        last_seq: Optional[int] = None
+    ) -> Optional[str]:
         """
         Register a new WebSocket connection.
 
         Args:
             websocket: WebSocket connection
             user_id: Authenticated user ID
+            codec: Negotiated wire format (plain JSON text frames if None)
+            last_seq: Last sequence number the client received; the
+                messages it missed are replayed before any new one
 
         Returns:
-            Connection ID
+            Connection ID, None if rejected by the connection limits
         """
-        await websocket.accept()
+        # Enforce per-user and per-process limits before accepting
+        close_code = self.supervisor.admit(user_id)
+        if close_code is not None:
+            await websocket.close(code=close_code)
+            return None
 
         # Generate unique connection ID
         connection_id = str(uuid.uuid4())
 
-        # Store connection
-        self.active_connections[connection_id] = websocket
-        self.connection_users[connection_id] = user_id
+        try:
+            # Store in Redis for cross-instance tracking (TTL refreshed by the
+            # supervisor); the per-user limit across instances is checked in
+            # the same atomic step
+            added = await self.redis.add_ws_connection(
+                connection_id, user_id, self.instance_id,
+                ttl=self.supervisor.connection_ttl,
+                max_per_user=self.supervisor.max_connections_per_user
+            )
+            if not added:
+                self.supervisor.reject(user_id, "connection limit reached across instances")
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                return None
 
-        # Track user connections
-        if user_id not in self.user_connections:
-            self.user_connections[user_id] = set()
-        self.user_connections[user_id].add(connection_id)
-
-        # Store in Redis for cross-instance tracking
-        await self.redis.add_ws_connection(connection_id, user_id)
+            try:
+                await websocket.accept()
+            except Exception:
+                await self.redis.remove_ws_connection(connection_id, user_id, self.instance_id)
+                raise
+
+            # Store connection
+            self.active_connections[connection_id] = websocket
+            self.connection_users[connection_id] = user_id
+            self.codecs[connection_id] = codec or MessageCodec()
+
+            # Sends go through a bounded queue so a slow client only delays itself
+            writer = ConnectionWriter(
+                websocket,
+                on_close=lambda: self.disconnect(connection_id),
+                max_queue=settings.WS_SEND_QUEUE_SIZE,
+                policy=settings.WS_SLOW_CONSUMER_POLICY,
+                send_timeout=settings.WS_SEND_TIMEOUT,
+                on_sent=lambda key: self._on_sent(connection_id, key),
+            )
+            self.writers[connection_id] = writer
+
+            # Track user connections
+            if user_id not in self.user_connections:
+                self.user_connections[user_id] = set()
+            self.user_connections[user_id].add(connection_id)
+
+            self.supervisor.track(connection_id)
+        finally:
+            # Registered (counted by user_connections now) or refused
+            self.supervisor.release(user_id)
+
+        # New messages already queue up; missed ones go in front of them
+        if last_seq is not None:
+            await self._replay(connection_id, user_id, last_seq)
+        writer.start()
 
         logger.info(f"User {user_id} connected (connection: {connection_id})")
 
         return connection_id
 
+    async def _replay(self, connection_id: str, user_id: str, last_seq: int) -> None:
+        """Queue the messages a resuming client missed, or ask it to resync."""
+        try:
+            replay = await self.redis.get_replay(user_id, last_seq)
+        except Exception as e:
+            logger.error(f"Error reading replay buffer of user {user_id}: {e}")
+            replay = None
+
+        codec = self.codecs[connection_id]
+        if replay is None:
+            # Missed messages are gone: the client must refetch its state
+            resync = WebSocketMessage(type="session.resync_required", payload={"last_seq": last_seq})
+            frames = [OutboundMessage(resync.to_dict()).frame(codec)]
+        else:
+            frames = []
+            for seq, message_json in replay:
+                data = orjson.loads(message_json)
+                data["seq"] = seq
+                frames.append(OutboundMessage(data).frame(codec))
+
+        self.writers[connection_id].prepend(frames)
+        logger.info(f"Connection {connection_id} resumed after seq {last_seq}: "
+                    f"{'resync required' if replay is None else f'{len(frames)} replayed'}")
+
     async def disconnect(self, connection_id: str) -> None:
         """
         Remove a WebSocket connection.
@@ -158,16 +314,26 @@ class ConnectionManager:
         Args:
             connection_id: Connection identifier
         """
+        # Already removed (e.g. closed by its writer as a slow consumer)
+        if connection_id not in self.active_connections:
+            return
+
         # Get user ID
         user_id = self.connection_users.get(connection_id)
 
         # Remove from tracking
-        if connection_id in self.active_connections:
-            del self.active_connections[connection_id]
+        del self.active_connections[connection_id]
 
         if connection_id in self.connection_users:
             del self.connection_users[connection_id]
 
+        self.codecs.pop(connection_id, None)
+        self.supervisor.untrack(connection_id)
+
+        writer = self.writers.pop(connection_id, None)
+        if writer is not None:
+            await writer.stop()
+
         # Remove from user connections
         if user_id and user_id in self.user_connections:
             self.user_connections[user_id].discard(connection_id)
@@ -175,14 +341,52 @@ class ConnectionManager:
                 del self.user_connections[user_id]
 
         # Remove from Redis
-        await self.redis.remove_ws_connection(connection_id)
+        await self.redis.remove_ws_connection(connection_id, user_id, self.instance_id)
 
         logger.info(f"Connection {connection_id} disconnected")
 
+    async def close_connection(self, connection_id: str, code: int = status.WS_1000_NORMAL_CLOSURE) -> None:
+        """
+        Close a connection from the server side and remove it.
+
+        Args:
+            connection_id: Connection identifier
+            code: WebSocket close code
+        """
+        websocket = self.active_connections.get(connection_id)
+        if websocket is None:
+            return
+
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+        await self.disconnect(connection_id)
+
+    def touch(self, connection_id: str) -> None:
+        """Record activity on a connection (inbound frame or delivered heartbeat)."""
+        self.supervisor.touch(connection_id)
+
+    def _on_sent(self, connection_id: str, coalesce_key: Optional[str]) -> None:
+        # Clients are not required to answer pings: the socket accepting
+        # the heartbeat is enough to keep the connection
+        if coalesce_key == HEARTBEAT_KEY:
+            self.touch(connection_id)
+
+    async def send_ping(self, connection_id: str) -> None:
+        """Send a heartbeat to a connection that has been quiet."""
+        await self.send_personal_message(
+            WebSocketMessage(type="ping", payload={}),
+            connection_id,
+            coalesce_key=HEARTBEAT_KEY
+        )
+
     async def send_personal_message(
         self,
         message: WebSocketMessage,
-        connection_id: str
+        connection_id: str,
+        coalesce_key: Optional[str] = None,
+        merge: Optional[MessageMerge] = None
     ) -> None:
         """
         Send a message to a specific connection.
@@ -190,37 +394,113 @@ class ConnectionManager:
         Args:
             message: Message to send
             connection_id: Target connection ID
+            coalesce_key: Replace a still-queued message with the same key
+            merge: Combine with a still-queued message of the same key instead
+                of replacing it; such messages are never dropped when the
+                queue is full
         """
-        websocket = self.active_connections.get(connection_id)
-        if websocket:
-            try:
-                await websocket.send_text(message.to_json())
-            except Exception as e:
-                logger.error(f"Error sending message to {connection_id}: {e}")
-                await self.disconnect(connection_id)
+        self._send_frame(connection_id, OutboundMessage(message.to_dict()), coalesce_key, merge)
+
+    def _send_frame(
+        self,
+        connection_id: str,
+        message: OutboundMessage,
+        coalesce_key: Optional[str] = None,
+        merge: Optional[MessageMerge] = None
+    ) -> None:
+        writer = self.writers.get(connection_id)
+        if writer is None:
+            return
+
+        codec = self.codecs[connection_id]
+        merge_frame = None
+        if merge is not None:
+            # Only runs when the previous message is still queued (slow client)
+            def merge_frame(queued):
+                return OutboundMessage(merge(codec.decode(queued), message.data)).frame(codec)
+
+        writer.enqueue(message.frame(codec), coalesce_key, merge_frame)
+
+    async def _deliver_local(
+        self,
+        user_id: Optional[str],
+        message: Union[OutboundMessage, str],
+        coalesce_key: Optional[str] = None
+    ) -> None:
+        """
+        Queue for this instance's sockets of a user (all sockets if user_id is None).
+
+        `message` may be JSON text, as received from other instances.
+        """
+        if isinstance(message, str):
+            message = OutboundMessage(json_text=message)
+
+        if user_id is None:
+            connection_ids = list(self.active_connections.keys())
+        else:
+            connection_ids = list(self.user_connections.get(user_id, set()))
 
-    async def send_to_user(self, message: WebSocketMessage, user_id: str) -> None:
+        # Enqueue only: each connection's writer task sends concurrently
+        for connection_id in connection_ids:
+            self._send_frame(connection_id, message, coalesce_key)
+
+    async def send_to_user(
+        self,
+        message: WebSocketMessage,
+        user_id: str,
+        coalesce_key: Optional[str] = None
+    ) -> None:
         """
-        Send a message to all connections of a user.
+        Send a message to all connections of a user, on any instance.
+
+        The message gets the user's next sequence number (`seq`) and is kept
+        in the user's replay buffer, so a reconnecting client can resume
+        from the last seq it received.
 
         Args:
             message: Message to send
             user_id: Target user ID
+            coalesce_key: Replace a still-queued local message with the same key
         """
-        connection_ids = self.user_connections.get(user_id, set())
-
-        for connection_id in list(connection_ids):  # Copy to avoid modification during iteration
-            await self.send_personal_message(message, connection_id)
+        data = message.to_dict()
+        try:
+            data["seq"] = await self.redis.append_replay(
+                user_id,
+                OutboundMessage(data).json_text,
+                settings.WS_REPLAY_BUFFER_SIZE,
+                settings.WS_REPLAY_TTL,
+            )
+        except Exception as e:
+            logger.error(f"Error sequencing message for user {user_id}: {e}")
+
+        outbound = OutboundMessage(data)
+        await self._deliver_local(user_id, outbound, coalesce_key)
+
+        if self.fanout is None:
+            return
+
+        try:
+            instance_ids = await self.redis.get_user_instances(user_id)
+        except Exception as e:
+            logger.error(f"Error looking up instances for user {user_id}: {e}")
+            return
+
+        instance_ids.discard(self.instance_id)
+        if instance_ids:
+            self.fanout.send_to_user(instance_ids, user_id, outbound.json_text)
 
     async def broadcast(self, message: WebSocketMessage) -> None:
         """
-        Broadcast a message to all connected clients.
+        Broadcast a message to all connected clients, on every instance.
 
         Args:
             message: Message to broadcast
         """
-        for connection_id in list(self.active_connections.keys()):
-            await self.send_personal_message(message, connection_id)
+        outbound = OutboundMessage(message.to_dict())
+        await self._deliver_local(None, outbound)
+
+        if self.fanout is not None:
+            self.fanout.broadcast(outbound.json_text)
 
     def get_user_id(self, connection_id: str) -> Optional[str]:
         """Get user ID for a connection."""
@@ -230,6 +510,17 @@ class ConnectionManager:
         """Get number of active connections for a user."""
         return len(self.user_connections.get(user_id, set()))
 
+    def outbound_metrics(self) -> dict[str, int]:
+        """Aggregate outbound queue counters of this instance's connections."""
+        writers = list(self.writers.values())
+        return {
+            "queued": sum(writer.queue_depth for writer in writers),
+            "max_queue_depth": max((writer.queue_depth for writer in writers), default=0),
+            "sent": sum(writer.sent for writer in writers),
+            "dropped": sum(writer.dropped for writer in writers),
+            "coalesced": sum(writer.coalesced for writer in writers),
+        }
+
 
 # Global connection manager instance
 connection_manager = ConnectionManager()
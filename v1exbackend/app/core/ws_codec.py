@@ -0,0 +1,157 @@
+"""WebSocket wire formats: JSON or msgpack, with optional per-message deflate."""
+
+import logging
+import zlib
+from datetime import datetime
+from typing import Any, Mapping, Optional, Union
+
+import msgpack
+import orjson
+
+logger = logging.getLogger(__name__)
+
+JSON = "json"
+MSGPACK = "msgpack"
+WIRE_FORMATS = (JSON, MSGPACK)
+
+DEFLATE = "deflate"
+
+# First byte of every binary frame
+FLAG_RAW = 0x00
+FLAG_DEFLATE = 0x01
+
+DEFLATE_LEVEL = 6
+# Inbound frames are rejected if they inflate beyond this size
+MAX_INFLATED_SIZE = 1024 * 1024
+
+Frame = Union[str, bytes]
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__} to msgpack")
+
+
+class OutboundMessage:
+    """
+    A message encoded at most once per wire format.
+
+    Broadcasts and multi-connection sends share one instance, so each
+    (format, compression) variant is built once no matter how many sockets
+    receive it. Messages arriving from other instances already carry their
+    JSON text, which is reused as-is for JSON clients.
+    """
+
+    __slots__ = ("_data", "_json", "_frames")
+
+    def __init__(self, data: Optional[dict[str, Any]] = None, json_text: Optional[str] = None):
+        if data is None and json_text is None:
+            raise ValueError("OutboundMessage needs data or json_text")
+        self._data = data
+        self._json = json_text
+        self._frames: dict[tuple[str, bool], Frame] = {}
+
+    @property
+    def data(self) -> dict[str, Any]:
+        if self._data is None:
+            self._data = orjson.loads(self._json)
+        return self._data
+
+    @property
+    def json_text(self) -> str:
+        if self._json is None:
+            self._json = orjson.dumps(self._data, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        return self._json
+
+    def frame(self, codec: "MessageCodec") -> Frame:
+        """Frame for a connection using `codec` (cached per format and compression)."""
+        key = (codec.format, codec.compress)
+        frame = self._frames.get(key)
+        if frame is None:
+            frame = self._frames[key] = codec.encode(self)
+        return frame
+
+
+class MessageCodec:
+    """
+    Encoding negotiated by one connection.
+
+    Clients choose it in the connect query string:
+    `?format=json|msgpack&compress=deflate`.
+
+    - JSON, uncompressed: text frames, as before.
+    - Binary frames start with one flag byte (0x00 raw, 0x01 raw deflate)
+      followed by the message in the negotiated format. msgpack always
+      uses binary frames; JSON uses them only for deflated messages.
+    - With compression, only messages of at least `compress_threshold`
+      bytes are deflated; small ones are not worth the CPU.
+    """
+
+    __slots__ = ("format", "compress", "compress_threshold")
+
+    def __init__(self, format: str = JSON, compress: bool = False, compress_threshold: int = 1024):
+        if format not in WIRE_FORMATS:
+            raise ValueError(f"Unsupported wire format: {format}")
+        self.format = format
+        self.compress = compress
+        self.compress_threshold = compress_threshold
+
+    @classmethod
+    def negotiate(cls, query_params: Mapping[str, str], compress_threshold: int = 1024) -> "MessageCodec":
+        """Codec requested in the connect query string (JSON if unknown)."""
+        format = query_params.get("format", JSON).lower()
+        if format not in WIRE_FORMATS:
+            logger.warning(f"Unsupported WebSocket wire format '{format}', using JSON")
+            format = JSON
+        compress = query_params.get("compress", "").lower() == DEFLATE
+        return cls(format, compress, compress_threshold)
+
+    def describe(self) -> dict[str, Any]:
+        """Negotiated settings, echoed to the client on connect."""
+        return {
+            "format": self.format,
+            "compress": DEFLATE if self.compress else None,
+            "compress_threshold": self.compress_threshold if self.compress else None,
+        }
+
+    def encode(self, message: OutboundMessage) -> Frame:
+        """Encode a message into a text or binary frame."""
+        if self.format == JSON:
+            if not self.compress:
+                return message.json_text
+            raw = message.json_text.encode("utf-8")
+            if len(raw) < self.compress_threshold:
+                return message.json_text
+        else:
+            raw = msgpack.packb(message.data, default=_msgpack_default)
+
+        if self.compress and len(raw) >= self.compress_threshold:
+            return bytes((FLAG_DEFLATE,)) + zlib.compress(raw, DEFLATE_LEVEL, wbits=-15)
+        return bytes((FLAG_RAW,)) + raw
+
+    def decode(self, frame: Frame) -> dict[str, Any]:
+        """
+        Decode an inbound frame.
+
+        Raises:
+            ValueError: Malformed frame
+        """
+        if isinstance(frame, str):
+            return orjson.loads(frame)
+
+        if not frame:
+            raise ValueError("Empty binary frame")
+
+        flag, body = frame[0], frame[1:]
+        if flag == FLAG_DEFLATE:
+            inflater = zlib.decompressobj(wbits=-15)
+            body = inflater.decompress(body, MAX_INFLATED_SIZE)
+            if inflater.unconsumed_tail:
+                raise ValueError("Inflated frame too large")
+        elif flag != FLAG_RAW:
+            raise ValueError(f"Unknown frame flag: {flag}")
+
+        if self.format == MSGPACK:
+            return msgpack.unpackb(body)
+        return orjson.loads(body)
@@ -0,0 +1,182 @@
+"""Cross-instance WebSocket fan-out over Redis pub/sub."""
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+INSTANCE_CHANNEL_PREFIX = "ws:instance:"
+BROADCAST_CHANNEL = "ws:broadcast"
+
+# deliver(user_id, text): user_id None means broadcast to every local socket
+DeliverCallback = Callable[[Optional[str], str], Awaitable[None]]
+
+
+def instance_channel(instance_id: str) -> str:
+    """Pub/sub channel of one instance."""
+    return f"{INSTANCE_CHANNEL_PREFIX}{instance_id}"
+
+
+class WebSocketFanout:
+    """
+    Route WebSocket messages to the instances holding the target sockets.
+
+    Each instance subscribes to its own channel (`ws:instance:{id}`) and to
+    the broadcast channel. Outgoing messages are buffered per channel and
+    published as one newline-delimited JSON frame per channel every
+    `flush_interval` seconds (or as soon as `max_batch` messages are
+    pending), so a burst of pushes costs one PUBLISH per target instance.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        instance_id: str,
+        deliver: DeliverCallback,
+        flush_interval: float = 0.002,
+        max_batch: int = 256
+    ):
+        self.redis = redis_client
+        self.instance_id = instance_id
+        self.deliver = deliver
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        # channel -> encoded items waiting for the next flush
+        self._buffers: Dict[str, list[str]] = {}
+        self._buffered = 0
+        self._pending = asyncio.Event()
+        self._full = asyncio.Event()
+
+        self._listener: Optional[asyncio.Task] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+
+        # Metrics
+        self.published_frames = 0
+        self.published_messages = 0
+        self.received_messages = 0
+
+    # ==================== Sending ====================
+
+    def send_to_user(self, instance_ids: Iterable[str], user_id: str, text: str) -> None:
+        """Queue a message for a user's sockets on other instances."""
+        item = json.dumps({"user_id": user_id, "message": text})
+        for instance_id in instance_ids:
+            self._enqueue(instance_channel(instance_id), item)
+
+    def broadcast(self, text: str) -> None:
+        """Queue a message for every socket on every other instance."""
+        self._enqueue(BROADCAST_CHANNEL, json.dumps({"origin": self.instance_id, "message": text}))
+
+    def _enqueue(self, channel: str, item: str) -> None:
+        self._buffers.setdefault(channel, []).append(item)
+        self._buffered += 1
+        self._pending.set()
+        if self._buffered >= self.max_batch:
+            self._full.set()
+
+    async def flush(self) -> None:
+        """Publish every buffered frame now."""
+        if not self._buffers:
+            return
+
+        buffers, self._buffers = self._buffers, {}
+        self._buffered = 0
+        self._full.clear()
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for channel, items in buffers.items():
+                pipe.publish(channel, "\n".join(items))
+                self.published_messages += len(items)
+            await pipe.execute()
+
+        self.published_frames += len(buffers)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._pending.wait()
+            self._pending.clear()
+
+            # Collect more messages for the same frame unless the batch is full
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error publishing WebSocket fan-out frames: {e}")
+
+    # ==================== Receiving ====================
+
+    async def _handle_frame(self, channel: str, data: str) -> None:
+        for line in data.split("\n"):
+            item = json.loads(line)
+
+            if channel == BROADCAST_CHANNEL:
+                if item["origin"] == self.instance_id:
+                    continue
+                user_id = None
+            else:
+                user_id = item["user_id"]
+
+            self.received_messages += 1
+            try:
+                await self.deliver(user_id, item["message"])
+            except Exception as e:
+                logger.error(f"Error delivering fan-out message: {e}")
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(instance_channel(self.instance_id), BROADCAST_CHANNEL)
+                self._subscribed.set()
+
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    channel, data = message["channel"], message["data"]
+                    if isinstance(channel, bytes):
+                        channel, data = channel.decode("utf-8"), data.decode("utf-8")
+                    await self._handle_frame(channel, data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WebSocket fan-out subscription lost, resubscribing: {e}")
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+
+    # ==================== Lifecycle ====================
+
+    async def start(self, timeout: float = 5.0) -> None:
+        """Subscribe to this instance's channels and start flushing."""
+        self._listener = asyncio.create_task(self._listen())
+        self._flusher = asyncio.create_task(self._flush_loop())
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("WebSocket fan-out not subscribed yet")
+
+    async def stop(self) -> None:
+        """Flush pending frames and stop."""
+        for task in (self._flusher, self._listener):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._flusher = self._listener = None
+
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error publishing WebSocket fan-out frames: {e}")
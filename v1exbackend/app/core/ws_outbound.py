@@ -0,0 +1,181 @@
+"""Per-connection outbound queues for WebSocket sends."""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Optional, Union
+
+from fastapi import WebSocket, status
+
+logger = logging.getLogger(__name__)
+
+# What to do when a connection's queue is full
+DROP_OLDEST = "drop_oldest"  # discard the oldest queued frame, keep the connection
+DISCONNECT = "disconnect"  # close the slow connection
+OVERFLOW_POLICIES = (DROP_OLDEST, DISCONNECT)
+
+
+class ConnectionWriter:
+    """
+    Bounded outbound queue plus a writer task for one WebSocket.
+
+    Senders enqueue already-encoded frames (text or binary) without awaiting the socket, so
+    a broadcast costs one encode and N appends, and a slow client only
+    delays its own queue. Frames with the same `coalesce_key` replace each
+    other while still queued (e.g. progress updates: only the latest one
+    matters), or are combined by a `merge` function (e.g. streamed text
+    deltas). When the queue is full the overflow policy applies; drop_oldest
+    never discards a frame queued with `merge`, since that would lose part
+    of a stream, and there is at most one such frame queued per key.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_close: Callable[[], Awaitable[None]],
+        max_queue: int = 256,
+        policy: str = DROP_OLDEST,
+        send_timeout: float = 10.0,
+        on_sent: Optional[Callable[[Optional[str]], None]] = None
+    ):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+
+        self.websocket = websocket
+        self.on_close = on_close
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        # Called with the frame's coalesce_key once it is written to the socket
+        self.on_sent = on_sent
+
+        # Entries are [frame, coalesce_key, mergeable] so coalescing can replace in place
+        self._queue: deque[list] = deque()
+        self._coalesce: dict[str, list] = {}
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Referenced so the loop does not garbage-collect it mid-close
+        self._close_task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        # Metrics
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def start(self) -> None:
+        """Start the writer task (frames queued before are kept)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the writer task; queued frames are discarded."""
+        self.closed = True
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def enqueue(
+        self,
+        frame: Union[str, bytes],
+        coalesce_key: Optional[str] = None,
+        merge: Optional[Callable[[Union[str, bytes]], Union[str, bytes]]] = None
+    ) -> bool:
+        """
+        Queue a frame for sending (never blocks).
+
+        Args:
+            frame: Encoded frame
+            coalesce_key: Replace a still-queued frame with the same key
+            merge: Instead of replacing, build the frame from the queued one
+
+        Returns:
+            False if the frame was not queued (connection closed or closing)
+        """
+        if self.closed:
+            return False
+
+        if coalesce_key is not None:
+            entry = self._coalesce.get(coalesce_key)
+            if entry is not None:
+                entry[0] = frame if merge is None else merge(entry[0])
+                self.coalesced += 1
+                return True
+
+        if len(self._queue) >= self.max_queue:
+            if self.policy == DISCONNECT:
+                self.dropped += 1
+                self._close_slow_consumer()
+                return False
+
+            oldest = next((entry for entry in self._queue if not entry[2]), None)
+            if oldest is not None:
+                self._queue.remove(oldest)
+                if oldest[1] is not None:
+                    self._coalesce.pop(oldest[1], None)
+                self.dropped += 1
+
+        entry = [frame, coalesce_key, merge is not None]
+        self._queue.append(entry)
+        if coalesce_key is not None:
+            self._coalesce[coalesce_key] = entry
+        self._ready.set()
+        return True
+
+    def prepend(self, frames: list[Union[str, bytes]]) -> None:
+        """
+        Queue frames ahead of everything already queued (session replay).
+
+        Not subject to `max_queue`: replays are bounded by the replay buffer.
+        """
+        self._queue.extendleft([frame, None, False] for frame in reversed(frames))
+        if frames:
+            self._ready.set()
+
+    def _close_slow_consumer(self) -> None:
+        self.closed = True
+        self._close_task = asyncio.create_task(self._close(status.WS_1013_TRY_AGAIN_LATER))
+
+    async def _close(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+        await self.on_close()
+
+    async def _run(self) -> None:
+        while True:
+            await self._ready.wait()
+
+            while self._queue:
+                frame, coalesce_key, _ = entry = self._queue.popleft()
+                if coalesce_key is not None and self._coalesce.get(coalesce_key) is entry:
+                    del self._coalesce[coalesce_key]
+
+                try:
+                    async with asyncio.timeout(self.send_timeout):
+                        if isinstance(frame, bytes):
+                            await self.websocket.send_bytes(frame)
+                        else:
+                            await self.websocket.send_text(frame)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error sending WebSocket frame, closing connection: {e}")
+                    self.closed = True
+                    await self._close(status.WS_1011_INTERNAL_ERROR)
+                    return
+
+                self.sent += 1
+                if self.on_sent is not None:
+                    self.on_sent(coalesce_key)
+
+            self._ready.clear()
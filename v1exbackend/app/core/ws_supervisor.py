@@ -0,0 +1,213 @@
+"""Admission control and heartbeat supervision for WebSocket connections."""
+
+import asyncio
+import logging
+import math
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+
+from fastapi import status
+
+if TYPE_CHECKING:
+    from app.core.websocket import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionSupervisor:
+    """
+    Bound the connections of one process and evict the ones that went quiet.
+
+    Admission: a new connection is refused when the process already holds
+    `max_connections` sockets (1013, try again later) or the user already
+    has `max_connections_per_user` sockets (1008). `admit` checks and
+    reserves a slot without awaiting, so concurrent connects of one user on
+    this process cannot all pass the check; the per-user limit across
+    instances is enforced atomically when the connection is added to the
+    Redis index (see ConnectionManager.connect).
+
+    Heartbeats: instead of a task per socket, one timer wheel with
+    `heartbeat_interval / tick` slots. Each connection lives in a fixed slot,
+    so it is checked once per interval as the wheel turns. A connection is
+    seen alive when it sends a frame or when a ping is written to its socket;
+    clients need not answer pings (the v1 extension does not), and a dead
+    peer stops accepting them, so its writer fails or times out:
+
+    - no activity for `idle_timeout`: closed as dead
+    - no activity for one interval: sent a ping
+    - otherwise (and after a ping) its Redis TTLs are refreshed, batched in
+      one pipeline per tick, so entries of a crashed worker expire after
+      `connection_ttl` instead of lingering.
+    """
+
+    def __init__(
+        self,
+        manager: "ConnectionManager",
+        heartbeat_interval: float = 30.0,
+        idle_timeout: float = 90.0,
+        max_connections_per_user: int = 3,
+        max_connections: int = 10000,
+        tick: float = 1.0
+    ):
+        self.manager = manager
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.max_connections_per_user = max_connections_per_user
+        self.max_connections = max_connections
+        self.tick = tick
+
+        # Redis entries outlive a few missed refreshes
+        self.connection_ttl = int(heartbeat_interval * 3)
+
+        self._wheel: list[set[str]] = [set() for _ in range(max(1, math.ceil(heartbeat_interval / tick)))]
+        self._cursor = 0
+        self._slots: Dict[str, int] = {}
+        self.last_seen: Dict[str, float] = {}
+
+        # Admitted connections not registered in the manager yet
+        self._reserved: Dict[str, int] = {}
+        self._reserved_total = 0
+
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.rejected = 0
+        self.evicted = 0
+        self.pings_sent = 0
+        self.ttl_refreshes = 0
+
+    # ==================== Admission ====================
+
+    def admit(self, user_id: str) -> Optional[int]:
+        """
+        Check whether a user may open another connection on this process
+        and, if so, reserve the slot until `release`.
+
+        Synchronous on purpose: the check and the reservation happen with
+        no await in between.
+
+        Returns:
+            None if admitted, otherwise the close code to reject with
+        """
+        if len(self.manager.active_connections) + self._reserved_total >= self.max_connections:
+            self.reject(user_id, "process limit reached")
+            return status.WS_1013_TRY_AGAIN_LATER
+
+        count = self.manager.get_user_connection_count(user_id) + self._reserved.get(user_id, 0)
+        if count >= self.max_connections_per_user:
+            self.reject(user_id, f"{count} connections open")
+            return status.WS_1008_POLICY_VIOLATION
+
+        self._reserved[user_id] = self._reserved.get(user_id, 0) + 1
+        self._reserved_total += 1
+        return None
+
+    def release(self, user_id: str) -> None:
+        """Free a slot reserved by `admit` (registered or refused)."""
+        remaining = self._reserved.get(user_id, 0) - 1
+        if remaining > 0:
+            self._reserved[user_id] = remaining
+        else:
+            self._reserved.pop(user_id, None)
+        self._reserved_total = max(0, self._reserved_total - 1)
+
+    def reject(self, user_id: str, reason: str) -> None:
+        """Count and log a refused connection."""
+        self.rejected += 1
+        logger.warning(f"Rejecting WebSocket for user {user_id}: {reason}")
+
+    # ==================== Tracking ====================
+
+    def track(self, connection_id: str) -> None:
+        """Start supervising a connection (first check one interval from now)."""
+        slot = (self._cursor - 1) % len(self._wheel)
+        self._wheel[slot].add(connection_id)
+        self._slots[connection_id] = slot
+        self.last_seen[connection_id] = time.monotonic()
+
+    def untrack(self, connection_id: str) -> None:
+        """Stop supervising a connection."""
+        slot = self._slots.pop(connection_id, None)
+        if slot is not None:
+            self._wheel[slot].discard(connection_id)
+        self.last_seen.pop(connection_id, None)
+
+    def touch(self, connection_id: str) -> None:
+        """Record activity (O(1), the wheel is not touched)."""
+        if connection_id in self.last_seen:
+            self.last_seen[connection_id] = time.monotonic()
+
+    # ==================== Wheel ====================
+
+    async def advance(self) -> None:
+        """Process the current slot and move the wheel one tick."""
+        slot = self._wheel[self._cursor]
+        self._cursor = (self._cursor + 1) % len(self._wheel)
+        if not slot:
+            return
+
+        now = time.monotonic()
+        alive: list[tuple[str, str]] = []
+
+        for connection_id in list(slot):
+            idle = now - self.last_seen.get(connection_id, now)
+
+            if idle >= self.idle_timeout:
+                self.evicted += 1
+                logger.info(f"Evicting WebSocket {connection_id} (no traffic for {idle:.0f}s)")
+                await self.manager.close_connection(connection_id, status.WS_1001_GOING_AWAY)
+                continue
+
+            if idle >= self.heartbeat_interval:
+                self.pings_sent += 1
+                await self.manager.send_ping(connection_id)
+
+            user_id = self.manager.get_user_id(connection_id)
+            if user_id is not None:
+                alive.append((connection_id, user_id))
+
+        if alive:
+            try:
+                await self.manager.redis.refresh_ws_connections(
+                    alive, self.manager.instance_id, self.connection_ttl
+                )
+                self.ttl_refreshes += len(alive)
+            except Exception as e:
+                logger.error(f"Error refreshing WebSocket connection TTLs: {e}")
+
+    async def _run(self) -> None:
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.tick
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+            try:
+                await self.advance()
+            except Exception as e:
+                logger.error(f"Error supervising WebSocket connections: {e}")
+
+    # ==================== Lifecycle ====================
+
+    def start(self) -> None:
+        """Start turning the wheel."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop turning the wheel."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict[str, int]:
+        """Supervisor counters."""
+        return {
+            "supervised": len(self._slots),
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+            "pings_sent": self.pings_sent,
+            "ttl_refreshes": self.ttl_refreshes,
+        }
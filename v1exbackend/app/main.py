@@ -1,18 +1,30 @@
 """FastAPI application entry point with WebSocket support."""
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from app.core.config import settings
 from app.core.database import init_db
 from app.core.redis_client import init_redis, close_redis
+from app.core.token_blacklist import init_token_blacklist, close_token_blacklist
+from app.core.password_hasher import PasswordHasherBusy, close_password_hasher
+from app.core.websocket import connection_manager
 from app.core.rabbitmq import init_rabbitmq, close_rabbitmq
 from app.agents.checkpointer import AgentCheckpointer
+from app.services.rate_limit_audit_writer import init_audit_writer, close_audit_writer
+from app.services.rate_limit_partition_service import partition_maintenance_loop
+from app.services.parquet_event_sink import (
+    init_parquet_sink,
+    close_parquet_sink,
+    parquet_compaction_loop,
+)
+from app.services.event_outbox_relay import init_outbox_relay, close_outbox_relay
 from app.api import router as api_router
 
 # Configure logging
@@ -37,6 +49,34 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     await init_redis()
     logger.info("✓ Redis connected")
 
+    # Sync the local token blacklist filter
+    await init_token_blacklist()
+    logger.info("✓ Token blacklist filter started")
+
+    # Receive WebSocket messages routed to this worker by other workers
+    await connection_manager.start_fanout()
+    logger.info(f"✓ WebSocket fan-out started (instance {connection_manager.instance_id})")
+
+    # Heartbeats, idle eviction and connection TTL refreshes
+    connection_manager.start_supervisor()
+    logger.info("✓ WebSocket connection supervisor started")
+
+    # Start rate limit audit writer
+    await init_audit_writer()
+    logger.info("✓ Rate limit audit writer started")
+
+    # Create upcoming audit partitions and drop expired ones (hourly)
+    partition_task = asyncio.create_task(partition_maintenance_loop())
+
+    # Writes the outbox relay's batches to Parquet as part files
+    await init_parquet_sink()
+    logger.info("✓ Parquet event sink ready")
+
+    # Merge the part files of each Parquet partition
+    compaction_task = asyncio.create_task(
+        parquet_compaction_loop(settings.PARQUET_COMPACTION_INTERVAL)
+    )
+
     # Initialize RabbitMQ (optional for local development)
     try:
         await init_rabbitmq()
@@ -44,6 +84,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     except Exception as e:
         logger.warning(f"⚠ RabbitMQ not available (running without event streaming): {e}")
 
+    # Deliver committed events to Parquet and RabbitMQ
+    await init_outbox_relay()
+    logger.info("✓ Event outbox relay started")
+
     # Initialize LangGraph checkpointer
     await AgentCheckpointer.get_checkpointer()
     logger.info("✓ LangGraph checkpointer initialized")
@@ -54,12 +98,25 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
 
     # Shutdown
     logger.info("Shutting down...")
+    for task in (partition_task, compaction_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await close_audit_writer()
+    await close_outbox_relay()
+    await close_parquet_sink()
     try:
         await close_rabbitmq()
     except Exception:
         pass
     await AgentCheckpointer.close()
+    await connection_manager.stop_supervisor()
+    await connection_manager.stop_fanout()
+    await close_token_blacklist()
     await close_redis()
+    close_password_hasher()
     logger.info("✓ Cleanup completed")
 
 
@@ -89,6 +146,15 @@ app.add_middleware(
 from app.middleware.rate_limit_middleware import RateLimitMiddleware
 app.add_middleware(RateLimitMiddleware, enabled=True)
 
+# Password hashing saturated: fail fast instead of queueing more bcrypt work
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication service busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
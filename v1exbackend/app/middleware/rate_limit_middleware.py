@@ -1,26 +1,32 @@
 """
 Rate Limit Middleware - Aplica rate limiting a todos los requests.
+
+Middleware ASGI puro: no usa BaseHTTPMiddleware (que añade tasks y memory
+streams por request). Los 429 se responden directamente y los headers
+X-RateLimit-* se añaden envolviendo `send`.
 """
 
+import re
 import time
-from typing import Callable
-from fastapi import Request, Response, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from typing import Dict, Optional
+from fastapi import Request, HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.rate_limiter import get_rate_limiter, RateLimitResult
-from app.core.database import AsyncSessionLocal
 from app.services.rate_limit_audit_service import RateLimitAuditService
+from app.services.rate_limit_audit_writer import get_audit_writer
 from app.models import RateLimitAction
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+class RateLimitMiddleware:
     """
     Middleware que aplica rate limiting a todos los requests.
 
     Features:
     - Token bucket algorithm
-    - Auditoría automática
+    - Auditoría automática (encolada y escrita en lote)
     - Headers de rate limit en response
     - Detección de actividad sospechosa
     """
@@ -42,31 +48,62 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     ]
 
     def __init__(self, app: ASGIApp, enabled: bool = True):
-        super().__init__(app)
+        self.app = app
         self.enabled = enabled
+        self._path_pattern, self._path_actions = self._compile_paths()
 
-    async def dispatch(
-        self, request: Request, call_next: Callable
-    ) -> Response:
-        """Process request con rate limiting."""
+    def _compile_paths(self) -> tuple[re.Pattern, Dict[str, Optional[RateLimitAction]]]:
+        """
+        Compilar EXCLUDED_PATHS y ACTION_MAPPING en un único regex de prefijos.
+
+        Las alternativas se prueban en orden (excluidos primero, luego el
+        mapeo), igual que los startswith secuenciales; el grupo que matchea
+        indica si el path está excluido (None) o su acción.
+        """
+        alternatives = []
+        actions: Dict[str, Optional[RateLimitAction]] = {}
 
-        # Skip si está deshabilitado
-        if not self.enabled:
-            return await call_next(request)
+        prefixes = [(path, None) for path in self.EXCLUDED_PATHS]
+        prefixes += list(self.ACTION_MAPPING.items())
 
-        # Skip paths excluidos
-        if any(request.url.path.startswith(path) for path in self.EXCLUDED_PATHS):
-            return await call_next(request)
+        for index, (prefix, action) in enumerate(prefixes):
+            group = f"p{index}"
+            alternatives.append(f"(?P<{group}>{re.escape(prefix)})")
+            actions[group] = action
+
+        return re.compile("|".join(alternatives)), actions
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Process request con rate limiting."""
+
+        # Skip si está deshabilitado o no es HTTP (websocket, lifespan)
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Skip paths excluidos; el resto va a api_call si no hay mapeo
+        path = scope["path"]
+        match = self._path_pattern.match(path)
+        if match is None:
+            action = RateLimitAction.api_call
+        else:
+            action = self._path_actions[match.lastgroup]
+            if action is None:
+                await self.app(scope, receive, send)
+                return
 
         # Obtener user_id (simplificado para POC)
-        user_id = request.headers.get("X-User-ID", "anonymous")
+        user_id = "anonymous"
+        user_agent = None
+        for name, value in scope["headers"]:
+            if name == b"x-user-id":
+                user_id = value.decode("latin-1")
+            elif name == b"user-agent":
+                user_agent = value.decode("latin-1")
         if user_id == "anonymous":
             # En producción, obtener del JWT token
             user_id = "test-user-123"
 
-        # Determinar acción basada en el endpoint
-        action = self._get_action_for_path(request.url.path)
-
         # Obtener rate limiter
         rate_limiter = await get_rate_limiter()
 
@@ -80,29 +117,21 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             tokens=1
         )
 
-        # Registrar en auditoría (async en background)
-        # En producción, usar background tasks de FastAPI
-        await self._log_audit(
-            request=request,
-            user_id=user_id,
-            action=action,
-            result=result,
-            start_time=start_time
-        )
-
-        # Si está bloqueado, retornar 429
+        # Si está bloqueado, retornar 429 directamente
         if not result.allowed:
             retry_after = int(result.retry_after_seconds or 60)
 
-            raise HTTPException(
+            response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail={
-                    "error": "Rate limit exceeded",
-                    "message": f"Too many requests. Please try again in {retry_after} seconds.",
-                    "retry_after": retry_after,
-                    "limit": result.max_requests,
-                    "window": result.window_seconds,
-                    "current_count": result.current_count
+                content={
+                    "detail": {
+                        "error": "Rate limit exceeded",
+                        "message": f"Too many requests. Please try again in {retry_after} seconds.",
+                        "retry_after": retry_after,
+                        "limit": result.max_requests,
+                        "window": result.window_seconds,
+                        "current_count": result.current_count
+                    }
                 },
                 headers={
                     "Retry-After": str(retry_after),
@@ -111,56 +140,84 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                     "X-RateLimit-Reset": str(int(time.time() + retry_after))
                 }
             )
-
-        # Procesar request
-        response = await call_next(request)
+            await response(scope, receive, send)
+
+            self._log_audit(
+                scope=scope,
+                user_id=user_id,
+                user_agent=user_agent,
+                action=action,
+                result=result,
+                start_time=start_time,
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            return
 
         # Añadir headers de rate limit a la response
-        response.headers["X-RateLimit-Limit"] = str(result.max_requests)
-        response.headers["X-RateLimit-Remaining"] = str(result.tokens_available)
-        response.headers["X-RateLimit-Reset"] = str(
-            int(time.time() + result.window_seconds)
-        )
-
-        return response
-
-    def _get_action_for_path(self, path: str) -> RateLimitAction:
-        """Determinar acción basada en el path."""
-        for pattern, action in self.ACTION_MAPPING.items():
-            if path.startswith(pattern):
-                return action
-        return RateLimitAction.api_call
+        rate_limit_headers = [
+            (b"x-ratelimit-limit", str(result.max_requests).encode()),
+            (b"x-ratelimit-remaining", str(result.tokens_available).encode()),
+        ]
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        async def send_with_headers(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    *rate_limit_headers,
+                    (b"x-ratelimit-reset", str(int(time.time() + result.window_seconds)).encode()),
+                ]
+            await send(message)
+
+        # Procesar request y registrar en auditoría (se encola, la escritura es en lote)
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            self._log_audit(
+                scope=scope,
+                user_id=user_id,
+                user_agent=user_agent,
+                action=action,
+                result=result,
+                start_time=start_time,
+                status_code=status_code
+            )
 
-    async def _log_audit(
+    def _log_audit(
         self,
-        request: Request,
+        scope: Scope,
         user_id: str,
+        user_agent: Optional[str],
         action: RateLimitAction,
         result: RateLimitResult,
-        start_time: float
+        start_time: float,
+        status_code: int
     ) -> None:
-        """Registrar en auditoría (background)."""
+        """Encolar el registro de auditoría para el writer en background."""
         try:
-            async with AsyncSessionLocal() as db:
-                audit_service = RateLimitAuditService(db)
-
-                response_time_ms = (time.time() - start_time) * 1000
-
-                await audit_service.log_request(
-                    user_id=user_id,
-                    endpoint=str(request.url.path),
-                    method=request.method,
-                    action=action,
-                    rate_limit_result=result,
-                    response_time_ms=response_time_ms,
-                    http_status_code=200 if result.allowed else 429,
-                    ip_address=request.client.host if request.client else None,
-                    user_agent=request.headers.get("user-agent"),
-                    metadata={
-                        "query_params": dict(request.query_params),
-                        "path_params": dict(request.path_params) if hasattr(request, 'path_params') else {}
-                    }
-                )
+            writer = get_audit_writer()
+            if writer is None:
+                return
+
+            client = scope.get("client")
+            writer.submit(RateLimitAuditService.build_record(
+                user_id=user_id,
+                endpoint=scope["path"],
+                method=scope["method"],
+                action=action,
+                rate_limit_result=result,
+                response_time_ms=(time.time() - start_time) * 1000,
+                http_status_code=status_code,
+                ip_address=client[0] if client else None,
+                user_agent=user_agent,
+                metadata={
+                    "query_params": dict(QueryParams(scope.get("query_string", b""))),
+                    # El router rellena path_params en el scope al resolver la ruta
+                    "path_params": dict(scope.get("path_params", {}))
+                }
+            ))
         except Exception as e:
             # No fallar el request si falla la auditoría
             print(f"Error logging rate limit audit: {e}")
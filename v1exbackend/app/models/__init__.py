@@ -7,9 +7,11 @@ from app.models.course import Course, CourseStatus
 from app.models.goal import Goal, GoalStatus, GoalPriority
 from app.models.task import Task, TaskStatus, TaskType
 from app.models.event import Event, EventType
+from app.models.event_outbox import EventOutbox
 from app.models.embedding import Embedding
 from app.models.code_snapshot import CodeSnapshot
 from app.models.rate_limit_audit import RateLimitAudit, RateLimitAction, RateLimitStatus
+from app.models.rate_limit_rollup import RateLimitRollupMinute, RateLimitRollupHour
 
 __all__ = [
     "User",
@@ -23,9 +25,12 @@ __all__ = [
     "TaskType",
     "Event",
     "EventType",
+    "EventOutbox",
     "Embedding",
     "CodeSnapshot",
     "RateLimitAudit",
     "RateLimitAction",
     "RateLimitStatus",
+    "RateLimitRollupMinute",
+    "RateLimitRollupHour",
 ]
@@ -0,0 +1,65 @@
+"""
+Event Outbox - Eventos pendientes de entregar a Parquet y RabbitMQ.
+
+Se inserta en la misma transacción que el evento (transactional outbox):
+si el commit falla no queda nada por entregar, y si el proceso cae después
+del commit el relay lo entrega igualmente. La fila se borra cuando las dos
+entregas se han completado.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, String, DateTime, Integer, Text, ForeignKey, JSON, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class EventOutbox(Base):
+    """
+    Entrega pendiente de un evento.
+
+    Atributos:
+        id: Secuencia (orden de entrega)
+        event_id: Evento a entregar
+        message: Mensaje del evento tal como se publica en RabbitMQ
+        routing_key: Routing key del mensaje
+        attempts: Intentos de entrega fallidos
+        next_attempt_at: No se reintenta antes de este momento (backoff)
+        parquet_written_at: Cuándo se escribió en Parquet (None = pendiente)
+        published_at: Cuándo lo confirmó RabbitMQ (None = pendiente)
+        last_error: Último error de entrega
+    """
+
+    __tablename__ = "event_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    event_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("events.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True
+    )
+
+    message: Mapped[dict] = mapped_column(JSON, nullable=False)
+    routing_key: Mapped[str] = mapped_column(String(255), nullable=False)
+
+    # Reintentos
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # Entrega por destino: un reintento sólo repite lo que falló
+    parquet_written_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    published_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # El relay reclama las filas vencidas en orden
+        Index("idx_event_outbox_next_attempt", "next_attempt_at", "id"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<EventOutbox(id={self.id}, event_id={self.event_id}, attempts={self.attempts})>"
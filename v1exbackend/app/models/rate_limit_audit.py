@@ -113,11 +113,11 @@ class RateLimitAudit(Base):
     # Additional metadata
     audit_metadata: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict, nullable=False)
 
-    # Timestamps
+    # Timestamps (clave de partición por día, forma parte del PK)
     timestamp: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow,
-        nullable=False,
+        primary_key=True,
         index=True
     )
 
@@ -0,0 +1,90 @@
+"""
+Rate Limit Audit Rollups - Agregados por minuto y por hora de la auditoría.
+
+Se mantienen incrementalmente al escribir cada lote de auditoría
+(INSERT ... ON CONFLICT DO UPDATE sumando contadores), así los dashboards
+leen O(buckets) filas en lugar de O(requests).
+"""
+
+from datetime import datetime
+
+from sqlalchemy import String, Integer, BigInteger, Float, DateTime, Enum as SQLEnum
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+from app.models.rate_limit_audit import RateLimitAction
+
+# Límites superiores (ms) del histograma de tiempos de respuesta; el último
+# bucket (rt_gt_2500ms) recoge el resto
+RESPONSE_TIME_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500)
+
+RESPONSE_TIME_HISTOGRAM_COLUMNS = tuple(
+    [f"rt_le_{bound}ms" for bound in RESPONSE_TIME_BUCKETS_MS]
+    + [f"rt_gt_{RESPONSE_TIME_BUCKETS_MS[-1]}ms"]
+)
+
+# Columnas que se suman al hacer upsert y al agregar un rango de buckets
+ROLLUP_COUNTER_COLUMNS = (
+    "request_count",
+    "allowed_count",
+    "blocked_count",
+    "alert_count",
+    "openai_tokens",
+    "cost_cents",
+    "response_time_sum_ms",
+    "response_time_count",
+) + RESPONSE_TIME_HISTOGRAM_COLUMNS
+
+
+class RateLimitRollupMixin:
+    """Columnas comunes de los rollups: clave (user, action, bucket) y contadores."""
+
+    user_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    action: Mapped[RateLimitAction] = mapped_column(SQLEnum(RateLimitAction), primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True, index=True)
+
+    # Requests
+    request_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    allowed_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    blocked_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    alert_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    # OpenAI
+    openai_tokens: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    cost_cents: Mapped[float] = mapped_column(Float, default=0, nullable=False)
+
+    # Tiempos de respuesta (sólo > 0 ms, como el promedio de las estadísticas)
+    response_time_sum_ms: Mapped[float] = mapped_column(Float, default=0, nullable=False)
+    response_time_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rt_le_10ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rt_le_50ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rt_le_100ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rt_le_250ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rt_le_500ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rt_le_1000ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rt_le_2500ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rt_gt_2500ms: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class RateLimitRollupMinute(RateLimitRollupMixin, Base):
+    """Rollup por minuto (bucket_start truncado al minuto)."""
+
+    __tablename__ = "rate_limit_audit_rollups_minute"
+
+    def __repr__(self) -> str:
+        return (
+            f"<RateLimitRollupMinute(user_id={self.user_id}, action={self.action.value}, "
+            f"bucket_start={self.bucket_start}, requests={self.request_count})>"
+        )
+
+
+class RateLimitRollupHour(RateLimitRollupMixin, Base):
+    """Rollup por hora (bucket_start truncado a la hora)."""
+
+    __tablename__ = "rate_limit_audit_rollups_hour"
+
+    def __repr__(self) -> str:
+        return (
+            f"<RateLimitRollupHour(user_id={self.user_id}, action={self.action.value}, "
+            f"bucket_start={self.bucket_start}, requests={self.request_count})>"
+        )
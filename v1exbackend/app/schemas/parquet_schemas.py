@@ -11,9 +11,12 @@ Estructura de directorios:
 backend/data/storage/events/
 ├── 2024/
 │   ├── 01/
-│   │   ├── user_events_2024-01-15.parquet
-│   │   ├── goal_events_2024-01-15.parquet
-│   │   └── task_events_2024-01-15.parquet
+│   │   ├── user_events_2024-01-15/
+│   │   │   ├── part-00000.parquet      # partes ya compactadas
+│   │   │   ├── part-00001.parquet
+│   │   │   └── part-00002.parquet
+│   │   ├── goal_events_2024-01-15/
+│   │   └── task_events_2024-01-15/
 │   └── 02/
 │       └── ...
 └── ...
@@ -319,6 +322,30 @@ def get_parquet_path(event_type: str, timestamp: datetime, base_path: str = "./d
     return f"{base_path}/{year}/{month}/{category}_events_{date_str}.parquet"
 
 
+def get_parquet_partition_dir(event_type: str, timestamp: datetime, base_path: str = "./data/storage/events") -> str:
+    """
+    Generar el directorio de partes Parquet de una categoría y un día.
+
+    Cada flush del sink escribe un archivo part-{n}.parquet nuevo en este
+    directorio; la compactación los une en part-00000.parquet.
+
+    Args:
+        event_type: Tipo de evento (o sólo su categoría: user, goal, ...)
+        timestamp: Timestamp (o fecha) del evento
+        base_path: Path base de almacenamiento
+
+    Returns:
+        Path del directorio de la partición
+
+    Example:
+        ./data/storage/events/2024/01/goal_events_2024-01-15
+    """
+    category = event_type.split(".")[0]
+    date_str = timestamp.strftime("%Y-%m-%d")
+
+    return f"{base_path}/{timestamp.year}/{timestamp.month:02d}/{category}_events_{date_str}"
+
+
 # ==================== EJEMPLO DE USO ====================
 
 """
@@ -0,0 +1,246 @@
+"""
+Event Analytics Service - Consultas analíticas sobre el lago Parquet.
+
+Responde preguntas de rango de tiempo y agregados (eventos por tipo y día,
+actividad de un usuario, usuarios más activos) leyendo los archivos Parquet
+que escribe el sink, sin tocar PostgreSQL.
+
+El lago no usa particiones hive (year=2024/...): la fecha y la categoría
+están en la ruta {base}/{yyyy}/{mm}/{categoria}_events_{fecha}/. La poda de
+particiones se hace sobre esa estructura: sólo se listan los directorios
+del rango de fechas y de las categorías pedidas. Sobre esas partes se
+construye un pyarrow.dataset y el filtro (created_at, event_type, user_id)
+y la proyección de columnas se empujan al lector Parquet, que descarta
+row groups por sus estadísticas y sólo decodifica las columnas usadas.
+
+Las partes todavía sin compactar pueden repetir un evento (entrega
+at-least-once del outbox), así que los conteos son de event_id distintos.
+"""
+
+import asyncio
+import re
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from app.core.config import settings
+
+PARTITION_DIR_PATTERN = re.compile(r"^(?P<category>[a-z_]+)_events_(?P<date>\d{4}-\d{2}-\d{2})$")
+
+# Columnas comunes a los schemas de todas las categorías: las demás se ignoran
+ANALYTICS_SCHEMA = pa.schema([
+    pa.field("event_id", pa.string()),
+    pa.field("user_id", pa.string()),
+    pa.field("event_type", pa.string()),
+    pa.field("created_at", pa.timestamp("us")),
+    pa.field("year", pa.int32()),
+    pa.field("month", pa.int32()),
+    pa.field("day", pa.int32()),
+])
+
+ACTIVITY_BUCKETS = ("hour", "day", "week")
+
+
+def _to_naive_utc(value: datetime) -> datetime:
+    # created_at se guarda como timestamp sin zona horaria, en UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def partition_files(
+    base_path: str,
+    start: date,
+    end: date,
+    categories: Optional[Sequence[str]] = None
+) -> List[str]:
+    """
+    Listar las partes Parquet de las particiones entre dos fechas.
+
+    Args:
+        base_path: Path base del lago
+        start: Primer día (incluido)
+        end: Último día (incluido)
+        categories: Categorías (user, goal, ...) o None para todas
+
+    Returns:
+        Paths de los archivos part-*.parquet
+    """
+    files = []
+    for month_dir in sorted(Path(base_path).glob("[0-9][0-9][0-9][0-9]/[0-9][0-9]")):
+        month = (int(month_dir.parent.name), int(month_dir.name))
+        if month < (start.year, start.month) or month > (end.year, end.month):
+            continue
+
+        for directory in sorted(month_dir.iterdir()):
+            match = PARTITION_DIR_PATTERN.match(directory.name)
+            if match is None:
+                continue
+            if categories is not None and match["category"] not in categories:
+                continue
+            if not start <= date.fromisoformat(match["date"]) <= end:
+                continue
+            files.extend(str(part) for part in sorted(directory.glob("part-*.parquet")))
+    return files
+
+
+class EventAnalyticsService:
+    """Consultas agregadas sobre los eventos en Parquet."""
+
+    def __init__(self, base_path: Optional[str] = None):
+        self.base_path = base_path or settings.PARQUET_EVENTS_PATH
+
+    # ==================== Scan ====================
+
+    def scan(
+        self,
+        start: datetime,
+        end: datetime,
+        columns: List[str],
+        event_types: Optional[Sequence[str]] = None,
+        user_id: Optional[str] = None,
+        require_user: bool = False
+    ) -> pa.Table:
+        """
+        Leer las columnas pedidas de los eventos en [start, end).
+
+        Returns:
+            Tabla con `columns` de los eventos que cumplen los filtros
+        """
+        start, end = _to_naive_utc(start), _to_naive_utc(end)
+        categories = sorted({t.split(".")[0] for t in event_types}) if event_types else None
+
+        expression = (
+            (ds.field("created_at") >= pa.scalar(start, type=pa.timestamp("us")))
+            & (ds.field("created_at") < pa.scalar(end, type=pa.timestamp("us")))
+        )
+        if event_types:
+            expression &= ds.field("event_type").isin(list(event_types))
+        if user_id is not None:
+            expression &= ds.field("user_id") == user_id
+        elif require_user:
+            expression &= ds.field("user_id").is_valid()
+
+        for attempt in range(2):
+            files = partition_files(self.base_path, start.date(), end.date(), categories)
+            if not files:
+                break
+            try:
+                dataset = ds.dataset(files, schema=ANALYTICS_SCHEMA, format="parquet")
+                return dataset.to_table(columns=columns, filter=expression)
+            except FileNotFoundError:
+                # La compactación borró una parte entre el listado y la lectura
+                if attempt:
+                    raise
+
+        return ANALYTICS_SCHEMA.empty_table().select(columns)
+
+    # ==================== Queries ====================
+
+    def _counts_by_type_per_day(
+        self,
+        start: datetime,
+        end: datetime,
+        event_types: Optional[Sequence[str]],
+        user_id: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        table = self.scan(start, end, ["event_id", "event_type", "year", "month", "day"], event_types, user_id)
+        grouped = table.group_by(["year", "month", "day", "event_type"]).aggregate(
+            [("event_id", "count_distinct")]
+        )
+        rows = sorted(
+            grouped.to_pylist(),
+            key=lambda row: (row["year"], row["month"], row["day"], row["event_type"])
+        )
+        return [
+            {
+                "date": f"{row['year']:04d}-{row['month']:02d}-{row['day']:02d}",
+                "event_type": row["event_type"],
+                "count": row["event_id_count_distinct"],
+            }
+            for row in rows
+        ]
+
+    async def counts_by_type_per_day(
+        self,
+        start: datetime,
+        end: datetime,
+        event_types: Optional[Sequence[str]] = None,
+        user_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Número de eventos por día y tipo.
+
+        Returns:
+            [{"date": "2024-01-15", "event_type": "goal.created", "count": 12}, ...]
+            ordenado por fecha y tipo
+        """
+        return await asyncio.to_thread(self._counts_by_type_per_day, start, end, event_types, user_id)
+
+    def _user_activity(
+        self,
+        user_id: str,
+        start: datetime,
+        end: datetime,
+        bucket: str,
+        event_types: Optional[Sequence[str]]
+    ) -> List[Dict[str, Any]]:
+        table = self.scan(start, end, ["event_id", "created_at"], event_types, user_id)
+        buckets = pa.table({
+            "bucket": pc.floor_temporal(table["created_at"], unit=bucket),
+            "event_id": table["event_id"],
+        })
+        grouped = buckets.group_by("bucket").aggregate([("event_id", "count_distinct")]).sort_by("bucket")
+        return [
+            {"bucket": row["bucket"].isoformat(), "count": row["event_id_count_distinct"]}
+            for row in grouped.to_pylist()
+        ]
+
+    async def user_activity(
+        self,
+        user_id: str,
+        start: datetime,
+        end: datetime,
+        bucket: str = "day",
+        event_types: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Histograma de actividad de un usuario: eventos por hora, día o semana.
+
+        Los intervalos sin eventos no aparecen.
+
+        Raises:
+            ValueError: bucket no está en ACTIVITY_BUCKETS
+        """
+        if bucket not in ACTIVITY_BUCKETS:
+            raise ValueError(f"Invalid bucket: {bucket}")
+        return await asyncio.to_thread(self._user_activity, user_id, start, end, bucket, event_types)
+
+    def _top_users(
+        self,
+        start: datetime,
+        end: datetime,
+        limit: int,
+        event_types: Optional[Sequence[str]]
+    ) -> List[Dict[str, Any]]:
+        table = self.scan(start, end, ["event_id", "user_id"], event_types, require_user=True)
+        grouped = table.group_by("user_id").aggregate([("event_id", "count_distinct")])
+        grouped = grouped.sort_by([("event_id_count_distinct", "descending"), ("user_id", "ascending")])
+        return [
+            {"user_id": row["user_id"], "count": row["event_id_count_distinct"]}
+            for row in grouped.slice(0, limit).to_pylist()
+        ]
+
+    async def top_users(
+        self,
+        start: datetime,
+        end: datetime,
+        limit: int = 20,
+        event_types: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Usuarios con más eventos en el rango, de más a menos."""
+        return await asyncio.to_thread(self._top_users, start, end, limit, event_types)
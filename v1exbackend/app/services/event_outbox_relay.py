@@ -0,0 +1,342 @@
+"""
+Event Outbox Relay - Entrega en background de los eventos del outbox.
+
+EventService.create_event sólo hace un commit (evento + fila de outbox).
+Este relay reclama lotes de filas vencidas con SELECT ... FOR UPDATE SKIP
+LOCKED, así que varios workers pueden drenar el outbox a la vez sin
+repartirse la misma fila, y entrega cada lote:
+
+1. RabbitMQ: en cuanto se reclama la fila, el lote entero por el
+   publisher compartido, esperando las confirmaciones del broker juntas
+2. Parquet: al cerrar la ventana de parquet_window segundos en la que se
+   creó el evento (ParquetEventSink.write, una parte por partición y
+   lote). Hasta entonces la fila espera en el outbox con next_attempt_at
+   en el fin de la ventana; como todas las filas de una ventana vencen a
+   la vez, se escriben juntas y no queda un archivo por evento.
+
+Cada destino se marca por separado: un reintento sólo repite lo que falló,
+con backoff exponencial. La entrega es at-least-once e idempotente para
+quien lee: el mensaje de RabbitMQ lleva message_id = event_id y la
+compactación de Parquet descarta event_id repetidos.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.rabbitmq import get_publisher
+from app.core.rabbitmq_publisher import OutgoingMessage
+from app.models import EventOutbox
+from app.services.parquet_event_sink import get_parquet_sink
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+PublishBatch = Callable[[List[EventOutbox]], Awaitable[List[Optional[BaseException]]]]
+
+
+async def _publish_to_rabbitmq(rows: List[EventOutbox]) -> List[Optional[BaseException]]:
+    """Publicar los mensajes del lote con el publisher compartido (confirms en lote)."""
+    try:
+        publisher = get_publisher()
+    except RuntimeError as e:
+        return [e] * len(rows)
+
+    return await publisher.publish_batch([
+        OutgoingMessage(
+            # El mismo exchange del que leen EventPublisher y EventConsumer
+            exchange=settings.RABBITMQ_EXCHANGE,
+            routing_key=row.routing_key,
+            body=json.dumps(row.message).encode(),
+            # Los consumidores deduplican por message_id
+            message_id=row.event_id,
+        )
+        for row in rows
+    ])
+
+
+def parquet_record(message: Dict[str, Any]) -> Dict[str, Any]:
+    """Fila Parquet de un mensaje de evento (campos comunes + event_data)."""
+    created_at = datetime.fromisoformat(message["timestamp"])
+    return {
+        # Primero event_data: no puede pisar los campos comunes
+        **message["event_data"],
+        "event_id": message["event_id"],
+        "user_id": message["user_id"],
+        "entity_type": message["entity_type"],
+        "entity_id": message["entity_id"],
+        "event_type": message["event_type"],
+        "payload": json.dumps(message["event_data"]),
+        "metadata": json.dumps(message["metadata"]) if message.get("metadata") else None,
+        "created_at": created_at,
+        "year": created_at.year,
+        "month": created_at.month,
+        "day": created_at.day,
+    }
+
+
+class EventOutboxRelay:
+    """
+    Worker que drena el outbox por lotes.
+
+    Cuando un lote sale lleno se sigue drenando sin esperar; si no, se
+    duerme poll_interval segundos o hasta notify() (create_event avisa tras
+    su commit, así que en el mismo proceso la entrega no espera al poll).
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+        retry_base_delay: float = 1.0,
+        retry_max_delay: float = 300.0,
+        parquet_window: float = 30.0,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        publish_batch: Optional[PublishBatch] = None
+    ):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.parquet_window = parquet_window
+        self._session_factory = session_factory
+        self._publish_batch = publish_batch or _publish_to_rabbitmq
+
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # Métricas
+        self.delivered = 0
+        self.parquet_written = 0
+        self.published = 0
+        self.retries = 0
+        self.parquet_deferred = 0
+        self.batches = 0
+        self.last_batch_ms = 0.0
+        self.last_lag_ms = 0.0
+
+    def notify(self) -> None:
+        """Avisar de que hay filas nuevas en el outbox."""
+        self._wakeup.set()
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff exponencial (segundos) tras `attempts` intentos fallidos."""
+        return min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+
+    def parquet_due_at(self, row: EventOutbox) -> datetime:
+        """Fin de la ventana de parquet_window segundos en la que se creó el evento."""
+        if self.parquet_window <= 0:
+            return row.created_at
+        elapsed = (row.created_at - _EPOCH).total_seconds()
+        windows = int(elapsed // self.parquet_window) + 1
+        return _EPOCH + timedelta(seconds=windows * self.parquet_window)
+
+    async def deliver(self, rows: List[EventOutbox], now: datetime) -> List[EventOutbox]:
+        """
+        Entregar un lote a Parquet y RabbitMQ.
+
+        Marca en cada fila lo entregado y, si algo falló, programa el
+        reintento. Las filas cuya ventana de Parquet sigue abierta sólo se
+        publican y quedan programadas para el cierre de la ventana. No toca
+        la base de datos.
+
+        Returns:
+            Filas completamente entregadas (a borrar)
+        """
+        errors: Dict[int, str] = {}
+
+        pending_parquet = [
+            row for row in rows
+            if row.parquet_written_at is None and self.parquet_due_at(row) <= now
+        ]
+        if pending_parquet:
+            sink = get_parquet_sink()
+            if sink is None:
+                for row in pending_parquet:
+                    errors[row.id] = "Parquet sink not running"
+            else:
+                done = await sink.write([
+                    (row.message["event_type"], datetime.fromisoformat(row.message["timestamp"]),
+                     parquet_record(row.message))
+                    for row in pending_parquet
+                ])
+                for row in pending_parquet:
+                    if row.event_id in done:
+                        row.parquet_written_at = now
+                        self.parquet_written += 1
+                    else:
+                        errors[row.id] = "Parquet write failed"
+
+        pending_publish = [row for row in rows if row.published_at is None]
+        if pending_publish:
+            results = await self._publish_batch(pending_publish)
+            for row, error in zip(pending_publish, results):
+                if error is not None:
+                    errors[row.id] = f"RabbitMQ publish failed: {error}"
+                else:
+                    row.published_at = now
+                    self.published += 1
+
+        delivered = []
+        for row in rows:
+            error = errors.get(row.id)
+            if error is None:
+                if row.parquet_written_at is None:
+                    # Publicada; vuelve cuando cierre su ventana de Parquet
+                    row.next_attempt_at = self.parquet_due_at(row)
+                    self.parquet_deferred += 1
+                else:
+                    delivered.append(row)
+                continue
+
+            row.attempts += 1
+            row.last_error = error
+            row.next_attempt_at = now + timedelta(seconds=self.retry_delay(row.attempts))
+            self.retries += 1
+
+        if errors:
+            # Un solo log por lote: con RabbitMQ caído fallan todas las filas
+            logger.warning(
+                f"Event outbox: {len(errors)}/{len(rows)} deliveries failed, "
+                f"will retry: {next(iter(errors.values()))}"
+            )
+
+        self.delivered += len(delivered)
+        return delivered
+
+    async def drain_batch(self) -> int:
+        """
+        Reclamar, entregar y cerrar un lote de filas vencidas.
+
+        Returns:
+            Número de filas procesadas (entregadas o reprogramadas)
+        """
+        start = time.perf_counter()
+
+        async with self._session_factory() as db:
+            now = datetime.utcnow()
+            result = await db.execute(
+                select(EventOutbox)
+                .where(EventOutbox.next_attempt_at <= now)
+                .order_by(EventOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = list(result.scalars().all())
+            if not rows:
+                await db.rollback()
+                return 0
+
+            delivered = await self.deliver(rows, now)
+            if delivered:
+                await db.execute(
+                    delete(EventOutbox).where(EventOutbox.id.in_([row.id for row in delivered]))
+                )
+            # Las filas con reintento guardan su estado al hacer commit
+            await db.commit()
+
+        self.batches += 1
+        self.last_batch_ms = (time.perf_counter() - start) * 1000
+        self.last_lag_ms = (now - min(row.created_at for row in rows)).total_seconds() * 1000
+        return len(rows)
+
+    def start(self) -> None:
+        """Arrancar el worker."""
+        if self._task is None:
+            self._closed = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Detener el worker al terminar el lote en curso.
+
+        Lo que quede en el outbox lo entrega el siguiente arranque (u otro worker).
+        """
+        self._closed = True
+        self._wakeup.set()
+        if self._task is None:
+            return
+
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Event outbox relay did not stop in {timeout}s")
+        finally:
+            self._task = None
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas del relay."""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "delivered": self.delivered,
+            "parquet_written": self.parquet_written,
+            "published": self.published,
+            "retries": self.retries,
+            "parquet_deferred": self.parquet_deferred,
+            "batches": self.batches,
+            "last_batch_ms": round(self.last_batch_ms, 2),
+            "last_lag_ms": round(self.last_lag_ms, 2),
+        }
+
+    async def _run(self) -> None:
+        """Loop del worker: drenar mientras salgan lotes llenos, luego esperar."""
+        while not self._closed:
+            self._wakeup.clear()
+            try:
+                processed = await self.drain_batch()
+            except Exception as e:
+                logger.error(f"Error draining event outbox: {e}")
+                processed = 0
+
+            if processed >= self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Global relay instance
+_outbox_relay: Optional[EventOutboxRelay] = None
+
+
+async def init_outbox_relay() -> EventOutboxRelay:
+    """Crear y arrancar el relay global."""
+    global _outbox_relay
+
+    if _outbox_relay is None:
+        _outbox_relay = EventOutboxRelay(
+            batch_size=settings.OUTBOX_BATCH_SIZE,
+            poll_interval=settings.OUTBOX_POLL_INTERVAL,
+            retry_base_delay=settings.OUTBOX_RETRY_BASE_DELAY,
+            retry_max_delay=settings.OUTBOX_RETRY_MAX_DELAY,
+            parquet_window=settings.OUTBOX_PARQUET_WINDOW
+        )
+        _outbox_relay.start()
+
+    return _outbox_relay
+
+
+async def close_outbox_relay() -> None:
+    """Detener el relay global."""
+    global _outbox_relay
+
+    if _outbox_relay is not None:
+        await _outbox_relay.stop()
+        _outbox_relay = None
+
+
+def get_outbox_relay() -> Optional[EventOutboxRelay]:
+    """Relay global, o None si no se ha inicializado."""
+    return _outbox_relay
@@ -5,32 +5,35 @@ Este servicio maneja la persistencia triple:
 1. PostgreSQL (base de datos relacional)
 2. Parquet (archivos particionados por fecha)
 3. RabbitMQ (publicación de eventos)
+
+Sólo PostgreSQL se escribe en el request: el evento y su fila de outbox se
+guardan en el mismo commit y EventOutboxRelay entrega Parquet y RabbitMQ
+en background.
 """
 
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import uuid
-import os
-import json
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-import pyarrow as pa
-import pyarrow.parquet as pq
-import aio_pika
-
-from app.models import Event, EventType
-from app.schemas.parquet_schemas import (
-    BaseEvent,
-    UserEvent,
-    GoalEvent,
-    TaskEvent,
-    CodeEvent,
-    AIEvent,
-    get_schema_for_event_type,
-    get_parquet_path
-)
-from app.core.config import settings
+
+from app.models import Event, EventOutbox, EventType
+from app.services.event_outbox_relay import get_outbox_relay
+
+
+def build_event_message(event: Event) -> Dict[str, Any]:
+    """Mensaje de un evento tal como se publica (y se guarda en el outbox)."""
+    return {
+        "event_id": event.id,
+        "user_id": event.user_id,
+        "event_type": event.event_type.value,
+        "entity_type": event.entity_type,
+        "entity_id": event.entity_id,
+        "event_data": event.payload,
+        "metadata": event.event_metadata,
+        "timestamp": event.created_at.isoformat()
+    }
 
 
 class EventService:
@@ -38,18 +41,6 @@ class EventService:
 
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.rabbitmq_connection = None
-        self.rabbitmq_channel = None
-
-    async def _get_rabbitmq_channel(self):
-        """Get or create RabbitMQ channel."""
-        if not self.rabbitmq_channel:
-            self.rabbitmq_connection = await aio_pika.connect_robust(
-                settings.RABBITMQ_URL
-            )
-            self.rabbitmq_channel = await self.rabbitmq_connection.channel()
-
-        return self.rabbitmq_channel
 
     async def create_event(
         self,
@@ -61,10 +52,11 @@ class EventService:
         metadata: Optional[Dict[str, Any]] = None
     ) -> Event:
         """
-        Create event with triple persistence:
-        1. Save to PostgreSQL
-        2. Append to Parquet file
-        3. Publish to RabbitMQ
+        Create event with triple persistence.
+
+        The event and its outbox row are committed together; Parquet and
+        RabbitMQ are delivered afterwards by the outbox relay, so the
+        request only waits for this one commit.
 
         Args:
             user_id: User ID
@@ -77,30 +69,31 @@ class EventService:
         Returns:
             Created event
         """
-        event_id = str(uuid.uuid4())
-        timestamp = datetime.utcnow()
-
-        # 1. Save to PostgreSQL
         event = Event(
-            id=event_id,
+            id=str(uuid.uuid4()),
             user_id=user_id,
             event_type=event_type,
             entity_type=entity_type,
             entity_id=entity_id,
-            event_data=event_data,
-            metadata=metadata or {},
-            timestamp=timestamp
+            payload=event_data,
+            event_metadata=metadata or {},
+            created_at=datetime.utcnow()
         )
 
-        self.db.add(event)
-        await self.db.commit()
-        await self.db.refresh(event)
+        # Routing key: event_type.entity_type
+        outbox = EventOutbox(
+            event_id=event.id,
+            message=build_event_message(event),
+            routing_key=f"{event_type.value}.{entity_type}"
+        )
 
-        # 2. Save to Parquet (async in background would be better)
-        await self._save_to_parquet(event)
+        self.db.add_all([event, outbox])
+        await self.db.commit()
 
-        # 3. Publish to RabbitMQ
-        await self._publish_to_rabbitmq(event)
+        # Entregar ya si el relay corre en este proceso (si no, lo recoge el poll)
+        relay = get_outbox_relay()
+        if relay is not None:
+            relay.notify()
 
         return event
 
@@ -168,102 +161,6 @@ class EventService:
         result = await self.db.execute(query)
         return list(result.scalars().all())
 
-    async def _save_to_parquet(self, event: Event) -> None:
-        """
-        Save event to Parquet file.
-
-        Files are partitioned by year/month/day.
-        """
-        # Get Parquet path for this event
-        parquet_path = get_parquet_path(
-            event_type=event.event_type.value,
-            timestamp=event.timestamp
-        )
-
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
-
-        # Get schema for this event type
-        schema = get_schema_for_event_type(event.event_type.value)
-
-        # Build record based on event type
-        record = {
-            "event_id": event.id,
-            "user_id": event.user_id,
-            "entity_id": event.entity_id,
-            "timestamp": event.timestamp.isoformat(),
-            "year": event.timestamp.year,
-            "month": event.timestamp.month,
-            "day": event.timestamp.day,
-            **event.event_data  # Unpack event data
-        }
-
-        # Create PyArrow table
-        table = pa.Table.from_pylist([record], schema=schema)
-
-        # Append to Parquet file (or create if doesn't exist)
-        if os.path.exists(parquet_path):
-            # Append to existing file
-            existing_table = pq.read_table(parquet_path)
-            combined_table = pa.concat_tables([existing_table, table])
-            pq.write_table(combined_table, parquet_path)
-        else:
-            # Create new file
-            pq.write_table(table, parquet_path)
-
-    async def _publish_to_rabbitmq(self, event: Event) -> None:
-        """
-        Publish event to RabbitMQ.
-
-        Exchange: events
-        Routing key: {event_type}.{entity_type}
-        """
-        try:
-            channel = await self._get_rabbitmq_channel()
-
-            # Declare exchange
-            exchange = await channel.declare_exchange(
-                "events",
-                aio_pika.ExchangeType.TOPIC,
-                durable=True
-            )
-
-            # Build message
-            message_body = {
-                "event_id": event.id,
-                "user_id": event.user_id,
-                "event_type": event.event_type.value,
-                "entity_type": event.entity_type,
-                "entity_id": event.entity_id,
-                "event_data": event.event_data,
-                "metadata": event.metadata,
-                "timestamp": event.timestamp.isoformat()
-            }
-
-            message = aio_pika.Message(
-                body=json.dumps(message_body).encode(),
-                content_type="application/json",
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-            )
-
-            # Routing key: event_type.entity_type
-            routing_key = f"{event.event_type.value}.{event.entity_type}"
-
-            # Publish
-            await exchange.publish(
-                message,
-                routing_key=routing_key
-            )
-
-        except Exception as e:
-            # Log error but don't fail the event creation
-            print(f"Error publishing to RabbitMQ: {e}")
-
-    async def close(self):
-        """Close RabbitMQ connection."""
-        if self.rabbitmq_connection:
-            await self.rabbitmq_connection.close()
-
     async def replay_events(
         self,
         entity_type: str,
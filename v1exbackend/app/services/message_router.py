@@ -1,31 +1,65 @@
 """WebSocket message routing to appropriate handlers."""
 
+import asyncio
 import logging
-from typing import Any
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
 
-from app.core.websocket import WebSocketMessage, ConnectionManager
+from app.core.config import settings
+from app.core.websocket import MessageMerge, WebSocketMessage, ConnectionManager
 from app.agents.graph import compile_agent_graph
+from app.agents.nodes import run_feedback
 from app.agents.checkpointer import AgentCheckpointer
 from app.core.database import AsyncSessionLocal
 
 logger = logging.getLogger(__name__)
 
+Handler = Callable[[dict[str, Any], str], Awaitable[None]]
+
+
+def merge_deltas(queued: dict[str, Any], message: dict[str, Any]) -> dict[str, Any]:
+    """Join two consecutive stream frames into one starting at the queued offset."""
+    payload = {**queued["payload"], "delta": queued["payload"]["delta"] + message["payload"]["delta"]}
+    return {**message, "payload": payload}
+
 
 class MessageRouter:
-    """Route incoming WebSocket messages to appropriate handlers."""
+    """
+    Route incoming WebSocket messages to appropriate handlers.
+
+    Handlers run off the receive loop on a bounded per-connection pool, so a
+    slow handler (e.g. an LLM validation) does not hold up later messages:
+
+    - Messages with the same ordering key run one after another; different
+      keys run concurrently, at most `max_concurrency` at a time. The key is
+      the payload's task_id or goal_id, else the correlation_id.
+    - At most `max_pending` messages may be queued or running; beyond that
+      the client gets a "busy" error instead of blocking the socket.
+    - `ping` and `cancel` are handled immediately.
+    - Each handler runs under a timeout (`handler_timeout`, or a shorter
+      `timeout` in the payload). A client aborts a request with
+      `{"type": "cancel", "payload": {"correlation_id": "..."}}`. Timed out
+      and cancelled requests are answered with a `cancelled` message
+      carrying their correlation_id.
+    """
 
     def __init__(
         self,
         connection_id: str,
         user_id: str,
-        connection_manager: ConnectionManager
+        connection_manager: ConnectionManager,
+        max_concurrency: int = settings.WS_HANDLER_CONCURRENCY,
+        max_pending: int = settings.WS_HANDLER_MAX_PENDING,
+        handler_timeout: float = settings.WS_HANDLER_TIMEOUT
     ):
         self.connection_id = connection_id
         self.user_id = user_id
         self.connection_manager = connection_manager
+        self.max_pending = max_pending
+        self.handler_timeout = handler_timeout
 
         # Message type handlers
-        self.handlers = {
+        self.handlers: Dict[str, Handler] = {
             "ping": self.handle_ping,
             "goal.create": self.handle_goal_create,
             "goal.start": self.handle_goal_start,
@@ -34,38 +68,129 @@ class MessageRouter:
             # Add more handlers as needed
         }
 
+        # Handled inline in the receive loop, never queued
+        self.immediate_handlers: Dict[str, Handler] = {
+            "ping": self.handle_ping,
+            "cancel": self.handle_cancel,
+        }
+
+        # Ordering key -> queued messages, drained by one lane task per key
+        self._lanes: Dict[str, deque[WebSocketMessage]] = {}
+        self._lane_tasks: Dict[str, asyncio.Task] = {}
+        # correlation_id -> running handler task
+        self._running: Dict[str, asyncio.Task] = {}
+        self._pending = 0
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._closed = False
+
+    @staticmethod
+    def ordering_key(message: WebSocketMessage) -> str:
+        """Messages sharing a key are handled in arrival order."""
+        payload = message.payload if isinstance(message.payload, dict) else {}
+        if payload.get("task_id"):
+            return f"task:{payload['task_id']}"
+        if payload.get("goal_id"):
+            return f"goal:{payload['goal_id']}"
+        return f"correlation:{message.correlation_id}"
+
     async def route_message(self, message: WebSocketMessage) -> None:
         """
         Route message to appropriate handler based on type.
 
+        Returns as soon as the message is queued; the handler runs on the
+        connection's pool.
+
         Args:
             message: Incoming WebSocket message
         """
-        handler = self.handlers.get(message.type)
-
-        if handler:
-            try:
-                await handler(message.payload, message.correlation_id)
-            except Exception as e:
-                logger.error(f"Error handling message type '{message.type}': {e}")
-                await self.send_error(f"Error processing {message.type}", message.correlation_id)
-        else:
+        immediate = self.immediate_handlers.get(message.type)
+        if immediate:
+            await self._call(immediate, message)
+            return
+
+        if message.type not in self.handlers:
             logger.warning(f"Unknown message type: {message.type}")
             await self.send_error(f"Unknown message type: {message.type}", message.correlation_id)
+            return
+
+        if self._pending >= self.max_pending:
+            await self.send_error(f"Too many pending requests, retry {message.type} later", message.correlation_id)
+            return
+
+        key = self.ordering_key(message)
+        self._pending += 1
+        self._lanes.setdefault(key, deque()).append(message)
+        if key not in self._lane_tasks:
+            self._lane_tasks[key] = asyncio.create_task(self._run_lane(key))
+
+    async def _call(self, handler: Handler, message: WebSocketMessage) -> None:
+        try:
+            await handler(message.payload, message.correlation_id)
+        except Exception as e:
+            logger.error(f"Error handling message type '{message.type}': {e}")
+            await self.send_error(f"Error processing {message.type}", message.correlation_id)
+
+    async def _run_lane(self, key: str) -> None:
+        lane = self._lanes[key]
+        try:
+            while lane:
+                message = lane.popleft()
+                try:
+                    async with self._slots:
+                        task = asyncio.create_task(self._run_handler(message))
+                        self._running[message.correlation_id] = task
+                        # wait() does not raise if the handler task is cancelled
+                        await asyncio.wait([task])
+                finally:
+                    self._running.pop(message.correlation_id, None)
+                    self._pending -= 1
+        finally:
+            self._pending -= len(lane)
+            del self._lanes[key]
+            del self._lane_tasks[key]
+
+    async def _run_handler(self, message: WebSocketMessage) -> None:
+        timeout = self.handler_timeout
+        requested = message.payload.get("timeout") if isinstance(message.payload, dict) else None
+        if isinstance(requested, (int, float)) and requested > 0:
+            timeout = min(timeout, requested)
+
+        try:
+            async with asyncio.timeout(timeout):
+                await self._call(self.handlers[message.type], message)
+        except TimeoutError:
+            logger.warning(f"Handler for '{message.type}' timed out after {timeout}s")
+            await self.send_cancelled(message.correlation_id, "timeout")
+        except asyncio.CancelledError:
+            if not self._closed:
+                await self.send_cancelled(message.correlation_id, "cancelled")
+            raise
+
+    async def close(self) -> None:
+        """Cancel queued and running handlers (the connection is gone)."""
+        self._closed = True
+        tasks = list(self._lane_tasks.values()) + list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
     async def send_response(
         self,
         type: str,
         payload: dict[str, Any],
-        correlation_id: str
+        correlation_id: str,
+        coalesce_key: Optional[str] = None,
+        merge: Optional[MessageMerge] = None
     ) -> None:
-        """Send response message."""
+        """Send response message (coalesce_key/merge: see send_personal_message)."""
         response = WebSocketMessage(
             type=type,
             payload=payload,
             correlation_id=correlation_id
         )
-        await self.connection_manager.send_personal_message(response, self.connection_id)
+        await self.connection_manager.send_personal_message(
+            response, self.connection_id, coalesce_key=coalesce_key, merge=merge
+        )
 
     async def send_error(self, error: str, correlation_id: str) -> None:
         """Send error message."""
@@ -75,12 +200,36 @@ class MessageRouter:
             correlation_id
         )
 
+    async def send_cancelled(self, correlation_id: str, reason: str) -> None:
+        """Tell the client a request was aborted (reason: cancelled or timeout)."""
+        await self.send_response("cancelled", {"reason": reason}, correlation_id)
+
     # ==================== Message Handlers ====================
 
     async def handle_ping(self, payload: dict[str, Any], correlation_id: str) -> None:
         """Handle ping message."""
         await self.send_response("pong", {"timestamp": payload.get("timestamp")}, correlation_id)
 
+    async def handle_cancel(self, payload: dict[str, Any], correlation_id: str) -> None:
+        """Abort a queued or running request by its correlation_id."""
+        target = payload.get("correlation_id")
+
+        for lane in self._lanes.values():
+            for message in lane:
+                if message.correlation_id == target:
+                    lane.remove(message)
+                    self._pending -= 1
+                    await self.send_cancelled(target, "cancelled")
+                    return
+
+        task = self._running.get(target)
+        if task is not None:
+            # The handler task answers with "cancelled" itself
+            task.cancel()
+            return
+
+        await self.send_error(f"No pending request {target}", correlation_id)
+
     async def handle_goal_create(self, payload: dict[str, Any], correlation_id: str) -> None:
         """
         Handle goal creation request.
@@ -120,29 +269,61 @@ class MessageRouter:
 
     async def handle_task_validate(self, payload: dict[str, Any], correlation_id: str) -> None:
         """
-        Handle task validation request.
+        Handle task validation request (Nodo 4, streamed).
 
-        TODO: Integrate with Nodo 4 (Feedback Agent)
+        Model tokens are forwarded as `task.validating` frames with a `delta`
+        and its `offset` in the streamed text as they arrive; the parsed
+        verdict follows as `task.validation_result`. For a slow client, deltas
+        still queued are merged into one frame (see merge_deltas) and never
+        dropped, so the client can rebuild the text by offset.
         """
         task_id = payload.get("task_id")
         code = payload.get("code", "")
 
         logger.info(f"Task {task_id} validation requested by user {self.user_id}")
 
-        # Send streaming feedback (placeholder)
-        await self.send_response(
-            "task.validating",
-            {"task_id": task_id, "progress": 0.3, "message": "Analyzing code..."},
-            correlation_id
+        if not task_id or not code:
+            await self.send_error("task.validate requires task_id and code", correlation_id)
+            return
+
+        offset = 0
+
+        async def forward(delta: str) -> None:
+            nonlocal offset
+            await self.send_response(
+                "task.validating",
+                {"task_id": task_id, "delta": delta, "offset": offset},
+                correlation_id,
+                coalesce_key=f"validating:{task_id}",
+                merge=merge_deltas
+            )
+            offset += len(delta)
+
+        result = await run_feedback(
+            {
+                "user_id": self.user_id,
+                "task_id": task_id,
+                "goal_id": payload.get("goal_id"),
+                "code_snapshot": code,
+            },
+            on_delta=forward
         )
 
+        if result.get("error"):
+            await self.send_error(f"Validation failed: {result['error']}", correlation_id)
+            return
+
+        validation = result["validation_results"]
         await self.send_response(
             "task.validation_result",
             {
                 "task_id": task_id,
-                "passed": True,
-                "feedback": "Code looks good!",
-                "suggestions": []
+                "passed": validation.get("passed", False),
+                "score": validation.get("score"),
+                "feedback": validation.get("feedback", ""),
+                "suggestions": validation.get("hints", []),
+                "issues_found": validation.get("issues_found", []),
+                "snapshot_id": str(result["snapshot_id"]),
             },
             correlation_id
         )
@@ -0,0 +1,403 @@
+"""
+Parquet Event Sink - Escritura en lote de eventos a Parquet.
+
+En lugar de leer, concatenar y reescribir el archivo del día en cada evento,
+cada lote se agrupa por (categoría, día) y cada grupo se escribe como un
+archivo nuevo part-{n}.parquet en el directorio de la partición:
+
+    {base}/2024/01/goal_events_2024-01-15/part-00001.parquet
+
+Los lotes los arma el relay del outbox, que junta los eventos de una
+ventana de OUTBOX_PARQUET_WINDOW segundos: los eventos esperan en
+PostgreSQL, no en memoria. El número de parte se reclama con os.link, que
+falla si el archivo ya existe, así que varios workers pueden escribir en
+la misma partición sin pisarse.
+
+Un job periódico compacta las particiones con varias partes en una sola
+(part-00000.parquet) para que las lecturas no tengan que abrir miles de
+archivos pequeños.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from app.core.config import settings
+from app.schemas.parquet_schemas import get_parquet_partition_dir, get_schema_for_event_type
+
+logger = logging.getLogger(__name__)
+
+PART_PATTERN = re.compile(r"^part-(\d+)\.parquet$")
+COMPACTED_PART = "part-00000.parquet"
+COMPACTION_LOCK = ".compact.lock"
+# Un lock más viejo que esto es de un worker que murió compactando
+COMPACTION_LOCK_STALE_SECONDS = 3600
+
+
+def _part_numbers(directory: Path) -> List[int]:
+    numbers = []
+    for name in os.listdir(directory):
+        match = PART_PATTERN.match(name)
+        if match:
+            numbers.append(int(match.group(1)))
+    return numbers
+
+
+def _write_tmp(directory: Path, table: pa.Table) -> Path:
+    # Los lectores de pyarrow ignoran los archivos que empiezan por "."
+    tmp_path = directory / f".tmp-{uuid.uuid4().hex}.parquet"
+    pq.write_table(table, tmp_path)
+    return tmp_path
+
+
+def write_part(directory: str, table: pa.Table) -> Path:
+    """
+    Escribir una tabla como una parte nueva de la partición.
+
+    Se escribe a un archivo temporal y se publica con os.link al primer
+    número de parte libre: los lectores nunca ven un archivo a medias y
+    dos workers nunca obtienen el mismo número.
+
+    Returns:
+        Path de la parte escrita
+    """
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = _write_tmp(path, table)
+    try:
+        number = max(_part_numbers(path), default=0) + 1
+        while True:
+            part_path = path / f"part-{number:05d}.parquet"
+            try:
+                os.link(tmp_path, part_path)
+                return part_path
+            except FileExistsError:
+                number += 1
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _drop_duplicate_events(table: pa.Table) -> pa.Table:
+    """
+    Quedarse con la primera fila de cada event_id.
+
+    Las entregas se reintentan (at-least-once), así que un evento puede
+    estar en dos partes; la compactación deja una sola copia.
+    """
+    if pc.count_distinct(table.column("event_id")).as_py() == table.num_rows:
+        return table
+
+    first_rows = (
+        table.select(["event_id"])
+        .append_column("_row", pa.array(range(table.num_rows), pa.int64()))
+        .group_by("event_id", use_threads=False)
+        .aggregate([("_row", "min")])
+        .column("_row_min")
+    )
+    # En el orden original
+    return table.take(pc.take(first_rows, pc.sort_indices(first_rows)))
+
+
+def _acquire_compaction_lock(directory: Path) -> bool:
+    lock_path = directory / COMPACTION_LOCK
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        pass
+
+    try:
+        if time.time() - lock_path.stat().st_mtime < COMPACTION_LOCK_STALE_SECONDS:
+            return False
+        lock_path.unlink(missing_ok=True)
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except (FileExistsError, FileNotFoundError):
+        return False
+
+
+def compact_partition(directory: str) -> int:
+    """
+    Unir todas las partes de una partición en part-00000.parquet.
+
+    Las partes que aparezcan mientras tanto no se tocan (se compactan en la
+    siguiente pasada). Entre el reemplazo de part-00000 y el borrado de las
+    partes unidas, un lector puede ver filas duplicadas durante un instante.
+
+    Returns:
+        Número de partes unidas (0 si no había nada que compactar o
+        otro worker la está compactando)
+    """
+    path = Path(directory)
+    numbers = sorted(_part_numbers(path))
+    if len(numbers) < 2 or not _acquire_compaction_lock(path):
+        return 0
+
+    try:
+        # Releer con el lock tomado: otro worker pudo terminar justo antes
+        numbers = sorted(_part_numbers(path))
+        if len(numbers) < 2:
+            return 0
+
+        parts = [path / f"part-{number:05d}.parquet" for number in numbers]
+        table = _drop_duplicate_events(pa.concat_tables([pq.read_table(part) for part in parts]))
+
+        tmp_path = _write_tmp(path, table)
+        os.replace(tmp_path, path / COMPACTED_PART)
+
+        for part in parts:
+            if part.name != COMPACTED_PART:
+                part.unlink(missing_ok=True)
+
+        return len(parts)
+    finally:
+        (path / COMPACTION_LOCK).unlink(missing_ok=True)
+
+
+def compact_partitions(base_path: str) -> Dict[str, int]:
+    """
+    Compactar todas las particiones de eventos bajo base_path.
+
+    Returns:
+        Directorio -> número de partes unidas, sólo de las compactadas
+    """
+    compacted = {}
+    for directory in sorted(Path(base_path).glob("*/*/*_events_*")):
+        if not directory.is_dir():
+            continue
+        try:
+            merged = compact_partition(str(directory))
+        except Exception as e:
+            logger.error(f"Error compacting Parquet partition {directory}: {e}")
+            continue
+        if merged:
+            compacted[str(directory)] = merged
+    return compacted
+
+
+def build_table(records: List[Dict[str, Any]], schema: pa.Schema) -> Tuple[Optional[pa.Table], int]:
+    """
+    Convertir eventos a una tabla Arrow.
+
+    Si el lote no encaja en el schema se convierte fila a fila descartando
+    las filas inválidas, para que un evento malo no pierda todo el lote.
+
+    Returns:
+        (tabla o None si no queda ninguna fila, número de filas descartadas)
+    """
+    try:
+        return pa.Table.from_pylist(records, schema=schema), 0
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    tables = []
+    for record in records:
+        try:
+            tables.append(pa.Table.from_pylist([record], schema=schema))
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            logger.error(f"Rejecting event {record.get('event_id')} for Parquet: {e}")
+
+    rejected = len(records) - len(tables)
+    return (pa.concat_tables(tables) if tables else None), rejected
+
+
+def _build_and_write(
+    directory: str,
+    schema: pa.Schema,
+    records: List[Dict[str, Any]]
+) -> Tuple[Optional[pa.Table], int]:
+    table, rejected = build_table(records, schema)
+    if table is not None:
+        write_part(directory, table)
+    return table, rejected
+
+
+class _Partition:
+    """Eventos de un lote que van a una misma partición (categoría, día)."""
+
+    __slots__ = ("directory", "schema", "records")
+
+    def __init__(self, directory: str, schema: pa.Schema):
+        self.directory = directory
+        self.schema = schema
+        self.records: List[Dict[str, Any]] = []
+
+
+class ParquetEventSink:
+    """
+    Escritor de lotes de eventos como partes nuevas de sus particiones.
+
+    No guarda eventos en memoria: quien llama agrupa (el relay del outbox
+    junta los eventos de una ventana de tiempo) y sólo da un evento por
+    escrito cuando write() lo devuelve. La escritura corre en un thread
+    (asyncio.to_thread) para no frenar el event loop.
+    """
+
+    def __init__(
+        self,
+        base_path: str = "./data/storage/events",
+        max_rows: int = 10_000
+    ):
+        self.base_path = base_path
+        self.max_rows = max_rows
+
+        self._required: Dict[int, List[str]] = {}
+
+        # Métricas
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.parts_written = 0
+        self.last_write_ms = 0.0
+
+    def _required_fields(self, schema: pa.Schema) -> List[str]:
+        required = self._required.get(id(schema))
+        if required is None:
+            required = self._required[id(schema)] = [
+                field.name for field in schema if not field.nullable
+            ]
+        return required
+
+    @staticmethod
+    def _partition_key(event_type: str, timestamp: datetime) -> Tuple[str, str]:
+        return event_type.split(".")[0], timestamp.strftime("%Y-%m-%d")
+
+    def _new_partition(self, event_type: str, timestamp: datetime) -> _Partition:
+        return _Partition(
+            get_parquet_partition_dir(event_type, timestamp, self.base_path),
+            get_schema_for_event_type(event_type)
+        )
+
+    def _is_valid(self, event_type: str, schema: pa.Schema, record: Dict[str, Any]) -> bool:
+        missing = [name for name in self._required_fields(schema) if record.get(name) is None]
+        if missing:
+            self.rejected += 1
+            logger.error(f"Rejecting {event_type} event for Parquet, missing fields: {', '.join(missing)}")
+            return False
+        return True
+
+    async def write(self, events: List[Tuple[str, datetime, Dict[str, Any]]]) -> Set[str]:
+        """
+        Escribir un lote: una parte por partición (o varias si pasa de max_rows).
+
+        Args:
+            events: (event_type, timestamp, record) de cada evento
+
+        Returns:
+            event_id de los eventos que no hay que reintentar: los escritos
+            y los rechazados por inválidos
+        """
+        start = time.perf_counter()
+        partitions: Dict[Tuple[str, str], _Partition] = {}
+        done: Set[str] = set()
+
+        for event_type, timestamp, record in events:
+            key = self._partition_key(event_type, timestamp)
+            partition = partitions.get(key)
+            if partition is None:
+                partition = partitions[key] = self._new_partition(event_type, timestamp)
+
+            # Un evento inválido haría fallar la tabla de toda la parte
+            if self._is_valid(event_type, partition.schema, record):
+                partition.records.append(record)
+            else:
+                done.add(record["event_id"])
+
+        for partition in partitions.values():
+            for offset in range(0, len(partition.records), self.max_rows):
+                chunk = partition.records[offset:offset + self.max_rows]
+                if await self._write(partition, chunk) is not None:
+                    done.update(record["event_id"] for record in chunk)
+
+        self.last_write_ms = (time.perf_counter() - start) * 1000
+        return done
+
+    async def _write(self, partition: _Partition, records: List[Dict[str, Any]]) -> Optional[int]:
+        """Escribir una parte; devuelve las filas escritas o None si falló."""
+        # La conversión a Arrow también va al thread: con miles de filas
+        # bloquearía el event loop decenas de ms
+        try:
+            table, rejected = await asyncio.to_thread(
+                _build_and_write, partition.directory, partition.schema, records
+            )
+        except Exception as e:
+            # Reintenta quien llama: el evento no se devuelve como escrito
+            self.failed += len(records)
+            logger.error(f"Error writing Parquet part to {partition.directory} ({len(records)} events): {e}")
+            return None
+
+        self.rejected += rejected
+        if table is None:
+            return 0
+
+        self.written += table.num_rows
+        self.parts_written += 1
+        return table.num_rows
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas de escritura."""
+        return {
+            "rejected": self.rejected,
+            "written": self.written,
+            "failed": self.failed,
+            "parts_written": self.parts_written,
+            "last_write_ms": round(self.last_write_ms, 2),
+        }
+
+
+async def parquet_compaction_loop(interval_seconds: float = 3600) -> None:
+    """Compactar las particiones de eventos periódicamente."""
+    while True:
+        try:
+            compacted = await asyncio.to_thread(compact_partitions, settings.PARQUET_EVENTS_PATH)
+            if compacted:
+                logger.info(
+                    f"Compacted {len(compacted)} Parquet partitions "
+                    f"({sum(compacted.values())} parts)"
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Parquet compaction failed: {e}")
+
+        await asyncio.sleep(interval_seconds)
+
+
+# Global sink instance
+_parquet_sink: Optional[ParquetEventSink] = None
+
+
+async def init_parquet_sink() -> ParquetEventSink:
+    """Crear el sink global."""
+    global _parquet_sink
+
+    if _parquet_sink is None:
+        _parquet_sink = ParquetEventSink(
+            base_path=settings.PARQUET_EVENTS_PATH,
+            max_rows=settings.PARQUET_SINK_MAX_ROWS
+        )
+
+    return _parquet_sink
+
+
+async def close_parquet_sink() -> None:
+    """Soltar el sink global (no guarda eventos pendientes)."""
+    global _parquet_sink
+
+    _parquet_sink = None
+
+
+def get_parquet_sink() -> Optional[ParquetEventSink]:
+    """Sink global, o None si no se ha inicializado."""
+    return _parquet_sink
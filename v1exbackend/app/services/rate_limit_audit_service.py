@@ -2,15 +2,18 @@
 Rate Limit Audit Service - Tracking y auditoría de rate limits.
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 import uuid
 
-from sqlalchemy import select, func
+from sqlalchemy import select, func, insert, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import RateLimitAudit, RateLimitAction, RateLimitStatus
 from app.core.rate_limiter import RateLimitResult
+from app.core.suspicious_activity import SuspiciousActivityDetector, evaluate_suspicious
+from app.models.rate_limit_rollup import RESPONSE_TIME_BUCKETS_MS, RESPONSE_TIME_HISTOGRAM_COLUMNS
+from app.services.rate_limit_rollup_service import RateLimitRollupService, default_window
 
 
 class RateLimitAuditService:
@@ -31,7 +34,8 @@ class RateLimitAuditService:
         ip_address: Optional[str] = None,
         user_agent: Optional[str] = None,
         openai_usage: Optional[Dict[str, int]] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        detector: Optional[SuspiciousActivityDetector] = None
     ) -> RateLimitAudit:
         """
         Registrar un request en la auditoría.
@@ -48,71 +52,162 @@ class RateLimitAuditService:
             user_agent: User agent del cliente
             openai_usage: Uso de tokens de OpenAI
             metadata: Metadata adicional
+            detector: Detector en Redis; sin él se usan los COUNT(*) en SQL
 
         Returns:
             RateLimitAudit creado
         """
-        # Determinar status
-        if rate_limit_result.allowed:
-            status = RateLimitStatus.allowed
-        else:
-            status = RateLimitStatus.rate_limited
-
-        # Calcular costo estimado si hay uso de OpenAI
-        estimated_cost_cents = None
-        if openai_usage:
-            estimated_cost_cents = self._calculate_cost(
-                model=openai_usage.get("model", "text-embedding-3-small"),
-                prompt_tokens=openai_usage.get("prompt_tokens", 0),
-                completion_tokens=openai_usage.get("completion_tokens", 0)
-            )
-
-        # Detectar comportamiento sospechoso
-        is_suspicious, alert_reason = await self._check_suspicious_activity(
-            user_id=user_id,
-            action=action,
-            rate_limit_result=rate_limit_result,
-            endpoint=endpoint
-        )
-
-        # Crear registro de auditoría
-        audit = RateLimitAudit(
-            id=str(uuid.uuid4()),
+        record = self.build_record(
             user_id=user_id,
             endpoint=endpoint,
             method=method,
             action=action,
-            status=status,
-            allowed=rate_limit_result.allowed,
-            tokens_requested=rate_limit_result.tokens_requested,
-            tokens_available=rate_limit_result.tokens_available,
-            tokens_consumed=rate_limit_result.tokens_consumed,
-            openai_prompt_tokens=openai_usage.get("prompt_tokens") if openai_usage else None,
-            openai_completion_tokens=openai_usage.get("completion_tokens") if openai_usage else None,
-            openai_total_tokens=openai_usage.get("total_tokens") if openai_usage else None,
-            openai_model=openai_usage.get("model") if openai_usage else None,
-            estimated_cost_cents=estimated_cost_cents,
+            rate_limit_result=rate_limit_result,
             response_time_ms=response_time_ms,
             http_status_code=http_status_code,
-            rate_limit_key=rate_limit_result.limit_key,
-            rate_limit_window_seconds=rate_limit_result.window_seconds,
-            rate_limit_max_requests=rate_limit_result.max_requests,
-            current_request_count=rate_limit_result.current_count,
-            is_suspicious=is_suspicious,
-            alert_triggered=is_suspicious,
-            alert_reason=alert_reason,
             ip_address=ip_address,
             user_agent=user_agent,
-            metadata=metadata or {},
-            timestamp=datetime.utcnow()
+            openai_usage=openai_usage,
+            metadata=metadata
         )
 
+        # Detectar comportamiento sospechoso; si Redis falla, con los COUNT(*) en SQL
+        flagged = False
+        if detector is not None:
+            try:
+                await detector.flag_batch([record])
+                flagged = True
+            except Exception as e:
+                print(f"Suspicious activity detector error: {e}")
+
+        if not flagged:
+            is_suspicious, alert_reason = await self._check_suspicious_activity(
+                user_id=user_id,
+                action=action,
+                rate_limit_result=rate_limit_result,
+                endpoint=endpoint
+            )
+            record.update(
+                is_suspicious=is_suspicious,
+                alert_triggered=is_suspicious,
+                alert_reason=alert_reason
+            )
+
+        # Crear registro de auditoría
+        audit = RateLimitAudit(**record)
+
         self.db.add(audit)
+        await RateLimitRollupService(self.db).apply([record])
         await self.db.commit()
         await self.db.refresh(audit)
 
         return audit
 
+    async def log_requests_batch(
+        self,
+        records: List[Dict[str, Any]],
+        detector: Optional[SuspiciousActivityDetector] = None
+    ) -> int:
+        """
+        Registrar varios requests con un único INSERT multi-fila y un commit.
+
+        La detección de actividad sospechosa usa los contadores en Redis del
+        detector (un pipeline por lote). Sin detector, o si Redis falla, se
+        hace con una sola consulta agrupada por (user_id, action).
+
+        Args:
+            records: Registros creados con build_record()
+            detector: Detector incremental de actividad sospechosa
+
+        Returns:
+            Número de registros insertados
+        """
+        if not records:
+            return 0
+
+        flagged = False
+        if detector is not None:
+            try:
+                await detector.flag_batch(records)
+                flagged = True
+            except Exception as e:
+                print(f"Suspicious activity detector error: {e}")
+
+        if not flagged:
+            await self._flag_suspicious_batch(records)
+
+        await self.db.execute(insert(RateLimitAudit), records)
+        await RateLimitRollupService(self.db).apply(records)
+        await self.db.commit()
+
+        return len(records)
+
+    @staticmethod
+    def build_record(
+        user_id: str,
+        endpoint: str,
+        method: str,
+        action: RateLimitAction,
+        rate_limit_result: RateLimitResult,
+        response_time_ms: Optional[float] = None,
+        http_status_code: Optional[int] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        openai_usage: Optional[Dict[str, int]] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Construir la fila de auditoría (sin flags de actividad sospechosa).
+
+        No toca la base de datos, así que puede llamarse en el hot path
+        y encolarse para escritura en lote.
+        """
+        # Determinar status
+        if rate_limit_result.allowed:
+            status = RateLimitStatus.allowed
+        else:
+            status = RateLimitStatus.rate_limited
+
+        # Calcular costo estimado si hay uso de OpenAI
+        estimated_cost_cents = None
+        if openai_usage:
+            estimated_cost_cents = RateLimitAuditService._calculate_cost(
+                model=openai_usage.get("model", "text-embedding-3-small"),
+                prompt_tokens=openai_usage.get("prompt_tokens", 0),
+                completion_tokens=openai_usage.get("completion_tokens", 0)
+            )
+
+        return {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "endpoint": endpoint,
+            "method": method,
+            "action": action,
+            "status": status,
+            "allowed": rate_limit_result.allowed,
+            "tokens_requested": rate_limit_result.tokens_requested,
+            "tokens_available": rate_limit_result.tokens_available,
+            "tokens_consumed": rate_limit_result.tokens_consumed,
+            "openai_prompt_tokens": openai_usage.get("prompt_tokens") if openai_usage else None,
+            "openai_completion_tokens": openai_usage.get("completion_tokens") if openai_usage else None,
+            "openai_total_tokens": openai_usage.get("total_tokens") if openai_usage else None,
+            "openai_model": openai_usage.get("model") if openai_usage else None,
+            "estimated_cost_cents": estimated_cost_cents,
+            "response_time_ms": response_time_ms,
+            "http_status_code": http_status_code,
+            "rate_limit_key": rate_limit_result.limit_key,
+            "rate_limit_window_seconds": rate_limit_result.window_seconds,
+            "rate_limit_max_requests": rate_limit_result.max_requests,
+            "current_request_count": rate_limit_result.current_count,
+            "is_suspicious": False,
+            "alert_triggered": False,
+            "alert_reason": None,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "audit_metadata": metadata or {},
+            "timestamp": datetime.utcnow()
+        }
+
     async def get_user_statistics(
         self,
         user_id: str,
@@ -130,47 +225,16 @@ class RateLimitAuditService:
         Returns:
             Dict con estadísticas
         """
-        # Default: últimas 24 horas
-        if not start_date:
-            start_date = datetime.utcnow() - timedelta(hours=24)
+        # Default: últimas 24 horas, alineadas al minuto para leer de los rollups
         if not end_date:
-            end_date = datetime.utcnow()
-
-        query = select(RateLimitAudit).where(
-            RateLimitAudit.user_id == user_id,
-            RateLimitAudit.timestamp >= start_date,
-            RateLimitAudit.timestamp <= end_date
-        )
-
-        result = await self.db.execute(query)
-        audits = result.scalars().all()
-
-        # Calcular estadísticas
-        total_requests = len(audits)
-        allowed_requests = sum(1 for a in audits if a.allowed)
-        blocked_requests = total_requests - allowed_requests
-
-        # Por acción
-        by_action = {}
-        for action in RateLimitAction:
-            action_audits = [a for a in audits if a.action == action]
-            if action_audits:
-                by_action[action.value] = {
-                    "total": len(action_audits),
-                    "allowed": sum(1 for a in action_audits if a.allowed),
-                    "blocked": sum(1 for a in action_audits if not a.allowed)
-                }
-
-        # Tokens OpenAI
-        total_openai_tokens = sum(a.openai_total_tokens or 0 for a in audits)
-        total_cost_cents = sum(a.estimated_cost_cents or 0 for a in audits)
+            end_date = default_window()[1]
+        if not start_date:
+            start_date = end_date - timedelta(hours=24)
 
-        # Alertas
-        total_alerts = sum(1 for a in audits if a.alert_triggered)
+        totals, by_action = await self._aggregate_statistics(start_date, end_date, user_id=user_id)
 
-        # Tiempos de respuesta promedio
-        response_times = [a.response_time_ms for a in audits if a.response_time_ms]
-        avg_response_time = sum(response_times) / len(response_times) if response_times else 0
+        total_requests = totals["total"]
+        blocked_requests = totals["blocked"]
 
         return {
             "user_id": user_id,
@@ -180,23 +244,204 @@ class RateLimitAuditService:
             },
             "requests": {
                 "total": total_requests,
-                "allowed": allowed_requests,
+                "allowed": totals["allowed"],
                 "blocked": blocked_requests,
                 "block_rate": blocked_requests / total_requests if total_requests > 0 else 0
             },
             "by_action": by_action,
             "openai": {
-                "total_tokens": total_openai_tokens,
-                "estimated_cost_usd": total_cost_cents / 100 if total_cost_cents else 0
+                "total_tokens": totals["openai_tokens"],
+                "estimated_cost_usd": totals["cost_cents"] / 100 if totals["cost_cents"] else 0
             },
             "alerts": {
-                "total": total_alerts
+                "total": totals["alerts"]
             },
             "performance": {
-                "avg_response_time_ms": avg_response_time
+                "avg_response_time_ms": totals["avg_response_time_ms"],
+                "response_time_histogram": totals["response_time_histogram"]
             }
         }
 
+    async def get_global_statistics(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Obtener estadísticas globales del sistema.
+
+        Args:
+            start_date: Fecha inicio
+            end_date: Fecha fin
+
+        Returns:
+            Dict con estadísticas
+        """
+        # Default: últimas 24 horas, alineadas al minuto para leer de los rollups
+        if not end_date:
+            end_date = default_window()[1]
+        if not start_date:
+            start_date = end_date - timedelta(hours=24)
+
+        totals, by_action = await self._aggregate_statistics(start_date, end_date)
+
+        total_requests = totals["total"]
+        blocked_requests = totals["blocked"]
+        unique_users = totals["unique_users"]
+        total_alerts = totals["alerts"]
+
+        return {
+            "system": "global",
+            "period": {
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat()
+            },
+            "requests": {
+                "total": total_requests,
+                "allowed": totals["allowed"],
+                "blocked": blocked_requests,
+                "block_rate": blocked_requests / total_requests if total_requests > 0 else 0
+            },
+            "users": {
+                "unique_users": unique_users,
+                "avg_requests_per_user": total_requests / unique_users if unique_users > 0 else 0
+            },
+            "by_action": by_action,
+            "openai": {
+                "total_tokens": totals["openai_tokens"],
+                "estimated_cost_usd": totals["cost_cents"] / 100 if totals["cost_cents"] else 0
+            },
+            "alerts": {
+                "total": total_alerts,
+                "rate": total_alerts / total_requests if total_requests > 0 else 0
+            }
+        }
+
+    async def _aggregate_statistics(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[str] = None
+    ) -> tuple[Dict[str, Any], Dict[str, Dict[str, int]]]:
+        """
+        Agregar la auditoría de la ventana [start_date, end_date) con una sola consulta.
+
+        Si la ventana está alineada al minuto se lee de los rollups; si no,
+        de la tabla cruda. En ambos casos GROUP BY ROLLUP(action) devuelve una
+        fila por acción más la fila de totales (action NULL), que incluye
+        los usuarios únicos.
+
+        Returns:
+            (totales, by_action)
+        """
+        rollups = RateLimitRollupService(self.db)
+
+        if rollups.covers(start_date, end_date):
+            query = rollups.statistics_query(start_date, end_date, user_id=user_id)
+        else:
+            query = self._raw_statistics_query(start_date, end_date, user_id=user_id)
+
+        result = await self.db.execute(query)
+
+        totals = {
+            "total": 0,
+            "allowed": 0,
+            "blocked": 0,
+            "openai_tokens": 0,
+            "cost_cents": 0,
+            "alerts": 0,
+            "avg_response_time_ms": 0,
+            "response_time_histogram": self._histogram([0] * len(RESPONSE_TIME_HISTOGRAM_COLUMNS)),
+            "unique_users": 0
+        }
+        action_rows = {}
+
+        for row in result.all():
+            (action, total, allowed, tokens, cost_cents, alerts,
+             response_time_sum, response_time_count, unique_users, is_total) = row[:10]
+            total, allowed = int(total), int(allowed)
+
+            if is_total:
+                totals.update(
+                    total=total,
+                    allowed=allowed,
+                    blocked=total - allowed,
+                    openai_tokens=int(tokens),
+                    cost_cents=float(cost_cents),
+                    alerts=int(alerts),
+                    avg_response_time_ms=(
+                        float(response_time_sum) / int(response_time_count)
+                        if response_time_count else 0
+                    ),
+                    response_time_histogram=self._histogram(row[10:]),
+                    unique_users=unique_users
+                )
+            else:
+                action_rows[action] = {
+                    "total": total,
+                    "allowed": allowed,
+                    "blocked": total - allowed
+                }
+
+        # Mismo orden que el enum
+        by_action = {
+            action.value: action_rows[action]
+            for action in RateLimitAction
+            if action in action_rows
+        }
+
+        return totals, by_action
+
+    @staticmethod
+    def _raw_statistics_query(
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[str] = None
+    ):
+        """Consulta de estadísticas sobre rate_limit_audits (ventanas no alineadas)."""
+        response_time = RateLimitAudit.response_time_ms
+
+        # Histograma con los mismos buckets que los rollups
+        histogram = []
+        lower = 0
+        for bound in RESPONSE_TIME_BUCKETS_MS:
+            histogram.append(
+                func.count(RateLimitAudit.id).filter(response_time > lower, response_time <= bound)
+            )
+            lower = bound
+        histogram.append(func.count(RateLimitAudit.id).filter(response_time > lower))
+
+        query = select(
+            RateLimitAudit.action,
+            func.count(RateLimitAudit.id),
+            func.count(RateLimitAudit.id).filter(RateLimitAudit.allowed == True),
+            func.coalesce(func.sum(RateLimitAudit.openai_total_tokens), 0),
+            func.coalesce(func.sum(RateLimitAudit.estimated_cost_cents), 0),
+            func.count(RateLimitAudit.id).filter(RateLimitAudit.alert_triggered == True),
+            # Igual que antes: los tiempos 0/NULL no cuentan para el promedio
+            func.coalesce(func.sum(response_time).filter(response_time > 0), 0),
+            func.count(RateLimitAudit.id).filter(response_time > 0),
+            func.count(RateLimitAudit.user_id.distinct()),
+            func.grouping(RateLimitAudit.action),
+            *histogram
+        ).where(
+            RateLimitAudit.timestamp >= start_date,
+            RateLimitAudit.timestamp < end_date
+        )
+
+        if user_id:
+            query = query.where(RateLimitAudit.user_id == user_id)
+
+        return query.group_by(func.rollup(RateLimitAudit.action))
+
+    @staticmethod
+    def _histogram(counts) -> Dict[str, int]:
+        """Histograma de tiempos de respuesta: {"le_10ms": n, ..., "gt_2500ms": n}."""
+        return {
+            column[len("rt_"):]: int(count)
+            for column, count in zip(RESPONSE_TIME_HISTOGRAM_COLUMNS, counts)
+        }
+
     async def get_suspicious_activities(
         self,
         hours: int = 24,
@@ -219,37 +464,19 @@ class RateLimitAuditService:
         hours: int = 24,
         limit: int = 10
     ) -> list[Dict[str, Any]]:
-        """Obtener usuarios con mayor consumo."""
-        since = datetime.utcnow() - timedelta(hours=hours)
-
-        query = select(
-            RateLimitAudit.user_id,
-            func.count(RateLimitAudit.id).label('request_count'),
-            func.sum(RateLimitAudit.openai_total_tokens).label('total_tokens'),
-            func.sum(RateLimitAudit.estimated_cost_cents).label('total_cost')
-        ).where(
-            RateLimitAudit.timestamp >= since
-        )
-
-        if action:
-            query = query.where(RateLimitAudit.action == action)
+        """
+        Obtener usuarios con mayor consumo.
 
-        query = query.group_by(RateLimitAudit.user_id).order_by(
-            func.count(RateLimitAudit.id).desc()
-        ).limit(limit)
+        La ventana se alinea al minuto y se lee de los rollups.
+        """
+        start_date, end_date = default_window(hours)
 
-        result = await self.db.execute(query)
-        rows = result.all()
-
-        return [
-            {
-                "user_id": row[0],
-                "request_count": row[1],
-                "total_tokens": row[2] or 0,
-                "total_cost_usd": (row[3] or 0) / 100
-            }
-            for row in rows
-        ]
+        return await RateLimitRollupService(self.db).get_top_consumers(
+            start_date=start_date,
+            end_date=end_date,
+            action=action,
+            limit=limit
+        )
 
     async def _check_suspicious_activity(
         self,
@@ -274,13 +501,8 @@ class RateLimitAuditService:
         result = await self.db.execute(query)
         recent_count = result.scalar()
 
-        # Umbral sospechoso: 5x el límite normal en 5 minutos
-        threshold = rate_limit_result.max_requests * 5
-
-        if recent_count and recent_count > threshold:
-            return True, f"Excessive requests: {recent_count} in 5 minutes (threshold: {threshold})"
-
         # Verificar si está siendo bloqueado constantemente
+        blocked_count = 0
         if not rate_limit_result.allowed:
             query = select(func.count(RateLimitAudit.id)).where(
                 RateLimitAudit.user_id == user_id,
@@ -291,13 +513,61 @@ class RateLimitAuditService:
             result = await self.db.execute(query)
             blocked_count = result.scalar()
 
-            if blocked_count and blocked_count > 10:
-                return True, f"Multiple rate limit violations: {blocked_count} blocked requests in 5 minutes"
+        return evaluate_suspicious(
+            recent_count=recent_count,
+            blocked_count=blocked_count,
+            max_requests=rate_limit_result.max_requests,
+            allowed=rate_limit_result.allowed
+        )
+
+    async def _flag_suspicious_batch(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Marcar actividad sospechosa en un lote con las mismas reglas que
+        _check_suspicious_activity.
+
+        Una consulta agrupada trae los counts de los últimos 5 minutos por
+        (user_id, action); los registros previos del propio lote se suman
+        en orden para que cada fila vea lo mismo que vería en la ruta inline.
+        """
+        since = datetime.utcnow() - timedelta(minutes=5)
+        pairs = {(r["user_id"], r["action"]) for r in records}
+
+        query = select(
+            RateLimitAudit.user_id,
+            RateLimitAudit.action,
+            func.count(RateLimitAudit.id),
+            func.count(RateLimitAudit.id).filter(RateLimitAudit.allowed == False)
+        ).where(
+            tuple_(RateLimitAudit.user_id, RateLimitAudit.action).in_(list(pairs)),
+            RateLimitAudit.timestamp >= since
+        ).group_by(RateLimitAudit.user_id, RateLimitAudit.action)
+
+        result = await self.db.execute(query)
+        counts = {(row[0], row[1]): [row[2], row[3]] for row in result.all()}
 
-        return False, None
+        for record in sorted(records, key=lambda r: r["timestamp"]):
+            recent_count, blocked_count = counts.setdefault(
+                (record["user_id"], record["action"]), [0, 0]
+            )
 
+            is_suspicious, alert_reason = evaluate_suspicious(
+                recent_count=recent_count,
+                blocked_count=blocked_count,
+                max_requests=record["rate_limit_max_requests"],
+                allowed=record["allowed"]
+            )
+            record.update(
+                is_suspicious=is_suspicious,
+                alert_triggered=is_suspicious,
+                alert_reason=alert_reason
+            )
+
+            counts[(record["user_id"], record["action"])][0] += 1
+            if not record["allowed"]:
+                counts[(record["user_id"], record["action"])][1] += 1
+
+    @staticmethod
     def _calculate_cost(
-        self,
         model: str,
         prompt_tokens: int,
         completion_tokens: int
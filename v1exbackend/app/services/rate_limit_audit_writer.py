@@ -0,0 +1,223 @@
+"""
+Rate Limit Audit Writer - Escritura asíncrona y en lote de la auditoría.
+
+El middleware encola registros (construidos con RateLimitAuditService.build_record)
+sin tocar la base de datos; un worker en background los agrupa y los inserta
+con un único INSERT multi-fila por lote.
+
+La cola es acotada: si se llena, el registro se descarta y se contabiliza
+en las métricas en lugar de frenar el request.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.rate_limiter import get_rate_limiter
+from app.core.suspicious_activity import SuspiciousActivityDetector
+from app.services.rate_limit_audit_service import RateLimitAuditService
+
+logger = logging.getLogger(__name__)
+
+FlushBatch = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+_detector: Optional[SuspiciousActivityDetector] = None
+
+
+async def _write_batch(records: List[Dict[str, Any]]) -> None:
+    """Insertar un lote con su propia sesión."""
+    global _detector
+
+    if _detector is None:
+        # Misma conexión de Redis que el rate limiter
+        _detector = SuspiciousActivityDetector((await get_rate_limiter()).bucket.redis)
+
+    async with AsyncSessionLocal() as db:
+        await RateLimitAuditService(db).log_requests_batch(records, detector=_detector)
+
+
+class RateLimitAuditWriter:
+    """
+    Cola acotada + worker que escribe la auditoría en lotes.
+
+    Un lote se escribe al llegar a batch_size registros o cuando pasan
+    flush_interval segundos desde el primer registro del lote.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        flush_batch: Optional[FlushBatch] = None
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._flush_batch = flush_batch or _write_batch
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # Métricas
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.last_flush_ms = 0.0
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """
+        Encolar un registro sin bloquear.
+
+        Returns:
+            False si la cola está llena o el writer está cerrado (registro descartado)
+        """
+        if self._closed:
+            self.dropped += 1
+            return False
+
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            # Loguear sólo el primero y luego cada 1000 para no inundar los logs
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(
+                    f"Rate limit audit queue full ({self.queue.maxsize}), "
+                    f"{self.dropped} records dropped"
+                )
+            return False
+
+        self.enqueued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+        return True
+
+    def start(self) -> None:
+        """Arrancar el worker."""
+        if self._task is None:
+            self._closed = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Dejar de aceptar registros y escribir lo que quede en la cola.
+
+        Args:
+            timeout: Segundos máximos para vaciar la cola
+        """
+        self._closed = True
+        if self._task is None:
+            return
+
+        try:
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                f"Rate limit audit writer did not drain in {timeout}s, "
+                f"{self.queue.qsize()} records lost"
+            )
+        finally:
+            self._task = None
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métricas de la cola y del worker."""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "max_queue_depth": self.max_queue_depth,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+
+    async def _run(self) -> None:
+        """Loop del worker: agrupar por tamaño o tiempo y escribir."""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            # Esperar el primer registro despertando periódicamente
+            # para detectar el cierre
+            try:
+                first = await asyncio.wait_for(self.queue.get(), self.flush_interval)
+            except asyncio.TimeoutError:
+                if self._closed:
+                    return
+                continue
+
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+
+                # Al cerrar no se espera a completar el lote
+                timeout = deadline - loop.time()
+                if self._closed or timeout <= 0:
+                    break
+
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        start = time.perf_counter()
+        try:
+            await self._flush_batch(batch)
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            # No reintentar: un fallo de la base de datos no debe
+            # acumular presión sobre la cola
+            self.failed += len(batch)
+            logger.error(f"Error writing rate limit audit batch ({len(batch)} records): {e}")
+        finally:
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+
+# Global writer instance
+_audit_writer: Optional[RateLimitAuditWriter] = None
+
+
+async def init_audit_writer() -> RateLimitAuditWriter:
+    """Crear y arrancar el writer global."""
+    global _audit_writer
+
+    if _audit_writer is None:
+        _audit_writer = RateLimitAuditWriter(
+            max_queue_size=settings.RATE_LIMIT_AUDIT_QUEUE_SIZE,
+            batch_size=settings.RATE_LIMIT_AUDIT_BATCH_SIZE,
+            flush_interval=settings.RATE_LIMIT_AUDIT_FLUSH_INTERVAL
+        )
+        _audit_writer.start()
+
+    return _audit_writer
+
+
+async def close_audit_writer() -> None:
+    """Escribir los registros pendientes y detener el writer global."""
+    global _audit_writer
+
+    if _audit_writer is not None:
+        await _audit_writer.stop()
+        _audit_writer = None
+
+
+def get_audit_writer() -> Optional[RateLimitAuditWriter]:
+    """Writer global, o None si no se ha inicializado."""
+    return _audit_writer
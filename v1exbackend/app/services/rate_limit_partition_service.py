@@ -0,0 +1,175 @@
+"""
+Rate Limit Partition Service - Particiones diarias de rate_limit_audits.
+
+rate_limit_audits está particionada por rango de timestamp, una partición
+por día (rate_limit_audits_pYYYYMMDD), más una partición DEFAULT
+(rate_limit_audits_default) para los registros de días sin partición.
+Este servicio:
+- Crea por adelantado las particiones de los próximos días, moviendo a cada
+  una los registros de su día que hubieran caído en la DEFAULT
+- Aplica la retención con DROP de particiones completas (sin DELETE)
+
+Las consultas con filtro por timestamp sólo leen las particiones del rango
+(partition pruning).
+"""
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "rate_limit_audits"
+PARTITION_PREFIX = f"{PARENT_TABLE}_p"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+
+# Advisory lock para que varios workers no creen/borren particiones a la vez
+ADVISORY_LOCK_ID = 0x7261746C  # "ratl"
+
+
+def partition_name(day: date) -> str:
+    """Nombre de la partición de un día."""
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def partition_day(name: str) -> Optional[date]:
+    """Día de una partición a partir de su nombre, o None si no es nuestra."""
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    try:
+        return datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+class RateLimitAuditPartitionService:
+    """Creación y retención de particiones de la auditoría."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_partitions(self) -> List[str]:
+        """Particiones existentes de rate_limit_audits, ordenadas."""
+        result = await self.db.execute(text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :parent
+            ORDER BY child.relname
+        """), {"parent": PARENT_TABLE})
+        return [row[0] for row in result.all()]
+
+    async def ensure_partitions(self, days_ahead: int = 7, today: Optional[date] = None) -> List[str]:
+        """
+        Crear las particiones de hoy a hoy + days_ahead que falten.
+
+        Returns:
+            Nombres de las particiones creadas
+        """
+        today = today or datetime.utcnow().date()
+        await self._lock()
+
+        existing = set(await self.list_partitions())
+        missing = [
+            day for day in (today + timedelta(days=offset) for offset in range(days_ahead + 1))
+            if partition_name(day) not in existing
+        ]
+
+        if missing:
+            # Bloquea los INSERT hasta el commit: ningún registro del día puede
+            # caer en la DEFAULT entre que se vacía y el ATTACH. Con las
+            # particiones creadas días antes, la DEFAULT suele estar vacía
+            await self.db.execute(text(f"LOCK TABLE {PARENT_TABLE} IN SHARE ROW EXCLUSIVE MODE"))
+
+        created = []
+        for day in missing:
+            name = partition_name(day)
+            await self._create_partition(name, day)
+            created.append(name)
+
+        await self.db.commit()
+        return created
+
+    async def drop_expired_partitions(self, retention_days: int, today: Optional[date] = None) -> List[str]:
+        """
+        Borrar las particiones con todos sus registros fuera de la retención.
+
+        Una partición del día D se borra cuando D + 1 <= hoy - retention_days,
+        es decir, cuando su registro más reciente ya expiró.
+
+        Returns:
+            Nombres de las particiones borradas
+        """
+        today = today or datetime.utcnow().date()
+        cutoff = today - timedelta(days=retention_days)
+        await self._lock()
+
+        dropped = []
+        for name in await self.list_partitions():
+            day = partition_day(name)
+            if day is None or day + timedelta(days=1) > cutoff:
+                continue
+
+            await self.db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+            dropped.append(name)
+
+        await self.db.commit()
+        return dropped
+
+    async def _create_partition(self, name: str, day: date) -> None:
+        # CREATE ... PARTITION OF falla si la DEFAULT tiene registros del día:
+        # se crea la tabla suelta, se le mueven esos registros y se adjunta,
+        # todo en la transacción de ensure_partitions
+        start, end = day.isoformat(), (day + timedelta(days=1)).isoformat()
+        await self.db.execute(text(
+            f'CREATE TABLE "{name}" (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        ))
+        await self.db.execute(text(
+            f"WITH moved AS ("
+            f"DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE timestamp >= '{start}' AND timestamp < '{end}' RETURNING *"
+            f') INSERT INTO "{name}" SELECT * FROM moved'
+        ))
+        await self.db.execute(text(
+            f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION "{name}" '
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+
+    async def _lock(self) -> None:
+        # Lock de transacción: se libera en el commit
+        await self.db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+
+async def run_partition_maintenance() -> None:
+    """Crear particiones futuras y aplicar la retención."""
+    async with AsyncSessionLocal() as db:
+        service = RateLimitAuditPartitionService(db)
+
+        created = await service.ensure_partitions(settings.RATE_LIMIT_AUDIT_PARTITIONS_AHEAD_DAYS)
+        if created:
+            logger.info(f"Created rate limit audit partitions: {', '.join(created)}")
+
+        dropped = await service.drop_expired_partitions(settings.RATE_LIMIT_AUDIT_RETENTION_DAYS)
+        if dropped:
+            logger.info(f"Dropped expired rate limit audit partitions: {', '.join(dropped)}")
+
+
+async def partition_maintenance_loop(interval_seconds: float = 3600) -> None:
+    """Ejecutar el mantenimiento de particiones periódicamente."""
+    while True:
+        try:
+            await run_partition_maintenance()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Rate limit audit partition maintenance failed: {e}")
+
+        await asyncio.sleep(interval_seconds)
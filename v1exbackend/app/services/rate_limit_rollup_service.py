@@ -0,0 +1,253 @@
+"""
+Rate Limit Rollup Service - Mantenimiento y consulta de los rollups de auditoría.
+
+Cada lote de auditoría se agrega en memoria por (user_id, action, minuto/hora)
+y se suma a las tablas de rollup con un upsert en la misma transacción que
+el INSERT de las filas crudas.
+
+Las consultas sobre ventanas alineadas al minuto leen las horas completas
+del rollup por hora y los bordes del rollup por minuto.
+"""
+
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Select, func, select, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import RateLimitAction, RateLimitRollupHour, RateLimitRollupMinute
+from app.models.rate_limit_rollup import (
+    RESPONSE_TIME_BUCKETS_MS,
+    RESPONSE_TIME_HISTOGRAM_COLUMNS,
+    ROLLUP_COUNTER_COLUMNS,
+)
+
+MINUTE = timedelta(minutes=1)
+HOUR = timedelta(hours=1)
+
+ROLLUP_MODELS = (
+    (RateLimitRollupMinute, MINUTE),
+    (RateLimitRollupHour, HOUR),
+)
+
+RollupKey = Tuple[str, RateLimitAction, datetime]
+
+# Límite de parámetros por sentencia de asyncpg/PostgreSQL
+MAX_BIND_PARAMS = 32767
+
+
+def floor_time(timestamp: datetime, unit: timedelta) -> datetime:
+    """Truncar un timestamp al minuto o a la hora."""
+    if unit == HOUR:
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def ceil_time(timestamp: datetime, unit: timedelta) -> datetime:
+    """Redondear un timestamp hacia arriba al minuto o a la hora."""
+    floored = floor_time(timestamp, unit)
+    return floored if floored == timestamp else floored + unit
+
+
+def default_window(hours: int = 24) -> Tuple[datetime, datetime]:
+    """
+    Ventana [start, end) de las últimas `hours` horas alineada al minuto.
+
+    end es el inicio del minuto siguiente, así que incluye todo lo escrito
+    hasta ahora y la ventana siempre se puede servir desde los rollups.
+    """
+    end = floor_time(datetime.utcnow(), MINUTE) + MINUTE
+    return end - timedelta(hours=hours), end
+
+
+def aggregate_records(
+    records: List[Dict[str, Any]],
+    unit: timedelta
+) -> Dict[RollupKey, Dict[str, Any]]:
+    """Agregar registros de auditoría por (user_id, action, bucket)."""
+    buckets: Dict[RollupKey, Dict[str, Any]] = {}
+
+    for record in records:
+        key = (record["user_id"], record["action"], floor_time(record["timestamp"], unit))
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = dict.fromkeys(ROLLUP_COUNTER_COLUMNS, 0)
+
+        bucket["request_count"] += 1
+        if record["allowed"]:
+            bucket["allowed_count"] += 1
+        else:
+            bucket["blocked_count"] += 1
+        if record.get("alert_triggered"):
+            bucket["alert_count"] += 1
+
+        bucket["openai_tokens"] += record.get("openai_total_tokens") or 0
+        bucket["cost_cents"] += record.get("estimated_cost_cents") or 0
+
+        response_time = record.get("response_time_ms")
+        if response_time and response_time > 0:
+            bucket["response_time_sum_ms"] += response_time
+            bucket["response_time_count"] += 1
+            index = bisect_left(RESPONSE_TIME_BUCKETS_MS, response_time)
+            bucket[RESPONSE_TIME_HISTOGRAM_COLUMNS[index]] += 1
+
+    return buckets
+
+
+class RateLimitRollupService:
+    """Servicio de rollups por minuto y por hora de la auditoría."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def apply(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Sumar un lote de auditoría a los rollups (sin commit).
+
+        Las filas se envían ordenadas por clave para que workers concurrentes
+        bloqueen los mismos buckets en el mismo orden, en upserts de como
+        mucho MAX_BIND_PARAMS parámetros.
+        """
+        if not records:
+            return
+
+        for model, unit in ROLLUP_MODELS:
+            buckets = aggregate_records(records, unit)
+            rows = [
+                {"user_id": user_id, "action": action, "bucket_start": bucket_start, **counters}
+                for (user_id, action, bucket_start), counters in sorted(
+                    buckets.items(), key=lambda item: (item[0][0], item[0][1].value, item[0][2])
+                )
+            ]
+
+            chunk_size = MAX_BIND_PARAMS // len(rows[0])
+            for offset in range(0, len(rows), chunk_size):
+                stmt = pg_insert(model).values(rows[offset:offset + chunk_size])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["user_id", "action", "bucket_start"],
+                    set_={
+                        column: getattr(model, column) + stmt.excluded[column]
+                        for column in ROLLUP_COUNTER_COLUMNS
+                    }
+                )
+                await self.db.execute(stmt)
+
+    @staticmethod
+    def covers(start_date: datetime, end_date: datetime) -> bool:
+        """Si la ventana [start, end) se puede servir desde los rollups."""
+        return (
+            start_date < end_date
+            and floor_time(start_date, MINUTE) == start_date
+            and floor_time(end_date, MINUTE) == end_date
+        )
+
+    def bucket_source(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[str] = None,
+        action: Optional[RateLimitAction] = None
+    ):
+        """
+        Subquery con los buckets que cubren [start, end).
+
+        Horas completas del rollup por hora y minutos sueltos de los bordes
+        del rollup por minuto: como mucho ~120 buckets por minuto más uno
+        por hora, por cada (user_id, action).
+        """
+        first_hour = ceil_time(start_date, HOUR)
+        last_hour = floor_time(end_date, HOUR)
+
+        if first_hour < last_hour:
+            ranges = [
+                (RateLimitRollupMinute, start_date, first_hour),
+                (RateLimitRollupHour, first_hour, last_hour),
+                (RateLimitRollupMinute, last_hour, end_date),
+            ]
+        else:
+            ranges = [(RateLimitRollupMinute, start_date, end_date)]
+
+        parts = []
+        for model, range_start, range_end in ranges:
+            if range_start >= range_end:
+                continue
+
+            part = select(
+                model.user_id,
+                model.action,
+                *[getattr(model, column) for column in ROLLUP_COUNTER_COLUMNS]
+            ).where(
+                model.bucket_start >= range_start,
+                model.bucket_start < range_end
+            )
+            if user_id:
+                part = part.where(model.user_id == user_id)
+            if action:
+                part = part.where(model.action == action)
+            parts.append(part)
+
+        if len(parts) == 1:
+            return parts[0].subquery()
+        return union_all(*parts).subquery()
+
+    def statistics_query(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[str] = None
+    ) -> Select:
+        """
+        Misma forma de fila que la consulta de estadísticas sobre la tabla cruda:
+        (action, total, allowed, tokens, cost_cents, alerts, response_time_sum,
+        response_time_count, unique_users, grouping, *histograma).
+        """
+        buckets = self.bucket_source(start_date, end_date, user_id=user_id)
+
+        return select(
+            buckets.c.action,
+            func.coalesce(func.sum(buckets.c.request_count), 0),
+            func.coalesce(func.sum(buckets.c.allowed_count), 0),
+            func.coalesce(func.sum(buckets.c.openai_tokens), 0),
+            func.coalesce(func.sum(buckets.c.cost_cents), 0),
+            func.coalesce(func.sum(buckets.c.alert_count), 0),
+            func.coalesce(func.sum(buckets.c.response_time_sum_ms), 0),
+            func.coalesce(func.sum(buckets.c.response_time_count), 0),
+            func.count(buckets.c.user_id.distinct()),
+            func.grouping(buckets.c.action),
+            *[
+                func.coalesce(func.sum(buckets.c[column]), 0)
+                for column in RESPONSE_TIME_HISTOGRAM_COLUMNS
+            ]
+        ).group_by(func.rollup(buckets.c.action))
+
+    async def get_top_consumers(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        action: Optional[RateLimitAction] = None,
+        limit: int = 10
+    ) -> list[Dict[str, Any]]:
+        """Usuarios con mayor número de requests en la ventana."""
+        buckets = self.bucket_source(start_date, end_date, action=action)
+        request_count = func.sum(buckets.c.request_count)
+
+        query = select(
+            buckets.c.user_id,
+            request_count,
+            func.sum(buckets.c.openai_tokens),
+            func.sum(buckets.c.cost_cents)
+        ).group_by(buckets.c.user_id).order_by(request_count.desc()).limit(limit)
+
+        result = await self.db.execute(query)
+
+        return [
+            {
+                "user_id": row[0],
+                "request_count": int(row[1]),
+                "total_tokens": int(row[2] or 0),
+                "total_cost_usd": (row[3] or 0) / 100
+            }
+            for row in result.all()
+        ]
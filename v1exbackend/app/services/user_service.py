@@ -9,10 +9,12 @@ from typing import Optional
 from datetime import datetime
 import uuid
 import hashlib
+import hmac
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.password_hasher import get_password_hasher
 from app.models import User
 from app.schemas.user_schemas import UserCreate, UserUpdate
 
@@ -23,9 +25,16 @@ class UserService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    def _hash_password(self, password: str) -> str:
-        """Hash password using SHA256."""
-        return hashlib.sha256(password.encode()).hexdigest()
+    async def _hash_password(self, password: str) -> str:
+        """Hash password with bcrypt (in the password hasher executor)."""
+        return await get_password_hasher().hash(password)
+
+    async def _check_password(self, password: str, hashed_password: str) -> bool:
+        """Check a password against a bcrypt hash or a legacy SHA256 hex digest."""
+        if not hashed_password.startswith("$2"):
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(legacy, hashed_password)
+        return await get_password_hasher().verify(password, hashed_password)
 
     async def create_user(self, user_data: UserCreate) -> User:
         """
@@ -44,7 +53,7 @@ class UserService:
             email=user_data.email,
             username=user_data.username,
             full_name=user_data.full_name,
-            hashed_password=self._hash_password(user_data.password),
+            hashed_password=await self._hash_password(user_data.password),
             is_active=True,
             preferences=user_data.preferences or {},
             metadata=user_data.metadata or {}
@@ -91,7 +100,7 @@ class UserService:
 
         # Hash password if being updated
         if "password" in update_data:
-            update_data["hashed_password"] = self._hash_password(update_data.pop("password"))
+            update_data["hashed_password"] = await self._hash_password(update_data.pop("password"))
 
         for field, value in update_data.items():
             setattr(user, field, value)
@@ -113,7 +122,7 @@ class UserService:
         if not user:
             return False
 
-        return user.hashed_password == self._hash_password(password)
+        return await self._check_password(password, user.hashed_password)
 
     async def update_last_login(self, user_id: str) -> Optional[User]:
         """Update user's last login timestamp."""
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark del coste de autenticación por request: jwt.decode + EXISTS en
+Redis (ruta anterior) vs caché de claims + Bloom filter local.
+
+Mide µs por request de:
+- verificación del token (decode_token sin caché vs con caché)
+- comprobación de blacklist (EXISTS por request vs filtro local)
+- get_current_user_id completo
+
+contra un Redis local (argumento REDIS_URL) o fakeredis si no se pasa URL.
+
+Uso:
+    python scripts/benchmark_auth.py                       # fakeredis
+    python scripts/benchmark_auth.py redis://localhost:6379/15
+"""
+
+import asyncio
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import redis.asyncio as redis
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core import security  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.redis_client import BLACKLIST_KEY_PREFIX  # noqa: E402
+from app.core.security import create_access_token, decode_token, get_current_user_id  # noqa: E402
+from app.core.token_blacklist import TokenBlacklist  # noqa: E402
+
+N_REQUESTS = 20_000
+N_TOKENS = 500
+N_REVOKED = 10_000
+
+
+def legacy_decode(token: str) -> dict:
+    """Ruta anterior: HMAC + JSON + claims en cada request."""
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+def report(name: str, elapsed: float) -> float:
+    per_request = elapsed / N_REQUESTS * 1_000_000
+    print(f"{name:<40}{per_request:>10.2f} µs")
+    return per_request
+
+
+async def main() -> None:
+    if len(sys.argv) > 1:
+        client = redis.from_url(sys.argv[1], decode_responses=True)
+    else:
+        import fakeredis.aioredis
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+    tokens = [
+        create_access_token({"sub": f"bench-user-{i}"}, expires_delta=timedelta(minutes=30))
+        for i in range(N_TOKENS)
+    ]
+
+    # Tokens revocados (otros) para que el filtro tenga contenido realista
+    async with client.pipeline(transaction=False) as pipe:
+        for i in range(N_REVOKED):
+            pipe.setex(f"{BLACKLIST_KEY_PREFIX}bench-revoked-{i}", 600, "1")
+        await pipe.execute()
+
+    blacklist = TokenBlacklist(client, capacity=max(N_REVOKED * 2, 100_000))
+    await blacklist.rebuild()
+
+    print(f"Requests: {N_REQUESTS}, tokens distintos: {N_TOKENS}, revocados: {N_REVOKED}\n")
+
+    # Verificación del token
+    start = time.perf_counter()
+    for i in range(N_REQUESTS):
+        legacy_decode(tokens[i % N_TOKENS])
+    decode_legacy = report("jwt.decode (anterior)", time.perf_counter() - start)
+
+    security._claims_cache.clear()
+    for token in tokens:
+        decode_token(token)
+    start = time.perf_counter()
+    for i in range(N_REQUESTS):
+        decode_token(tokens[i % N_TOKENS])
+    decode_cached = report("decode_token con caché", time.perf_counter() - start)
+
+    # Blacklist
+    start = time.perf_counter()
+    for i in range(N_REQUESTS):
+        await client.exists(f"{BLACKLIST_KEY_PREFIX}{tokens[i % N_TOKENS]}")
+    blacklist_legacy = report("EXISTS blacklist (anterior)", time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(N_REQUESTS):
+        await blacklist.is_blacklisted(tokens[i % N_TOKENS])
+    blacklist_bloom = report("Bloom filter local", time.perf_counter() - start)
+
+    # Dependency completa
+    credentials = [HTTPAuthorizationCredentials(scheme="Bearer", credentials=token) for token in tokens]
+    start = time.perf_counter()
+    for i in range(N_REQUESTS):
+        await get_current_user_id(credentials[i % N_TOKENS])
+    report("get_current_user_id con caché", time.perf_counter() - start)
+
+    print(f"\nVerificación: {decode_legacy / decode_cached:.1f}x, "
+          f"blacklist: {blacklist_legacy / blacklist_bloom:.1f}x "
+          f"({blacklist.redis_checks} consultas a Redis por falsos positivos)")
+
+    keys = [key async for key in client.scan_iter(match=f"{BLACKLIST_KEY_PREFIX}bench-revoked-*")]
+    if keys:
+        await client.delete(*keys)
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
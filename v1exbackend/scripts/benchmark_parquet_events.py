@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ingesta de eventos a Parquet: leer-concatenar-reescribir el
+archivo del día por evento (implementación anterior) vs el sink que escribe
+cada lote del relay del outbox como partes nuevas por (categoría, día).
+
+Los eventos se reparten entre goal, task y user en un mismo día (el peor
+caso para la implementación anterior: todos caen en tres archivos).
+
+La implementación anterior es O(eventos del día) por evento, así que con
+100k eventos tardaría horas: se mide con --legacy-events eventos y se
+extrapola el total con un ajuste cuadrático (t(n) = a·n + b·n²).
+
+Uso:
+    python scripts/benchmark_parquet_events.py
+    python scripts/benchmark_parquet_events.py --events 100000 --legacy-events 3000 --batch-size 500
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import app.agents  # noqa: E402,F401  evita el import circular app.services <-> app.agents
+from app.schemas.parquet_schemas import get_parquet_path, get_schema_for_event_type  # noqa: E402
+from app.services.parquet_event_sink import ParquetEventSink, compact_partitions  # noqa: E402
+
+DAY = datetime(2024, 1, 15, 10, 30)
+EVENT_TYPES = ("goal.updated", "task.updated", "user.login")
+
+
+def make_event(n: int) -> tuple[str, dict]:
+    event_type = EVENT_TYPES[n % len(EVENT_TYPES)]
+    return event_type, {
+        "event_id": str(uuid.uuid4()),
+        "user_id": f"user-{n % 500}",
+        "goal_id": f"goal-{n % 2000}",
+        "task_id": f"task-{n}",
+        "action": "login",
+        "event_type": event_type,
+        "status": "in_progress",
+        "progress_percentage": float(n % 100),
+        "created_at": DAY,
+        "year": DAY.year,
+        "month": DAY.month,
+        "day": DAY.day,
+    }
+
+
+def save_legacy(base_path: str, event_type: str, record: dict) -> None:
+    """Copia de EventService._save_to_parquet antes del sink."""
+    parquet_path = get_parquet_path(event_type=event_type, timestamp=DAY, base_path=base_path)
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+
+    schema = get_schema_for_event_type(event_type)
+    table = pa.Table.from_pylist([record], schema=schema)
+
+    if os.path.exists(parquet_path):
+        existing_table = pq.read_table(parquet_path)
+        combined_table = pa.concat_tables([existing_table, table])
+        pq.write_table(combined_table, parquet_path)
+    else:
+        pq.write_table(table, parquet_path)
+
+
+def count_rows(base_path: str) -> int:
+    return sum(pq.read_metadata(path).num_rows for path in Path(base_path).rglob("*.parquet"))
+
+
+def fit_quadratic(samples: list[tuple[int, float]]) -> tuple[float, float]:
+    """Mínimos cuadrados de t(n) = a·n + b·n² sobre (n, t acumulado)."""
+    s11 = sum(n * n for n, _ in samples)
+    s12 = sum(n ** 3 for n, _ in samples)
+    s22 = sum(n ** 4 for n, _ in samples)
+    t1 = sum(n * t for n, t in samples)
+    t2 = sum(n * n * t for n, t in samples)
+    det = s11 * s22 - s12 * s12
+    return (t1 * s22 - t2 * s12) / det, (s11 * t2 - s12 * t1) / det
+
+
+def run_legacy(base_path: str, events: int, target: int) -> None:
+    per_event = []
+    samples = []
+    start = time.perf_counter()
+
+    for n in range(events):
+        event_type, record = make_event(n)
+        t0 = time.perf_counter()
+        save_legacy(base_path, event_type, record)
+        per_event.append(time.perf_counter() - t0)
+        if (n + 1) % max(1, events // 20) == 0:
+            samples.append((n + 1, time.perf_counter() - start))
+
+    elapsed = time.perf_counter() - start
+    a, b = fit_quadratic(samples)
+    projected = a * target + b * target * target
+
+    print(f"\nLeer-concatenar-reescribir ({events} eventos medidos)")
+    print(f"  tiempo:             {elapsed:.2f} s ({events / elapsed:,.0f} eventos/s)")
+    print(f"  primer/último 10%:  {statistics.mean(per_event[:events // 10]) * 1000:.2f} / "
+          f"{statistics.mean(per_event[-events // 10:]) * 1000:.2f} ms por evento")
+    print(f"  filas escritas:     {count_rows(base_path)}")
+    print(f"  estimado {target:,}:  {projected:,.0f} s ({projected / 3600:.1f} h)")
+
+
+async def run_sink(base_path: str, events: int, batch_size: int) -> None:
+    sink = ParquetEventSink(base_path=base_path, max_rows=10_000)
+
+    # Medir también cuánto se bloquea el event loop mientras el sink escribe
+    lags = []
+    stop = asyncio.Event()
+
+    async def probe() -> None:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - t0 - 0.001)
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+
+    # Lotes del tamaño de los que reclama el relay al cerrar una ventana
+    for offset in range(0, events, batch_size):
+        batch = [make_event(n) for n in range(offset, min(events, offset + batch_size))]
+        await sink.write([(event_type, DAY, record) for event_type, record in batch])
+
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+
+    metrics = sink.metrics()
+    parts = len(list(Path(base_path).rglob("part-*.parquet")))
+
+    t0 = time.perf_counter()
+    compacted = compact_partitions(base_path)
+    compaction = time.perf_counter() - t0
+
+    lags.sort()
+    print(f"\nSink por lotes de {batch_size} ({events:,} eventos)")
+    print(f"  tiempo:             {elapsed:.2f} s ({events / elapsed:,.0f} eventos/s)")
+    print(f"  partes escritas:    {parts} (rejected={metrics['rejected']}, failed={metrics['failed']})")
+    print(f"  filas escritas:     {count_rows(base_path):,}")
+    print(f"  lag del loop:       p50 {lags[len(lags) // 2] * 1000:.2f} ms, "
+          f"p99 {lags[int(len(lags) * 0.99)] * 1000:.2f} ms")
+    print(f"  compactación:       {len(compacted)} particiones, "
+          f"{sum(compacted.values())} partes en {compaction:.2f} s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--legacy-events", type=int, default=3_000)
+    parser.add_argument("--batch-size", type=int, default=500, help="OUTBOX_BATCH_SIZE")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as legacy_dir:
+        run_legacy(legacy_dir, min(args.legacy_events, args.events), args.events)
+
+    with tempfile.TemporaryDirectory() as sink_dir:
+        asyncio.run(run_sink(sink_dir, args.events, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
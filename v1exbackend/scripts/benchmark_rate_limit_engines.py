@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los engines de rate limiting (token_bucket, gcra, sliding_window).
+
+Para cada engine reporta:
+- Memoria de Redis por cada 100k buckets activos (INFO memory, requiere Redis real)
+- Keys por bucket
+- Decisiones/seg (una llamada por decisión y en pipeline)
+
+Uso:
+    python scripts/benchmark_rate_limit_engines.py --redis-url redis://localhost:6379/15
+    python scripts/benchmark_rate_limit_engines.py --buckets 10000   # fakeredis
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import redis.asyncio as redis
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.rate_limiter import RateLimitConfig, RateLimiter  # noqa: E402
+
+BATCH_SIZE = 1_000
+N_DECISIONS = 10_000
+
+
+async def used_memory(client: redis.Redis) -> int | None:
+    """used_memory de Redis, o None si el servidor no soporta INFO (fakeredis)."""
+    try:
+        return int((await client.info("memory"))["used_memory"])
+    except Exception:
+        return None
+
+
+async def bench_engine(client: redis.Redis, limiter: RateLimiter, name: str, n_buckets: int) -> None:
+    engine = limiter.engines[name]
+    config = RateLimitConfig(
+        max_requests=100, window_seconds=60, burst_multiplier=1.5, algorithm=name
+    )
+    keys = [f"bench:user{i}:api_call" for i in range(n_buckets)]
+
+    await client.flushdb()
+    memory_before = await used_memory(client)
+
+    # Crear n_buckets buckets activos con pipelines de BATCH_SIZE decisiones.
+    # Se consumen 50 tokens por bucket para que el estado siga vivo durante
+    # la medición (GCRA expira la key en cuanto el bucket vuelve a llenarse).
+    start = time.perf_counter()
+    for i in range(0, n_buckets, BATCH_SIZE):
+        await engine.consume_many([(key, 50, config) for key in keys[i:i + BATCH_SIZE]])
+    pipelined_rate = n_buckets / (time.perf_counter() - start)
+
+    memory_after = await used_memory(client)
+    n_keys = await client.dbsize()
+
+    # Decisiones individuales (un round-trip cada una) sobre buckets existentes
+    start = time.perf_counter()
+    for i in range(N_DECISIONS):
+        await engine.consume(keys[i % n_buckets], 1, config)
+    single_rate = N_DECISIONS / (time.perf_counter() - start)
+
+    if memory_before is not None and memory_after is not None:
+        per_100k = (memory_after - memory_before) * 100_000 / n_buckets
+        memory = f"{per_100k / 1024 / 1024:>8.2f} MB/100k"
+    else:
+        memory = "     n/a (requiere Redis real)"
+
+    print(
+        f"{name:<15} {memory}   {n_keys / n_buckets:.2f} keys/bucket"
+        f"   {single_rate:>9,.0f} dec/s   {pipelined_rate:>9,.0f} dec/s (pipeline)"
+    )
+
+
+def make_client(redis_url: str | None) -> redis.Redis:
+    if redis_url:
+        return redis.from_url(redis_url, decode_responses=True)
+
+    try:
+        import fakeredis
+    except ImportError:
+        print("❌ Instala fakeredis[lua] o pasa --redis-url")
+        sys.exit(1)
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+async def main(redis_url: str | None, n_buckets: int) -> None:
+    client = make_client(redis_url)
+    limiter = RateLimiter(client)
+
+    print(f"🏁 {n_buckets:,} buckets activos por engine\n")
+    for name in limiter.engines:
+        await bench_engine(client, limiter, name, n_buckets)
+
+    await client.flushdb()
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", default=None, help="Redis dedicado (se hace FLUSHDB)")
+    parser.add_argument("--buckets", type=int, default=100_000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.redis_url, args.buckets))
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Benchmark del RateLimitMiddleware: BaseHTTPMiddleware (ruta anterior) vs
+middleware ASGI puro.
+
+Monta una app FastAPI mínima con el middleware y mide requests/seg con un
+cliente ASGI en proceso (httpx.ASGITransport), sin red ni servidor. Por
+defecto el rate limiter siempre permite con una respuesta fija para medir
+sólo el overhead del middleware; con --fakeredis usa el RateLimiter real
+sobre fakeredis. La auditoría se encola en un writer cuyo flush no hace nada.
+
+Uso:
+    python scripts/benchmark_rate_limit_middleware.py
+    python scripts/benchmark_rate_limit_middleware.py --requests 20000 --concurrency 50
+    python scripts/benchmark_rate_limit_middleware.py --fakeredis
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import app.agents  # noqa: E402,F401  evita el import circular app.services <-> app.agents
+from app.core.rate_limiter import RateLimiter, RateLimitResult  # noqa: E402
+from app.middleware import rate_limit_middleware  # noqa: E402
+from app.middleware.rate_limit_middleware import RateLimitMiddleware  # noqa: E402
+from app.services import rate_limit_audit_writer  # noqa: E402
+from app.services.rate_limit_audit_service import RateLimitAuditService  # noqa: E402
+from app.services.rate_limit_audit_writer import RateLimitAuditWriter  # noqa: E402
+
+N_REQUESTS = 10_000
+CONCURRENCY = 20
+PATHS = ["/api/v1/goals", "/api/v1/tasks/123", "/api/v1/code-snapshots", "/health"]
+
+ALLOWED = RateLimitResult(
+    allowed=True,
+    tokens_available=99,
+    tokens_requested=1,
+    tokens_consumed=1,
+    limit_key="rate_limit:bench:api_call",
+    window_seconds=60,
+    max_requests=100,
+    current_count=1,
+)
+
+
+class StaticRateLimiter:
+    """Rate limiter que siempre permite, sin Redis."""
+
+    async def check_limit(self, user_id: str, action: str, tokens: int = 1) -> RateLimitResult:
+        return ALLOWED
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    """Copia de la ruta anterior (BaseHTTPMiddleware + startswith por request)."""
+
+    def __init__(self, app, enabled: bool = True):
+        super().__init__(app)
+        self.enabled = enabled
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        if not self.enabled:
+            return await call_next(request)
+
+        if any(request.url.path.startswith(path) for path in RateLimitMiddleware.EXCLUDED_PATHS):
+            return await call_next(request)
+
+        user_id = request.headers.get("X-User-ID", "anonymous")
+        if user_id == "anonymous":
+            user_id = "test-user-123"
+
+        action = rate_limit_middleware.RateLimitAction.api_call
+        for pattern, mapped in RateLimitMiddleware.ACTION_MAPPING.items():
+            if request.url.path.startswith(pattern):
+                action = mapped
+                break
+
+        rate_limiter = await rate_limit_middleware.get_rate_limiter()
+        start_time = time.time()
+        result = await rate_limiter.check_limit(user_id=user_id, action=action.value, tokens=1)
+
+        response = await call_next(request)
+
+        writer = rate_limit_audit_writer.get_audit_writer()
+        if writer is not None:
+            writer.submit(RateLimitAuditService.build_record(
+                user_id=user_id,
+                endpoint=str(request.url.path),
+                method=request.method,
+                action=action,
+                rate_limit_result=result,
+                response_time_ms=(time.time() - start_time) * 1000,
+                http_status_code=response.status_code,
+                ip_address=request.client.host if request.client else None,
+                user_agent=request.headers.get("user-agent"),
+                metadata={
+                    "query_params": dict(request.query_params),
+                    "path_params": dict(request.path_params)
+                }
+            ))
+
+        response.headers["X-RateLimit-Limit"] = str(result.max_requests)
+        response.headers["X-RateLimit-Remaining"] = str(result.tokens_available)
+        response.headers["X-RateLimit-Reset"] = str(int(time.time() + result.window_seconds))
+        return response
+
+
+def build_app(middleware_class) -> FastAPI:
+    """App mínima con rutas triviales detrás del middleware."""
+    bench_app = FastAPI()
+
+    @bench_app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @bench_app.get("/api/v1/goals")
+    async def goals():
+        return {"goals": []}
+
+    @bench_app.get("/api/v1/tasks/{task_id}")
+    async def task(task_id: str):
+        return {"id": task_id}
+
+    @bench_app.get("/api/v1/code-snapshots")
+    async def snapshots():
+        return {"snapshots": []}
+
+    bench_app.add_middleware(middleware_class, enabled=True)
+    return bench_app
+
+
+async def run(bench_app: FastAPI, n_requests: int, concurrency: int) -> float:
+    """Requests/seg con `concurrency` clientes en paralelo."""
+    transport = httpx.ASGITransport(app=bench_app)
+    per_worker = n_requests // concurrency
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(worker_id: int) -> None:
+            headers = {"X-User-ID": f"bench-user-{worker_id}"}
+            for i in range(per_worker):
+                response = await client.get(PATHS[i % len(PATHS)], headers=headers)
+                assert response.status_code == 200, response.status_code
+
+        # Calentamiento (compilación de rutas, primeros imports)
+        await worker(-1)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    return per_worker * concurrency / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=N_REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--fakeredis", action="store_true", help="RateLimiter real sobre fakeredis")
+    args = parser.parse_args()
+
+    if args.fakeredis:
+        import fakeredis.aioredis
+        limiter = RateLimiter(fakeredis.aioredis.FakeRedis())
+        # Límite alto para que ningún request del benchmark devuelva 429
+        for config in limiter.configs.values():
+            config.max_requests = 10_000_000
+    else:
+        limiter = StaticRateLimiter()
+
+    async def get_limiter():
+        return limiter
+
+    rate_limit_middleware.get_rate_limiter = get_limiter
+
+    async def discard(batch):
+        return None
+
+    writer = RateLimitAuditWriter(max_queue_size=100_000, flush_batch=discard)
+    writer.start()
+    rate_limit_audit_writer._writer = writer
+
+    print(f"Requests: {args.requests}, concurrencia: {args.concurrency}, "
+          f"limiter: {'fakeredis' if args.fakeredis else 'estático'}")
+    print(f"{'Middleware':<25}{'req/s':>12}")
+
+    results = {}
+    for name, middleware_class in (
+        ("BaseHTTPMiddleware", LegacyRateLimitMiddleware),
+        ("ASGI puro", RateLimitMiddleware),
+    ):
+        results[name] = await run(build_app(middleware_class), args.requests, args.concurrency)
+        print(f"{name:<25}{results[name]:>12,.0f}")
+
+    print(f"\nSpeedup: {results['ASGI puro'] / results['BaseHTTPMiddleware']:.2f}x")
+
+    await writer.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
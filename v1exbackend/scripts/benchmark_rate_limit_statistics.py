@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las estadísticas de rate limits: carga de filas ORM + loops en
+Python (ruta anterior) vs agregados GROUP BY/FILTER en PostgreSQL.
+
+Siembra N filas de auditoría (1M por defecto) repartidas en las últimas 24h
+con INSERT ... SELECT generate_series, mide ambas rutas para las estadísticas
+globales y de un usuario, comprueba que den lo mismo y borra las filas.
+
+Requiere PostgreSQL con las migraciones aplicadas (DATABASE_URL de .env).
+
+Uso:
+    python scripts/benchmark_rate_limit_statistics.py
+    python scripts/benchmark_rate_limit_statistics.py --rows 200000 --keep
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import app.agents  # noqa: E402,F401  evita el import circular app.services <-> app.agents
+from app.core.config import settings  # noqa: E402
+from app.models import RateLimitAction, RateLimitAudit  # noqa: E402
+from app.services.rate_limit_audit_service import RateLimitAuditService  # noqa: E402
+
+BENCH_KEY = "bench:statistics"
+N_USERS = 1_000
+
+SEED_SQL = """
+INSERT INTO rate_limit_audits (
+    id, user_id, endpoint, method, action, status, allowed,
+    tokens_requested, tokens_available, tokens_consumed,
+    openai_total_tokens, estimated_cost_cents, response_time_ms, http_status_code,
+    rate_limit_key, rate_limit_window_seconds, rate_limit_max_requests,
+    current_request_count, is_suspicious, alert_triggered, audit_metadata, timestamp
+)
+SELECT
+    md5(CAST(:run AS text) || i::text),
+    'bench-user-' || (i % CAST(:users AS integer)),
+    '/api/v1/goals',
+    'GET',
+    (enum_range(NULL::ratelimitaction))[1 + i % 8],
+    CASE WHEN i % 15 = 0 THEN 'rate_limited'::ratelimitstatus ELSE 'allowed'::ratelimitstatus END,
+    i % 15 <> 0,
+    1, 50, CASE WHEN i % 15 = 0 THEN 0 ELSE 1 END,
+    CASE WHEN i % 4 = 0 THEN 100 + i % 900 END,
+    CASE WHEN i % 4 = 0 THEN (i % 900) / 100.0 END,
+    CASE WHEN i % 10 = 0 THEN NULL ELSE 5 + i % 200 END,
+    CASE WHEN i % 15 = 0 THEN 429 ELSE 200 END,
+    :key, 60, 100, 1,
+    i % 500 = 0, i % 500 = 0,
+    '{}'::jsonb,
+    now() AT TIME ZONE 'utc' - (i % 86000) * interval '1 second'
+FROM generate_series(1, CAST(:rows AS integer)) AS i
+"""
+
+
+async def legacy_global_statistics(db: AsyncSession, start_date: datetime, end_date: datetime) -> dict:
+    """Ruta anterior: todas las filas a objetos ORM y loops por acción."""
+    result = await db.execute(select(RateLimitAudit).where(
+        RateLimitAudit.timestamp >= start_date,
+        RateLimitAudit.timestamp <= end_date
+    ))
+    audits = result.scalars().all()
+
+    total_requests = len(audits)
+    allowed_requests = sum(1 for a in audits if a.allowed)
+
+    by_action = {}
+    for action in RateLimitAction:
+        action_audits = [a for a in audits if a.action == action]
+        if action_audits:
+            by_action[action.value] = {
+                "total": len(action_audits),
+                "allowed": sum(1 for a in action_audits if a.allowed),
+                "blocked": sum(1 for a in action_audits if not a.allowed)
+            }
+
+    return {
+        "total": total_requests,
+        "allowed": allowed_requests,
+        "by_action": by_action,
+        "total_tokens": sum(a.openai_total_tokens or 0 for a in audits),
+        "unique_users": len(set(a.user_id for a in audits)),
+        "alerts": sum(1 for a in audits if a.alert_triggered),
+    }
+
+
+async def timed(label: str, coro):
+    start = time.perf_counter()
+    result = await coro
+    print(f"{label:<32} {time.perf_counter() - start:>8.3f} s")
+    return result
+
+
+async def main(n_rows: int, keep: bool) -> None:
+    engine = create_async_engine(settings.DATABASE_URL)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with session_factory() as db:
+        print(f"🌱 Sembrando {n_rows:,} filas de auditoría...")
+        start = time.perf_counter()
+        await db.execute(text(SEED_SQL), {
+            "run": str(time.time()), "users": N_USERS, "rows": n_rows, "key": BENCH_KEY
+        })
+        await db.commit()
+        await db.execute(text("ANALYZE rate_limit_audits"))
+        print(f"   {time.perf_counter() - start:.1f} s\n")
+
+        end_date = datetime.utcnow() + timedelta(minutes=1)
+        start_date = end_date - timedelta(hours=24, minutes=2)
+        service = RateLimitAuditService(db)
+
+        try:
+            print("🌍 Estadísticas globales")
+            legacy = await timed("  legacy (ORM + loops)", legacy_global_statistics(db, start_date, end_date))
+            db.expunge_all()
+            stats = await timed("  GROUP BY/FILTER", service.get_global_statistics(start_date, end_date))
+
+            assert stats["requests"]["total"] == legacy["total"]
+            assert stats["requests"]["allowed"] == legacy["allowed"]
+            assert stats["by_action"] == legacy["by_action"]
+            assert stats["openai"]["total_tokens"] == legacy["total_tokens"]
+            assert stats["users"]["unique_users"] == legacy["unique_users"]
+            assert stats["alerts"]["total"] == legacy["alerts"]
+            print("  ✓ mismos resultados\n")
+
+            print("👤 Estadísticas de un usuario")
+            await timed("  GROUP BY/FILTER", service.get_user_statistics("bench-user-7", start_date, end_date))
+        finally:
+            if not keep:
+                await db.execute(delete(RateLimitAudit).where(RateLimitAudit.rate_limit_key == BENCH_KEY))
+                await db.commit()
+                print("\n🧹 Filas del benchmark eliminadas")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--keep", action="store_true", help="No borrar las filas sembradas")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.keep))
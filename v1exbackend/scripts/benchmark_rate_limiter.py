@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark del rate limiter: EVAL + INCR/EXPIRE (ruta anterior) vs EVALSHA.
+
+Mide decisiones/seg y comandos Redis por decisión contra un Redis local
+(argumento REDIS_URL) o contra fakeredis si no se pasa URL.
+
+Uso:
+    python scripts/benchmark_rate_limiter.py                       # fakeredis
+    python scripts/benchmark_rate_limiter.py redis://localhost:6379/15
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import redis.asyncio as redis
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.rate_limiter import RateLimitConfig, TokenBucket  # noqa: E402
+
+N_DECISIONS = 20_000
+N_USERS = 200
+
+# Script original: sólo el bucket, el contador iba en comandos aparte
+LEGACY_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local tokens_to_consume = tonumber(ARGV[2])
+local max_capacity = tonumber(ARGV[3])
+local refill_rate = tonumber(ARGV[4])
+local ttl = tonumber(ARGV[5])
+local bucket = redis.call('HMGET', key, 'tokens', 'last_refill')
+local current_tokens = tonumber(bucket[1]) or max_capacity
+local last_refill = tonumber(bucket[2]) or now
+current_tokens = math.min(max_capacity, current_tokens + (now - last_refill) * refill_rate)
+if current_tokens >= tokens_to_consume then
+    current_tokens = current_tokens - tokens_to_consume
+    redis.call('HSET', key, 'tokens', current_tokens, 'last_refill', now)
+    redis.call('EXPIRE', key, ttl)
+    return {1, current_tokens, tokens_to_consume}
+else
+    return {0, current_tokens, 0, (tokens_to_consume - current_tokens) / refill_rate}
+end
+"""
+
+
+class CommandCounter:
+    """Cuenta los comandos enviados a Redis por un cliente."""
+
+    def __init__(self, client: redis.Redis):
+        self.count = 0
+        original = client.execute_command
+
+        async def counted(*args, **kwargs):
+            self.count += 1
+            return await original(*args, **kwargs)
+
+        client.execute_command = counted
+
+
+async def legacy_consume(client: redis.Redis, key: str, config: RateLimitConfig) -> bool:
+    """Ruta anterior: EVAL con el código completo + INCR/EXPIRE o GET."""
+    max_capacity = int(config.max_requests * config.burst_multiplier)
+    refill_rate = config.max_requests / config.window_seconds
+    result = await client.eval(
+        LEGACY_SCRIPT, 1, key, time.time(), 1, max_capacity, refill_rate,
+        config.window_seconds * 2
+    )
+    count_key = f"{key}:count"
+    if result[0]:
+        await client.incr(count_key)
+        await client.expire(count_key, config.window_seconds)
+    else:
+        await client.get(count_key)
+    return bool(result[0])
+
+
+async def run(label: str, client: redis.Redis, consume) -> None:
+    counter = CommandCounter(client)
+    config = RateLimitConfig(max_requests=100, window_seconds=60, burst_multiplier=1.5)
+
+    start = time.perf_counter()
+    for i in range(N_DECISIONS):
+        await consume(f"bench:{label}:user{i % N_USERS}:api_call", config)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{label:<10} {N_DECISIONS / elapsed:>12,.0f} decisiones/s"
+        f"   {counter.count / N_DECISIONS:.2f} comandos/decisión"
+    )
+
+
+def make_client(redis_url: str | None) -> redis.Redis:
+    if redis_url:
+        return redis.from_url(redis_url, decode_responses=True)
+
+    try:
+        import fakeredis
+    except ImportError:
+        print("❌ Instala fakeredis[lua] o pasa una REDIS_URL")
+        sys.exit(1)
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+async def main(redis_url: str | None) -> None:
+    client = make_client(redis_url)
+    await client.flushdb()
+
+    print(f"🏁 {N_DECISIONS:,} decisiones sobre {N_USERS} buckets\n")
+
+    await run("legacy", client, lambda key, config: legacy_consume(client, key, config))
+
+    bucket = TokenBucket(client)
+    await run("evalsha", client, lambda key, config: bucket.consume(key, 1, config))
+
+    await client.flushdb()
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark de broadcast WebSocket a 10k sockets en memoria: envío secuencial
+(to_json por destinatario y await de cada send_text) vs serializar una vez y
+encolar en la cola de salida de cada conexión (un writer por socket).
+
+Un 1% de los sockets son lentos (cada send_text tarda SLOW_SEND_DELAY). Se
+mide el tiempo desde el inicio del broadcast hasta que cada socket recibe el
+mensaje, y se reportan p50/p99 sobre todos los envíos.
+
+Redis se sustituye por un mock: solo se mide la entrega local.
+
+Uso:
+    python scripts/benchmark_ws_broadcast.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.websocket import ConnectionManager, WebSocketMessage  # noqa: E402
+
+N_SOCKETS = 10_000
+SLOW_EVERY = 100  # 1 de cada 100 sockets es lento
+SLOW_SEND_DELAY = 0.05
+N_BROADCASTS = 10
+
+
+class FakeWebSocket:
+    """WebSocket en memoria que registra cuándo recibe cada mensaje."""
+
+    def __init__(self, latencies: list, started: dict, slow: bool):
+        self.latencies = latencies
+        self.started = started
+        self.slow = slow
+
+    async def accept(self) -> None:
+        pass
+
+    async def close(self, code: int = 1000) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        if self.slow:
+            await asyncio.sleep(SLOW_SEND_DELAY)
+        else:
+            await asyncio.sleep(0)
+        self.latencies.append(time.perf_counter() - self.started["at"])
+
+
+async def legacy_broadcast(manager: ConnectionManager, message: WebSocketMessage) -> None:
+    """Broadcast anterior: un to_json y un await por conexión, en serie."""
+    for connection_id in list(manager.active_connections.keys()):
+        websocket = manager.active_connections.get(connection_id)
+        if websocket:
+            await websocket.send_text(message.to_json())
+
+
+async def run_mode(name: str, broadcast) -> None:
+    manager = ConnectionManager()
+    manager._redis = MagicMock()
+    manager._redis.add_ws_connection = AsyncMock()
+    manager._redis.remove_ws_connection = AsyncMock()
+    manager._redis.get_user_connections = AsyncMock(return_value=[])
+
+    latencies: list = []
+    started = {"at": 0.0}
+    for i in range(N_SOCKETS):
+        websocket = FakeWebSocket(latencies, started, slow=i % SLOW_EVERY == 0)
+        await manager.connect(websocket, f"bench-user-{i}")
+
+    expected = 0
+    wall = time.perf_counter()
+    for n in range(N_BROADCASTS):
+        message = WebSocketMessage(type="bench", payload={"n": n, "data": "x" * 200})
+        expected += N_SOCKETS
+        started["at"] = time.perf_counter()
+        await broadcast(manager, message)
+        # Esperar la entrega completa antes del siguiente broadcast
+        while len(latencies) < expected:
+            await asyncio.sleep(0.001)
+    wall = time.perf_counter() - wall
+
+    for connection_id in list(manager.active_connections):
+        await manager.disconnect(connection_id)
+
+    latencies = sorted(latency * 1000 for latency in latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"{name:<32}{len(latencies):>10}{wall:>10.2f}{p50:>10.2f}{p99:>10.2f}")
+
+
+async def main() -> None:
+    print(f"Sockets: {N_SOCKETS} ({N_SOCKETS // SLOW_EVERY} lentos, {SLOW_SEND_DELAY * 1000:.0f} ms/envío), "
+          f"broadcasts: {N_BROADCASTS}\n")
+    print(f"{'Modo':<32}{'entregas':>10}{'total s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+
+    await run_mode("Secuencial (to_json por socket)", legacy_broadcast)
+    await run_mode("Serializar una vez + colas", lambda manager, message: manager.broadcast(message))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latencia de entrega WebSocket entre workers (fan-out por
+Redis pub/sub): un PUBLISH por mensaje vs frames agrupados por instancia.
+
+Simula N workers en un mismo proceso, cada uno con su ConnectionManager,
+sus usuarios conectados con WebSockets falsos y su canal ws:instance:{id}.
+Cada worker envía mensajes con send_to_user a usuarios repartidos entre
+todos los workers y se mide la latencia desde el envío hasta el send_text
+en el worker que tiene el socket.
+
+Contra un Redis local (argumento REDIS_URL) o fakeredis si no se pasa URL.
+
+Uso:
+    python scripts/benchmark_ws_fanout.py                       # fakeredis
+    python scripts/benchmark_ws_fanout.py redis://localhost:6379/15
+"""
+
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import redis.asyncio as redis
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core import redis_client  # noqa: E402
+from app.core.websocket import ConnectionManager, WebSocketMessage  # noqa: E402
+from app.core.ws_fanout import WebSocketFanout  # noqa: E402
+
+N_WORKERS = 4
+USERS_PER_WORKER = 50
+MESSAGES_PER_WORKER = 1_000
+SEND_RATE = 500  # mensajes/seg por worker
+MAX_IN_FLIGHT = 8  # envíos concurrentes por worker (handlers simultáneos)
+
+
+class UnbatchedFanout(WebSocketFanout):
+    """Referencia: un PUBLISH por mensaje y destino, sin buffer."""
+
+    def _enqueue(self, channel: str, item: str) -> None:
+        self.published_frames += 1
+        self.published_messages += 1
+        asyncio.create_task(self.redis.publish(channel, item))
+
+
+MODES = {
+    "Un PUBLISH por mensaje": UnbatchedFanout,
+    "Frames por instancia": WebSocketFanout,
+}
+
+
+class FakeWebSocket:
+    """WebSocket que registra la latencia de cada mensaje recibido."""
+
+    def __init__(self, latencies: list):
+        self.latencies = latencies
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        sent_at = json.loads(text)["payload"]["sent_at"]
+        self.latencies.append(time.time() - sent_at)
+
+
+async def send_load(manager: ConnectionManager) -> None:
+    """Envíos concurrentes (como pushes desde varios handlers) a ritmo constante."""
+    total_users = N_WORKERS * USERS_PER_WORKER
+    in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+    sends = []
+    start = time.perf_counter()
+
+    async def send(message: WebSocketMessage, user_id: str) -> None:
+        async with in_flight:
+            await manager.send_to_user(message, user_id)
+
+    for j in range(MESSAGES_PER_WORKER):
+        target = j % total_users
+        user_id = f"bench-user-{target // USERS_PER_WORKER}-{target % USERS_PER_WORKER}"
+        message = WebSocketMessage(type="bench", payload={"sent_at": time.time()})
+        sends.append(asyncio.create_task(send(message, user_id)))
+
+        delay = start + (j + 1) / SEND_RATE - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    await asyncio.gather(*sends)
+
+
+async def run_mode(name: str, fanout_class: type, client: redis.Redis) -> None:
+    latencies: list = []
+    managers = []
+
+    for worker in range(N_WORKERS):
+        manager = ConnectionManager()
+        manager.fanout = fanout_class(client, manager.instance_id, manager._deliver_local)
+        await manager.fanout.start()
+        for i in range(USERS_PER_WORKER):
+            await manager.connect(FakeWebSocket(latencies), f"bench-user-{worker}-{i}")
+        managers.append(manager)
+
+    await asyncio.gather(*[send_load(manager) for manager in managers])
+
+    expected = N_WORKERS * MESSAGES_PER_WORKER
+    deadline = time.time() + 30
+    while len(latencies) < expected and time.time() < deadline:
+        await asyncio.sleep(0.01)
+
+    frames = sum(manager.fanout.published_frames for manager in managers)
+    published = sum(manager.fanout.published_messages for manager in managers)
+
+    for manager in managers:
+        for connection_id in list(manager.active_connections):
+            await manager.disconnect(connection_id)
+        await manager.fanout.stop()
+
+    latencies = sorted(latency * 1000 for latency in latencies)
+    received = len(latencies)
+    p50 = latencies[received // 2] if latencies else 0
+    p99 = latencies[min(received - 1, int(received * 0.99))] if latencies else 0
+    mean = statistics.mean(latencies) if latencies else 0
+    print(f"{name:<28}{received:>6}/{expected:<6}{frames:>8}{published / max(frames, 1):>10.1f}"
+          f"{mean:>10.2f}{p50:>10.2f}{p99:>10.2f}")
+
+
+async def main() -> None:
+    if len(sys.argv) > 1:
+        client = redis.from_url(sys.argv[1], decode_responses=True)
+    else:
+        import fakeredis.aioredis
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    redis_client._redis_client = client
+
+    print(f"Workers: {N_WORKERS}, usuarios/worker: {USERS_PER_WORKER}, "
+          f"mensajes/worker: {MESSAGES_PER_WORKER} a {SEND_RATE}/s\n")
+    print(f"{'Modo':<28}{'recibidos':>13}{'PUBLISH':>8}{'msg/frame':>10}"
+          f"{'media ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+
+    for name, fanout_class in MODES.items():
+        await run_mode(name, fanout_class, client)
+
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
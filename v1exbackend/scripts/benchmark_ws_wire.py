@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark de formatos de cable WebSocket: bytes enviados y tiempo de
+codificación por tipo de mensaje.
+
+Compara la codificación actual (json.dumps de la librería estándar, uuid4 e
+isoformat por mensaje, siempre texto) con los formatos negociables:
+JSON (orjson), JSON + deflate, msgpack y msgpack + deflate. El tiempo incluye
+crear el WebSocketMessage y codificar el frame.
+
+Uso:
+    python scripts/benchmark_ws_wire.py
+"""
+
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+# Add app to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.core.websocket import WebSocketMessage  # noqa: E402
+from app.core.ws_codec import JSON, MSGPACK, MessageCodec, OutboundMessage  # noqa: E402
+
+ITERATIONS = 20_000
+
+CODE = "\n".join(
+    f"def step_{i}(items: list[int]) -> int:\n"
+    f"    \"\"\"Paso {i} del ejercicio.\"\"\"\n"
+    f"    return sum(item * {i} for item in items if item % 2 == 0)\n"
+    for i in range(40)
+)
+
+MESSAGE_TYPES = {
+    "pong": {"timestamp": 1718900000123},
+    "goal.created": {"goal_id": str(uuid.uuid4()), "title": "Aprender FastAPI", "status": "created"},
+    "task.validating": {"task_id": str(uuid.uuid4()), "progress": 0.3, "message": "Analyzing code..."},
+    "task.validation_result": {
+        "task_id": str(uuid.uuid4()),
+        "passed": False,
+        "feedback": "La función no maneja listas vacías y repite cálculos en cada paso. " * 12,
+        "suggestions": [
+            {"line": i * 3 + 1, "severity": "warning", "message": f"Considera extraer el cálculo del paso {i}."}
+            for i in range(15)
+        ],
+    },
+    "code.snapshot": {"task_id": str(uuid.uuid4()), "language": "python", "code": CODE},
+}
+
+MODES = {
+    "JSON (orjson)": MessageCodec(JSON),
+    "JSON + deflate": MessageCodec(JSON, compress=True, compress_threshold=settings.WS_COMPRESSION_THRESHOLD),
+    "msgpack": MessageCodec(MSGPACK),
+    "msgpack + deflate": MessageCodec(MSGPACK, compress=True, compress_threshold=settings.WS_COMPRESSION_THRESHOLD),
+}
+
+
+def legacy_encode(type: str, payload: dict) -> str:
+    """Codificación anterior de WebSocketMessage.to_json."""
+    return json.dumps({
+        "type": type,
+        "payload": payload,
+        "correlation_id": str(uuid.uuid4()),
+        "timestamp": datetime.utcnow().isoformat(),
+    })
+
+
+def encode(codec: MessageCodec, type: str, payload: dict):
+    return OutboundMessage(WebSocketMessage(type=type, payload=payload).to_dict()).frame(codec)
+
+
+def frame_size(frame) -> int:
+    return len(frame.encode("utf-8")) if isinstance(frame, str) else len(frame)
+
+
+def measure(fn) -> float:
+    """Microsegundos por mensaje (mejor de 3)."""
+    return min(timeit.repeat(fn, number=ITERATIONS, repeat=3)) / ITERATIONS * 1e6
+
+
+def main() -> None:
+    print(f"Umbral de compresión: {settings.WS_COMPRESSION_THRESHOLD} bytes, iteraciones: {ITERATIONS}\n")
+    print(f"{'Tipo':<24}{'Modo':<20}{'bytes':>8}{'vs actual':>11}{'µs/msg':>9}{'speedup':>9}")
+
+    for type, payload in MESSAGE_TYPES.items():
+        base_size = frame_size(legacy_encode(type, payload))
+        base_time = measure(lambda: legacy_encode(type, payload))
+        print(f"{type:<24}{'Actual (json)':<20}{base_size:>8}{'':>11}{base_time:>9.2f}{'':>9}")
+
+        for name, codec in MODES.items():
+            size = frame_size(encode(codec, type, payload))
+            elapsed = measure(lambda: encode(codec, type, payload))
+            print(f"{'':<24}{name:<20}{size:>8}{size / base_size:>10.0%} {elapsed:>9.2f}"
+                  f"{base_time / elapsed:>8.1f}x")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -80,6 +80,30 @@ async def test_rate_limit_headers(client):
         assert response.status_code == 200
 
 
+def test_rate_limit_exceeded_returns_429(client):
+    """Test that a blocked request gets a 429 with rate limit headers."""
+    with patch('app.middleware.rate_limit_middleware.get_rate_limiter') as mock_limiter:
+        mock_result = MagicMock()
+        mock_result.allowed = False
+        mock_result.retry_after_seconds = 30
+        mock_result.max_requests = 100
+        mock_result.tokens_available = 0
+        mock_result.window_seconds = 60
+        mock_result.current_count = 150
+
+        mock_limiter_instance = AsyncMock()
+        mock_limiter_instance.check_limit = AsyncMock(return_value=mock_result)
+        mock_limiter.return_value = mock_limiter_instance
+
+        response = client.get("/api/v1/goals")
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "30"
+        assert response.headers["X-RateLimit-Limit"] == "100"
+        assert response.headers["X-RateLimit-Remaining"] == "0"
+        assert response.json()["detail"]["error"] == "Rate limit exceeded"
+
+
 def test_cors_headers(client):
     """Test CORS headers are present."""
     response = client.options(
@@ -0,0 +1,153 @@
+"""Tests for the Parquet event analytics queries."""
+
+import pytest
+from datetime import datetime, timezone
+
+import pyarrow as pa
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.agents  # noqa: F401  avoids the app.services <-> app.agents import cycle
+from app.api.routes.admin import analytics
+from app.core.config import settings
+from app.core.security import get_current_admin_user_id
+from app.schemas.parquet_schemas import (
+    GOAL_EVENT_SCHEMA,
+    TASK_EVENT_SCHEMA,
+    get_parquet_partition_dir,
+)
+from app.services.event_analytics_service import EventAnalyticsService, partition_files
+from app.services.parquet_event_sink import write_part
+
+
+def write_events(base, schema, events):
+    """Write (event_id, user_id, event_type, created_at) tuples as one part per day."""
+    by_dir = {}
+    for event_id, user_id, event_type, created_at in events:
+        directory = get_parquet_partition_dir(event_type, created_at, str(base))
+        by_dir.setdefault(directory, []).append({
+            "event_id": event_id,
+            "user_id": user_id,
+            "goal_id": "goal-1",
+            "task_id": "task-1",
+            "event_type": event_type,
+            "created_at": created_at,
+            "year": created_at.year,
+            "month": created_at.month,
+            "day": created_at.day,
+        })
+    for directory, records in by_dir.items():
+        write_part(directory, pa.Table.from_pylist(records, schema=schema))
+
+
+@pytest.fixture
+def lake(tmp_path):
+    write_events(tmp_path, GOAL_EVENT_SCHEMA, [
+        ("g1", "user-1", "goal.created", datetime(2024, 1, 15, 9)),
+        ("g2", "user-2", "goal.created", datetime(2024, 1, 15, 10)),
+        ("g3", "user-1", "goal.completed", datetime(2024, 1, 16, 11)),
+        ("g4", "user-1", "goal.created", datetime(2024, 2, 1, 8)),
+    ])
+    write_events(tmp_path, TASK_EVENT_SCHEMA, [
+        ("t1", "user-1", "task.completed", datetime(2024, 1, 15, 9, 30)),
+        ("t2", "user-1", "task.completed", datetime(2024, 1, 15, 9, 45)),
+        ("t3", "user-2", "task.completed", datetime(2024, 1, 16, 12)),
+    ])
+    # Same event in a second part, as before compaction
+    write_events(tmp_path, TASK_EVENT_SCHEMA, [
+        ("t1", "user-1", "task.completed", datetime(2024, 1, 15, 9, 30)),
+    ])
+    return EventAnalyticsService(base_path=str(tmp_path))
+
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 2, 1)
+
+
+class TestEventAnalyticsService:
+    """Test partition pruning and aggregates."""
+
+    def test_partition_pruning_by_date_and_category(self, lake):
+        """Only parts of the requested days and categories are listed."""
+        files = partition_files(lake.base_path, datetime(2024, 1, 15).date(), datetime(2024, 1, 15).date())
+        assert len(files) == 3
+        assert all("_events_2024-01-15" in path for path in files)
+
+        goal_files = partition_files(lake.base_path, START.date(), datetime(2024, 2, 28).date(), ["goal"])
+        assert [path.split("/")[-2] for path in goal_files] == [
+            "goal_events_2024-01-15", "goal_events_2024-01-16", "goal_events_2024-02-01",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_counts_by_type_per_day(self, lake):
+        """Counts are per day and type, exclude the end bound and ignore duplicates."""
+        counts = await lake.counts_by_type_per_day(START, END)
+
+        assert counts == [
+            {"date": "2024-01-15", "event_type": "goal.created", "count": 2},
+            {"date": "2024-01-15", "event_type": "task.completed", "count": 2},
+            {"date": "2024-01-16", "event_type": "goal.completed", "count": 1},
+            {"date": "2024-01-16", "event_type": "task.completed", "count": 1},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_filters_by_type_and_user(self, lake):
+        """event_type and user_id filters are applied."""
+        counts = await lake.counts_by_type_per_day(START, END, event_types=["goal.created"], user_id="user-1")
+        assert counts == [{"date": "2024-01-15", "event_type": "goal.created", "count": 1}]
+
+    @pytest.mark.asyncio
+    async def test_user_activity_histogram(self, lake):
+        """Activity is bucketed by hour; timezone-aware bounds are read as UTC."""
+        activity = await lake.user_activity(
+            "user-1",
+            datetime(2024, 1, 15, tzinfo=timezone.utc),
+            datetime(2024, 1, 17, tzinfo=timezone.utc),
+            bucket="hour",
+        )
+
+        assert activity == [
+            {"bucket": "2024-01-15T09:00:00", "count": 3},
+            {"bucket": "2024-01-16T11:00:00", "count": 1},
+        ]
+        with pytest.raises(ValueError):
+            await lake.user_activity("user-1", START, END, bucket="minute")
+
+    @pytest.mark.asyncio
+    async def test_top_users_and_empty_range(self, lake):
+        """Users are ranked by events; a range with no partitions returns nothing."""
+        assert await lake.top_users(START, END, limit=1) == [{"user_id": "user-1", "count": 4}]
+        assert await lake.counts_by_type_per_day(datetime(2023, 1, 1), datetime(2023, 2, 1)) == []
+
+
+@pytest.fixture
+def client(lake, monkeypatch):
+    monkeypatch.setattr(settings, "PARQUET_EVENTS_PATH", lake.base_path)
+    api = FastAPI()
+    api.include_router(analytics.router, prefix="/admin/analytics")
+    api.dependency_overrides[get_current_admin_user_id] = lambda: "admin-1"
+    return TestClient(api)
+
+
+class TestAnalyticsRoutes:
+    """Test the admin analytics endpoints."""
+
+    def test_timezone_aware_and_naive_bounds(self, client):
+        """A "Z" start_date works with or without end_date and is read as UTC."""
+        response = client.get("/admin/analytics/events/daily-counts", params={
+            "start_date": "2024-01-16T00:00:00Z", "end_date": "2024-01-17T00:00:00",
+        })
+        assert response.status_code == 200
+        assert response.json()["start_date"] == "2024-01-16T00:00:00"
+        assert [row["count"] for row in response.json()["counts"]] == [1, 1]
+
+        response = client.get("/admin/analytics/events/top-users", params={"start_date": "2024-01-01T00:00:00Z"})
+        assert response.status_code == 200
+        assert response.json()["users"] == [{"user_id": "user-1", "count": 5}, {"user_id": "user-2", "count": 2}]
+
+    def test_start_after_end_is_rejected(self, client):
+        """Inverted bounds are a 400, also across timezones."""
+        response = client.get("/admin/analytics/events/daily-counts", params={
+            "start_date": "2024-01-16T02:00:00+03:00", "end_date": "2024-01-15T22:00:00",
+        })
+        assert response.status_code == 400
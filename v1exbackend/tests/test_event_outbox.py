@@ -0,0 +1,201 @@
+"""Tests for the transactional event outbox and its relay."""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pyarrow.parquet as pq
+from sqlalchemy.dialects import postgresql
+
+import app.agents  # noqa: F401  avoids the app.services <-> app.agents import cycle
+from app.models import Event, EventOutbox, EventType
+from app.core.config import settings
+from app.services.event_outbox_relay import EventOutboxRelay, _publish_to_rabbitmq
+from app.services.event_service import EventService, build_event_message
+from app.services.parquet_event_sink import ParquetEventSink
+
+NOW = datetime(2024, 1, 15, 10, 30)
+# After the Parquet window of events created at NOW has closed
+LATER = NOW + timedelta(minutes=1)
+
+
+def make_row(n=1, published=False, parquet_written=False):
+    event = Event(
+        id=f"event-{n}",
+        user_id="user-1",
+        event_type=EventType.GOAL_UPDATED,
+        entity_type="goal",
+        entity_id="goal-1",
+        payload={"goal_id": "goal-1", "status": "in_progress"},
+        event_metadata={},
+        created_at=NOW,
+    )
+    return EventOutbox(
+        id=n,
+        event_id=event.id,
+        message=build_event_message(event),
+        routing_key="goal.updated.goal",
+        attempts=0,
+        next_attempt_at=NOW,
+        created_at=NOW,
+        published_at=NOW if published else None,
+        parquet_written_at=NOW if parquet_written else None,
+    )
+
+
+@pytest.fixture
+def sink(tmp_path):
+    sink = ParquetEventSink(base_path=str(tmp_path))
+    with patch("app.services.event_outbox_relay.get_parquet_sink", return_value=sink):
+        yield sink
+
+
+class TestCreateEvent:
+    """Test the request path."""
+
+    @pytest.mark.asyncio
+    async def test_commits_event_and_outbox_together(self):
+        """The event and its outbox row go in one commit; no sink is touched."""
+        db = MagicMock()
+        db.commit = AsyncMock()
+        relay = MagicMock()
+
+        with patch("app.services.event_service.get_outbox_relay", return_value=relay):
+            event = await EventService(db).create_event(
+                user_id="user-1",
+                event_type=EventType.TASK_COMPLETED,
+                entity_type="task",
+                entity_id="task-1",
+                event_data={"task_id": "task-1", "goal_id": "goal-1"},
+            )
+
+        added = db.add_all.call_args.args[0]
+        assert [type(obj) for obj in added] == [Event, EventOutbox]
+        outbox = added[1]
+        assert outbox.event_id == event.id
+        assert outbox.routing_key == "task.completed.task"
+        assert outbox.message["event_data"] == {"task_id": "task-1", "goal_id": "goal-1"}
+        assert outbox.message["timestamp"] == event.created_at.isoformat()
+
+        db.commit.assert_awaited_once()
+        relay.notify.assert_called_once()
+
+
+class TestEventOutboxRelay:
+    """Test delivery, retries and draining."""
+
+    @pytest.mark.asyncio
+    async def test_delivers_to_parquet_and_rabbitmq(self, sink):
+        """A delivered batch is one Parquet part plus one batch publish."""
+        publish = AsyncMock(return_value=[None, None])
+        relay = EventOutboxRelay(publish_batch=publish)
+        rows = [make_row(1), make_row(2)]
+
+        delivered = await relay.deliver(rows, LATER)
+
+        assert delivered == rows
+        publish.assert_awaited_once_with(rows)
+        assert sink.parts_written == 1
+        table = pq.read_table(f"{sink.base_path}/2024/01/goal_events_2024-01-15")
+        assert table.column("event_id").to_pylist() == ["event-1", "event-2"]
+        assert table.column("status").to_pylist() == ["in_progress", "in_progress"]
+        assert relay.metrics()["delivered"] == 2
+
+    @pytest.mark.asyncio
+    async def test_retry_only_repeats_failed_destination(self, sink):
+        """A failed publish is retried later without rewriting Parquet."""
+        publish = AsyncMock(side_effect=[[ConnectionError("broker down")], [None]])
+        relay = EventOutboxRelay(publish_batch=publish, retry_base_delay=2.0)
+        row = make_row()
+
+        assert await relay.deliver([row], LATER) == []
+        assert row.parquet_written_at == LATER
+        assert row.published_at is None
+        assert row.attempts == 1
+        assert (row.next_attempt_at - LATER).total_seconds() == 2.0
+        assert "broker down" in row.last_error
+
+        assert await relay.deliver([row], LATER) == [row]
+        assert sink.parts_written == 1
+        assert publish.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_without_sink_events_wait(self):
+        """Without a Parquet sink nothing is lost: the row is retried."""
+        publish = AsyncMock()
+        relay = EventOutboxRelay(publish_batch=publish)
+        row = make_row(published=True)
+
+        with patch("app.services.event_outbox_relay.get_parquet_sink", return_value=None):
+            assert await relay.deliver([row], LATER) == []
+
+        assert row.attempts == 1
+        assert row.parquet_written_at is None
+        publish.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_parquet_waits_for_the_window_to_close(self, sink):
+        """Rows are published at once but written to Parquet together when their window closes."""
+        publish = AsyncMock(side_effect=lambda rows: [None] * len(rows))
+        relay = EventOutboxRelay(publish_batch=publish, parquet_window=60.0)
+        early, late = make_row(1), make_row(2)
+        late.created_at = NOW + timedelta(seconds=20)
+
+        assert await relay.deliver([early], NOW) == []
+        assert await relay.deliver([late], late.created_at) == []
+        assert early.published_at == NOW and late.published_at == late.created_at
+        assert early.next_attempt_at == late.next_attempt_at == datetime(2024, 1, 15, 10, 31)
+        assert early.attempts == 0
+        assert sink.parts_written == 0
+
+        window_end = early.next_attempt_at
+        assert await relay.deliver([early, late], window_end) == [early, late]
+        assert sink.parts_written == 1
+        assert publish.await_count == 2
+        assert relay.metrics()["parquet_deferred"] == 2
+
+    @pytest.mark.asyncio
+    async def test_publishes_to_the_configured_exchange(self):
+        """Outbox events go to the exchange EventConsumer binds to."""
+        publisher = MagicMock()
+        publisher.publish_batch = AsyncMock(return_value=[None])
+        with patch("app.services.event_outbox_relay.get_publisher", return_value=publisher):
+            assert await _publish_to_rabbitmq([make_row()]) == [None]
+
+        message, = publisher.publish_batch.await_args.args[0]
+        assert message.exchange == settings.RABBITMQ_EXCHANGE
+        assert message.routing_key == "goal.updated.goal"
+        assert message.message_id == "event-1"
+
+    def test_retry_delay_is_capped(self):
+        """Backoff doubles per attempt up to retry_max_delay."""
+        relay = EventOutboxRelay(retry_base_delay=1.0, retry_max_delay=10.0)
+        assert [relay.retry_delay(n) for n in range(1, 6)] == [1.0, 2.0, 4.0, 8.0, 10.0]
+
+    @pytest.mark.asyncio
+    async def test_drain_batch_deletes_delivered_rows(self, sink):
+        """Delivered rows are deleted and retries saved in the same commit."""
+        failing = make_row(2, parquet_written=True)
+        rows = [make_row(1), failing]
+
+        claimed = MagicMock()
+        claimed.scalars.return_value.all.return_value = rows
+        db = MagicMock()
+        db.execute = AsyncMock(side_effect=[claimed, MagicMock()])
+        db.commit = AsyncMock()
+        session = MagicMock()
+        session.return_value.__aenter__ = AsyncMock(return_value=db)
+        session.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        async def publish_rows(rows):
+            return [None if row.id == 1 else ConnectionError("down") for row in rows]
+
+        relay = EventOutboxRelay(session_factory=session, publish_batch=publish_rows)
+        assert await relay.drain_batch() == 2
+
+        claim = db.execute.await_args_list[0].args[0]
+        assert "FOR UPDATE SKIP LOCKED" in str(claim.compile(dialect=postgresql.dialect()))
+        delete_sql = db.execute.await_args_list[1].args[0]
+        assert delete_sql.whereclause.right.value == [1]
+        db.commit.assert_awaited_once()
+        assert failing.attempts == 1
@@ -0,0 +1,156 @@
+"""Tests for streamed task validation feedback against a fake OpenAI server."""
+
+import asyncio
+import json
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from openai import AsyncOpenAI
+
+import app.agents  # noqa: F401  avoids the app.services <-> app.agents import cycle
+from app.agents import nodes
+from app.services.message_router import MessageRouter, merge_deltas
+
+VALIDATION = {
+    "passed": True,
+    "score": 0.8,
+    "feedback": "Good use of comprehensions.",
+    "hints": ["Handle empty lists"],
+    "issues_found": [],
+}
+
+
+class FakeOpenAIServer:
+    """Minimal HTTP server answering chat completions as an SSE stream."""
+
+    def __init__(self, chunks: list[str], pause_after_first: float = 0.0):
+        self.chunks = chunks
+        self.pause_after_first = pause_after_first
+        self.requests: list[dict] = []
+        self.finished_at = None
+
+    async def __aenter__(self) -> "FakeOpenAIServer":
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        head = await reader.readuntil(b"\r\n\r\n")
+        headers = dict(
+            line.split(": ", 1) for line in head.decode().split("\r\n")[1:] if ": " in line
+        )
+        length = int({k.lower(): v for k, v in headers.items()}["content-length"])
+        self.requests.append(json.loads(await reader.readexactly(length)))
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+        for i, content in enumerate(self.chunks):
+            chunk = {
+                "id": "chatcmpl-test",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": "gpt-4",
+                "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+            }
+            writer.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+            if i == 0 and self.pause_after_first:
+                await asyncio.sleep(self.pause_after_first)
+        writer.write(b"data: [DONE]\n\n")
+        await writer.drain()
+        self.finished_at = time.perf_counter()
+        writer.close()
+
+
+def split(text: str, size: int = 12) -> list[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.fixture
+def feedback_pipeline():
+    """Feedback pipeline with context lookup and snapshot storage mocked."""
+    with patch.object(nodes, "_build_feedback_prompt", new=AsyncMock(return_value="prompt")), \
+            patch.object(nodes, "_save_feedback_snapshot", new=AsyncMock(return_value="snapshot-1")):
+        yield
+
+
+def use_server(server: FakeOpenAIServer):
+    return patch.object(nodes, "openai_client", AsyncOpenAI(base_url=server.base_url, api_key="test-key", max_retries=0))
+
+
+STATE = {"user_id": "user-1", "task_id": "task-1", "goal_id": "goal-1", "code_snapshot": "print(1)"}
+
+
+class TestStreamingFeedback:
+    """Test run_feedback and the task.validate handler."""
+
+    @pytest.mark.asyncio
+    async def test_deltas_forwarded_and_result_parsed(self, feedback_pipeline):
+        deltas = []
+
+        async def on_delta(delta: str) -> None:
+            deltas.append(delta)
+
+        async with FakeOpenAIServer(split(json.dumps(VALIDATION))) as server:
+            with use_server(server):
+                result = await nodes.run_feedback(STATE, on_delta=on_delta)
+
+        assert server.requests[0]["stream"] is True
+        assert "".join(deltas) == json.dumps(VALIDATION)
+        assert result["validation_results"] == VALIDATION
+        assert result["snapshot_id"] == "snapshot-1"
+
+    @pytest.mark.asyncio
+    async def test_first_delta_arrives_before_completion(self, feedback_pipeline):
+        first_delta_at = []
+
+        async def on_delta(delta: str) -> None:
+            if not first_delta_at:
+                first_delta_at.append(time.perf_counter())
+
+        chunks = split(json.dumps(VALIDATION))
+        async with FakeOpenAIServer(chunks, pause_after_first=0.2) as server:
+            with use_server(server):
+                await nodes.run_feedback(STATE, on_delta=on_delta)
+
+        assert server.finished_at - first_delta_at[0] >= 0.15
+
+    @pytest.mark.asyncio
+    async def test_fenced_json_is_parsed(self, feedback_pipeline):
+        content = "```json\n" + json.dumps(VALIDATION) + "\n```"
+
+        async with FakeOpenAIServer(split(content)) as server:
+            with use_server(server):
+                result = await nodes.run_feedback(STATE)
+
+        assert result["validation_results"]["passed"] is True
+
+    @pytest.mark.asyncio
+    async def test_task_validate_streams_then_sends_result(self, feedback_pipeline):
+        manager = MagicMock()
+        manager.send_personal_message = AsyncMock()
+        router = MessageRouter("conn-1", "user-1", manager)
+
+        async with FakeOpenAIServer(split(json.dumps(VALIDATION))) as server:
+            with use_server(server):
+                await router.handle_task_validate({"task_id": "task-1", "code": "print(1)"}, "c-1")
+
+        calls = manager.send_personal_message.await_args_list
+        sent = [call.args[0] for call in calls]
+        assert all(message.type == "task.validating" for message in sent[:-1])
+        assert "".join(message.payload["delta"] for message in sent[:-1]) == json.dumps(VALIDATION)
+        offsets = [message.payload["offset"] for message in sent[:-1]]
+        assert offsets == [sum(len(message.payload["delta"]) for message in sent[:n]) for n in range(len(offsets))]
+        assert {call.kwargs["coalesce_key"] for call in calls[:-1]} == {"validating:task-1"}
+        assert all(call.kwargs["merge"] is merge_deltas for call in calls[:-1])
+        assert sent[-1].type == "task.validation_result"
+        assert sent[-1].payload["suggestions"] == ["Handle empty lists"]
+        assert {message.correlation_id for message in sent} == {"c-1"}
@@ -0,0 +1,127 @@
+"""Tests for concurrent WebSocket message routing."""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+import app.agents  # noqa: F401  avoids the app.services <-> app.agents import cycle
+from app.core.websocket import WebSocketMessage
+from app.services.message_router import MessageRouter
+
+
+@pytest.fixture
+def router():
+    """Router whose responses are recorded as (type, payload, correlation_id)."""
+    manager = MagicMock()
+    manager.send_personal_message = AsyncMock()
+    router = MessageRouter("conn-1", "user-1", manager, max_concurrency=2, max_pending=3, handler_timeout=5)
+
+    def sent():
+        return [
+            (call.args[0].type, call.args[0].payload, call.args[0].correlation_id)
+            for call in manager.send_personal_message.await_args_list
+        ]
+
+    router.sent = sent
+    return router
+
+
+def message(type: str, correlation_id: str, **payload) -> WebSocketMessage:
+    return WebSocketMessage(type=type, payload=payload, correlation_id=correlation_id)
+
+
+class TestMessageRouter:
+    """Test dispatch, ordering, backpressure, timeouts and cancellation."""
+
+    @pytest.mark.asyncio
+    async def test_slow_handler_does_not_block_ping(self, router):
+        release = asyncio.Event()
+
+        async def slow(payload, correlation_id):
+            await release.wait()
+            await router.send_response("done", {}, correlation_id)
+
+        router.handlers["task.validate"] = slow
+
+        await router.route_message(message("task.validate", "c-1", task_id="t-1"))
+        await router.route_message(message("ping", "c-2"))
+        await asyncio.sleep(0.01)
+        assert [sent[0] for sent in router.sent()] == ["pong"]
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert [sent[0] for sent in router.sent()] == ["pong", "done"]
+
+    @pytest.mark.asyncio
+    async def test_same_key_runs_in_order(self, router):
+        order = []
+
+        async def handler(payload, correlation_id):
+            order.append(f"start {correlation_id}")
+            await asyncio.sleep(0.01)
+            order.append(f"end {correlation_id}")
+
+        router.handlers["code.submit"] = handler
+
+        await router.route_message(message("code.submit", "c-1", task_id="t-1"))
+        await router.route_message(message("code.submit", "c-2", task_id="t-1"))
+        await asyncio.sleep(0.05)
+
+        assert order == ["start c-1", "end c-1", "start c-2", "end c-2"]
+
+    @pytest.mark.asyncio
+    async def test_rejects_beyond_max_pending(self, router):
+        router.handlers["goal.create"] = AsyncMock(side_effect=lambda *args: asyncio.sleep(0.05))
+
+        for i in range(4):
+            await router.route_message(message("goal.create", f"c-{i}"))
+
+        assert [(sent[0], sent[2]) for sent in router.sent()] == [("error", "c-3")]
+        await router.close()
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_handler(self, router):
+        async def forever(payload, correlation_id):
+            await asyncio.Event().wait()
+
+        router.handlers["task.validate"] = forever
+
+        await router.route_message(message("task.validate", "c-1", task_id="t-1"))
+        await asyncio.sleep(0.01)
+        await router.route_message(WebSocketMessage(type="cancel", payload={"correlation_id": "c-1"}, correlation_id="c-2"))
+        await asyncio.sleep(0.01)
+
+        assert router.sent() == [("cancelled", {"reason": "cancelled"}, "c-1")]
+        assert router._pending == 0
+
+    @pytest.mark.asyncio
+    async def test_cancel_queued_message(self, router):
+        release = asyncio.Event()
+        handled = []
+
+        async def handler(payload, correlation_id):
+            await release.wait()
+            handled.append(correlation_id)
+
+        router.handlers["code.submit"] = handler
+
+        await router.route_message(message("code.submit", "c-1", task_id="t-1"))
+        await router.route_message(message("code.submit", "c-2", task_id="t-1"))
+        await router.route_message(WebSocketMessage(type="cancel", payload={"correlation_id": "c-2"}, correlation_id="c-3"))
+        release.set()
+        await asyncio.sleep(0.01)
+
+        assert handled == ["c-1"]
+        assert router.sent() == [("cancelled", {"reason": "cancelled"}, "c-2")]
+
+    @pytest.mark.asyncio
+    async def test_requested_timeout(self, router):
+        async def forever(payload, correlation_id):
+            await asyncio.Event().wait()
+
+        router.handlers["task.validate"] = forever
+
+        await router.route_message(message("task.validate", "c-1", task_id="t-1", timeout=0.01))
+        await asyncio.sleep(0.05)
+
+        assert router.sent() == [("cancelled", {"reason": "timeout"}, "c-1")]
@@ -0,0 +1,168 @@
+"""Tests for the buffered Parquet event sink and its compaction."""
+
+import os
+import pytest
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import app.agents  # noqa: F401  avoids the app.services <-> app.agents import cycle
+from app.schemas.parquet_schemas import GOAL_EVENT_SCHEMA
+from app.services.parquet_event_sink import (
+    ParquetEventSink,
+    compact_partition,
+    compact_partitions,
+    write_part,
+)
+
+DAY = datetime(2024, 1, 15, 10, 30)
+
+
+def make_record(n=0, event_type="goal.created", timestamp=DAY, **extra):
+    return {
+        "event_id": f"event-{n}",
+        "user_id": "user-1",
+        "goal_id": "goal-1",
+        "event_type": event_type,
+        "created_at": timestamp,
+        "year": timestamp.year,
+        "month": timestamp.month,
+        "day": timestamp.day,
+        **extra,
+    }
+
+
+def parts(directory):
+    return sorted(p.name for p in Path(directory).glob("part-*.parquet"))
+
+
+def goal_dir(base):
+    return Path(base) / "2024" / "01" / "goal_events_2024-01-15"
+
+
+class TestParquetEventSink:
+    """Test batch writes."""
+
+    @pytest.mark.asyncio
+    async def test_write_makes_one_part_per_partition(self, tmp_path):
+        """A batch is grouped by (category, day), one part file per partition."""
+        sink = ParquetEventSink(base_path=str(tmp_path), max_rows=100)
+        events = [("goal.created", DAY, make_record(n)) for n in range(5)]
+        events.append(("task.created", DAY, make_record(99, event_type="task.created", task_id="task-1")))
+
+        assert len(await sink.write(events)) == 6
+        assert parts(goal_dir(tmp_path)) == ["part-00001.parquet"]
+        assert parts(tmp_path / "2024" / "01" / "task_events_2024-01-15") == ["part-00001.parquet"]
+
+        table = pq.read_table(goal_dir(tmp_path))
+        assert table.num_rows == 5
+        assert table.column("event_id").to_pylist() == [f"event-{n}" for n in range(5)]
+
+        metrics = sink.metrics()
+        assert metrics["written"] == 6
+        assert metrics["parts_written"] == 2
+
+    @pytest.mark.asyncio
+    async def test_write_splits_parts_at_max_rows(self, tmp_path):
+        """A partition with more than max_rows events is written as several parts."""
+        sink = ParquetEventSink(base_path=str(tmp_path), max_rows=4)
+
+        await sink.write([("goal.created", DAY, make_record(n)) for n in range(10)])
+
+        assert parts(goal_dir(tmp_path)) == ["part-00001.parquet", "part-00002.parquet", "part-00003.parquet"]
+        assert pq.read_table(goal_dir(tmp_path)).num_rows == 10
+
+    @pytest.mark.asyncio
+    async def test_failed_part_is_not_reported_written(self, tmp_path):
+        """Events of a part that could not be written are left for the caller to retry."""
+        blocked = tmp_path / "2024"
+        blocked.write_bytes(b"")  # a file where the year directory should go
+        sink = ParquetEventSink(base_path=str(tmp_path))
+
+        assert await sink.write([("goal.created", DAY, make_record())]) == set()
+        assert sink.metrics()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_events_do_not_sink_the_batch(self, tmp_path):
+        """Events missing required fields or with wrong types are rejected alone."""
+        sink = ParquetEventSink(base_path=str(tmp_path), max_rows=100)
+
+        done = await sink.write([
+            ("goal.created", DAY, make_record(1, user_id=None)),
+            ("goal.created", DAY, make_record(2)),
+            ("goal.created", DAY, make_record(3, progress_percentage="not a number")),
+            ("goal.created", DAY, make_record(4)),
+        ])
+
+        # Rejected events are not retried either
+        assert done == {"event-1", "event-2", "event-3", "event-4"}
+        assert sink.rejected == 2
+        table = pq.read_table(goal_dir(tmp_path))
+        assert table.column("event_id").to_pylist() == ["event-2", "event-4"]
+
+
+class TestParquetParts:
+    """Test part files and compaction."""
+
+    def test_write_part_claims_next_number(self, tmp_path):
+        """Part numbers continue after the existing ones; no temp files remain."""
+        table = pa.Table.from_pylist([make_record()], schema=GOAL_EVENT_SCHEMA)
+
+        assert write_part(str(tmp_path), table).name == "part-00001.parquet"
+        (tmp_path / "part-00007.parquet").write_bytes(b"")
+        assert write_part(str(tmp_path), table).name == "part-00008.parquet"
+        assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".")] == []
+
+    @pytest.mark.asyncio
+    async def test_compaction_merges_parts(self, tmp_path):
+        """Compaction merges every part into part-00000 keeping all rows."""
+        sink = ParquetEventSink(base_path=str(tmp_path), max_rows=100)
+        for n in range(0, 6, 2):
+            await sink.write([("goal.created", DAY, make_record(n)), ("goal.created", DAY, make_record(n + 1))])
+        assert len(parts(goal_dir(tmp_path))) == 3
+
+        assert compact_partitions(str(tmp_path)) == {str(goal_dir(tmp_path)): 3}
+        assert parts(goal_dir(tmp_path)) == ["part-00000.parquet"]
+        assert sorted(pq.read_table(goal_dir(tmp_path)).column("event_id").to_pylist()) == [
+            f"event-{n}" for n in range(6)
+        ]
+
+        # New parts after compaction are merged into the compacted one
+        await sink.write([("goal.created", DAY, make_record(6))])
+        await sink.write([("goal.created", DAY, make_record(7))])
+        assert compact_partition(str(goal_dir(tmp_path))) == 3
+        assert pq.read_table(goal_dir(tmp_path)).num_rows == 8
+
+    @pytest.mark.asyncio
+    async def test_write_and_compaction_dedupe_redelivered_events(self, tmp_path):
+        """write() reports what reached disk; compaction keeps one copy per event_id."""
+        sink = ParquetEventSink(base_path=str(tmp_path))
+        events = [("goal.created", DAY, make_record(n)) for n in range(3)]
+        invalid = ("goal.created", DAY, make_record(9, goal_id=None))
+
+        assert await sink.write(events + [invalid]) == {"event-0", "event-1", "event-2", "event-9"}
+        # Redelivery after a lost acknowledgement
+        await sink.write(events[1:])
+        assert pq.read_table(goal_dir(tmp_path)).num_rows == 5
+
+        assert compact_partition(str(goal_dir(tmp_path))) == 2
+        assert pq.read_table(goal_dir(tmp_path)).column("event_id").to_pylist() == [
+            "event-0", "event-1", "event-2"
+        ]
+
+    def test_compaction_skips_locked_partition(self, tmp_path):
+        """A partition being compacted by another worker is left alone."""
+        table = pa.Table.from_pylist([make_record()], schema=GOAL_EVENT_SCHEMA)
+        write_part(str(tmp_path), table)
+        write_part(str(tmp_path), table)
+        (tmp_path / ".compact.lock").touch()
+
+        assert compact_partition(str(tmp_path)) == 0
+        assert parts(tmp_path) == ["part-00001.parquet", "part-00002.parquet"]
+
+        # A lock left by a dead worker expires
+        os.utime(tmp_path / ".compact.lock", (0, 0))
+        assert compact_partition(str(tmp_path)) == 2
+        assert not (tmp_path / ".compact.lock").exists()
@@ -0,0 +1,60 @@
+"""Tests for the bounded bcrypt executor."""
+
+import asyncio
+import threading
+import pytest
+
+from app.core.password_hasher import PasswordHasher, PasswordHasherBusy
+
+
+class TestPasswordHasher:
+    """Test password hashing off the event loop."""
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify(self):
+        """Hashes verify against the original password only."""
+        hasher = PasswordHasher(max_workers=1, max_queue=1)
+        hashed = await hasher.hash("secret-password")
+
+        assert await hasher.verify("secret-password", hashed) is True
+        assert await hasher.verify("wrong-password", hashed) is False
+
+        metrics = hasher.metrics()
+        assert metrics["completed"] == 3
+        assert metrics["hash_ms"]["avg"] > 0
+        hasher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_saturated(self):
+        """Calls beyond workers + queue fail fast instead of waiting."""
+        hasher = PasswordHasher(max_workers=1, max_queue=1)
+        release = threading.Event()
+
+        running = asyncio.create_task(hasher._run(release.wait))
+        queued = asyncio.create_task(hasher._run(release.wait))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(PasswordHasherBusy):
+            await hasher._run(release.wait)
+
+        release.set()
+        await asyncio.gather(running, queued)
+        await asyncio.sleep(0.01)
+
+        metrics = hasher.metrics()
+        assert metrics["rejected"] == 1
+        assert metrics["pending"] == 0
+        # The queued job waited for the running one
+        assert metrics["queue_wait_ms"]["max"] > 0
+        hasher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_invalid_hash_counts_as_failure(self):
+        """Errors from bcrypt propagate and are counted."""
+        hasher = PasswordHasher(max_workers=1, max_queue=1)
+
+        with pytest.raises(ValueError):
+            await hasher.verify("secret-password", "not-a-bcrypt-hash")
+
+        assert hasher.metrics()["failed"] == 1
+        hasher.shutdown()
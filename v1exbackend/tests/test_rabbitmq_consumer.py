@@ -0,0 +1,237 @@
+"""Tests for the concurrent RabbitMQ consumer runtime."""
+
+import asyncio
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from app.core.rabbitmq_consumer import (
+    ORIGINAL_ROUTING_KEY_HEADER,
+    RETRY_COUNT_HEADER,
+    ConsumerRuntime,
+    QueueConsumer,
+)
+
+
+class FakeQueue:
+    def __init__(self, name, arguments):
+        self.name = name
+        self.arguments = arguments
+        self.bindings = []
+        self.callback = None
+
+    async def bind(self, exchange, routing_key):
+        self.bindings.append((exchange, routing_key))
+
+    async def consume(self, callback, no_ack=False):
+        self.callback = callback
+        return "tag"
+
+    async def cancel(self, tag):
+        self.callback = None
+
+    async def declare(self):
+        return SimpleNamespace(message_count=42)
+
+
+class FakeChannel:
+    def __init__(self):
+        self.is_closed = False
+        self.prefetch = None
+        self.queues = {}
+        self.exchanges = {}
+        self.default_exchange = MagicMock()
+        self.default_exchange.publish = AsyncMock()
+
+    async def set_qos(self, prefetch_count):
+        self.prefetch = prefetch_count
+
+    async def declare_exchange(self, name, type, durable=False):
+        self.exchanges[name] = type
+        return name
+
+    async def declare_queue(self, name, durable=False, arguments=None):
+        self.queues[name] = FakeQueue(name, arguments)
+        return self.queues[name]
+
+    async def close(self):
+        self.is_closed = True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.channels = []
+
+    async def channel(self, publisher_confirms=True):
+        channel = FakeChannel()
+        self.channels.append(channel)
+        return channel
+
+
+def incoming(n=0, retries=None, body=None):
+    message = MagicMock()
+    message.body = body if body is not None else json.dumps({"n": n}).encode()
+    message.routing_key = "goal.created"
+    message.message_id = f"m-{n}"
+    message.content_type = "application/json"
+    message.timestamp = datetime.now(timezone.utc) - timedelta(seconds=2)
+    message.headers = {} if retries is None else {RETRY_COUNT_HEADER: retries}
+    message.ack = AsyncMock()
+    message.reject = AsyncMock()
+    return message
+
+
+async def started(**kwargs):
+    connection = FakeConnection()
+    kwargs.setdefault("handler", AsyncMock())
+    consumer = QueueConsumer(connection, "goals", exchange="events", routing_keys=["goal.*"], **kwargs)
+    await consumer.start()
+    return consumer, connection.channels[0]
+
+
+async def deliver(consumer, messages):
+    for message in messages:
+        await consumer._on_message(message)
+    for _ in range(200):
+        await asyncio.sleep(0.01)
+        if all(message.ack.await_count or message.reject.await_count for message in messages):
+            return
+
+
+class TestQueueConsumer:
+    """Test topology, concurrency, batching, retries and dead-lettering."""
+
+    @pytest.mark.asyncio
+    async def test_declares_prefetch_retry_queues_and_dlq(self):
+        """The channel gets the prefetch; retry queues back off and dead-letter into the queue."""
+        consumer, channel = await started(prefetch=16, max_retries=3, retry_base_delay=1.0, retry_max_delay=3.0)
+
+        assert channel.prefetch == 16
+        assert channel.queues["goals"].arguments["x-dead-letter-exchange"] == "events.dlx"
+        assert channel.queues["goals"].bindings == [("events", "goal.*")]
+        assert channel.queues["goals.dlq"].bindings == [("events.dlx", "goals")]
+        assert [channel.queues[f"goals.retry.{n}"].arguments["x-message-ttl"] for n in (1, 2, 3)] == [1000, 2000, 3000]
+        assert channel.queues["goals.retry.1"].arguments["x-dead-letter-routing-key"] == "goals"
+        await consumer.stop()
+
+    @pytest.mark.asyncio
+    async def test_handlers_run_concurrently_up_to_limit(self):
+        """At most `concurrency` handlers run at once and every message is acked."""
+        running = 0
+        peak = 0
+
+        async def handler(payload, routing_key):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+        consumer, _ = await started(handler=handler, concurrency=3)
+        messages = [incoming(n) for n in range(9)]
+        await deliver(consumer, messages)
+
+        assert peak == 3
+        assert all(message.ack.await_count == 1 for message in messages)
+        metrics = consumer.metrics()
+        assert metrics["processed"] == 9
+        assert metrics["last_lag_ms"] >= 2000
+        assert metrics["throughput_per_second"] > 0
+        await consumer.stop()
+
+    @pytest.mark.asyncio
+    async def test_batch_handler_receives_lists(self):
+        """Batch mode groups up to batch_size messages per call."""
+        batch_handler = AsyncMock()
+        consumer, _ = await started(
+            handler=None, batch_handler=batch_handler, concurrency=1, batch_size=4, batch_timeout=0.05
+        )
+
+        await deliver(consumer, [incoming(n) for n in range(10)])
+
+        sizes = [len(call.args[0]) for call in batch_handler.await_args_list]
+        assert sum(sizes) == 10
+        assert max(sizes) == 4
+        assert batch_handler.await_args_list[0].args[0][0] == ({"n": 0}, "goal.created")
+        await consumer.stop()
+
+    @pytest.mark.asyncio
+    async def test_failure_goes_to_next_retry_queue(self):
+        """A failed message is republished with the next retry count, then acked."""
+        consumer, channel = await started(handler=AsyncMock(side_effect=RuntimeError("boom")))
+        message = incoming(retries=1)
+
+        await deliver(consumer, [message])
+
+        retry, = channel.default_exchange.publish.await_args_list
+        assert retry.kwargs["routing_key"] == "goals.retry.2"
+        assert retry.args[0].headers[RETRY_COUNT_HEADER] == 2
+        assert retry.args[0].body == message.body
+        message.ack.assert_awaited_once()
+        assert consumer.metrics()["retried"] == 1
+        await consumer.stop()
+
+    @pytest.mark.asyncio
+    async def test_retried_message_keeps_original_routing_key(self):
+        """After a round trip through a retry queue the handler gets the original key."""
+        handler = AsyncMock(side_effect=[RuntimeError("boom"), None])
+        consumer, channel = await started(handler=handler)
+        first = incoming()
+
+        await deliver(consumer, [first])
+
+        # The broker dead-letters the retry copy back with the queue name as key
+        retry = channel.default_exchange.publish.await_args.args[0]
+        assert retry.headers[ORIGINAL_ROUTING_KEY_HEADER] == "goal.created"
+        redelivered = incoming()
+        redelivered.routing_key = "goals"
+        redelivered.headers = retry.headers
+        await deliver(consumer, [redelivered])
+
+        assert [call.args[1] for call in handler.await_args_list] == ["goal.created", "goal.created"]
+        redelivered.ack.assert_awaited_once()
+        await consumer.stop()
+
+    @pytest.mark.asyncio
+    async def test_exhausted_and_undecodable_messages_are_dead_lettered(self):
+        """Past max_retries, or with a body that is not JSON, the message is rejected."""
+        handler = AsyncMock(side_effect=RuntimeError("boom"))
+        consumer, channel = await started(handler=handler, max_retries=2)
+        exhausted = incoming(retries=2)
+        garbage = incoming(body=b"not json")
+
+        await deliver(consumer, [exhausted, garbage])
+
+        exhausted.reject.assert_awaited_once_with(requeue=False)
+        garbage.reject.assert_awaited_once_with(requeue=False)
+        assert handler.await_count == 1
+        channel.default_exchange.publish.assert_not_awaited()
+        assert consumer.metrics()["dead_lettered"] == 2
+        await consumer.stop()
+
+
+class TestConsumerRuntime:
+    """Test the runtime across queues."""
+
+    @pytest.mark.asyncio
+    async def test_start_stop_and_metrics(self):
+        """Each queue gets its own channel; stop cancels and closes them."""
+        connection = FakeConnection()
+        runtime = ConsumerRuntime(connection)
+        for name in ("goals", "tasks"):
+            runtime.add(QueueConsumer(connection, name, "events", [f"{name[:-1]}.*"], handler=AsyncMock()))
+        with pytest.raises(ValueError):
+            runtime.add(QueueConsumer(connection, "goals", "events", [], handler=AsyncMock()))
+
+        await runtime.start()
+        await runtime.consumers["goals"].refresh_queue_depth()
+        metrics = runtime.metrics()
+        await runtime.stop()
+
+        assert set(metrics) == {"goals", "tasks"}
+        assert metrics["goals"]["queue_depth"] == 42
+        assert len(connection.channels) == 2
+        assert all(channel.is_closed for channel in connection.channels)
+        assert connection.channels[0].queues["goals"].callback is None
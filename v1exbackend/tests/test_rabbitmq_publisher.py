@@ -0,0 +1,121 @@
+"""Tests for the pooled RabbitMQ publisher."""
+
+import asyncio
+import pytest
+
+from app.core.rabbitmq_publisher import OutgoingMessage, RabbitMQPublisher
+
+
+class FakeExchange:
+    """Exchange that confirms after `delay` and nacks routing key 'fail'."""
+
+    def __init__(self, channel, name, delay):
+        self.channel = channel
+        self.name = name
+        self.delay = delay
+
+    async def publish(self, message, routing_key, timeout=None):
+        self.channel.in_flight += 1
+        self.channel.max_in_flight = max(self.channel.max_in_flight, self.channel.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if routing_key == "fail":
+                raise RuntimeError("nacked")
+            self.channel.published.append((self.name, routing_key, message.message_id))
+        finally:
+            self.channel.in_flight -= 1
+
+
+class FakeChannel:
+    def __init__(self, delay):
+        self.delay = delay
+        self.is_closed = False
+        self.declared = []
+        self.published = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def declare_exchange(self, name, type, durable=False):
+        self.declared.append((name, type, durable))
+        return FakeExchange(self, name, self.delay)
+
+    async def close(self):
+        self.is_closed = True
+
+
+class FakeConnection:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.channels = []
+
+    async def channel(self, publisher_confirms=True):
+        assert publisher_confirms
+        channel = FakeChannel(self.delay)
+        self.channels.append(channel)
+        return channel
+
+
+def message(routing_key="goal.created", n=0):
+    return OutgoingMessage(exchange="events", routing_key=routing_key, body=b"{}", message_id=f"m-{n}")
+
+
+class TestRabbitMQPublisher:
+    """Test pooling, exchange caching, windows and batch confirms."""
+
+    @pytest.mark.asyncio
+    async def test_exchange_declared_once_per_channel(self):
+        """Publishes are spread round-robin and each channel declares the exchange once."""
+        connection = FakeConnection()
+        publisher = RabbitMQPublisher(connection, pool_size=3)
+        await publisher.start()
+
+        for n in range(30):
+            await publisher.publish(message(n=n))
+
+        assert len(connection.channels) == 3
+        assert [len(channel.published) for channel in connection.channels] == [10, 10, 10]
+        assert [len(channel.declared) for channel in connection.channels] == [1, 1, 1]
+        assert publisher.metrics()["exchange_declarations"] == 3
+        assert publisher.metrics()["published"] == 30
+
+    @pytest.mark.asyncio
+    async def test_batch_reports_each_confirm(self):
+        """A batch returns None for confirmed messages and the error for nacked ones."""
+        publisher = RabbitMQPublisher(FakeConnection(), pool_size=2)
+        await publisher.start()
+
+        batch = [message(n=0), message("fail", 1), message(n=2), message(n=3)]
+        results = await publisher.publish_batch(batch)
+
+        assert [r is None for r in results] == [True, False, True, True]
+        assert isinstance(results[1], RuntimeError)
+        assert publisher.metrics()["failed"] == 1
+        assert publisher.metrics()["batches"] == 1
+
+    @pytest.mark.asyncio
+    async def test_in_flight_window_is_bounded(self):
+        """No channel has more than max_in_flight unconfirmed messages."""
+        connection = FakeConnection(delay=0.01)
+        publisher = RabbitMQPublisher(connection, pool_size=2, max_in_flight=5)
+        await publisher.start()
+
+        results = await publisher.publish_batch([message(n=n) for n in range(40)])
+
+        assert results == [None] * 40
+        assert [channel.max_in_flight for channel in connection.channels] == [5, 5]
+        assert publisher.metrics()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_closed_channel_is_reopened(self):
+        """A closed channel is replaced and its exchanges declared again."""
+        connection = FakeConnection()
+        publisher = RabbitMQPublisher(connection, pool_size=1)
+        await publisher.start()
+        await publisher.publish(message())
+
+        connection.channels[0].is_closed = True
+        await publisher.publish(message())
+
+        assert len(connection.channels) == 2
+        assert len(connection.channels[1].declared) == 1
+        assert publisher.metrics()["channel_reopens"] == 1
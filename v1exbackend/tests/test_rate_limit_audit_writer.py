@@ -0,0 +1,219 @@
+"""Tests for the batched rate limit audit writer and rollups."""
+
+import asyncio
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.rate_limiter import RateLimiter, RateLimitResult
+from app.models import RateLimitAction
+from app.models.rate_limit_rollup import ROLLUP_COUNTER_COLUMNS
+from app.services import rate_limit_audit_writer
+from app.services.rate_limit_audit_service import RateLimitAuditService
+from app.services.rate_limit_audit_writer import RateLimitAuditWriter
+from tests.test_suspicious_activity import FakeSortedSetRedis
+from app.services.rate_limit_rollup_service import (
+    HOUR,
+    MAX_BIND_PARAMS,
+    MINUTE,
+    RateLimitRollupService,
+    aggregate_records,
+)
+
+
+def make_record(user_id="user-1", allowed=True, max_requests=10):
+    result = RateLimitResult(
+        allowed=allowed,
+        tokens_requested=1,
+        tokens_available=5,
+        tokens_consumed=1 if allowed else 0,
+        limit_key=f"rate_limit:{user_id}:api_call",
+        window_seconds=60,
+        max_requests=max_requests,
+        current_count=1,
+    )
+    return RateLimitAuditService.build_record(
+        user_id=user_id,
+        endpoint="/api/v1/goals",
+        method="GET",
+        action=RateLimitAction.api_call,
+        rate_limit_result=result,
+        http_status_code=200 if allowed else 429,
+    )
+
+
+class TestRateLimitAuditWriter:
+    """Test the background audit writer."""
+
+    @pytest.mark.asyncio
+    async def test_flushes_full_batches(self):
+        """Records are written in batches of batch_size."""
+        batches = []
+
+        async def flush(batch):
+            batches.append(list(batch))
+
+        writer = RateLimitAuditWriter(batch_size=10, flush_interval=5.0, flush_batch=flush)
+        for _ in range(25):
+            assert writer.submit(make_record())
+
+        writer.start()
+        await writer.stop()
+
+        assert [len(b) for b in batches] == [10, 10, 5]
+        assert writer.written == 25
+        assert writer.batches == 3
+
+    @pytest.mark.asyncio
+    async def test_flushes_partial_batch_after_interval(self):
+        """A partial batch is written once flush_interval elapses."""
+        flushed = asyncio.Event()
+
+        async def flush(batch):
+            flushed.set()
+
+        writer = RateLimitAuditWriter(batch_size=100, flush_interval=0.05, flush_batch=flush)
+        writer.start()
+        writer.submit(make_record())
+
+        await asyncio.wait_for(flushed.wait(), timeout=1.0)
+        assert writer.written == 1
+
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_drops_when_queue_full(self):
+        """A full queue drops records instead of blocking the caller."""
+        writer = RateLimitAuditWriter(max_queue_size=3, flush_batch=AsyncMock())
+
+        accepted = [writer.submit(make_record()) for _ in range(5)]
+
+        assert accepted == [True, True, True, False, False]
+        metrics = writer.metrics()
+        assert metrics["dropped"] == 2
+        assert metrics["queue_depth"] == 3
+        assert metrics["max_queue_depth"] == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_counted(self):
+        """A failing insert is counted and does not stop the worker."""
+        flush = AsyncMock(side_effect=[Exception("db down"), None])
+        writer = RateLimitAuditWriter(batch_size=2, flush_interval=5.0, flush_batch=flush)
+        for _ in range(4):
+            writer.submit(make_record())
+
+        writer.start()
+        await writer.stop()
+
+        assert writer.failed == 2
+        assert writer.written == 2
+
+    @pytest.mark.asyncio
+    async def test_rejects_after_stop(self):
+        """Records submitted after shutdown are dropped."""
+        writer = RateLimitAuditWriter(flush_batch=AsyncMock())
+        writer.start()
+        await writer.stop()
+
+        assert writer.submit(make_record()) is False
+        assert writer.dropped == 1
+
+
+class TestBatchSuspiciousDetection:
+    """Test suspicious-activity flags computed for a whole batch."""
+
+    @pytest.mark.asyncio
+    async def test_batch_counts_include_earlier_rows(self):
+        """Each row sees the DB count plus the earlier rows of the batch."""
+        db = AsyncMock()
+        query_result = MagicMock()
+        # threshold = 10 * 5 = 50 requests in 5 minutes
+        query_result.all.return_value = [("user-1", RateLimitAction.api_call, 50, 0)]
+        db.execute = AsyncMock(return_value=query_result)
+
+        records = [make_record(), make_record(), make_record(user_id="user-2")]
+        await RateLimitAuditService(db)._flag_suspicious_batch(records)
+
+        assert records[0]["is_suspicious"] is False
+        assert records[1]["is_suspicious"] is True
+        assert records[1]["alert_reason"] == "Excessive requests: 51 in 5 minutes (threshold: 50)"
+        assert records[2]["is_suspicious"] is False
+        # One grouped query for the whole batch
+        assert db.execute.call_count == 1
+
+
+    @pytest.mark.asyncio
+    async def test_default_flush_uses_the_rate_limiter_redis(self, monkeypatch):
+        """Without an injected flush_batch, batches go through the Redis detector."""
+        redis = FakeSortedSetRedis()
+        db = MagicMock()
+        db.execute = AsyncMock()
+        db.commit = AsyncMock()
+        session = MagicMock()
+        session.return_value.__aenter__ = AsyncMock(return_value=db)
+        session.return_value.__aexit__ = AsyncMock(return_value=False)
+        monkeypatch.setattr(rate_limit_audit_writer, "_detector", None)
+
+        writer = RateLimitAuditWriter(batch_size=10, flush_interval=0.05)
+        records = [make_record(), make_record(user_id="user-2")]
+        for record in records:
+            writer.submit(record)
+
+        with patch.object(rate_limit_audit_writer, "get_rate_limiter", AsyncMock(return_value=RateLimiter(redis))), \
+                patch.object(rate_limit_audit_writer, "AsyncSessionLocal", session):
+            writer.start()
+            await writer.stop()
+
+        assert writer.written == 2
+        assert writer.failed == 0
+        assert set(redis.zsets) == {"suspicious:user-1:api_call:all", "suspicious:user-2:api_call:all"}
+        assert all(record["is_suspicious"] is False for record in records)
+        db.commit.assert_awaited_once()
+
+
+class TestRollupAggregation:
+    """Test the in-memory aggregation applied to the rollup tables."""
+
+    def test_aggregate_records_by_minute_and_hour(self):
+        """Counters, sums and histogram buckets per (user, action, bucket)."""
+        records = [make_record(), make_record(allowed=False), make_record(user_id="user-2")]
+        records[0].update(timestamp=datetime(2025, 1, 15, 10, 0, 5), response_time_ms=8.0,
+                          openai_total_tokens=100, estimated_cost_cents=0.5)
+        records[1].update(timestamp=datetime(2025, 1, 15, 10, 1, 59), response_time_ms=300.0,
+                          alert_triggered=True)
+        records[2].update(timestamp=datetime(2025, 1, 15, 10, 59, 0), response_time_ms=None)
+
+        minutes = aggregate_records(records, MINUTE)
+        assert len(minutes) == 3
+
+        hours = aggregate_records(records, HOUR)
+        bucket = hours[("user-1", RateLimitAction.api_call, datetime(2025, 1, 15, 10))]
+        assert bucket["request_count"] == 2
+        assert bucket["allowed_count"] == 1
+        assert bucket["blocked_count"] == 1
+        assert bucket["alert_count"] == 1
+        assert bucket["openai_tokens"] == 100
+        assert bucket["response_time_sum_ms"] == 308.0
+        assert bucket["response_time_count"] == 2
+        assert bucket["rt_le_10ms"] == 1
+        assert bucket["rt_le_500ms"] == 1
+
+        other = hours[("user-2", RateLimitAction.api_call, datetime(2025, 1, 15, 10))]
+        assert other["response_time_count"] == 0
+
+    @pytest.mark.asyncio
+    async def test_upsert_is_chunked_under_the_parameter_limit(self):
+        """Large batches are split so no statement exceeds MAX_BIND_PARAMS."""
+        db = MagicMock()
+        db.execute = AsyncMock()
+        records = [make_record(user_id=f"user-{n}") for n in range(3000)]
+
+        await RateLimitRollupService(db).apply(records)
+
+        statements = [call.args[0] for call in db.execute.await_args_list]
+        params = [len(stmt.compile().params) for stmt in statements]
+        assert len(statements) > 2
+        assert max(params) <= MAX_BIND_PARAMS
+        # Every (user, bucket) row of both rollups is written once
+        columns = 3 + len(ROLLUP_COUNTER_COLUMNS)
+        assert sum(params) == 2 * 3000 * columns
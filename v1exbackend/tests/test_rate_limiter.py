@@ -3,10 +3,13 @@
 import pytest
 import time
 from unittest.mock import AsyncMock, MagicMock, patch
+from redis.exceptions import NoScriptError
 
 from app.core.rate_limiter import (
     RateLimiter,
     TokenBucket,
+    GCRA,
+    SlidingWindowCounter,
     RateLimitConfig,
     RateLimitResult,
 )
@@ -17,12 +20,13 @@ def mock_redis():
     """Create a mock Redis client."""
     redis_mock = AsyncMock()
 
-    # Mock eval to simulate Token Bucket behavior
-    async def mock_eval(script, num_keys, *args):
+    # Mock evalsha to simulate Token Bucket behavior
+    async def mock_evalsha(sha, num_keys, *args):
         # Simple simulation: always allow first request
-        return [1, 99, 1]  # allowed=1, tokens_available=99, tokens_consumed=1
+        return [1, 99, 1, 1]  # allowed=1, tokens_available=99, tokens_consumed=1, count=1
 
-    redis_mock.eval = AsyncMock(side_effect=mock_eval)
+    redis_mock.script_load = AsyncMock(return_value="token-bucket-sha")
+    redis_mock.evalsha = AsyncMock(side_effect=mock_evalsha)
     redis_mock.incr = AsyncMock(return_value=1)
     redis_mock.expire = AsyncMock()
     redis_mock.get = AsyncMock(return_value=b"1")
@@ -56,11 +60,10 @@ async def test_rate_limiter_allows_within_limit(rate_limiter, mock_redis):
 async def test_rate_limiter_blocks_over_limit(mock_redis):
     """Test that requests over limit are blocked."""
     # Mock to simulate no tokens available
-    async def mock_eval_blocked(script, num_keys, *args):
-        return [0, 0, 0, 30.0]  # allowed=0, tokens=0, consumed=0, retry_after=30
+    async def mock_evalsha_blocked(sha, num_keys, *args):
+        return [0, 0, 0, 100, "30.0"]  # allowed=0, tokens=0, consumed=0, count=100, retry_after=30
 
-    mock_redis.eval = AsyncMock(side_effect=mock_eval_blocked)
-    mock_redis.get = AsyncMock(return_value=b"100")
+    mock_redis.evalsha = AsyncMock(side_effect=mock_evalsha_blocked)
 
     limiter = RateLimiter(mock_redis)
 
@@ -73,6 +76,7 @@ async def test_rate_limiter_blocks_over_limit(mock_redis):
     assert result.allowed is False
     assert result.retry_after_seconds is not None
     assert result.retry_after_seconds > 0
+    assert result.current_count == 100
 
 
 @pytest.mark.asyncio
@@ -111,6 +115,153 @@ async def test_token_bucket_consume(mock_redis):
     assert result.allowed is True
 
 
+@pytest.mark.asyncio
+async def test_token_bucket_single_round_trip(rate_limiter, mock_redis):
+    """Test that each decision is a single EVALSHA with the script loaded once."""
+    for _ in range(3):
+        result = await rate_limiter.check_limit(user_id="test_user", action="code_validation")
+        assert result.current_count == 1
+
+    mock_redis.script_load.assert_awaited_once()
+    assert mock_redis.evalsha.await_count == 3
+    mock_redis.eval.assert_not_called()
+    mock_redis.incr.assert_not_called()
+    mock_redis.expire.assert_not_called()
+
+    # Bucket and counter keys travel together in the same call
+    args = mock_redis.evalsha.await_args.args
+    assert args[0] == "token-bucket-sha"
+    assert args[1] == 2
+    assert args[2:4] == (
+        "rate_limit:test_user:code_validation",
+        "rate_limit:test_user:code_validation:count",
+    )
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_reloads_on_noscript(mock_redis):
+    """Test that the script is reloaded when Redis answers NOSCRIPT."""
+    mock_redis.evalsha = AsyncMock(
+        side_effect=[NoScriptError("NOSCRIPT"), [1, 99, 1, 5]]
+    )
+    bucket = TokenBucket(mock_redis)
+    bucket.script.sha = "stale-sha"
+
+    result = await bucket.consume(
+        key="test_key",
+        tokens=1,
+        config=RateLimitConfig(max_requests=100, window_seconds=60)
+    )
+
+    assert result.allowed is True
+    assert result.current_count == 5
+    mock_redis.script_load.assert_awaited_once()
+    assert bucket.script.sha == "token-bucket-sha"
+    assert mock_redis.evalsha.await_args.args[0] == "token-bucket-sha"
+
+
+@pytest.mark.asyncio
+async def test_leased_quota_serves_from_local_lease(mock_redis):
+    """Test that a lease lets the worker skip Redis until it runs out."""
+    # granted=10 tokens, 130 left in Redis, counter at 10 after the grant
+    mock_redis.evalsha = AsyncMock(return_value=[1, 130, 10, 10])
+    limiter = RateLimiter(mock_redis)
+
+    results = [
+        await limiter.check_limit(user_id="test_user", action="api_call")
+        for _ in range(10)
+    ]
+
+    assert all(r.allowed for r in results)
+    assert mock_redis.evalsha.await_count == 1
+    assert [r.current_count for r in results] == list(range(1, 11))
+    assert results[-1].tokens_available == 130
+
+    # The 11th request exhausts the lease and goes back to Redis
+    await limiter.check_limit(user_id="test_user", action="api_call")
+    assert mock_redis.evalsha.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_leased_quota_returns_unused_tokens_on_expiry(mock_redis):
+    """Test that an expired lease hands its unused tokens back to Redis."""
+    mock_redis.evalsha = AsyncMock(return_value=[1, 130, 10, 10])
+    limiter = RateLimiter(mock_redis)
+
+    await limiter.check_limit(user_id="test_user", action="api_call")
+    key = limiter.get_key("test_user", "api_call")
+    limiter.leases[key].expires_at = 0
+
+    await limiter.check_limit(user_id="test_user", action="api_call")
+
+    # ARGV[7] (tokens_returned) is the last argument of the lease script
+    assert mock_redis.evalsha.await_args.args[-1] == 9
+    assert mock_redis.evalsha.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_leased_quota_denies_when_bucket_empty(mock_redis):
+    """Test that an empty shared bucket still blocks leased actions."""
+    mock_redis.evalsha = AsyncMock(return_value=[0, 0, 0, 150, "0.6"])
+    limiter = RateLimiter(mock_redis)
+
+    result = await limiter.check_limit(user_id="test_user", action="api_call")
+
+    assert result.allowed is False
+    assert result.retry_after_seconds == pytest.approx(0.6)
+    assert result.current_count == 150
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_engine_per_action(rate_limiter, mock_redis):
+    """Test that config.algorithm selects the engine and its storage key."""
+    rate_limiter.configs["rag_search"].algorithm = "gcra"
+    rate_limiter.configs["bulk_create"].algorithm = "sliding_window"
+
+    await rate_limiter.check_limit(user_id="u1", action="rag_search")
+    args = mock_redis.evalsha.await_args.args
+    assert args[1] == 1
+    assert args[2] == "rate_limit:u1:rag_search:gcra"
+
+    await rate_limiter.check_limit(user_id="u1", action="bulk_create")
+    args = mock_redis.evalsha.await_args.args
+    assert args[2] == "rate_limit:u1:bulk_create:swc"
+
+    # Each engine loads its own script once
+    assert mock_redis.script_load.await_count == 2
+    assert isinstance(rate_limiter.engines["gcra"], GCRA)
+    assert isinstance(rate_limiter.engines["sliding_window"], SlidingWindowCounter)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_unknown_algorithm(rate_limiter):
+    """Test that a misconfigured algorithm fails loudly."""
+    config = RateLimitConfig(max_requests=5, window_seconds=10, algorithm="leaky")
+
+    with pytest.raises(ValueError):
+        await rate_limiter.check_limit(
+            user_id="test_user", action="custom", custom_config=config
+        )
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_check_limits_mixed_engines(rate_limiter, mock_redis):
+    """Test that batched checks keep request order across engines."""
+    rate_limiter.configs["rag_search"].algorithm = "gcra"
+    pipe = mock_pipeline(mock_redis, [[1, 10, 1, 1]])
+
+    results = await rate_limiter.check_limits([
+        ("u1", "rag_search", 1),
+        ("u1", "bulk_create", 1),
+    ])
+
+    assert [r.limit_key for r in results] == [
+        "rate_limit:u1:rag_search",
+        "rate_limit:u1:bulk_create",
+    ]
+    assert pipe.execute.await_count == 2
+
+
 @pytest.mark.asyncio
 async def test_rate_limiter_reset(rate_limiter):
     """Test resetting user limits."""
@@ -120,16 +271,86 @@ async def test_rate_limiter_reset(rate_limiter):
     rate_limiter.bucket.redis.delete.assert_called()
 
 
+def mock_pipeline(mock_redis, results):
+    """Attach a pipeline mock whose execute() returns the given results."""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=results)
+    mock_redis.pipeline = MagicMock(return_value=pipe)
+    return pipe
+
+
 @pytest.mark.asyncio
 async def test_rate_limiter_get_status(rate_limiter, mock_redis):
     """Test getting user status."""
-    mock_redis.hmget = AsyncMock(return_value=[b"50.0", str(time.time()).encode()])
-    mock_redis.get = AsyncMock(return_value=b"10")
+    n_actions = len(rate_limiter.configs)
+    pipe = mock_pipeline(
+        mock_redis,
+        [[b"50.0", str(time.time()).encode()], b"10"] * n_actions
+    )
 
     status = await rate_limiter.get_user_status("test_user")
 
     assert "api_call" in status
     assert "embedding_generation" in status
+    assert status["api_call"]["current_count"] == 10
+    assert status["api_call"]["available_tokens"] == pytest.approx(50.0, abs=0.1)
+
+    # All reads go out in a single round-trip
+    pipe.execute.assert_awaited_once()
+    assert pipe.hmget.call_count == n_actions
+    mock_redis.hmget.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_get_users_status_batched(rate_limiter, mock_redis):
+    """Test fetching the status of several users in one pipeline."""
+    n_actions = len(rate_limiter.configs)
+    pipe = mock_pipeline(mock_redis, [[None, None], None] * n_actions * 3)
+
+    statuses = await rate_limiter.get_users_status(["u1", "u2", "u3"])
+
+    assert list(statuses) == ["u1", "u2", "u3"]
+    assert statuses["u2"]["bulk_create"]["available_tokens"] == 5
+    assert statuses["u3"]["api_call"]["current_count"] == 0
+    pipe.execute.assert_awaited_once()
+    assert pipe.get.call_count == n_actions * 3
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_reset_all_single_delete(rate_limiter, mock_redis):
+    """Test that resetting every action issues a single DELETE."""
+    await rate_limiter.reset_users_limits(["u1", "u2"])
+
+    mock_redis.delete.assert_awaited_once()
+    keys = mock_redis.delete.await_args.args
+    # Two users x every action x the keys of every engine
+    keys_per_bucket = sum(len(e.storage_keys("k")) for e in rate_limiter.engines.values())
+    assert len(keys) == len(rate_limiter.configs) * 2 * keys_per_bucket
+    assert "rate_limit:u2:bulk_create:count" in keys
+    assert "rate_limit:u2:bulk_create:gcra" in keys
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_check_limits_batched(rate_limiter, mock_redis):
+    """Test consuming several buckets in one pipelined call."""
+    pipe = mock_pipeline(
+        mock_redis,
+        [[1, 20, 1, 1], [0, 0, 0, 5, "12.0"], Exception("boom")]
+    )
+
+    results = await rate_limiter.check_limits([
+        ("u1", "embedding_generation", 1),
+        ("u1", "bulk_create", 1),
+        ("u2", "chat_completion", 1),
+    ])
+
+    assert [r.allowed for r in results] == [True, False, True]
+    assert results[1].retry_after_seconds == 12.0
+    assert results[1].limit_key == "rate_limit:u1:bulk_create"
+    assert results[2].tokens_consumed == 0  # fail-open on per-item errors
+    assert pipe.evalsha.call_count == 3
+    pipe.execute.assert_awaited_once()
+    mock_redis.script_load.assert_awaited_once()
 
 
 @pytest.mark.asyncio
@@ -169,7 +390,7 @@ async def test_rate_limiter_burst_support(rate_limiter):
 async def test_rate_limiter_error_handling(mock_redis):
     """Test that rate limiter fails open on Redis errors."""
     # Simulate Redis error
-    mock_redis.eval = AsyncMock(side_effect=Exception("Redis connection failed"))
+    mock_redis.evalsha = AsyncMock(side_effect=Exception("Redis connection failed"))
 
     limiter = RateLimiter(mock_redis)
 
@@ -0,0 +1,136 @@
+"""Tests for the WebSocket connection index in RedisService."""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.redis_client import WS_ONLINE_USERS_KEY, RedisService
+
+
+@pytest.fixture
+def redis_service():
+    """RedisService over a mock client with mocked Lua scripts."""
+    client = MagicMock()
+    client.get = AsyncMock()
+
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    client.pipeline = MagicMock(return_value=MagicMock(
+        __aenter__=AsyncMock(return_value=pipe),
+        __aexit__=AsyncMock(return_value=False),
+    ))
+
+    with patch("app.core.redis_client.get_redis", return_value=client), \
+            patch("app.core.redis_client._ws_add_connection", new=AsyncMock()) as add_script, \
+            patch("app.core.redis_client._ws_remove_connection", new=AsyncMock()) as remove_script:
+        service = RedisService()
+        service.add_script = add_script
+        service.remove_script = remove_script
+        service.pipe = pipe
+        yield service
+
+
+class TestWebSocketConnectionIndex:
+    """Test the per-user connection index."""
+
+    @pytest.mark.asyncio
+    async def test_add_updates_connection_and_indexes(self, redis_service):
+        """A connection is stored and indexed under its user atomically."""
+        await redis_service.add_ws_connection("conn-1", "user-1", "instance-a")
+
+        call = redis_service.add_script.await_args
+        assert call.kwargs["keys"] == ["ws_connections:conn-1", "ws_user_connections:user-1", WS_ONLINE_USERS_KEY]
+        assert call.kwargs["args"][:2] == ["instance-a:conn-1", "user-1"]
+        assert json.loads(call.kwargs["args"][2])["instance_id"] == "instance-a"
+
+    @pytest.mark.asyncio
+    async def test_add_passes_limit_and_reports_refusal(self, redis_service):
+        """The per-user limit goes to the script, which returns 0 when refused."""
+        redis_service.add_script.return_value = 0
+
+        assert not await redis_service.add_ws_connection("conn-1", "user-1", "instance-a", max_per_user=3)
+        assert redis_service.add_script.await_args.kwargs["args"][5] == 3
+
+    @pytest.mark.asyncio
+    async def test_remove_looks_up_user_when_missing(self, redis_service):
+        """Without user_id the connection info gives the index to update."""
+        redis_service.client.get.return_value = json.dumps({"user_id": "user-1", "instance_id": "instance-a"})
+
+        await redis_service.remove_ws_connection("conn-1")
+
+        call = redis_service.remove_script.await_args
+        assert call.kwargs["keys"][1] == "ws_user_connections:user-1"
+        assert call.kwargs["args"][0] == "instance-a:conn-1"
+
+    @pytest.mark.asyncio
+    async def test_remove_unknown_connection_is_noop(self, redis_service):
+        """An unknown (expired) connection does not touch the index."""
+        redis_service.client.get.return_value = None
+
+        await redis_service.remove_ws_connection("conn-1")
+
+        redis_service.remove_script.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_get_user_connections_reads_index(self, redis_service):
+        """Lookup reads the user's sorted set, pruning expired entries."""
+        redis_service.pipe.execute.return_value = [1, ["instance-a:conn-1", "instance-b:conn-2"]]
+
+        assert await redis_service.get_user_connections("user-1") == ["conn-1", "conn-2"]
+        redis_service.pipe.zremrangebyscore.assert_called_once()
+        assert redis_service.pipe.zrangebyscore.call_args.args[0] == "ws_user_connections:user-1"
+
+    @pytest.mark.asyncio
+    async def test_get_user_instances(self, redis_service):
+        """Instances holding a user's sockets come from the same index."""
+        redis_service.pipe.execute.return_value = [0, ["instance-a:conn-1", "instance-a:conn-2", "instance-b:conn-3"]]
+
+        assert await redis_service.get_user_instances("user-1") == {"instance-a", "instance-b"}
+
+    @pytest.mark.asyncio
+    async def test_count_online_users(self, redis_service):
+        """Online users are counted from the online-users sorted set."""
+        redis_service.pipe.execute.return_value = [0, 42]
+
+        assert await redis_service.count_online_users() == 42
+        redis_service.pipe.zcard.assert_called_once_with(WS_ONLINE_USERS_KEY)
+
+    @pytest.mark.asyncio
+    async def test_refresh_ws_connections_is_one_pipeline(self, redis_service):
+        """TTL refreshes for many connections share one round trip."""
+        await redis_service.refresh_ws_connections([("conn-1", "user-1"), ("conn-2", "user-1")], "instance-a", 90)
+
+        redis_service.pipe.execute.assert_awaited_once()
+        assert redis_service.pipe.expire.call_count == 3  # two connections + one user index
+        index_call = redis_service.pipe.zadd.call_args_list[0]
+        assert "instance-a:conn-1" in index_call.args[1]
+        assert index_call.kwargs["xx"] is True
+
+
+class TestReplayBuffer:
+    """Test reading the per-user replay buffer."""
+
+    @pytest.mark.asyncio
+    async def test_returns_missed_messages(self, redis_service):
+        redis_service.pipe.execute.return_value = ["5", [("3\n{}", 3.0)], ['4\n{"n": 4}', '5\n{"n": 5}']]
+
+        assert await redis_service.get_replay("user-1", 3) == [(4, '{"n": 4}'), (5, '{"n": 5}')]
+
+    @pytest.mark.asyncio
+    async def test_up_to_date_client(self, redis_service):
+        redis_service.pipe.execute.return_value = ["5", [("1\n{}", 1.0)], []]
+
+        assert await redis_service.get_replay("user-1", 5) == []
+
+    @pytest.mark.asyncio
+    async def test_gap_requires_resync(self, redis_service):
+        """Messages already trimmed from the buffer cannot be replayed."""
+        redis_service.pipe.execute.return_value = ["9", [("6\n{}", 6.0)], ["6\n{}"]]
+
+        assert await redis_service.get_replay("user-1", 3) is None
+
+    @pytest.mark.asyncio
+    async def test_reset_counter_requires_resync(self, redis_service):
+        redis_service.pipe.execute.return_value = [None, [], []]
+
+        assert await redis_service.get_replay("user-1", 3) is None
@@ -1,12 +1,14 @@
 """Tests for CRUD services."""
 
 import pytest
-from datetime import datetime
+from datetime import date, datetime
 from unittest.mock import AsyncMock, MagicMock
 
 from app.services.goal_service import GoalService
 from app.services.task_service import TaskService
-from app.models import GoalStatus, GoalPriority, TaskStatus, TaskType
+from app.services.rate_limit_audit_service import RateLimitAuditService
+from app.services.rate_limit_partition_service import RateLimitAuditPartitionService
+from app.models import GoalStatus, GoalPriority, TaskStatus, TaskType, RateLimitAction
 
 
 @pytest.fixture
@@ -190,3 +192,145 @@ async def test_goal_service_not_found(mock_db_session):
             user_id="user_123",
             title="New Title"
         )
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_statistics_single_aggregate_query(mock_db_session):
+    """Test statistics come from one GROUP BY ROLLUP query over the rollups."""
+    service = RateLimitAuditService(mock_db_session)
+
+    # (action, total, allowed, tokens, cost_cents, alerts, rt_sum, rt_count, users, grouping, *histogram)
+    mock_result = MagicMock()
+    mock_result.all = MagicMock(return_value=[
+        (RateLimitAction.embedding_generation, 180, 170, 100000, 200.0, 1, 7200.0, 180, 3, 0) + (0,) * 8,
+        (RateLimitAction.api_call, 270, 250, 25000, 50.0, 1, 2700.0, 270, 5, 0) + (0,) * 8,
+        (None, 450, 420, 125000, 250.0, 2, 9900.0, 450, 5, 1, 270, 0, 180, 0, 0, 0, 0, 0),
+    ])
+    mock_db_session.execute = AsyncMock(return_value=mock_result)
+
+    stats = await service.get_global_statistics()
+
+    mock_db_session.execute.assert_called_once()
+    query = str(mock_db_session.execute.call_args[0][0])
+    assert "GROUP BY ROLLUP" in query
+    # Default window is minute-aligned, so it is served from the rollups
+    assert "rate_limit_audit_rollups_hour" in query
+    assert "FROM rate_limit_audits" not in query
+
+    assert stats["requests"] == {"total": 450, "allowed": 420, "blocked": 30, "block_rate": 30 / 450}
+    assert stats["users"] == {"unique_users": 5, "avg_requests_per_user": 90.0}
+    # Same order as RateLimitAction
+    assert list(stats["by_action"]) == ["api_call", "embedding_generation"]
+    assert stats["by_action"]["embedding_generation"] == {"total": 180, "allowed": 170, "blocked": 10}
+    assert stats["openai"] == {"total_tokens": 125000, "estimated_cost_usd": 2.5}
+    assert stats["alerts"] == {"total": 2, "rate": 2 / 450}
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_statistics_unaligned_window_uses_raw_table(mock_db_session):
+    """Test windows that don't line up with the rollups scan the audit table."""
+    service = RateLimitAuditService(mock_db_session)
+
+    mock_result = MagicMock()
+    mock_result.all = MagicMock(return_value=[
+        (None, 4, 3, 0, 0, 0, 100.0, 2, 1, 1, 0, 1, 1, 0, 0, 0, 0, 0),
+    ])
+    mock_db_session.execute = AsyncMock(return_value=mock_result)
+
+    stats = await service.get_user_statistics(
+        "user_123",
+        start_date=datetime(2025, 1, 15, 10, 0, 30),
+        end_date=datetime(2025, 1, 15, 11, 0, 0)
+    )
+
+    query = str(mock_db_session.execute.call_args[0][0])
+    assert "FROM rate_limit_audits" in query
+    assert "FILTER" in query
+    assert stats["requests"]["total"] == 4
+    assert stats["performance"]["avg_response_time_ms"] == 50.0
+    assert stats["performance"]["response_time_histogram"]["le_50ms"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_user_statistics_empty_window(mock_db_session):
+    """Test user statistics for a window with no audits."""
+    service = RateLimitAuditService(mock_db_session)
+
+    mock_result = MagicMock()
+    mock_result.all = MagicMock(return_value=[(None, 0, 0, 0, 0, 0, 0, 0, 0, 1) + (0,) * 8])
+    mock_db_session.execute = AsyncMock(return_value=mock_result)
+
+    stats = await service.get_user_statistics("user_123")
+
+    assert stats["requests"] == {"total": 0, "allowed": 0, "blocked": 0, "block_rate": 0}
+    assert stats["by_action"] == {}
+    assert stats["openai"] == {"total_tokens": 0, "estimated_cost_usd": 0}
+    assert stats["performance"]["avg_response_time_ms"] == 0
+
+
+def _partitions_result(names):
+    result = MagicMock()
+    result.all = MagicMock(return_value=[(name,) for name in names])
+    return result
+
+
+@pytest.mark.asyncio
+async def test_audit_partitions_created_ahead(mock_db_session):
+    """Test missing daily partitions are created up to days_ahead."""
+    service = RateLimitAuditPartitionService(mock_db_session)
+    mock_db_session.execute = AsyncMock(side_effect=[
+        MagicMock(),  # advisory lock
+        _partitions_result(["rate_limit_audits_p20250115", "rate_limit_audits_default"]),
+        MagicMock(),  # lock on the parent
+        *[MagicMock() for _ in range(6)],  # create, move from default, attach per day
+    ])
+
+    created = await service.ensure_partitions(days_ahead=2, today=date(2025, 1, 15))
+
+    assert created == ["rate_limit_audits_p20250116", "rate_limit_audits_p20250117"]
+    lock = str(mock_db_session.execute.call_args_list[2][0][0])
+    assert lock == "LOCK TABLE rate_limit_audits IN SHARE ROW EXCLUSIVE MODE"
+    create, move, attach = (str(call[0][0]) for call in mock_db_session.execute.call_args_list[-3:])
+    assert 'CREATE TABLE "rate_limit_audits_p20250117"' in create
+    assert "DELETE FROM rate_limit_audits_default" in move
+    assert "timestamp >= '2025-01-17' AND timestamp < '2025-01-18'" in move
+    assert "ATTACH PARTITION" in attach
+    assert "FROM ('2025-01-17') TO ('2025-01-18')" in attach
+    mock_db_session.commit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_audit_partitions_no_lock_when_complete(mock_db_session):
+    """Test the parent is not locked when every partition already exists."""
+    service = RateLimitAuditPartitionService(mock_db_session)
+    mock_db_session.execute = AsyncMock(side_effect=[
+        MagicMock(),  # advisory lock
+        _partitions_result(["rate_limit_audits_p20250115", "rate_limit_audits_p20250116"]),
+    ])
+
+    assert await service.ensure_partitions(days_ahead=1, today=date(2025, 1, 15)) == []
+    assert mock_db_session.execute.call_count == 2
+    mock_db_session.commit.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_audit_partitions_retention_drops_whole_days(mock_db_session):
+    """Test only partitions entirely past retention are dropped."""
+    service = RateLimitAuditPartitionService(mock_db_session)
+    mock_db_session.execute = AsyncMock(side_effect=[
+        MagicMock(),  # advisory lock
+        _partitions_result([
+            "rate_limit_audits_p20250101",
+            "rate_limit_audits_p20250114",
+            "rate_limit_audits_p20250115",
+            "rate_limit_audits_default",
+        ]),
+        MagicMock(),
+        MagicMock(),
+    ])
+
+    # cutoff = 2025-01-15: the 14th ends exactly at the cutoff, the 15th is kept
+    dropped = await service.drop_expired_partitions(retention_days=30, today=date(2025, 2, 14))
+
+    assert dropped == ["rate_limit_audits_p20250101", "rate_limit_audits_p20250114"]
+    assert "DROP TABLE" in str(mock_db_session.execute.call_args_list[-1][0][0])
@@ -0,0 +1,226 @@
+"""Tests for the incremental suspicious-activity detector."""
+
+import random
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.rate_limiter import RateLimitResult
+from app.core.suspicious_activity import SuspiciousActivityDetector, evaluate_suspicious
+from app.models import RateLimitAction
+from app.services.rate_limit_audit_service import RateLimitAuditService
+
+
+class FakeSortedSetRedis:
+    """In-memory Redis supporting the sorted-set commands the detector pipelines."""
+
+    def __init__(self):
+        self.zsets = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def zremrangebyscore(self, key, min_score, max_score):
+        self.commands.append(("zrem", key, float(max_score.lstrip("("))))
+
+    def zcount(self, key, min_score, max_score):
+        self.commands.append(("zcount", key, min_score))
+
+    def zadd(self, key, mapping):
+        self.commands.append(("zadd", key, mapping))
+
+    def expire(self, key, seconds):
+        self.commands.append(("expire", key, seconds))
+
+    async def execute(self):
+        results = []
+        for command, key, arg in self.commands:
+            zset = self.redis.zsets.setdefault(key, {})
+            if command == "zrem":
+                stale = [m for m, score in zset.items() if score < arg]
+                for member in stale:
+                    del zset[member]
+                results.append(len(stale))
+            elif command == "zcount":
+                results.append(sum(1 for score in zset.values() if score >= arg))
+            elif command == "zadd":
+                zset.update(arg)
+                results.append(len(arg))
+            else:
+                results.append(True)
+        return results
+
+
+class ReplayDB:
+    """Fake session that answers the SQL COUNT(*) queries from replayed rows."""
+
+    def __init__(self):
+        self.rows = []
+
+    async def execute(self, query):
+        params = query.compile().params
+        only_blocked = "allowed" in str(query)
+
+        count = sum(
+            1 for row in self.rows
+            if row["user_id"] == params["user_id_1"]
+            and row["action"] == params["action_1"]
+            and row["timestamp"] >= params["timestamp_1"]
+            and (not only_blocked or not row["allowed"])
+        )
+        result = MagicMock()
+        result.scalar.return_value = count
+        return result
+
+
+def make_replay(seed=7, n=2000):
+    """Audit rows with bursts that cross both alert thresholds."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 15, 10, 0, 0)
+    users = ["user-a", "user-b", "user-c"]
+    actions = [RateLimitAction.api_call, RateLimitAction.bulk_create]
+    max_requests = {RateLimitAction.api_call: 20, RateLimitAction.bulk_create: 5}
+
+    rows = []
+    offset = 0.0
+    for _ in range(n):
+        # Ráfagas densas intercaladas con pausas que vacían la ventana
+        offset += rng.choice([0.05, 0.1, 0.5, 1.0, 2.0, 90.0, 301.0]) if rng.random() < 0.1 \
+            else rng.uniform(0.01, 0.4)
+        action = rng.choice(actions)
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "user_id": rng.choice(users),
+            "action": action,
+            "allowed": rng.random() < 0.6,
+            "rate_limit_max_requests": max_requests[action],
+            "timestamp": start + timedelta(seconds=offset),
+        })
+    return rows
+
+
+async def replay_sql(rows):
+    """Flags produced by the per-request SQL path."""
+    db = ReplayDB()
+    service = RateLimitAuditService(db)
+    flags = []
+
+    for row in rows:
+        clock = MagicMock(wraps=datetime)
+        clock.utcnow.return_value = row["timestamp"]
+        result = RateLimitResult(
+            allowed=row["allowed"],
+            tokens_requested=1,
+            tokens_available=0,
+            tokens_consumed=1 if row["allowed"] else 0,
+            limit_key="",
+            window_seconds=60,
+            max_requests=row["rate_limit_max_requests"],
+            current_count=0,
+        )
+        with patch("app.services.rate_limit_audit_service.datetime", clock):
+            flags.append(await service._check_suspicious_activity(
+                user_id=row["user_id"],
+                action=row["action"],
+                rate_limit_result=result,
+                endpoint="/api/v1/goals"
+            ))
+        db.rows.append(row)
+
+    return flags
+
+
+class TestSuspiciousActivityDetector:
+    """Test the Redis-backed rolling-window detector."""
+
+    @pytest.mark.asyncio
+    async def test_matches_sql_path_on_replay(self):
+        """Detector flags are identical to the SQL COUNT(*) path."""
+        rows = make_replay()
+        expected = await replay_sql(rows)
+
+        detector = SuspiciousActivityDetector(FakeSortedSetRedis())
+        actual = [
+            await detector.observe(
+                request_id=row["id"],
+                user_id=row["user_id"],
+                action=row["action"].value,
+                allowed=row["allowed"],
+                max_requests=row["rate_limit_max_requests"],
+                timestamp=row["timestamp"],
+            )
+            for row in rows
+        ]
+
+        assert actual == expected
+        reasons = {reason.split(":")[0] for _, reason in expected if reason}
+        assert reasons == {"Excessive requests", "Multiple rate limit violations"}
+
+    @pytest.mark.asyncio
+    async def test_batches_match_sql_path(self):
+        """Flagging in batches gives the same result as one row at a time."""
+        rows = make_replay(seed=11, n=1000)
+        expected = await replay_sql(rows)
+
+        detector = SuspiciousActivityDetector(FakeSortedSetRedis())
+        batch = [dict(row) for row in rows]
+        for i in range(0, len(batch), 37):
+            await detector.flag_batch(batch[i:i + 37])
+
+        assert [(r["is_suspicious"], r["alert_reason"]) for r in batch] == expected
+        assert all(r["alert_triggered"] == r["is_suspicious"] for r in batch)
+
+    @pytest.mark.asyncio
+    async def test_window_boundary_is_inclusive(self):
+        """A request exactly 5 minutes old still counts, like timestamp >= since."""
+        detector = SuspiciousActivityDetector(FakeSortedSetRedis(), window_seconds=300)
+        start = datetime(2025, 1, 15, 10, 0, 0)
+
+        for i in range(6):
+            await detector.observe(str(i), "user-1", "api_call", True, 1, start)
+
+        assert await detector.observe("late", "user-1", "api_call", True, 1, start + timedelta(seconds=300)) == \
+            (True, "Excessive requests: 6 in 5 minutes (threshold: 5)")
+        assert await detector.observe("later", "user-1", "api_call", True, 1, start + timedelta(seconds=300, microseconds=1)) == \
+            (False, None)
+
+    @pytest.mark.asyncio
+    async def test_log_request_falls_back_to_sql_when_redis_fails(self):
+        """A detector error does not reach the request: the SQL path flags it."""
+        db = MagicMock()
+        db.execute = AsyncMock()
+        db.commit = AsyncMock()
+        db.refresh = AsyncMock()
+        detector = SuspiciousActivityDetector(MagicMock())
+        detector.flag_batch = AsyncMock(side_effect=ConnectionError("redis down"))
+        service = RateLimitAuditService(db)
+        service._check_suspicious_activity = AsyncMock(return_value=(True, "Excessive requests"))
+        result = RateLimitResult(
+            allowed=True, tokens_requested=1, tokens_available=5, tokens_consumed=1,
+            limit_key="", window_seconds=60, max_requests=10, current_count=1,
+        )
+
+        audit = await service.log_request(
+            "user-1", "/api/v1/goals", "GET", RateLimitAction.api_call, result, detector=detector
+        )
+
+        assert audit.is_suspicious is True
+        assert audit.alert_reason == "Excessive requests"
+        db.commit.assert_awaited_once()
+
+
+def test_evaluate_suspicious_rules():
+    """Shared rules keep the original alert_reason strings."""
+    assert evaluate_suspicious(51, 0, 10, True) == \
+        (True, "Excessive requests: 51 in 5 minutes (threshold: 50)")
+    assert evaluate_suspicious(20, 11, 10, False) == \
+        (True, "Multiple rate limit violations: 11 blocked requests in 5 minutes")
+    assert evaluate_suspicious(20, 11, 10, True) == (False, None)
+    assert evaluate_suspicious(50, 10, 10, False) == (False, None)
@@ -0,0 +1,125 @@
+"""Tests for the JWT claims cache and the token blacklist filter."""
+
+import time
+import pytest
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core import security
+from app.core.security import create_access_token, decode_token
+from app.core.token_blacklist import BloomFilter, TokenBlacklist
+from app.core.token_cache import TokenClaimsCache, token_digest
+
+
+class TestTokenClaimsCache:
+    """Test the LRU of verified claims."""
+
+    def test_hit_until_exp(self):
+        """Entries are served until the token's exp."""
+        cache = TokenClaimsCache(max_size=10)
+        cache.put("token", {"sub": "user-1", "exp": time.time() + 60})
+
+        assert cache.get("token")["sub"] == "user-1"
+        assert cache.hits == 1
+
+    def test_expired_entry_is_dropped(self):
+        """An entry past its exp is a miss and is evicted."""
+        cache = TokenClaimsCache(max_size=10)
+        cache.put("token", {"sub": "user-1", "exp": time.time() - 1})
+
+        assert cache.get("token") is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        """The least recently used token is evicted when full."""
+        cache = TokenClaimsCache(max_size=2)
+        exp = time.time() + 60
+        cache.put("a", {"sub": "a", "exp": exp})
+        cache.put("b", {"sub": "b", "exp": exp})
+        cache.get("a")
+        cache.put("c", {"sub": "c", "exp": exp})
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    def test_tokens_without_exp_are_not_cached(self):
+        """Claims without exp are never cached."""
+        cache = TokenClaimsCache(max_size=10)
+        cache.put("token", {"sub": "user-1"})
+
+        assert len(cache) == 0
+
+    def test_decode_token_uses_cache(self):
+        """A second decode of the same token skips jwt.decode."""
+        security._claims_cache.clear()
+        token = create_access_token({"sub": "user-1"}, expires_delta=timedelta(minutes=5))
+
+        assert decode_token(token)["sub"] == "user-1"
+        with patch("app.core.security.jwt.decode") as jwt_decode:
+            assert decode_token(token)["sub"] == "user-1"
+            jwt_decode.assert_not_called()
+
+    def test_invalid_token_is_not_cached(self):
+        """Invalid tokens are rejected every time and never cached."""
+        security._claims_cache.clear()
+
+        assert decode_token("not-a-jwt") is None
+        assert len(security._claims_cache) == 0
+
+
+class TestTokenBlacklist:
+    """Test the Bloom filter blacklist check."""
+
+    @pytest.fixture
+    def mock_redis(self):
+        redis_mock = AsyncMock()
+        redis_mock.exists = AsyncMock(return_value=1)
+
+        async def scan_iter(match=None, count=None):
+            yield "blacklist:revoked-token"
+
+        redis_mock.scan_iter = MagicMock(side_effect=scan_iter)
+        return redis_mock
+
+    def test_bloom_filter_membership(self):
+        """Added digests are always found."""
+        bloom = BloomFilter(capacity=1000, error_rate=0.001)
+        digests = [token_digest(f"token-{i}") for i in range(1000)]
+        for digest in digests:
+            bloom.add(digest)
+
+        assert all(digest in bloom for digest in digests)
+        false_positives = sum(token_digest(f"other-{i}") in bloom for i in range(10_000))
+        assert false_positives < 100
+
+    @pytest.mark.asyncio
+    async def test_unsynced_checks_redis(self, mock_redis):
+        """Without a synced filter every check goes to Redis."""
+        blacklist = TokenBlacklist(mock_redis)
+
+        assert await blacklist.is_blacklisted("any-token") is True
+        mock_redis.exists.assert_awaited_once_with("blacklist:any-token")
+
+    @pytest.mark.asyncio
+    async def test_filter_negative_skips_redis(self, mock_redis):
+        """Tokens not in the filter are accepted without a Redis round-trip."""
+        blacklist = TokenBlacklist(mock_redis, capacity=1000)
+        await blacklist.rebuild()
+
+        assert await blacklist.is_blacklisted("valid-token") is False
+        mock_redis.exists.assert_not_awaited()
+
+        assert await blacklist.is_blacklisted("revoked-token") is True
+        mock_redis.exists.assert_awaited_once_with("blacklist:revoked-token")
+
+    @pytest.mark.asyncio
+    async def test_published_revocation_is_applied(self, mock_redis):
+        """A digest received on the channel makes the next check ask Redis."""
+        blacklist = TokenBlacklist(mock_redis, capacity=1000)
+        await blacklist.rebuild()
+
+        blacklist.apply_event(token_digest("logged-out-token").hex())
+
+        assert await blacklist.is_blacklisted("logged-out-token") is True
+        assert blacklist.redis_checks == 1
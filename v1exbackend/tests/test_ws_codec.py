@@ -0,0 +1,84 @@
+"""Tests for WebSocket wire formats."""
+
+import zlib
+import msgpack
+import orjson
+import pytest
+
+from app.core.websocket import WebSocketMessage
+from app.core.ws_codec import (
+    FLAG_DEFLATE,
+    FLAG_RAW,
+    MAX_INFLATED_SIZE,
+    MSGPACK,
+    MessageCodec,
+    OutboundMessage,
+)
+
+
+def outbound(payload: dict) -> OutboundMessage:
+    return OutboundMessage(WebSocketMessage(type="test", payload=payload, correlation_id="c-1").to_dict())
+
+
+class TestMessageCodec:
+    """Test encoding and decoding per negotiated format."""
+
+    def test_default_is_json_text(self):
+        """Without negotiation frames stay JSON text, as before."""
+        frame = MessageCodec().encode(outbound({"n": 1}))
+
+        assert isinstance(frame, str)
+        assert orjson.loads(frame)["payload"] == {"n": 1}
+
+    def test_msgpack_binary_frames(self):
+        codec = MessageCodec(MSGPACK)
+        frame = codec.encode(outbound({"n": 1}))
+
+        assert isinstance(frame, bytes)
+        assert frame[0] == FLAG_RAW
+        assert msgpack.unpackb(frame[1:])["payload"] == {"n": 1}
+        assert codec.decode(frame)["correlation_id"] == "c-1"
+
+    def test_deflate_only_above_threshold(self):
+        codec = MessageCodec(compress=True, compress_threshold=256)
+
+        small = codec.encode(outbound({"code": "x"}))
+        large = codec.encode(outbound({"code": "print('hello')\n" * 100}))
+
+        assert isinstance(small, str)
+        assert large[0] == FLAG_DEFLATE
+        assert len(large) < len(orjson.dumps(outbound({"code": "print('hello')\n" * 100}).data))
+        assert codec.decode(large)["payload"]["code"].startswith("print")
+
+    def test_decode_rejects_oversized_inflation(self):
+        bomb = bytes((FLAG_DEFLATE,)) + zlib.compress(b"0" * (MAX_INFLATED_SIZE + 1), wbits=-15)
+
+        with pytest.raises(ValueError):
+            MessageCodec().decode(bomb)
+
+    def test_negotiate_from_query_string(self):
+        codec = MessageCodec.negotiate({"format": "msgpack", "compress": "deflate"}, 512)
+        assert (codec.format, codec.compress, codec.compress_threshold) == (MSGPACK, True, 512)
+
+        fallback = MessageCodec.negotiate({"format": "xml"})
+        assert (fallback.format, fallback.compress) == ("json", False)
+
+
+class TestOutboundMessage:
+    """Test that each variant is encoded once."""
+
+    def test_frames_are_cached_per_format(self):
+        message = outbound({"n": 1})
+        json_codec, msgpack_codec = MessageCodec(), MessageCodec(MSGPACK)
+
+        assert message.frame(json_codec) is message.frame(MessageCodec())
+        assert message.frame(msgpack_codec) is message.frame(MessageCodec(MSGPACK))
+        assert message.frame(json_codec) != message.frame(msgpack_codec)
+
+    def test_remote_json_text_is_reused(self):
+        """Messages from other instances are not re-encoded for JSON clients."""
+        text = WebSocketMessage(type="test", payload={"n": 1}).to_json()
+        message = OutboundMessage(json_text=text)
+
+        assert message.frame(MessageCodec()) is text
+        assert msgpack.unpackb(message.frame(MessageCodec(MSGPACK))[1:])["payload"] == {"n": 1}
@@ -0,0 +1,102 @@
+"""Tests for cross-instance WebSocket fan-out."""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.core.websocket import ConnectionManager, WebSocketMessage
+from app.core.ws_fanout import BROADCAST_CHANNEL, WebSocketFanout, instance_channel
+
+
+@pytest.fixture
+def mock_redis():
+    """Redis client whose pipeline records PUBLISH calls."""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+
+    client = MagicMock()
+    client.pipeline = MagicMock(return_value=MagicMock(
+        __aenter__=AsyncMock(return_value=pipe),
+        __aexit__=AsyncMock(return_value=False),
+    ))
+    client.pipe = pipe
+    return client
+
+
+class TestWebSocketFanout:
+    """Test batching and delivery of fan-out frames."""
+
+    @pytest.mark.asyncio
+    async def test_messages_are_batched_per_instance(self, mock_redis):
+        """Pending messages become one PUBLISH per target channel."""
+        fanout = WebSocketFanout(mock_redis, "instance-a", AsyncMock())
+        fanout.send_to_user(["instance-b", "instance-c"], "user-1", '{"n": 1}')
+        fanout.send_to_user(["instance-b"], "user-2", '{"n": 2}')
+
+        await fanout.flush()
+
+        published = {call.args[0]: call.args[1] for call in mock_redis.pipe.publish.call_args_list}
+        assert set(published) == {instance_channel("instance-b"), instance_channel("instance-c")}
+        assert len(published[instance_channel("instance-b")].split("\n")) == 2
+        assert fanout.published_frames == 2
+        assert fanout.published_messages == 3
+        mock_redis.pipe.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_frame_is_delivered_per_user(self, mock_redis):
+        """Each line of a frame is delivered to the user's local sockets."""
+        deliver = AsyncMock()
+        fanout = WebSocketFanout(mock_redis, "instance-a", deliver)
+        frame = "\n".join([
+            json.dumps({"user_id": "user-1", "message": "m1"}),
+            json.dumps({"user_id": "user-2", "message": "m2"}),
+        ])
+
+        await fanout._handle_frame(instance_channel("instance-a"), frame)
+
+        assert [call.args for call in deliver.await_args_list] == [("user-1", "m1"), ("user-2", "m2")]
+
+    @pytest.mark.asyncio
+    async def test_own_broadcast_is_skipped(self, mock_redis):
+        """An instance does not redeliver its own broadcasts."""
+        deliver = AsyncMock()
+        fanout = WebSocketFanout(mock_redis, "instance-a", deliver)
+        frame = "\n".join([
+            json.dumps({"origin": "instance-a", "message": "mine"}),
+            json.dumps({"origin": "instance-b", "message": "theirs"}),
+        ])
+
+        await fanout._handle_frame(BROADCAST_CHANNEL, frame)
+
+        deliver.assert_awaited_once_with(None, "theirs")
+
+
+class TestConnectionManagerRouting:
+    """Test that send_to_user only targets instances holding the user's sockets."""
+
+    @pytest.mark.asyncio
+    async def test_send_to_user_routes_to_remote_instances(self):
+        manager = ConnectionManager()
+        manager._redis = MagicMock()
+        manager._redis.add_ws_connection = AsyncMock(return_value=True)
+        manager._redis.remove_ws_connection = AsyncMock()
+        manager._redis.get_user_connections = AsyncMock(return_value=[])
+        manager._redis.get_user_instances = AsyncMock(return_value={manager.instance_id, "instance-b"})
+        manager._redis.append_replay = AsyncMock(return_value=7)
+        manager.fanout = MagicMock()
+
+        websocket = AsyncMock()
+        connection_id = await manager.connect(websocket, "user-1")
+
+        await manager.send_to_user(WebSocketMessage(type="ping", payload={}), "user-1")
+        await asyncio.sleep(0.01)
+
+        websocket.send_text.assert_awaited_once()
+        instance_ids, user_id, text = manager.fanout.send_to_user.call_args.args
+        assert instance_ids == {"instance-b"}
+        assert user_id == "user-1"
+        assert json.loads(text)["type"] == "ping"
+        assert json.loads(text)["seq"] == 7
+
+        await manager.disconnect(connection_id)
@@ -0,0 +1,164 @@
+"""Tests for per-connection WebSocket outbound queues."""
+
+import asyncio
+import orjson
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import status
+
+from app.core.websocket import ConnectionManager, WebSocketMessage
+from app.core.ws_outbound import DISCONNECT, ConnectionWriter
+
+
+class BlockingWebSocket:
+    """WebSocket whose sends wait until released."""
+
+    def __init__(self):
+        self.sent: list[str] = []
+        self.release = asyncio.Event()
+        self.accept = AsyncMock()
+        self.close = AsyncMock()
+
+    async def send_text(self, text: str) -> None:
+        await self.release.wait()
+        self.sent.append(text)
+
+
+class TestConnectionWriter:
+    """Test queueing, coalescing and the overflow policies."""
+
+    @pytest.mark.asyncio
+    async def test_frames_are_sent_in_order(self):
+        websocket = BlockingWebSocket()
+        websocket.release.set()
+        writer = ConnectionWriter(websocket, on_close=AsyncMock())
+        writer.start()
+
+        for i in range(5):
+            writer.enqueue(f"m{i}")
+        await asyncio.sleep(0.01)
+
+        assert websocket.sent == ["m0", "m1", "m2", "m3", "m4"]
+        assert writer.sent == 5
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_queued_frames_with_same_key_are_coalesced(self):
+        """Only the latest queued frame of a key is sent, in its original slot."""
+        websocket = BlockingWebSocket()
+        writer = ConnectionWriter(websocket, on_close=AsyncMock())
+
+        writer.enqueue("progress 10%", coalesce_key="task-1")
+        writer.enqueue("other")
+        writer.enqueue("progress 50%", coalesce_key="task-1")
+
+        websocket.release.set()
+        writer.start()
+        await asyncio.sleep(0.01)
+
+        assert websocket.sent == ["progress 50%", "other"]
+        assert writer.coalesced == 1
+        await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_drop_oldest_when_full(self):
+        writer = ConnectionWriter(BlockingWebSocket(), on_close=AsyncMock(), max_queue=2)
+
+        for i in range(4):
+            assert writer.enqueue(f"m{i}") is True
+
+        assert [entry[0] for entry in writer._queue] == ["m2", "m3"]
+        assert writer.dropped == 2
+
+    @pytest.mark.asyncio
+    async def test_merged_frames_are_combined_and_never_dropped(self):
+        """A frame queued with merge is combined with the next one and survives drop_oldest."""
+        writer = ConnectionWriter(BlockingWebSocket(), on_close=AsyncMock(), max_queue=2)
+
+        writer.enqueue("ab", coalesce_key="stream", merge=lambda queued: queued + "ab")
+        writer.enqueue("cd", coalesce_key="stream", merge=lambda queued: queued + "cd")
+        for i in range(3):
+            writer.enqueue(f"m{i}")
+
+        assert [entry[0] for entry in writer._queue] == ["abcd", "m2"]
+        assert writer.coalesced == 1
+        assert writer.dropped == 2
+
+    @pytest.mark.asyncio
+    async def test_disconnect_policy_closes_slow_consumer(self):
+        websocket = BlockingWebSocket()
+        on_close = AsyncMock()
+        writer = ConnectionWriter(websocket, on_close=on_close, max_queue=1, policy=DISCONNECT)
+
+        assert writer.enqueue("m0") is True
+        assert writer.enqueue("m1") is False
+        await asyncio.sleep(0.01)
+
+        websocket.close.assert_awaited_once_with(code=status.WS_1013_TRY_AGAIN_LATER)
+        on_close.assert_awaited_once()
+        assert writer._close_task.done()
+        assert writer.enqueue("m2") is False
+
+
+class TestConnectionManagerBroadcast:
+    """Test that broadcast encodes once and slow sockets do not block others."""
+
+    @pytest.mark.asyncio
+    async def test_broadcast_serializes_once_and_skips_slow_socket(self):
+        manager = ConnectionManager()
+        manager._redis = MagicMock()
+        manager._redis.add_ws_connection = AsyncMock(return_value=True)
+        manager._redis.remove_ws_connection = AsyncMock()
+        manager._redis.get_user_connections = AsyncMock(return_value=[])
+
+        slow = BlockingWebSocket()
+        fast = [BlockingWebSocket() for _ in range(3)]
+        for websocket in fast:
+            websocket.release.set()
+
+        connection_ids = [await manager.connect(slow, "slow-user")]
+        connection_ids += [await manager.connect(websocket, f"user-{i}") for i, websocket in enumerate(fast)]
+
+        message = WebSocketMessage(type="notice", payload={"n": 1})
+        with patch.object(WebSocketMessage, "to_dict", autospec=True, side_effect=WebSocketMessage.to_dict) as to_dict:
+            await manager.broadcast(message)
+            await asyncio.sleep(0.01)
+
+        to_dict.assert_called_once()
+        assert all(len(websocket.sent) == 1 for websocket in fast)
+        assert slow.sent == []
+
+        for connection_id in connection_ids:
+            await manager.disconnect(connection_id)
+        assert manager.writers == {}
+
+
+class TestConnectionManagerMerge:
+    """Test merging still-queued messages for a slow connection."""
+
+    @pytest.mark.asyncio
+    async def test_queued_deltas_are_merged_for_slow_socket(self):
+        manager = ConnectionManager()
+        manager._redis = MagicMock()
+        manager._redis.add_ws_connection = AsyncMock(return_value=True)
+        manager._redis.remove_ws_connection = AsyncMock()
+
+        slow = BlockingWebSocket()
+        connection_id = await manager.connect(slow, "user-1")
+
+        def merge(queued, message):
+            return {**message, "payload": {"text": queued["payload"]["text"] + message["payload"]["text"]}}
+
+        for text in ("a", "b", "c"):
+            await manager.send_personal_message(
+                WebSocketMessage(type="delta", payload={"text": text}), connection_id,
+                coalesce_key="stream", merge=merge
+            )
+            # "a" is already being sent; "b" and "c" wait in the queue
+            await asyncio.sleep(0.01)
+        slow.release.set()
+        await asyncio.sleep(0.01)
+
+        assert [orjson.loads(frame)["payload"]["text"] for frame in slow.sent] == ["a", "bc"]
+        await manager.disconnect(connection_id)
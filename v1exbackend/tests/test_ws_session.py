@@ -0,0 +1,86 @@
+"""Tests for resumable WebSocket sessions."""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.core.websocket import ConnectionManager, WebSocketMessage
+
+
+class RecordingWebSocket:
+    """WebSocket that records the JSON messages it is sent."""
+
+    def __init__(self):
+        self.messages: list[dict] = []
+        self.accept = AsyncMock()
+        self.close = AsyncMock()
+
+    async def send_text(self, text: str) -> None:
+        self.messages.append(json.loads(text))
+
+
+@pytest.fixture
+def manager():
+    manager = ConnectionManager()
+    manager._redis = MagicMock()
+    manager._redis.add_ws_connection = AsyncMock(return_value=True)
+    manager._redis.remove_ws_connection = AsyncMock()
+    manager._redis.get_user_connections = AsyncMock(return_value=[])
+    manager._redis.append_replay = AsyncMock(side_effect=[11, 12])
+    return manager
+
+
+def stored(seq: int, n: int) -> tuple[int, str]:
+    return seq, WebSocketMessage(type="notice", payload={"n": n}).to_json()
+
+
+class TestSessionResume:
+    """Test sequencing and replay on reconnect."""
+
+    @pytest.mark.asyncio
+    async def test_send_to_user_assigns_seq(self, manager):
+        websocket = RecordingWebSocket()
+        await manager.connect(websocket, "user-1")
+
+        await manager.send_to_user(WebSocketMessage(type="notice", payload={}), "user-1")
+        await manager.send_to_user(WebSocketMessage(type="notice", payload={}), "user-1")
+        await asyncio.sleep(0.01)
+
+        assert [message["seq"] for message in websocket.messages] == [11, 12]
+        assert "seq" not in json.loads(manager._redis.append_replay.await_args_list[0].args[1])
+
+    @pytest.mark.asyncio
+    async def test_missed_messages_replayed_before_new_ones(self, manager):
+        replay_started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def get_replay(user_id, after_seq):
+            replay_started.set()
+            await release.wait()
+            return [stored(9, 9), stored(10, 10)]
+
+        manager._redis.get_replay = AsyncMock(side_effect=get_replay)
+        websocket = RecordingWebSocket()
+
+        connecting = asyncio.create_task(manager.connect(websocket, "user-1", last_seq=8))
+        await replay_started.wait()
+        # A new message sent while the replay is being read
+        await manager.send_to_user(WebSocketMessage(type="notice", payload={"n": 11}), "user-1")
+        release.set()
+        await connecting
+        await asyncio.sleep(0.01)
+
+        assert [message["seq"] for message in websocket.messages] == [9, 10, 11]
+        manager._redis.get_replay.assert_awaited_once_with("user-1", 8)
+
+    @pytest.mark.asyncio
+    async def test_resync_when_buffer_lost(self, manager):
+        manager._redis.get_replay = AsyncMock(return_value=None)
+        websocket = RecordingWebSocket()
+
+        await manager.connect(websocket, "user-1", last_seq=3)
+        await asyncio.sleep(0.01)
+
+        assert websocket.messages[0]["type"] == "session.resync_required"
+        assert websocket.messages[0]["payload"] == {"last_seq": 3}
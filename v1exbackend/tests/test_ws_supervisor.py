@@ -0,0 +1,166 @@
+"""Tests for WebSocket admission control and heartbeat supervision."""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import status
+
+from app.core.websocket import ConnectionManager
+from app.core.ws_supervisor import ConnectionSupervisor
+
+
+@pytest.fixture
+def manager():
+    """ConnectionManager over a mocked Redis service."""
+    manager = ConnectionManager()
+    manager._redis = MagicMock()
+    manager._redis.add_ws_connection = AsyncMock(return_value=True)
+    manager._redis.remove_ws_connection = AsyncMock()
+    manager._redis.get_user_connections = AsyncMock(return_value=[])
+    manager._redis.refresh_ws_connections = AsyncMock()
+    manager.supervisor = ConnectionSupervisor(
+        manager, heartbeat_interval=3, idle_timeout=9, max_connections_per_user=2, max_connections=3
+    )
+    return manager
+
+
+async def advance_interval(manager: ConnectionManager) -> None:
+    """Turn the wheel a full heartbeat interval."""
+    for _ in range(len(manager.supervisor._wheel)):
+        await manager.supervisor.advance()
+
+
+class TestAdmission:
+    """Test per-user and per-process connection limits."""
+
+    @pytest.mark.asyncio
+    async def test_per_user_limit_counts_other_instances(self, manager):
+        # The Redis script refuses: the user is at the limit on other instances
+        manager._redis.add_ws_connection.return_value = False
+        websocket = AsyncMock()
+
+        assert await manager.connect(websocket, "user-1") is None
+        assert manager._redis.add_ws_connection.await_args.kwargs["max_per_user"] == 2
+        websocket.close.assert_awaited_once_with(code=status.WS_1008_POLICY_VIOLATION)
+        websocket.accept.assert_not_awaited()
+        assert manager.supervisor._reserved == {}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_connects_cannot_exceed_user_limit(self, manager):
+        """A reconnect storm is admitted up to the limit even while Redis is slow."""
+        async def slow_add(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return True
+
+        manager._redis.add_ws_connection.side_effect = slow_add
+        websockets = [AsyncMock() for _ in range(5)]
+
+        results = await asyncio.gather(*[manager.connect(ws, "user-1") for ws in websockets])
+
+        assert sum(result is not None for result in results) == 2
+        assert manager.get_user_connection_count("user-1") == 2
+        assert manager.supervisor.rejected == 3
+        assert manager.supervisor._reserved_total == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_accept_releases_slot(self, manager):
+        websocket = AsyncMock()
+        websocket.accept.side_effect = RuntimeError("client went away")
+
+        with pytest.raises(RuntimeError):
+            await manager.connect(websocket, "user-1")
+
+        manager._redis.remove_ws_connection.assert_awaited_once()
+        assert manager.supervisor._reserved == {}
+
+    @pytest.mark.asyncio
+    async def test_per_process_limit(self, manager):
+        for i in range(3):
+            assert await manager.connect(AsyncMock(), f"user-{i}") is not None
+
+        websocket = AsyncMock()
+        assert await manager.connect(websocket, "user-9") is None
+        websocket.close.assert_awaited_once_with(code=status.WS_1013_TRY_AGAIN_LATER)
+        assert manager.supervisor.rejected == 1
+
+
+class TestHeartbeatWheel:
+    """Test pings, idle eviction and batched TTL refreshes."""
+
+    @pytest.mark.asyncio
+    async def test_active_connection_ttl_refreshed_in_batch(self, manager):
+        first = await manager.connect(AsyncMock(), "user-1")
+        second = await manager.connect(AsyncMock(), "user-2")
+
+        await advance_interval(manager)
+
+        connections, instance_id, ttl = manager._redis.refresh_ws_connections.await_args.args
+        assert set(connections) == {(first, "user-1"), (second, "user-2")}
+        assert instance_id == manager.instance_id
+        assert ttl == manager.supervisor.connection_ttl
+        manager._redis.refresh_ws_connections.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_quiet_connection_is_pinged_then_evicted(self, manager):
+        websocket = AsyncMock()
+        connection_id = await manager.connect(websocket, "user-1")
+        manager.send_ping = AsyncMock()
+
+        manager.supervisor.last_seen[connection_id] -= 4
+        await advance_interval(manager)
+        manager.send_ping.assert_awaited_once_with(connection_id)
+        assert connection_id in manager.active_connections
+
+        manager.supervisor.last_seen[connection_id] -= 10
+        await advance_interval(manager)
+        websocket.close.assert_awaited_once_with(code=status.WS_1001_GOING_AWAY)
+        assert connection_id not in manager.active_connections
+        assert manager.supervisor.metrics()["supervised"] == 0
+
+    @pytest.mark.asyncio
+    async def test_touch_keeps_connection_alive(self, manager):
+        connection_id = await manager.connect(AsyncMock(), "user-1")
+        manager.send_ping = AsyncMock()
+
+        manager.supervisor.last_seen[connection_id] -= 10
+        manager.touch(connection_id)
+        await advance_interval(manager)
+
+        manager.send_ping.assert_not_awaited()
+        assert connection_id in manager.active_connections
+
+    @pytest.mark.asyncio
+    async def test_delivered_pings_keep_silent_client_alive(self, manager):
+        """A client that never answers stays connected while pings reach its socket."""
+        websocket = AsyncMock()
+        connection_id = await manager.connect(websocket, "user-1")
+
+        for _ in range(4):
+            manager.supervisor.last_seen[connection_id] -= 4
+            await advance_interval(manager)
+            await asyncio.sleep(0.01)
+
+        assert manager.supervisor.pings_sent == 4
+        assert websocket.send_text.await_count == 4
+        assert connection_id in manager.active_connections
+        await manager.disconnect(connection_id)
+
+    @pytest.mark.asyncio
+    async def test_undelivered_ping_does_not_count(self, manager):
+        """A ping stuck behind a dead socket does not refresh liveness."""
+        async def blocked_send(frame):
+            await asyncio.Event().wait()
+
+        websocket = AsyncMock()
+        websocket.send_text.side_effect = blocked_send
+        connection_id = await manager.connect(websocket, "user-1")
+
+        manager.supervisor.last_seen[connection_id] -= 4
+        await advance_interval(manager)
+        await asyncio.sleep(0.01)
+        manager.supervisor.last_seen[connection_id] -= 6
+        await advance_interval(manager)
+
+        websocket.close.assert_awaited_once_with(code=status.WS_1001_GOING_AWAY)
+        assert connection_id not in manager.active_connections